@@ -0,0 +1,103 @@
+"""Janela de contexto do agente criativo: resumo acumulado + turnos recentes.
+
+Cada turno envia ao LLM o system prompt, o resumo da sessao
+(``CreativeSession.summary``) e as mensagens mais recentes que cabem em
+``AGENT_CONTEXT_MAX_TOKENS``. O que sai da janela e incorporado ao resumo em
+segundo plano (``summarize_session_task``) quando acumula
+``AGENT_SUMMARY_BATCH`` mensagens; cada atualizacao manda ao LLM so o resumo
+anterior e as mensagens novas. Assim o custo de um turno nao cresce com o
+tamanho da sessao.
+
+Tokens sao estimados (~4 caracteres por token) para nao depender do
+tokenizer do provedor; os limites tem folga para isso.
+"""
+import math
+from typing import List, NamedTuple, Optional
+
+from django.conf import settings
+
+from .agent_prompt import CREATIVE_AGENT_SYSTEM_PROMPT, SESSION_SUMMARY_PROMPT
+from .llm import chat_completion
+from .models import SessionMessage
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = "Resumo da conversa até aqui:\n"
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Corta ``text`` para caber em ``max_tokens`` (estimados)."""
+    max_chars = max(1, (max_tokens - MESSAGE_OVERHEAD_TOKENS) * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1].rstrip() + "…"
+
+
+class AgentContext(NamedTuple):
+    messages: List[dict]
+    # Id da mensagem mais nova que ficou fora da janela, quando ja ha
+    # mensagens suficientes para atualizar o resumo.
+    summarize_until: Optional[int]
+
+
+def build_agent_context(session):
+    """Mensagens do proximo turno do agente, dentro do orcamento de tokens.
+
+    Uma unica query, limitada a ``AGENT_CONTEXT_MAX_MESSAGES`` +
+    ``AGENT_SUMMARY_BATCH`` linhas, le as mensagens mais novas ainda fora do
+    resumo. A mais nova (a do usuario) sempre entra, truncada se preciso.
+    """
+    max_messages = settings.AGENT_CONTEXT_MAX_MESSAGES
+    batch = settings.AGENT_SUMMARY_BATCH
+    per_message = settings.AGENT_CONTEXT_MESSAGE_MAX_TOKENS
+
+    messages = [{"role": "system", "content": CREATIVE_AGENT_SYSTEM_PROMPT}]
+    budget = settings.AGENT_CONTEXT_MAX_TOKENS
+    if session.summary:
+        summary = SUMMARY_HEADER + session.summary
+        messages.append({"role": "system", "content": summary})
+        budget -= estimate_tokens(summary)
+
+    rows = list(
+        session.messages.filter(id__gt=session.summarized_until_id)
+        .exclude(status=SessionMessage.Status.PENDING)
+        .order_by("-id")
+        .values_list("id", "role", "text")[:max_messages + batch]
+    )
+    window = []
+    for _, role, text in rows[:max_messages]:
+        text = truncate_to_tokens(text, per_message)
+        cost = estimate_tokens(text)
+        if window and cost > budget:
+            break
+        budget -= cost
+        window.append({"role": role, "content": text})
+    messages.extend(reversed(window))
+
+    dropped = rows[len(window):]
+    summarize_until = dropped[0][0] if len(dropped) >= batch else None
+    return AgentContext(messages, summarize_until)
+
+
+def summarize_messages(previous, rows):
+    """Resumo atualizado a partir de ``previous`` e de ``rows`` (``(role, text)``).
+
+    Levanta ``LLMError`` como ``chat_completion``.
+    """
+    per_message = settings.AGENT_CONTEXT_MESSAGE_MAX_TOKENS
+    transcript = "\n".join(
+        f"{'Usuário' if role == SessionMessage.Role.USER else 'Assistente'}: {truncate_to_tokens(text, per_message)}"
+        for role, text in rows
+    )
+    content = f"RESUMO ATUAL:\n{previous or '(vazio)'}\n\nMENSAGENS NOVAS:\n{transcript}"
+    summary = chat_completion(
+        [{"role": "system", "content": SESSION_SUMMARY_PROMPT}, {"role": "user", "content": content}],
+        operation="summary",
+        temperature=0.2,
+        max_tokens=settings.AGENT_SUMMARY_MAX_TOKENS,
+    )
+    return truncate_to_tokens(summary.strip(), settings.AGENT_SUMMARY_MAX_TOKENS)
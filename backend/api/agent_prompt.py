@@ -47,3 +47,15 @@ Você: {"action": "ask", "message": "Legal! Um gato em que contexto? Algo mais r
 Usuário: "gato preto fotorrealista em um telhado à noite"
 Você: {"action": "generate", "prompt": "professional photography of a black cat sitting on a rooftop at night, full moon in background, city lights bokeh, sharp green eyes glowing, wet fur reflecting moonlight, dramatic low-angle shot, cinematic composition, 8k, hyper detailed, shallow depth of field", "negative_prompt": "cartoon, drawing, illustration, blurry, low quality, watermark, text", "message": "Montei um prompt com atmosfera noturna cinematográfica, olhos brilhando e luzes da cidade ao fundo. Vou gerar!"}
 """
+
+
+SESSION_SUMMARY_PROMPT = """Você mantém o resumo de uma conversa entre um usuário e o assistente criativo do ImagAIne.
+
+Você recebe o resumo atual (pode estar vazio) e as mensagens novas. Responda APENAS com o resumo atualizado, em português, em texto corrido, com no máximo 150 palavras.
+
+Preserve o que importa para continuar a conversa:
+- o que o usuário quer criar (tema, estilo, humor, composição, cores);
+- preferências e restrições que ele declarou;
+- prompts já gerados e os ajustes pedidos depois deles.
+
+Descarte cumprimentos, repetições e detalhes que foram substituídos por decisões posteriores."""
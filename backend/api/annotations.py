@@ -0,0 +1,26 @@
+"""Anotacoes de contagem e de curtida como subqueries correlacionadas.
+
+Preferidas a ``Count()`` sobre joins nas listagens: sem ``GROUP BY`` nem
+multiplicacao de linhas quando ha mais de uma contagem.
+"""
+from django.db.models import BooleanField, Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def related_count(model, field="image"):
+    """COUNT(*) of ``model`` rows pointing at the outer row through ``field``, as a subquery."""
+    counts = (
+        model.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def liked_by(like_model, user, field="image"):
+    """``is_liked`` annotation for the viewer; constant False for anonymous."""
+    if not user.is_authenticated:
+        return Value(False, output_field=BooleanField())
+    return Exists(like_model.objects.filter(**{field: OuterRef("pk"), "user": user}))
@@ -0,0 +1,251 @@
+"""Backfills retomaveis: percorre a tabela pela chave primaria e despacha lotes.
+
+Um job (``BackfillJob``) diz quais linhas ainda precisam de trabalho
+(``pending``) e como processar um lote de ids (``process``). O andamento
+fica em ``BackfillRun``, uma linha por job:
+
+- ``cursor``: ultima chave despachada. Cada passo le o proximo lote com
+  ``pk > cursor ORDER BY pk LIMIT n`` (keyset, sempre pelo indice da PK), e
+  um backfill interrompido continua dali em vez de varrer a tabela de novo.
+- ``dispatched``/``completed``/``failed``: a diferenca e o que esta na fila.
+  ``advance`` so despacha enquanto houver menos de ``max_in_flight`` lotes
+  pendentes, entao um backfill grande nao inunda a fila dos workers.
+- ``progress`` calcula vazao e ETA a partir de ``started_at`` e ``total``
+  (quantas linhas estavam pendentes no inicio).
+
+O lote e escolhido e o checkpoint gravado sob o lock da linha; o despacho
+vem depois do commit, para o lock nao ficar preso enquanto o lote roda
+(modo inline) ou vai para a fila. Uma queda entre o commit e o despacho
+deixa o lote de fora desta execucao; como ``pending`` so devolve o que
+ainda falta, um ``--restart`` depois do fim o recupera. Os jobs sao
+idempotentes, entao repetir um lote so refaz trabalho. Comando:
+``manage.py backfill``; task: ``backfill_task`` (que se reagenda ate
+terminar).
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BackfillRun, Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = 4
+# Sem nenhuma atividade no checkpoint nesse intervalo, os lotes em voo sao dados como perdidos.
+STALL_TIMEOUT = timedelta(minutes=15)
+
+
+@dataclass(frozen=True)
+class BackfillJob:
+    name: str
+    description: str
+    pending: Callable  # () -> QuerySet das linhas que precisam do trabalho
+    process: Callable  # (ids) -> quantos foram processados sem erro
+    chunk_size: int = 100
+
+
+@dataclass(frozen=True)
+class Progress:
+    done: int
+    total: int
+    rate: float  # linhas por segundo desde o inicio da execucao
+    eta: Optional[timedelta]
+    finished: bool
+
+    def __str__(self):
+        percent = 100.0 * self.done / self.total if self.total else 100.0
+        eta = 'concluido' if self.finished else (f'ETA {self.eta}' if self.eta is not None else 'ETA ?')
+        return f'{self.done}/{self.total} ({percent:.1f}%), {self.rate:.1f}/s, {eta}'
+
+
+def _each(function, ids):
+    # Um item com erro nao derruba o lote; entra em ``failed`` e o que ele
+    # escreveu e desfeito (uma transacao por item).
+    ok = 0
+    for pk in ids:
+        try:
+            with transaction.atomic():
+                function(pk)
+            ok += 1
+        except Exception:
+            logger.warning(f"[BACKFILL] Failed for {pk}", exc_info=True)
+    return ok
+
+
+def _embed(ids):
+    from .models import ImageEmbedding
+    from .tasks import create_embeddings_task
+
+    # Sem transacao em volta: a task engole erros de banco ao gravar as
+    # colunas pgvector, e no PostgreSQL isso deixaria a transacao abortada.
+    # Ela tambem so registra e retorna quando o embedding nao sai (arquivo
+    # ilegivel, modelo falhou), entao conta como feito quem tem a linha.
+    for pk in ids:
+        try:
+            create_embeddings_task(pk)
+        except Exception:
+            logger.warning(f"[BACKFILL] Failed for {pk}", exc_info=True)
+    return ImageEmbedding.objects.filter(image_id__in=ids).count()
+
+
+def _relevance(ids):
+    from .http_cache import invalidate_public_cache
+    from .relevance import refresh_relevance
+
+    refreshed = refresh_relevance(ids)
+    invalidate_public_cache()
+    return refreshed
+
+
+def _style(ids):
+    from .style_clusters import cluster_user_styles
+    from .style_profile import rebuild_style_profile
+
+    def rebuild(user_id):
+        rebuild_style_profile(user_id)
+        cluster_user_styles(user_id)
+
+    return _each(rebuild, ids)
+
+
+def _ready_images():
+    return Image.objects.filter(status=Image.Status.READY).exclude(image='')
+
+
+JOBS: Dict[str, BackfillJob] = {
+    job.name: job
+    for job in (
+        BackfillJob(
+            'embeddings', 'Embeddings de imagens READY que ainda nao tem.',
+            lambda: _ready_images().filter(embedding__isnull=True), _embed, chunk_size=32,
+        ),
+        BackfillJob(
+            'embeddings-refresh', 'Recalcula os embeddings de todas as imagens READY.',
+            _ready_images, _embed, chunk_size=32,
+        ),
+        BackfillJob(
+            'relevance', 'Relevancia das imagens publicas.',
+            lambda: Image.objects.filter(is_public=True), _relevance, chunk_size=500,
+        ),
+        BackfillJob(
+            'style', 'Perfil de termos e estilos visuais de cada usuario.',
+            lambda: get_user_model().objects.all(), _style, chunk_size=50,
+        ),
+    )
+}
+
+
+def get_job(name) -> BackfillJob:
+    try:
+        return JOBS[name]
+    except KeyError:
+        raise ValueError(f"Backfill desconhecido: {name}") from None
+
+
+def start(name, restart=False) -> BackfillRun:
+    """Retoma a execucao em andamento de ``name`` ou comeca uma nova."""
+    job = get_job(name)
+    run, created = BackfillRun.objects.get_or_create(job=name)
+    if created or restart or run.finished_at is not None:
+        run.cursor = None
+        run.dispatched = run.completed = run.failed = 0
+        run.total = job.pending().count()
+        run.started_at = timezone.now()
+        run.finished_at = None
+        run.save()
+    return run
+
+
+def advance(name, dispatch, max_chunks=None, chunk_size=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT) -> BackfillRun:
+    """Despacha os proximos lotes (``dispatch(ids)``, depois do commit do checkpoint de cada um)."""
+    job = get_job(name)
+    chunk_size = chunk_size or job.chunk_size
+    sent = 0
+    while True:
+        with transaction.atomic():
+            # Um caminhante por job: o lock da linha serializa execucoes concorrentes.
+            run = BackfillRun.objects.select_for_update().get(job=name)
+            if run.finished_at is not None or (max_chunks is not None and sent >= max_chunks):
+                return run
+            if run.in_flight and timezone.now() - run.updated_at > STALL_TIMEOUT:
+                logger.warning(f"[BACKFILL] {name}: {run.in_flight} rows in flight look lost; moving on")
+                run.dispatched = run.completed + run.failed
+                run.save(update_fields=['dispatched', 'updated_at'])
+            if run.in_flight >= max_in_flight * chunk_size:
+                return run
+
+            rows = job.pending()
+            if run.cursor is not None:
+                rows = rows.filter(pk__gt=run.cursor)
+            # UUIDs viram texto: o lote vai para a fila do Celery (JSON).
+            ids = [
+                pk if isinstance(pk, int) else str(pk)
+                for pk in rows.order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            ]
+            if not ids:
+                run.finished_at = timezone.now()
+                run.save(update_fields=['finished_at', 'updated_at'])
+                logger.info(f"[BACKFILL] {name}: all {run.dispatched} rows dispatched")
+                return run
+            run.cursor = ids[-1]
+            run.dispatched += len(ids)
+            run.save(update_fields=['cursor', 'dispatched', 'updated_at'])
+        dispatch(ids)
+        sent += 1
+
+
+def run_chunk(name, ids: List) -> int:
+    """Processa um lote e soma o resultado no checkpoint; retorna quantos deram certo."""
+    ok = get_job(name).process(ids)
+    BackfillRun.objects.filter(job=name).update(
+        completed=F('completed') + ok,
+        failed=F('failed') + len(ids) - ok,
+        updated_at=timezone.now(),
+    )
+    return ok
+
+
+def progress(run: BackfillRun, now=None) -> Progress:
+    """Vazao e ETA da execucao, pelos lotes ja concluidos."""
+    now = now or timezone.now()
+    done = run.completed + run.failed
+    total = max(run.total, done)
+    elapsed = (now - run.started_at).total_seconds()
+    rate = done / elapsed if elapsed > 0 else 0.0
+    finished = run.finished_at is not None and not run.in_flight
+    if finished:
+        eta = timedelta()
+    elif rate > 0:
+        eta = timedelta(seconds=round((total - done) / rate))
+    else:
+        eta = None
+    return Progress(done=done, total=total, rate=rate, eta=eta, finished=finished)
+
+
+def run_inline(name, chunk_size=None, restart=False, report=None) -> BackfillRun:
+    """Executa o backfill no proprio processo, lote a lote (sem workers)."""
+    run = start(name, restart=restart)
+    while run.finished_at is None:
+        run = advance(name, lambda ids: run_chunk(name, ids), max_chunks=1, chunk_size=chunk_size)
+        run.refresh_from_db()
+        if report:
+            report(run)
+    return run
+
+
+def wait(name, poll_seconds, report=None) -> BackfillRun:
+    """Acompanha uma execucao despachada para os workers ate o ultimo lote voltar."""
+    while True:
+        run = BackfillRun.objects.get(job=name)
+        if report:
+            report(run)
+        if progress(run).finished:
+            return run
+        time.sleep(poll_seconds)
@@ -0,0 +1,65 @@
+"""Carregamento de threads de comentarios com numero fixo de queries.
+
+Uma pagina de comentarios custa sempre as mesmas queries: os comentarios de
+topo (contagens e ``is_liked`` como subqueries) e, em uma segunda query, as
+primeiras ``COMMENT_REPLY_PREVIEW`` respostas de cada um via
+``ROW_NUMBER() OVER (PARTITION BY parent_id ORDER BY id)``, ja com
+``like_count``/``is_liked``. O restante das respostas e lido por cursor
+(``replies_page``), em ordem de criacao (``id``).
+"""
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .annotations import liked_by, related_count
+from .models import CommentLike, ImageComment
+
+COMMENT_REPLY_PREVIEW = 3
+COMMENT_REPLY_PAGE_SIZE = 20
+COMMENT_REPLY_PAGE_MAX = 100
+
+
+def _with_social(queryset, user):
+    return queryset.select_related("user").annotate(
+        like_count=related_count(CommentLike, field="comment"),
+        is_liked=liked_by(CommentLike, user, field="comment"),
+    )
+
+
+def top_level_comments(image, user):
+    """Comentarios de topo da imagem com ``like_count``, ``is_liked`` e ``reply_count``."""
+    return (
+        _with_social(ImageComment.objects.filter(image=image, parent__isnull=True), user)
+        .annotate(reply_count=related_count(ImageComment, field="parent"))
+        .order_by("created_at", "id")
+    )
+
+
+def attach_reply_previews(comments, user, limit=COMMENT_REPLY_PREVIEW):
+    """Preenche ``comment.reply_preview`` com as primeiras respostas, em uma query."""
+    comments = list(comments)
+    if not comments:
+        return comments
+    replies = (
+        _with_social(ImageComment.objects.filter(parent_id__in=[comment.pk for comment in comments]), user)
+        .annotate(rank=Window(RowNumber(), partition_by=F("parent_id"), order_by=F("id").asc()))
+        .filter(rank__lte=limit)
+        .order_by("parent_id", "rank")
+    )
+    by_parent = {}
+    for reply in replies:
+        by_parent.setdefault(reply.parent_id, []).append(reply)
+    for comment in comments:
+        comment.reply_preview = by_parent.get(comment.pk, [])
+    return comments
+
+
+def replies_page(parent, user, after=None, limit=COMMENT_REPLY_PAGE_SIZE):
+    """Respostas de ``parent`` depois do id ``after``; devolve ``(replies, next_cursor)``."""
+    queryset = _with_social(ImageComment.objects.filter(parent=parent), user)
+    if after is not None:
+        queryset = queryset.filter(id__gt=after)
+    replies = list(queryset.order_by("id")[:limit + 1])
+    if len(replies) > limit:
+        replies = replies[:limit]
+        return replies, replies[-1].id
+    return replies, None
@@ -0,0 +1,202 @@
+"""Contador de downloads bufferizado no Redis, aplicado ao banco em lote.
+
+O download nao escreve no banco: ``record_download`` faz um ``HINCRBY`` no
+hash do shard da imagem (``downloads:buffer:<image_id % shards>``, campo
+``<image_id>:<dia>``) e devolve o valor do banco somado ao pendente. A task
+periodica ``flush_download_counters`` tira cada shard do Redis antes de
+escrever (``HGETALL`` + ``DEL`` numa transacao ``MULTI``; downloads novos
+caem num hash novo) e aplica os deltas agregados em lotes de
+``FLUSH_CHUNK_SIZE`` imagens: um ``UPDATE`` com ``CASE`` em
+``download_count`` e um upsert somando em ``ImageDownloadDaily`` por lote,
+e um ``bulk_update`` de ``relevance_score`` das imagens tocadas. Se a
+escrita falhar, os deltas voltam ao buffer com ``HINCRBY``. O lock do flush
+guarda um token do dono e so e liberado por ele (compare-and-delete), para um
+flush que passou de ``FLUSH_LOCK_TIMEOUT`` nao soltar o lock do seguinte.
+
+So downloads passam por aqui: ``Image`` nao tem contador de visualizacoes, e
+o hash por ``<imagem>:<dia>`` e o log de eventos ja agregado (nao ha log
+evento a evento).
+
+Sem Redis (locmem nos testes, dev sem cache compartilhado) nao ha buffer
+visivel entre processos: cada download e aplicado direto, pelo mesmo caminho
+do flush.
+"""
+import secrets
+from collections import Counter
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import connection, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from .models import Image, ImageDownloadDaily
+from .relevance import refresh_relevance
+
+BUFFER_PREFIX = "downloads:buffer"
+FLUSH_LOCK_KEY = "downloads:flush-lock"
+FLUSH_LOCK_TIMEOUT = 300
+FLUSH_CHUNK_SIZE = 500
+DOWNLOAD_STATS_DEFAULT_DAYS = 30
+DOWNLOAD_STATS_MAX_DAYS = 90
+_RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+def _buffer_key(image_id):
+    return f"{BUFFER_PREFIX}:{image_id % settings.DOWNLOAD_COUNTER_SHARDS}"
+
+
+def _redis_client(backend, key):
+    client = getattr(backend, "_cache", None)
+    if not hasattr(client, "get_client"):
+        return None
+    return client.get_client(key, write=True)
+
+
+def record_download(image, day=None):
+    """Conta um download de ``image`` e retorna o total visto pelo cliente."""
+    day = day or timezone.localdate()
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    key = _buffer_key(image.pk)
+    client = _redis_client(backend, key)
+    if client is None:
+        apply_download_deltas({(image.pk, day): 1})
+        return image.download_count + 1
+    pending = client.hincrby(backend.make_and_validate_key(key), f"{image.pk}:{day.isoformat()}", 1)
+    return image.download_count + pending
+
+
+def _parse_buffer(raw):
+    deltas = Counter()
+    for field, count in raw.items():
+        image_id, day = (field.decode() if isinstance(field, bytes) else field).split(":")
+        deltas[int(image_id), date.fromisoformat(day)] += int(count)
+    return deltas
+
+
+def _take_buffer(client, buffer):
+    # Leitura e remocao atomicas: um HINCRBY concorrente cai no hash novo.
+    pipe = client.pipeline()
+    pipe.hgetall(buffer)
+    pipe.delete(buffer)
+    raw, _ = pipe.execute()
+    return raw
+
+
+def _restore_buffer(client, buffer, raw):
+    pipe = client.pipeline()
+    for field, count in raw.items():
+        pipe.hincrby(buffer, field, int(count))
+    pipe.execute()
+
+
+def _release_flush_lock(backend, token):
+    client = getattr(backend, "_cache", None)
+    if hasattr(client, "get_client"):
+        # Inteiros sao gravados sem pickle pelo RedisCache: o GET devolve o token em texto.
+        client.get_client(FLUSH_LOCK_KEY, write=True).eval(
+            _RELEASE_SCRIPT, 1, backend.make_and_validate_key(FLUSH_LOCK_KEY), token
+        )
+    elif backend.get(FLUSH_LOCK_KEY) == token:
+        backend.delete(FLUSH_LOCK_KEY)
+
+
+def flush_downloads():
+    """Aplica ao banco os downloads pendentes de todos os shards.
+
+    Retorna quantos downloads foram gravados. Um flush por vez (lock no
+    cache); sem Redis nao ha nada pendente. Os contadores saem do Redis antes
+    da escrita e voltam para o buffer se ela falhar.
+    """
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    token = secrets.randbits(62)
+    if not backend.add(FLUSH_LOCK_KEY, token, timeout=FLUSH_LOCK_TIMEOUT):
+        return 0
+    try:
+        taken = []
+        deltas = Counter()
+        for shard in range(settings.DOWNLOAD_COUNTER_SHARDS):
+            key = f"{BUFFER_PREFIX}:{shard}"
+            client = _redis_client(backend, key)
+            if client is None:
+                return 0
+            buffer = backend.make_and_validate_key(key)
+            raw = _take_buffer(client, buffer)
+            if raw:
+                taken.append((client, buffer, raw))
+                deltas.update(_parse_buffer(raw))
+        try:
+            apply_download_deltas(deltas)
+        except Exception:
+            for client, buffer, raw in taken:
+                _restore_buffer(client, buffer, raw)
+            raise
+        return sum(deltas.values())
+    finally:
+        _release_flush_lock(backend, token)
+
+
+def apply_download_deltas(deltas):
+    """Grava ``{(image_id, dia): n}`` no banco, ``FLUSH_CHUNK_SIZE`` imagens por statement.
+
+    Deltas de imagens que ja nao existem sao descartados.
+    """
+    totals = Counter()
+    rows_by_image = {}
+    for (image_id, day), count in deltas.items():
+        totals[image_id] += count
+        rows_by_image.setdefault(image_id, []).append((image_id, day, count))
+    if not totals:
+        return
+    ids = sorted(totals)
+    touched = []
+    with transaction.atomic():
+        for start in range(0, len(ids), FLUSH_CHUNK_SIZE):
+            existing = set(
+                Image.objects.filter(id__in=ids[start:start + FLUSH_CHUNK_SIZE]).values_list("id", flat=True)
+            )
+            if not existing:
+                continue
+            Image.objects.filter(id__in=existing).update(
+                download_count=F("download_count") + Case(
+                    *(When(id=image_id, then=Value(totals[image_id])) for image_id in existing),
+                    default=Value(0),
+                    output_field=PositiveIntegerField(),
+                )
+            )
+            _upsert_daily([row for image_id in existing for row in rows_by_image[image_id]])
+            touched.extend(existing)
+    if touched:
+        refresh_relevance(touched)
+
+
+def _upsert_daily(rows):
+    """INSERT ... ON CONFLICT somando as contagens do dia (PostgreSQL e SQLite)."""
+    qn = connection.ops.quote_name
+    meta = ImageDownloadDaily._meta
+    table = qn(meta.db_table)
+    image_col = qn(meta.get_field("image").column)
+    day_col = qn(meta.get_field("day").column)
+    count_col = qn(meta.get_field("count").column)
+    sql = (
+        f"INSERT INTO {table} ({image_col}, {day_col}, {count_col}) "
+        f"VALUES {', '.join(['(%s, %s, %s)'] * len(rows))} "
+        f"ON CONFLICT ({image_col}, {day_col}) "
+        f"DO UPDATE SET {count_col} = {table}.{count_col} + EXCLUDED.{count_col}"
+    )
+    params = []
+    for image_id, day, count in rows:
+        params += [image_id, connection.ops.adapt_datefield_value(day), count]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def daily_downloads(image, days):
+    """``[(dia, downloads)]`` dos ultimos ``days`` dias gravados, do mais antigo ao mais novo."""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    return list(
+        ImageDownloadDaily.objects.filter(image=image, day__gte=since)
+        .order_by("day")
+        .values_list("day", "count")
+    )
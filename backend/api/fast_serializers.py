@@ -0,0 +1,131 @@
+"""Serializacao somente-leitura para listagens de imagens.
+
+``ImageSerializer(many=True)`` instancia campos, resolve seis
+``SerializerMethodField`` e chama ``storage.url`` + ``build_absolute_uri`` por
+item. Nas listagens paginadas o payload e sempre o mesmo, entao aqui a pagina
+vem de ``.values_list(*IMAGE_ROW_FIELDS)`` (tuplas) ou ``.values(...)``
+(dicts) e cada linha vira o dict final direto, com o prefixo de midia
+calculado uma vez por request, as tags buscadas em uma unica query e
+``is_liked`` resolvido pelo conjunto de curtidas em cache (``like_cache``).
+
+A saida e identica a de ``ImageSerializer``; o schema OpenAPI continua vindo
+dele (``serializer_class`` das views).
+"""
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+
+from .like_cache import liked_image_ids
+from .media import is_local
+from .models import Image
+
+# Ordem das colunas esperada por ``serialize_image_rows``. As anotacoes
+# like_count e comment_count precisam existir no queryset.
+IMAGE_ROW_FIELDS = (
+    'id',
+    'user_id',
+    'user__username',
+    'prompt',
+    'negative_prompt',
+    'aspect_ratio',
+    'seed',
+    'image',
+    'status',
+    'is_public',
+    'like_count',
+    'comment_count',
+    'download_count',
+    'relevance_score',
+    'featured',
+    'source_image_id',
+    'generation_type',
+    'strength',
+    'created_at',
+)
+
+_row_from_dict = itemgetter(*IMAGE_ROW_FIELDS)
+
+
+def media_url_builder(request=None) -> Callable[[Optional[str]], Optional[str]]:
+    """Retorna ``name -> URL absoluta`` com o prefixo resolvido uma unica vez.
+
+    Vale para storages em disco (FileSystemStorage); os demais (bucket S3, com
+    URL pre-assinada por arquivo) caem em ``storage.url`` por item, como o
+    ``ImageSerializer`` faz.
+    """
+    storage = Image._meta.get_field('image').storage
+
+    if not is_local(storage):
+        def build(name):
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+        return build
+
+    prefix = request.build_absolute_uri(storage.base_url) if request else storage.base_url
+
+    def build(name):
+        if not name:
+            return None
+        return prefix + filepath_to_uri(name).lstrip('/')
+    return build
+
+
+def fetch_image_tags(image_ids: Iterable[int]) -> Dict[int, List[str]]:
+    """Nomes das tags por imagem (ordenados por nome) em uma query."""
+    tags: Dict[int, List[str]] = {}
+    rows = (
+        Image.tags.through.objects.filter(image_id__in=list(image_ids))
+        .order_by('imagetag__name')
+        .values_list('image_id', 'imagetag__name')
+    )
+    for image_id, name in rows:
+        tags.setdefault(image_id, []).append(name)
+    return tags
+
+
+def serialize_image_rows(rows, request=None) -> List[dict]:
+    """Converte linhas (tuplas em ``IMAGE_ROW_FIELDS`` ou dicts de ``.values``) no payload do ``ImageSerializer``."""
+    rows = [_row_from_dict(row) if isinstance(row, dict) else row for row in rows]
+    if not rows:
+        return []
+
+    media_url = media_url_builder(request)
+    tags_by_image = fetch_image_tags(row[0] for row in rows)
+    liked_ids = liked_image_ids(request.user if request else None)
+    # Mesmo formato/timezone do DateTimeField do DRF, sem instanciar por linha.
+    datetime_field = serializers.DateTimeField()
+
+    data = []
+    for (
+        image_id, user_id, username, prompt, negative_prompt, aspect_ratio, seed,
+        image, status, is_public, like_count, comment_count, download_count,
+        relevance_score, featured, source_image_id, generation_type,
+        strength, created_at,
+    ) in rows:
+        data.append({
+            'id': image_id,
+            'user': {'id': str(user_id), 'username': username},
+            'prompt': prompt,
+            'negative_prompt': negative_prompt,
+            'aspect_ratio': aspect_ratio,
+            'seed': seed,
+            'image_url': media_url(image),
+            'status': status,
+            'is_public': is_public,
+            'like_count': like_count or 0,
+            'comment_count': comment_count or 0,
+            'download_count': download_count,
+            'is_liked': image_id in liked_ids,
+            'relevance_score': float(relevance_score),
+            'featured': featured,
+            'tags': tags_by_image.get(image_id, []),
+            'source_image': source_image_id,
+            'generation_type': generation_type,
+            'strength': strength,
+            'created_at': datetime_field.to_representation(created_at),
+        })
+    return data
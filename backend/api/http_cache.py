@@ -0,0 +1,126 @@
+"""Cache de respostas anonimas para endpoints publicos.
+
+Respostas ``AllowAny`` sem usuario sao iguais para todo mundo; guardamos o
+JSON renderizado por (escopo, esquema, host, path, query params ordenados) e servimos sem
+tocar o banco.
+
+- TTL curto (``PUBLIC_RESPONSE_CACHE_TTL``) + janela stale-while-revalidate
+  (``PUBLIC_RESPONSE_CACHE_STALE``): passado o TTL, um unico request (lock via
+  ``cache.add``) recalcula; os demais recebem a copia antiga ate la.
+- ``ETag``/``Last-Modified``/``Cache-Control`` e GET condicional (304).
+- Invalidacao O(1): as chaves carregam uma geracao global;
+  ``invalidate_public_cache`` so avanca a geracao e as entradas antigas expiram
+  sozinhas.
+"""
+import functools
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+GENERATION_KEY = "public-cache:generation"
+LOCK_TIMEOUT = 30
+
+
+def _ttl():
+    return getattr(settings, "PUBLIC_RESPONSE_CACHE_TTL", 0)
+
+
+def _stale():
+    return getattr(settings, "PUBLIC_RESPONSE_CACHE_STALE", 0)
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time(), timeout=None)
+        generation = cache.get(GENERATION_KEY, time.time())
+    return generation
+
+
+def invalidate_public_cache():
+    """Descarta todas as respostas publicas em cache (publicar, despublicar, relevancia)."""
+    cache.set(GENERATION_KEY, max(time.time(), _generation() + 0.001), timeout=None)
+
+
+def _response_key(scope, request, generation):
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    # O corpo traz URLs absolutas (build_absolute_uri): host e esquema entram na chave.
+    raw = f"{request.scheme}://{request.get_host()}{request.path}?{params}".encode()
+    return f"public-cache:{scope}:{generation}:{hashlib.sha1(raw).hexdigest()}"
+
+
+def _build_response(request, entry, cache_status):
+    response = HttpResponse(entry["body"], content_type="application/json")
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    response["Cache-Control"] = (
+        f"public, max-age={_ttl()}, stale-while-revalidate={_stale()}"
+    )
+    response["Age"] = str(max(int(time.time() - entry["stored_at"]), 0))
+    response["X-Cache"] = cache_status
+    return get_conditional_response(
+        request,
+        etag=entry["etag"],
+        last_modified=int(entry["last_modified"]),
+        response=response,
+    )
+
+
+def anonymous_response_cache(scope):
+    """Decora ``get``/``list`` de uma view publica com o cache anonimo."""
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            ttl = _ttl()
+            if ttl <= 0 or request.method != "GET" or request.user.is_authenticated:
+                return method(self, request, *args, **kwargs)
+
+            # DRF sobrescreve Vary com default_response_headers; o cache
+            # compartilhado precisa separar anonimos de autenticados.
+            self.headers["Vary"] = "Accept, Authorization"
+
+            key = _response_key(scope, request, _generation())
+            lock_key = f"{key}:lock"
+            stale = cache.get(key)
+            locked = False
+            if stale is not None:
+                if time.time() - stale["stored_at"] < ttl:
+                    return _build_response(request, stale, "HIT")
+                locked = cache.add(lock_key, 1, timeout=LOCK_TIMEOUT)
+                if not locked:
+                    return _build_response(request, stale, "STALE")
+
+            try:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                body = JSONRenderer().render(response.data)
+                etag = f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"'
+                now = time.time()
+                entry = {
+                    "body": body,
+                    "etag": etag,
+                    # Conteudo igual ao da copia anterior mantem a data: GET
+                    # condicional por If-Modified-Since continua valendo.
+                    "last_modified": (
+                        stale["last_modified"] if stale and stale["etag"] == etag else now
+                    ),
+                    "stored_at": now,
+                }
+                cache.set(key, entry, timeout=ttl + _stale())
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+            return _build_response(request, entry, "MISS")
+
+        return wrapper
+
+    return decorator
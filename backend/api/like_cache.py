@@ -0,0 +1,69 @@
+"""Conjunto de imagens curtidas por usuario, em cache.
+
+Resolver ``is_liked`` com ``Exists(ImageLike ...)`` adiciona uma subquery
+correlacionada por linha em toda listagem autenticada. Aqui cada usuario tem
+o conjunto de ids curtidos guardado no cache (preenchido sob demanda com uma
+query no indice ``user_id`` de ``ImageLike``); a pagina inteira resolve
+``is_liked`` com testes de pertinencia em memoria.
+
+``ImageLikeView`` invalida o conjunto a cada like/unlike avancando a geracao
+do usuario, que faz parte da chave. Um leitor que fez o SELECT antes do
+like e grava o conjunto depois da invalidacao grava numa geracao ja
+abandonada, entao o conjunto velho nunca volta a ser lido. A geracao avanca
+de novo quando a transacao confirma: quem leu entre o like e o commit
+tambem fica para tras.
+"""
+import time
+from typing import FrozenSet
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ImageLike
+
+LIKED_IDS_TIMEOUT = 60 * 60 * 24
+
+
+def _generation_key(user_id) -> str:
+    return f"liked-image-ids:generation:{user_id}"
+
+
+def _generation(user_id):
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Comeca pelo relogio: uma geracao despejada do cache nao volta a um valor antigo.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key, 0)
+    return generation
+
+
+def _key(user_id, generation) -> str:
+    return f"liked-image-ids:{user_id}:{generation}"
+
+
+def liked_image_ids(user) -> FrozenSet[int]:
+    """Ids das imagens curtidas por ``user`` (vazio para anonimos)."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+    key = _key(user.pk, _generation(user.pk))
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            ImageLike.objects.filter(user_id=user.pk).values_list("image_id", flat=True)
+        )
+        cache.set(key, ids, timeout=LIKED_IDS_TIMEOUT)
+    return ids
+
+
+def _bump(user_id):
+    try:
+        cache.incr(_generation_key(user_id))
+    except ValueError:
+        cache.set(_generation_key(user_id), time.time_ns(), timeout=None)
+
+
+def invalidate_liked_image_ids(user) -> None:
+    """Abandona o conjunto de ``user``; a proxima leitura recarrega do banco."""
+    _bump(user.pk)
+    transaction.on_commit(lambda: _bump(user.pk))
@@ -0,0 +1,540 @@
+"""Cliente do LLM (DeepSeek) e cache de refinamento de prompts.
+
+``refine_prompt`` guarda o resultado por (descricao normalizada, estilo,
+modelo) em dois niveis:
+
+- L1: LRU por processo, limitado a ``LLM_REFINE_CACHE_MAX_ENTRIES`` entradas;
+- L2: cache do Django (Redis), com TTL ``LLM_REFINE_CACHE_TTL``.
+
+Requests identicos simultaneos sao coalescidos (single-flight): so quem pega
+o lock (``cache.add`` com um token proprio) chama o upstream; os demais
+esperam o resultado aparecer no cache. Quem desiste de esperar chama o
+upstream sem o lock, e o lock so e apagado por quem guarda o token. Taxa de acerto e latencia do upstream vao para
+``api.metrics``.
+
+As chamadas saem pelo ``deepseek`` (``api.outbound``): pool de conexoes por
+processo, retries e circuit breaker.
+
+``chat_completion_stream`` + ``StreamingJSONFields`` leem a resposta em
+streaming e extraem os campos do JSON conforme chegam (refinador em SSE e
+turno do agente em ``api.tasks``).
+"""
+import hashlib
+import json
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import Counter, DerivedGauge, Histogram
+from .outbound import CircuitOpen, OutboundClient
+
+LOCK_TIMEOUT = 35  # > timeout do upstream
+POLL_INTERVAL = 0.05
+DEFAULT_NEGATIVE_PROMPT = 'blur, low quality, watermark, text, logo'
+FALLBACK_NEGATIVE_PROMPT = 'blur, low quality, watermark, text, logo, distorted, ugly'
+
+STYLE_DESCRIPTIONS = {
+    'photorealistic': 'fotorrealista, como uma fotografia profissional',
+    'anime': 'estilo anime/mangá japonês',
+    'digital_art': 'arte digital moderna e detalhada',
+    'oil_painting': 'pintura a óleo clássica',
+    'watercolor': 'aquarela suave e artística',
+    '3d_render': 'renderização 3D de alta qualidade',
+    'pixel_art': 'pixel art estilo retro/jogos',
+    'sketch': 'esboço ou desenho a lápis',
+}
+
+REFINE_SYSTEM_PROMPT = """Você é um especialista em criar prompts otimizados para geração de imagens com IA (como Stable Diffusion, DALL-E, Midjourney).
+
+Sua tarefa é transformar a descrição casual do usuário em um prompt estruturado e detalhado em INGLÊS.
+
+Estilo solicitado: {style_desc}
+
+Regras:
+1. O prompt DEVE estar em inglês
+2. Inclua detalhes sobre: composição, iluminação, atmosfera, cores, texturas
+3. Use termos técnicos de fotografia/arte quando apropriado
+4. Adicione modificadores de qualidade (highly detailed, 8k, professional, etc.)
+5. Mantenha o prompt com 50-150 palavras
+6. Retorne APENAS o prompt, sem explicações
+
+Também sugira um negative_prompt curto com elementos a evitar (blur, low quality, watermark, etc.)
+
+Formato de resposta (JSON):
+{{"refined_prompt": "seu prompt aqui", "negative_prompt": "elementos a evitar"}}"""
+
+refine_cache_requests = Counter(
+    "llm_refine_cache_requests_total",
+    "Refinamentos por resultado do cache (hit, coalesced = esperou outro request, miss = chamou o LLM).",
+    labels={"result": ("hit", "coalesced", "miss")},
+)
+upstream_latency = Histogram(
+    "llm_upstream_latency_seconds",
+    "Latencia das chamadas ao LLM por operacao e desfecho.",
+    labels={"operation": ("refine", "agent", "summary"), "outcome": ("ok", "error", "timeout")},
+)
+first_token_latency = Histogram(
+    "llm_first_token_seconds",
+    "Tempo ate o primeiro trecho de texto nas chamadas em streaming.",
+    labels={"operation": ("refine", "agent")},
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+
+
+def _refine_hit_ratio():
+    values = refine_cache_requests.values()
+    total = sum(values.values())
+    return (values["hit"] + values["coalesced"]) / total if total else 0.0
+
+
+DerivedGauge(
+    "llm_refine_cache_hit_ratio",
+    "Fracao de refinamentos atendidos sem chamar o LLM.",
+    _refine_hit_ratio,
+)
+
+
+class LLMError(Exception):
+    """Falha ao falar com o LLM."""
+
+
+class LLMNotConfigured(LLMError):
+    """``DEEPSEEK_API_KEY`` ausente."""
+
+
+class LLMTimeout(LLMError):
+    """Upstream nao respondeu a tempo."""
+
+
+class LLMBadResponse(LLMError):
+    """Resposta do upstream sem o formato esperado."""
+
+
+class LLMUnavailable(LLMError):
+    """Circuit breaker aberto: provedor degradado, chamada nem saiu."""
+
+
+deepseek = OutboundClient("deepseek", endpoints=("chat_completions",), settings_prefix="LLM")
+
+
+def _post(messages, *, temperature, max_tokens, timeout, stream=False):
+    api_key = getattr(settings, 'DEEPSEEK_API_KEY', '')
+    if not api_key:
+        raise LLMNotConfigured("DEEPSEEK_API_KEY not configured")
+    base_url = getattr(settings, 'DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
+    model = getattr(settings, 'DEEPSEEK_MODEL', 'deepseek-chat')
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    if stream:
+        payload["stream"] = True
+    try:
+        return deepseek.post(
+            "chat_completions",
+            f"{base_url}/v1/chat/completions",
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            json=payload,
+            timeout=timeout,
+            stream=stream,
+        )
+    except CircuitOpen as exc:
+        raise LLMUnavailable(str(exc)) from exc
+
+
+def chat_completion(messages, *, operation, temperature=0.7, max_tokens=500, timeout=30):
+    """Chama ``/v1/chat/completions`` e retorna o ``content`` da primeira escolha."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        response = _post(messages, temperature=temperature, max_tokens=max_tokens, timeout=timeout)
+        outcome = "ok"
+    except requests.exceptions.Timeout as exc:
+        outcome = "timeout"
+        raise LLMTimeout(str(exc)) from exc
+    except requests.exceptions.RequestException as exc:
+        raise LLMError(str(exc)) from exc
+    finally:
+        upstream_latency.observe(time.perf_counter() - started, operation=operation, outcome=outcome)
+
+    try:
+        return response.json()['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError, ValueError) as exc:
+        raise LLMBadResponse(str(exc)) from exc
+
+
+def chat_completion_stream(messages, *, operation, temperature=0.7, max_tokens=500, timeout=30):
+    """Como ``chat_completion``, com ``stream: true``: gera os trechos de ``content``.
+
+    O tempo ate o primeiro trecho vai para ``llm_first_token_seconds``; a
+    latencia total so e observada quando o stream termina.
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    response = None
+    try:
+        response = _post(messages, temperature=temperature, max_tokens=max_tokens, timeout=timeout, stream=True)
+        first = True
+        for line in response.iter_lines():
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                delta = json.loads(data)["choices"][0]["delta"].get("content")
+            except (KeyError, IndexError, TypeError, ValueError) as exc:
+                raise LLMBadResponse(str(exc)) from exc
+            if not delta:
+                continue
+            if first:
+                first_token_latency.observe(time.perf_counter() - started, operation=operation)
+                first = False
+            yield delta
+        outcome = "ok"
+    except requests.exceptions.Timeout as exc:
+        outcome = "timeout"
+        raise LLMTimeout(str(exc)) from exc
+    except requests.exceptions.RequestException as exc:
+        raise LLMError(str(exc)) from exc
+    finally:
+        if response is not None:
+            response.close()
+        upstream_latency.observe(time.perf_counter() - started, operation=operation, outcome=outcome)
+
+
+_END = object()
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class StreamingJSONFields:
+    """Parser incremental do objeto JSON plano que o LLM devolve.
+
+    ``feed`` recebe trechos do texto e retorna eventos ``("delta", campo,
+    trecho)`` enquanto um valor string chega e ``("field", campo, valor)``
+    quando ele fecha. Texto antes do ``{`` e ignorado; valores que nao sao
+    string so aparecem no fechamento. ``complete`` indica que o objeto
+    terminou.
+    """
+
+    def __init__(self):
+        self.state = "prefix"
+        self.fields = {}
+        self.complete = False
+        self._key = ""
+        self._buffer = []
+        self._escape = None  # None | "" (apos a barra) | "uXXXX" parcial
+        self._high_surrogate = None
+        self._depth = 0
+
+    def feed(self, chunk):
+        events = []
+        pending = []  # trecho do valor string atual ainda nao emitido
+        for char in chunk:
+            state = self.state
+            if state in ("key", "string"):
+                decoded = self._string_char(char)
+                if decoded is _END:
+                    if state == "key":
+                        self._key = "".join(self._buffer)
+                        self.state = "colon"
+                    else:
+                        if pending:
+                            events.append(("delta", self._key, "".join(pending)))
+                            pending = []
+                        value = "".join(self._buffer)
+                        self.fields[self._key] = value
+                        events.append(("field", self._key, value))
+                        self.state = "after_value"
+                    self._buffer = []
+                elif decoded:
+                    self._buffer.append(decoded)
+                    if state == "string":
+                        pending.append(decoded)
+            elif state == "prefix":
+                if char == "{":
+                    self.state = "key_wait"
+            elif state == "key_wait":
+                if char == '"':
+                    self.state = "key"
+                elif char == "}":
+                    self._finish()
+            elif state == "colon":
+                if char == ":":
+                    self.state = "value_wait"
+            elif state == "value_wait":
+                if char == '"':
+                    self.state = "string"
+                elif not char.isspace():
+                    self.state = "scalar"
+                    self._depth = 1 if char in "[{" else 0
+                    self._buffer = [char]
+            elif state == "scalar":
+                if self._depth == 0 and char in ",}":
+                    raw = "".join(self._buffer).strip()
+                    try:
+                        value = json.loads(raw)
+                    except ValueError:
+                        value = raw
+                    self.fields[self._key] = value
+                    events.append(("field", self._key, value))
+                    self._buffer = []
+                    self.state = "key_wait"
+                    if char == "}":
+                        self._finish()
+                else:
+                    self._depth += (char in "[{") - (char in "]}")
+                    self._buffer.append(char)
+            elif state == "after_value":
+                if char == ",":
+                    self.state = "key_wait"
+                elif char == "}":
+                    self._finish()
+        if pending:
+            events.append(("delta", self._key, "".join(pending)))
+        return events
+
+    def _finish(self):
+        self.state = "done"
+        self.complete = True
+
+    def _string_char(self, char):
+        """Decodifica um caractere dentro de string; ``_END`` na aspa final."""
+        if self._escape is None:
+            if char == "\\":
+                self._escape = ""
+                return ""
+            if char == '"':
+                return _END
+            return char
+        if self._escape == "":
+            if char == "u":
+                self._escape = "u"
+                return ""
+            self._escape = None
+            return _ESCAPES.get(char, char)
+        self._escape += char
+        if len(self._escape) < 5:
+            return ""
+        code = int(self._escape[1:], 16)
+        self._escape = None
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+            return ""
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+        return chr(code)
+
+
+def parse_refinement(content):
+    """Extrai ``refined_prompt``/``negative_prompt`` do texto do LLM."""
+    if '{' in content and '}' in content:
+        try:
+            parsed = json.loads(content[content.index('{'):content.rindex('}') + 1])
+        except json.JSONDecodeError as exc:
+            raise LLMBadResponse(str(exc)) from exc
+        return {
+            'refined_prompt': parsed.get('refined_prompt', content),
+            'negative_prompt': parsed.get('negative_prompt', DEFAULT_NEGATIVE_PROMPT),
+        }
+    return {
+        'refined_prompt': content.strip(),
+        'negative_prompt': FALLBACK_NEGATIVE_PROMPT,
+    }
+
+
+def parse_agent_reply(content):
+    """Le o JSON do agente criativo: ``(texto, prompt, negative_prompt)``.
+
+    ``prompt`` so vem preenchido quando o agente decidiu gerar; resposta fora
+    do formato vira texto puro.
+    """
+    if '{' in content and '}' in content:
+        try:
+            parsed = json.loads(content[content.index('{'):content.rindex('}') + 1])
+        except json.JSONDecodeError:
+            return content, '', ''
+        text = parsed.get('message', content)
+        if parsed.get('action') == 'generate':
+            return text, parsed.get('prompt', ''), parsed.get('negative_prompt', '')
+        return text, '', ''
+    return content, '', ''
+
+
+def normalize_description(description):
+    """Caixa e espacos nao mudam o pedido: ``"  Um  Gato "`` == ``"um gato"``."""
+    return re.sub(r"\s+", " ", description).strip().casefold()
+
+
+def refinement_cache_key(description, style):
+    model = getattr(settings, 'DEEPSEEK_MODEL', 'deepseek-chat')
+    raw = "\x1f".join((normalize_description(description), style, model))
+    return f"llm-refine:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+class _LRU:
+    """LRU por processo com expiracao; a frente do cache compartilhado."""
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl, max_entries):
+        if max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local_cache = _LRU()
+
+
+# Apaga o lock so se ainda for do dono (o TTL pode ter vencido e outro pego).
+_RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+def _release_lock(lock_key, token):
+    client = getattr(cache, "_cache", None)
+    if hasattr(client, "get_client"):
+        # Inteiros sao gravados sem pickle pelo RedisCache: o GET devolve o token em texto.
+        client.get_client(lock_key, write=True).eval(
+            _RELEASE_SCRIPT, 1, cache.make_and_validate_key(lock_key), token
+        )
+    elif cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _call_refine(description, style):
+    style_desc = STYLE_DESCRIPTIONS.get(style, STYLE_DESCRIPTIONS['photorealistic'])
+    content = chat_completion(
+        [
+            {"role": "system", "content": REFINE_SYSTEM_PROMPT.format(style_desc=style_desc)},
+            {"role": "user", "content": description},
+        ],
+        operation="refine",
+    )
+    return parse_refinement(content)
+
+
+def refine_prompt(description, style):
+    """Refina ``description`` no ``style`` pedido, com cache e single-flight."""
+    ttl = getattr(settings, 'LLM_REFINE_CACHE_TTL', 60 * 60 * 24)
+    max_entries = getattr(settings, 'LLM_REFINE_CACHE_MAX_ENTRIES', 512)
+    if ttl <= 0:
+        refine_cache_requests.inc(result="miss")
+        return _call_refine(description, style)
+    key = refinement_cache_key(description, style)
+
+    result = _local_cache.get(key)
+    if result is None:
+        result = cache.get(key)
+    if result is not None:
+        refine_cache_requests.inc(result="hit")
+        _local_cache.set(key, result, ttl, max_entries)
+        return result
+
+    lock_key = f"{key}:lock"
+    token = secrets.randbits(62)
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(lock_key, token, timeout=LOCK_TIMEOUT):
+        # Outro request ja esta chamando o LLM para a mesma chave.
+        time.sleep(POLL_INTERVAL)
+        result = cache.get(key)
+        if result is not None:
+            refine_cache_requests.inc(result="coalesced")
+            _local_cache.set(key, result, ttl, max_entries)
+            return result
+        if time.monotonic() >= deadline:
+            # Segue sem o lock: nao e dele para apagar.
+            token = None
+            break
+
+    try:
+        refine_cache_requests.inc(result="miss")
+        result = _call_refine(description, style)
+        cache.set(key, result, timeout=ttl)
+        _local_cache.set(key, result, ttl, max_entries)
+        return result
+    finally:
+        if token is not None:
+            _release_lock(lock_key, token)
+
+
+def refine_prompt_stream(description, style):
+    """Versao em streaming de ``refine_prompt``.
+
+    Gera ``("delta", trecho)`` com o ``refined_prompt`` conforme o LLM escreve
+    e termina com ``("done", resultado)``. Um acerto no cache sai direto como
+    ``done``; duplicatas em voo nao sao coalescidas (cada stream e do seu
+    cliente), mas o resultado final alimenta o mesmo cache.
+    """
+    ttl = getattr(settings, 'LLM_REFINE_CACHE_TTL', 60 * 60 * 24)
+    max_entries = getattr(settings, 'LLM_REFINE_CACHE_MAX_ENTRIES', 512)
+    key = refinement_cache_key(description, style)
+    if ttl > 0:
+        result = _local_cache.get(key) or cache.get(key)
+        if result is not None:
+            refine_cache_requests.inc(result="hit")
+            _local_cache.set(key, result, ttl, max_entries)
+            yield "done", result
+            return
+
+    refine_cache_requests.inc(result="miss")
+    style_desc = STYLE_DESCRIPTIONS.get(style, STYLE_DESCRIPTIONS['photorealistic'])
+    parser = StreamingJSONFields()
+    parts = []
+    chunks = chat_completion_stream(
+        [
+            {"role": "system", "content": REFINE_SYSTEM_PROMPT.format(style_desc=style_desc)},
+            {"role": "user", "content": description},
+        ],
+        operation="refine",
+    )
+    for chunk in chunks:
+        parts.append(chunk)
+        for kind, field, value in parser.feed(chunk):
+            if kind == "delta" and field == "refined_prompt":
+                yield "delta", value
+
+    content = "".join(parts)
+    if parser.complete:
+        result = {
+            'refined_prompt': parser.fields.get('refined_prompt', content),
+            'negative_prompt': parser.fields.get('negative_prompt', DEFAULT_NEGATIVE_PROMPT),
+        }
+    else:
+        result = parse_refinement(content)
+    if ttl > 0:
+        cache.set(key, result, timeout=ttl)
+        _local_cache.set(key, result, ttl, max_entries)
+    yield "done", result
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import backfill
+from api.models import BackfillRun
+from api.tasks import backfill_task
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa ou retoma um backfill em lotes pela chave primaria, com checkpoint "
+        "em BackfillRun. Sem job, lista os jobs e o andamento de cada um."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("job", nargs="?", choices=sorted(backfill.JOBS), help="Job a executar.")
+        parser.add_argument("--chunk-size", type=int, help="Linhas por lote (padrao do job).")
+        parser.add_argument("--restart", action="store_true", help="Descarta o checkpoint e comeca do inicio.")
+        parser.add_argument(
+            "--inline", action="store_true", help="Processa neste processo, sem workers do Celery."
+        )
+        parser.add_argument(
+            "--max-in-flight", type=int, default=backfill.DEFAULT_MAX_IN_FLIGHT,
+            help="Lotes pendentes na fila ao mesmo tempo.",
+        )
+        parser.add_argument(
+            "--wait", type=float, metavar="SEGUNDOS",
+            help="Depois de enfileirar, acompanha o progresso a cada SEGUNDOS.",
+        )
+
+    def handle(self, *args, job, chunk_size, restart, inline, max_in_flight, wait, **options):
+        if job is None:
+            return self._status()
+        if chunk_size is not None and chunk_size < 1:
+            raise CommandError("--chunk-size deve ser positivo.")
+
+        run = backfill.start(job, restart=restart)
+        self.stdout.write(f"{job}: {run.total} pendentes, a partir de {run.cursor or 'inicio'}")
+        if inline:
+            run = backfill.run_inline(job, chunk_size=chunk_size, report=self._report)
+        else:
+            backfill_task.delay(job, chunk_size=chunk_size, max_in_flight=max_in_flight)
+            self.stdout.write(f"{job}: enfileirado")
+            if wait:
+                run = backfill.wait(job, wait, report=self._report)
+        if run.failed:
+            self.stderr.write(f"{job}: {run.failed} linhas falharam (ver logs)")
+
+    def _report(self, run):
+        self.stdout.write(f"{run.job}: {backfill.progress(run)}")
+
+    def _status(self):
+        runs = {run.job: run for run in BackfillRun.objects.all()}
+        for name, job in sorted(backfill.JOBS.items()):
+            run = runs.get(name)
+            state = backfill.progress(run) if run else "nunca executado"
+            self.stdout.write(f"{name}: {state} - {job.description}")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.media_layout import relayout
+from api.models import CharacterReference, Image
+
+
+class Command(BaseCommand):
+    help = (
+        "Move imagens e referencias de personagem para o layout fragmentado por hash "
+        "(users/<id>/images/ab/cd/<sha256>.<ext>), em lotes e com a aplicacao no ar. "
+        "Os arquivos antigos ficam para a varredura de orfaos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Linhas lidas por lote.")
+        parser.add_argument("--dry-run", action="store_true", help="So conta o que seria movido.")
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        for label, queryset in (
+            ("imagens", Image.objects.all()),
+            ("referencias", CharacterReference.objects.all()),
+        ):
+            moved = relayout(queryset, batch_size=batch_size, dry_run=dry_run)
+            verb = "a mover" if dry_run else "movidas"
+            self.stdout.write(f"{label}: {moved} {verb}")
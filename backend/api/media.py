@@ -0,0 +1,60 @@
+"""Acesso a midia pela API de storage do Django (disco local ou bucket S3).
+
+Nada aqui assume ``MEDIA_ROOT``: arquivos sao lidos com ``storage.open`` e
+URLs vem de ``storage.url``. Com ``MEDIA_STORAGE=s3`` (django-storages) a URL
+e pre-assinada e expira em ``MEDIA_URL_EXPIRE`` segundos, ou aponta para o
+CDN quando ``MEDIA_CDN_DOMAIN`` esta definido.
+
+``profile_picture``/``cover_picture`` guardam o caminho estavel
+``MEDIA_URL + nome`` (uma URL pre-assinada expira e nao cabe no campo);
+``media_url`` resolve esse valor para a URL do storage na leitura.
+"""
+from typing import Optional
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
+from PIL import Image as PILImage
+
+
+def is_local(storage=None) -> bool:
+    """``True`` quando o storage grava em disco (``FileSystemStorage``)."""
+    return isinstance(storage or default_storage, FileSystemStorage)
+
+
+def media_path(name: str) -> str:
+    """Valor gravado em ``profile_picture``/``cover_picture`` para o arquivo ``name``."""
+    return f"{settings.MEDIA_URL}{filepath_to_uri(name)}"
+
+
+def media_name(value) -> Optional[str]:
+    """Nome no storage a partir do valor gravado por ``media_path``."""
+    if value and value.startswith(settings.MEDIA_URL):
+        return unquote(value[len(settings.MEDIA_URL):])
+    return None
+
+
+def media_url(value, request=None) -> Optional[str]:
+    """URL servivel (pre-assinada/CDN no S3) para um valor de ``media_path``."""
+    if not value:
+        return None
+    name = media_name(value)
+    url = default_storage.url(name) if name else value
+    return request.build_absolute_uri(url) if request else url
+
+
+def file_url(field, request=None) -> Optional[str]:
+    """URL servivel de um ``FileField``; absoluta quando ha ``request``."""
+    if not field:
+        return None
+    url = field.url
+    return request.build_absolute_uri(url) if request else url
+
+
+def open_image(field) -> PILImage.Image:
+    """Le a imagem de um ``FileField`` pelo storage, sem depender de ``.path``."""
+    with field.open("rb") as fh:
+        image = PILImage.open(fh)
+        image.load()
+    return image
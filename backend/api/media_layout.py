@@ -0,0 +1,129 @@
+"""Layout dos arquivos de midia: nome pelo hash do conteudo, diretorios fragmentados.
+
+Todo arquivo gravado pela aplicacao vai para ``<prefixo>/ab/cd/<sha256><ext>``
+(``ab``/``cd`` sao os quatro primeiros digitos do hash). Cada diretorio folha
+recebe em media 1/65536 dos arquivos do prefixo, entao listagem, backup e
+rsync deixam de varrer um diretorio com centenas de milhares de entradas.
+
+Prefixos: ``users/<user_id>/images`` (geracoes), ``characters/<id>/refs``
+(referencias), ``avatars`` e ``covers``. Conteudo repetido no mesmo prefixo
+vira o mesmo nome e ``store_file``/``store_content`` so gravam quando o nome
+ainda nao existe; um arquivo pode, portanto, ser usado por mais de uma linha
+e so sai do storage quando nenhuma o referencia
+(``purge.delete_unreferenced``). Reaproveitar um arquivo renova o mtime dele,
+e a limpeza nao apaga arquivos tocados ha pouco: a linha nova pode ainda
+nao ter sido gravada.
+
+``relayout`` (comando ``migrate_media_layout``) move os arquivos do layout
+antigo em lotes, com a aplicacao no ar: copia para o nome novo e troca a
+linha com um ``UPDATE`` condicionado ao nome antigo. O arquivo antigo fica
+para a varredura de orfaos (``sweep_orphan_media``), para que URLs ja
+entregues (cache publico, links assinados) continuem validas ate la.
+"""
+import hashlib
+import logging
+import os
+import re
+import uuid
+
+from django.core.files.storage import default_storage
+
+from .media import is_local
+
+logger = logging.getLogger(__name__)
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def content_digest(content) -> str:
+    """SHA-256 de um ``File`` lido em chunks (o arquivo nunca vai inteiro para a memoria)."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def sharded_name(prefix, filename, default_extension=".png") -> str:
+    """``<prefix>/ab/cd/<stem><ext>``; um ``filename`` que nao e hash ganha um UUID."""
+    stem, extension = os.path.splitext(os.path.basename(filename))
+    if not DIGEST_RE.match(stem):
+        stem = uuid.uuid4().hex
+    return f"{prefix}/{stem[:2]}/{stem[2:4]}/{stem}{extension or default_extension}"
+
+
+def is_content_addressed(name) -> bool:
+    """``True`` quando ``name`` ja esta no layout: ``.../ab/cd/<sha256><ext>``."""
+    parts = name.split("/")
+    stem = os.path.splitext(parts[-1])[0]
+    return len(parts) >= 3 and bool(DIGEST_RE.match(stem)) and parts[-3:-1] == [stem[:2], stem[2:4]]
+
+
+def _touch(storage, name, content):
+    if is_local(storage):
+        os.utime(storage.path(name))
+    else:
+        # Bucket nao tem "touch": regrava o objeto (mesmo conteudo, LastModified novo).
+        storage._save(name, content)
+
+
+def _save_once(storage, name, content):
+    # Mesmo hash, mesmo conteudo: reaproveita o arquivo que ja esta la.
+    if storage.exists(name):
+        try:
+            _touch(storage, name, content)
+            return name
+        except FileNotFoundError:
+            pass  # Apagado entre o exists e o touch: grava de novo.
+    return storage.save(name, content)
+
+
+def store_content(prefix, content, storage=None) -> str:
+    """Grava ``content`` em ``prefix`` pelo hash e retorna o nome no storage."""
+    storage = storage or default_storage
+    extension = os.path.splitext(content.name or "")[1]
+    return _save_once(storage, sharded_name(prefix, content_digest(content) + extension), content)
+
+
+def store_file(field_file, content, save=True):
+    """Equivalente a ``FieldFile.save`` com nome pelo hash e dedup pelo storage."""
+    extension = os.path.splitext(content.name or "")[1]
+    name = field_file.field.generate_filename(field_file.instance, content_digest(content) + extension)
+    field_file.name = _save_once(field_file.storage, name, content)
+    setattr(field_file.instance, field_file.field.attname, field_file.name)
+    field_file._committed = True
+    if save:
+        field_file.instance.save()
+
+
+def relayout(queryset, field_name="image", batch_size=500, dry_run=False) -> int:
+    """Move para o layout os arquivos de ``queryset`` fora dele; retorna quantos."""
+    model = queryset.model
+    field = model._meta.get_field(field_name)
+    storage = field.storage
+    queryset = queryset.exclude(**{f"{field_name}__isnull": True}).exclude(**{field_name: ""})
+    moved = 0
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        batch = list(page.order_by("pk")[:batch_size])
+        if not batch:
+            return moved
+        last_pk = batch[-1].pk
+        for obj in batch:
+            old = getattr(obj, field_name).name
+            if is_content_addressed(old):
+                continue
+            if dry_run:
+                moved += 1
+                continue
+            try:
+                with storage.open(old, "rb") as content:
+                    filename = content_digest(content) + os.path.splitext(old)[1]
+                    new = _save_once(storage, field.generate_filename(obj, filename), content)
+            except FileNotFoundError:
+                logger.warning("Arquivo %s de %s #%s nao existe; mantido.", old, model.__name__, obj.pk)
+                continue
+            # Condicionado ao nome antigo: uma troca feita pela aplicacao no meio vence.
+            moved += model.objects.filter(pk=obj.pk, **{field_name: old}).update(**{field_name: new})
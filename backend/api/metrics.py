@@ -0,0 +1,152 @@
+"""Metricas operacionais (contadores e histogramas) no cache compartilhado.
+
+Sem dependencia de ``prometheus_client``: os valores ficam no cache do Django
+(Redis em producao, entao somam todos os workers) com ``incr`` atomico, e
+``render_prometheus`` gera o formato texto servido em ``GET /api/metrics/``.
+
+As metricas declaram os valores possiveis de cada label; assim a exportacao
+sabe quais chaves ler sem precisar listar o cache. No Redis, os incrementos
+de uma observacao vao num unico pipeline (uma ida ao servidor).
+"""
+from itertools import product
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from django.core.cache import cache
+
+_KEY_PREFIX = "metrics"
+REGISTRY: List["_Metric"] = []
+
+
+def _incr(key: str, delta: int = 1) -> None:
+    _incr_many({key: delta})
+
+
+def _incr_many(deltas: Dict[str, int]) -> None:
+    """Aplica ``{chave: delta}``; no Redis, ``INCRBY`` em lote num pipeline."""
+    client = getattr(cache, "_cache", None)
+    if hasattr(client, "get_client"):
+        keys = list(deltas)
+        pipe = client.get_client(keys[0], write=True).pipeline(transaction=False)
+        for key in keys:
+            pipe.incrby(cache.make_and_validate_key(key), deltas[key])
+        pipe.execute()
+        return
+    for key, delta in deltas.items():
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, delta)
+
+
+def _format_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    pairs = list(pairs)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Dict[str, Sequence[str]] = None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels or {}
+        REGISTRY.append(self)
+
+    def _label_key(self, values: Dict[str, str]) -> str:
+        unknown = set(values) ^ set(self.labels)
+        if unknown:
+            raise ValueError(f"{self.name}: labels esperados {sorted(self.labels)}")
+        for name, value in values.items():
+            if value not in self.labels[name]:
+                raise ValueError(f"{self.name}: {name}={value!r} nao declarado")
+        return ",".join(values[name] for name in self.labels)
+
+    def _series(self):
+        names = list(self.labels)
+        for combo in product(*(self.labels[name] for name in names)):
+            yield list(zip(names, combo)), ",".join(combo)
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((_KEY_PREFIX, self.name) + parts)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: int = 1, **labels: str) -> None:
+        _incr(self._key(self._label_key(labels)), amount)
+
+    def values(self) -> Dict[str, int]:
+        """``{"v1,v2": total}`` por combinacao de labels."""
+        series = [label_key for _, label_key in self._series()]
+        stored = cache.get_many([self._key(label_key) for label_key in series])
+        return {label_key: stored.get(self._key(label_key), 0) for label_key in series}
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        values = self.values()
+        for pairs, label_key in self._series():
+            lines.append(f"{self.name}{_format_labels(pairs)} {values[label_key]}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Histograma com buckets fixos; a soma e guardada em milissegundos."""
+
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name, help_text, labels=None, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, seconds: float, **labels: str) -> None:
+        label_key = self._label_key(labels)
+        bucket = next((str(b) for b in self.buckets if seconds <= b), "+Inf")
+        _incr_many({
+            self._key(label_key, "bucket", bucket): 1,
+            self._key(label_key, "count"): 1,
+            self._key(label_key, "sum_ms"): int(round(seconds * 1000)),
+        })
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        bounds = [str(b) for b in self.buckets] + ["+Inf"]
+        for pairs, label_key in self._series():
+            keys = [self._key(label_key, "bucket", b) for b in bounds]
+            keys += [self._key(label_key, "count"), self._key(label_key, "sum_ms")]
+            stored = cache.get_many(keys)
+            cumulative = 0
+            for bound, key in zip(bounds, keys):
+                cumulative += stored.get(key, 0)
+                bucket_labels = _format_labels(pairs + [("le", bound)])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            total_ms = stored.get(self._key(label_key, "sum_ms"), 0)
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {total_ms / 1000:.3f}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {stored.get(self._key(label_key, 'count'), 0)}")
+        return lines
+
+
+class DerivedGauge(_Metric):
+    """Valor calculado na exportacao a partir de outras metricas (ex.: hit ratio)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, compute: Callable[[], float]):
+        super().__init__(name, help_text)
+        self.compute = compute
+
+    def render(self) -> List[str]:
+        return super().render() + [f"{self.name} {self.compute():.4f}"]
+
+
+def render_prometheus() -> str:
+    """Todas as metricas registradas no formato texto do Prometheus (0.0.4)."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_prompt_trigram_index(apps, schema_editor):
+    """Trigram index for prompt search (PostgreSQL only).
+
+    SearchFilter issues ``UPPER(prompt::text) LIKE UPPER('%term%')``, so the
+    index is built on the same expression to be usable by the planner.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    schema_editor.execute("""
+        CREATE INDEX IF NOT EXISTS image_prompt_trgm_idx
+        ON api_image
+        USING gin ((UPPER(prompt::text)) gin_trgm_ops);
+    """)
+
+
+def drop_prompt_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS image_prompt_trgm_idx;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_character_charactergeneration_characterreference'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(condition=models.Q(('is_public', True), ('status', 'READY')), fields=['-featured', '-relevance_score', '-created_at'], name='image_public_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['user', '-created_at'], name='image_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='imagecomment',
+            index=models.Index(fields=['image', 'parent'], name='comment_image_parent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='imagelike',
+            index=models.Index(fields=['user', 'image'], name='imagelike_user_image_idx'),
+        ),
+        migrations.RunPython(
+            create_prompt_trigram_index,
+            drop_prompt_trigram_index,
+        ),
+    ]
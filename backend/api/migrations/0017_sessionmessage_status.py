@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionmessage',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='READY', max_length=10),
+        ),
+    ]
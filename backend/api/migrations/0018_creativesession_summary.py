@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_sessionmessage_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='creativesession',
+            name='summarized_until_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='creativesession',
+            name='summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_creativesession_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageDownloadDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_downloads', to='api.image')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('image', 'day'), name='unique_download_day_per_image')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:43
+
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_imagedownloaddaily'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='characterreference',
+            name='image',
+            field=models.ImageField(max_length=255, upload_to=api.models.character_ref_upload_to),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='image',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to=api.models.image_upload_to),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_media_layout_max_length'),
+        ('authentication', '0013_user_deleted_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStyleProfile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='style_profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('prompt_count', models.PositiveIntegerField(default=0)),
+                ('terms', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
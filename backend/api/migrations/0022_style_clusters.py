@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_userstyleprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstyleprofile',
+            name='clustered_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='StyleCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=100)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('centroid', models.JSONField(default=list)),
+                ('example_score', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('example_image', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.image')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='style_clusters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-size', 'id'],
+            },
+        ),
+    ]
@@ -1,8 +1,14 @@
-import os
 import uuid
+from datetime import timedelta
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from .media_layout import sharded_name
 
 try:
     from pgvector.django import VectorField
@@ -19,9 +25,8 @@ IMAGE_EMBEDDING_DIM = 768  # BLIP visual encoder (ViT-B/16)
 
 
 def image_upload_to(instance, filename):
-    """Store generated images under per-user folders with stable extensions."""
-    extension = os.path.splitext(filename)[1] or ".png"
-    return f"users/{instance.user_id}/images/{uuid.uuid4()}{extension}"
+    """Store generated images under per-user folders, sharded by content hash."""
+    return sharded_name(f"users/{instance.user_id}/images", filename)
 
 
 class Image(models.Model):
@@ -53,7 +58,8 @@ class Image(models.Model):
         default=AspectRatio.SQUARE,
     )
     seed = models.BigIntegerField(blank=True, null=True)
-    image = models.ImageField(upload_to=image_upload_to, blank=True, null=True)
+    # users/<uuid>/images/ab/cd/<sha256>.<ext> is longer than the default 100 chars.
+    image = models.ImageField(upload_to=image_upload_to, max_length=255, blank=True, null=True)
     status = models.CharField(
         max_length=20,
         choices=Status.choices,
@@ -80,6 +86,17 @@ class Image(models.Model):
         related_name="images",
     )
 
+    class Meta:
+        indexes = [
+            # Public gallery: WHERE is_public AND status = READY ORDER BY rank
+            models.Index(
+                fields=['-featured', '-relevance_score', '-created_at'],
+                name='image_public_rank_idx',
+                condition=Q(is_public=True, status='READY'),
+            ),
+            models.Index(fields=['user', '-created_at'], name='image_user_created_idx'),
+        ]
+
     @property
     def image_url(self):
         if self.image:
@@ -106,12 +123,36 @@ class ImageLike(models.Model):
                 fields=['image', 'user'], name='unique_like_per_user_image'
             )
         ]
+        indexes = [
+            models.Index(fields=['user', 'image'], name='imagelike_user_image_idx'),
+        ]
         ordering = ['-created_at']
 
     def __str__(self):
         return f'Like by {self.user.username} on image {self.image_id}'
 
 
+class ImageDownloadDaily(models.Model):
+    """Downloads de uma imagem por dia, gravados pelo flush do contador."""
+
+    image = models.ForeignKey(
+        Image, on_delete=models.CASCADE, related_name='daily_downloads'
+    )
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['image', 'day'], name='unique_download_day_per_image'
+            )
+        ]
+        ordering = ['-day']
+
+    def __str__(self):
+        return f'{self.count} downloads of image {self.image_id} on {self.day}'
+
+
 class ImageComment(models.Model):
     image = models.ForeignKey(
         Image, on_delete=models.CASCADE, related_name='comments'
@@ -132,6 +173,9 @@ class ImageComment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['image', 'parent'], name='comment_image_parent_idx'),
+        ]
 
     def __str__(self):
         preview = (self.text or '')[:30]
@@ -219,6 +263,10 @@ class CreativeSession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='creative_sessions')
     title = models.CharField(max_length=200, default='Nova sessão')
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.ACTIVE)
+    # Resumo acumulado da conversa (api/agent_context.py) e id da ultima
+    # SessionMessage ja incorporada a ele.
+    summary = models.TextField(blank=True, default='')
+    summarized_until_id = models.PositiveBigIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -235,9 +283,16 @@ class SessionMessage(models.Model):
         USER = 'user', 'User'
         ASSISTANT = 'assistant', 'Assistant'
 
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        READY = 'READY', 'Ready'
+        FAILED = 'FAILED', 'Failed'
+
     session = models.ForeignKey(CreativeSession, on_delete=models.CASCADE, related_name='messages')
     role = models.CharField(max_length=10, choices=Role.choices)
     text = models.TextField()
+    # Resposta do agente nasce PENDING e o worker preenche o texto.
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.READY)
     image = models.ForeignKey(Image, on_delete=models.SET_NULL, null=True, blank=True, related_name='session_messages')
     prompt_used = models.TextField(blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -245,9 +300,18 @@ class SessionMessage(models.Model):
     class Meta:
         ordering = ['created_at']
 
+    # Texto da resposta do agente quando o turno falha (LLM, worker ou fila).
+    ERROR_TEXT = 'Desculpe, tive um problema ao processar sua mensagem. Tente novamente.'
+
     def __str__(self):
         return f'[{self.role}] {self.text[:50]}'
 
+    def is_stalled(self):
+        """Resposta ainda PENDING depois de ``AGENT_TURN_TIMEOUT``: o worker nao vai mais responde-la."""
+        if self.status != self.Status.PENDING:
+            return False
+        return timezone.now() - self.created_at > timedelta(seconds=settings.AGENT_TURN_TIMEOUT)
+
 
 class Character(models.Model):
     """A reusable character with reference images for consistent generation."""
@@ -267,14 +331,13 @@ class Character(models.Model):
 
 
 def character_ref_upload_to(instance, filename):
-    extension = os.path.splitext(filename)[1] or ".png"
-    return f"characters/{instance.character_id}/refs/{uuid.uuid4()}{extension}"
+    return sharded_name(f"characters/{instance.character_id}/refs", filename)
 
 
 class CharacterReference(models.Model):
     """A reference image for a character."""
     character = models.ForeignKey(Character, on_delete=models.CASCADE, related_name='references')
-    image = models.ImageField(upload_to=character_ref_upload_to)
+    image = models.ImageField(upload_to=character_ref_upload_to, max_length=255)
     order = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -356,3 +419,57 @@ class ImageEmbedding(models.Model):
     def has_embeddings(self):
         """Check if at least one embedding is available."""
         return bool(self.prompt_embedding_json or self.image_embedding_json)
+
+
+class UserStyleProfile(models.Model):
+    """Per-user term statistics behind style suggestions (api/style_profile.py)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='style_profile')
+    prompt_count = models.PositiveIntegerField(default=0)
+    # {term: [prompts containing the term, example image id]}
+    terms = models.JSONField(default=dict)
+    # Image embeddings covered by the last full clustering (api/style_clusters.py)
+    clustered_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Style profile for {self.user_id}"
+
+
+class StyleCluster(models.Model):
+    """One recurring visual style of a user: a k-means cluster of image embeddings."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='style_clusters')
+    label = models.CharField(max_length=100)
+    size = models.PositiveIntegerField(default=0)
+    # Mean of the member vectors (not normalized), updated as new embeddings arrive
+    centroid = models.JSONField(default=list)
+    example_image = models.ForeignKey(Image, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Inner product between the example embedding and the centroid
+    example_score = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-size', 'id']
+
+    def __str__(self):
+        return f"{self.label} ({self.size})"
+
+
+class BackfillRun(models.Model):
+    """Checkpoint of a resumable backfill job (api/backfill.py), one row per job."""
+    job = models.CharField(max_length=50, unique=True)
+    # Last primary key dispatched; keys may be ints or UUIDs
+    cursor = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    total = models.PositiveIntegerField(default=0, help_text="Pending rows when the run started (estimate)")
+    dispatched = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.job}: {self.completed + self.failed}/{self.total}"
+
+    @property
+    def in_flight(self):
+        return max(self.dispatched - self.completed - self.failed, 0)
@@ -0,0 +1,180 @@
+"""Cliente HTTP de saida compartilhado (pool, keep-alive, retry e circuit breaker).
+
+Um ``requests.Session`` por processo (recriado apos fork, no worker do
+Celery) mantem as conexoes TLS abertas entre chamadas. Em volta de cada
+request:
+
+- retry com backoff exponencial e jitter para falha de conexao e 429/502/503/504
+  (timeout de leitura nao e repetido: o provedor pode ter processado);
+- circuit breaker com estado no cache compartilhado: ``threshold`` falhas
+  dentro de ``window`` segundos abrem o circuito por ``cooldown`` segundos,
+  quando as chamadas falham na hora com ``CircuitOpen``; depois um unico
+  request de prova decide se fecha ou reabre;
+- latencia por endpoint, retries e rejeicoes em ``api.metrics``.
+
+A configuracao vem de ``settings.<PREFIX>_HTTP_*`` e
+``settings.<PREFIX>_CIRCUIT_*``, lida a cada chamada.
+"""
+import os
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+from .metrics import Counter, Histogram
+
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+OUTCOMES = ("ok", "http_error", "error", "timeout")
+
+
+class CircuitOpen(Exception):
+    """Provedor marcado como degradado; a chamada nem foi feita."""
+
+
+class CircuitBreaker:
+    def __init__(self, name, prefix):
+        self.prefix = prefix
+        self._failures_key = f"circuit:{name}:failures"
+        self._open_key = f"circuit:{name}:open-until"
+        self._probe_key = f"circuit:{name}:probe"
+
+    def _setting(self, name, default):
+        return getattr(settings, f"{self.prefix}_CIRCUIT_{name}", default)
+
+    def allow(self):
+        """``"closed"``, ``"probe"`` (meio-aberto, esta chamada testa) ou ``None``."""
+        if self._setting("FAILURE_THRESHOLD", 5) <= 0:
+            return "closed"
+        open_until = cache.get(self._open_key)
+        if open_until is None:
+            return "closed"
+        if time.time() < open_until:
+            return None
+        cooldown = self._setting("COOLDOWN", 30)
+        return "probe" if cache.add(self._probe_key, 1, timeout=cooldown) else None
+
+    def record_success(self, state):
+        if state == "probe":
+            cache.delete_many([self._open_key, self._probe_key, self._failures_key])
+
+    def record_failure(self, state):
+        threshold = self._setting("FAILURE_THRESHOLD", 5)
+        if threshold <= 0:
+            return
+        if state != "probe":
+            cache.add(self._failures_key, 0, timeout=self._setting("WINDOW", 30))
+            if cache.incr(self._failures_key) < threshold:
+                return
+        cooldown = self._setting("COOLDOWN", 30)
+        cache.set(self._open_key, time.time() + cooldown, timeout=cooldown * 2)
+        cache.delete_many([self._failures_key, self._probe_key])
+
+
+class OutboundClient:
+    """Cliente de um provedor externo; ``endpoints`` sao os nomes usados nas metricas."""
+
+    def __init__(self, name, *, endpoints, settings_prefix):
+        self.name = name
+        self.prefix = settings_prefix
+        self.breaker = CircuitBreaker(name, settings_prefix)
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+        self.latency = Histogram(
+            f"outbound_{name}_request_seconds",
+            f"Latencia de cada tentativa HTTP para {name}, por endpoint e desfecho.",
+            labels={"endpoint": endpoints, "outcome": OUTCOMES},
+        )
+        self.retries = Counter(
+            f"outbound_{name}_retries_total",
+            f"Tentativas repetidas para {name}.",
+            labels={"endpoint": endpoints},
+        )
+        self.rejections = Counter(
+            f"outbound_{name}_circuit_rejections_total",
+            f"Chamadas para {name} recusadas com o circuito aberto.",
+            labels={"endpoint": endpoints},
+        )
+
+    def _setting(self, name, default):
+        return getattr(settings, f"{self.prefix}_HTTP_{name}", default)
+
+    @property
+    def session(self):
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    pool_size = self._setting("POOL_MAXSIZE", 10)
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session, self._pid = session, pid
+        return self._session
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+
+    def post(self, endpoint, url, **kwargs):
+        """``session.post`` com breaker e retries; devolve a resposta ja validada.
+
+        Levanta ``CircuitOpen`` com o circuito aberto e as excecoes do
+        ``requests`` (``HTTPError`` inclusive) quando as tentativas acabam.
+        """
+        state = self.breaker.allow()
+        if state is None:
+            self.rejections.inc(endpoint=endpoint)
+            raise CircuitOpen(f"{self.name}: circuito aberto")
+
+        retries = self._setting("RETRIES", 2)
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                response = self.session.post(url, **kwargs)
+                if response.status_code in RETRY_STATUSES and attempt < retries:
+                    outcome = "http_error"
+                    response.close()
+                else:
+                    response.raise_for_status()
+                    outcome = "ok"
+                    self.breaker.record_success(state)
+                    return response
+            except requests.exceptions.ConnectionError:
+                # Inclui ConnectTimeout: nada chegou ao provedor, pode repetir.
+                if attempt >= retries:
+                    self.breaker.record_failure(state)
+                    raise
+            except requests.exceptions.Timeout:
+                outcome = "timeout"
+                self.breaker.record_failure(state)
+                raise
+            except requests.exceptions.HTTPError as exc:
+                outcome = "http_error"
+                if exc.response is not None and exc.response.status_code >= 500:
+                    self.breaker.record_failure(state)
+                else:
+                    # 4xx: o provedor respondeu, o problema e do request.
+                    self.breaker.record_success(state)
+                raise
+            finally:
+                self.latency.observe(time.perf_counter() - started, endpoint=endpoint, outcome=outcome)
+
+            attempt += 1
+            self.retries.inc(endpoint=endpoint)
+            self._sleep(attempt)
+
+    def _sleep(self, attempt):
+        """Backoff exponencial com full jitter."""
+        base = self._setting("BACKOFF", 0.25)
+        cap = self._setting("BACKOFF_MAX", 4.0)
+        time.sleep(random.uniform(0, min(cap, base * 2 ** (attempt - 1))))
@@ -0,0 +1,53 @@
+"""Read model das listagens de projetos.
+
+As listagens nao precisam das entradas completas de cada projeto: bastam a
+contagem de imagens e algumas miniaturas. A contagem vem de uma subquery
+anotada e as miniaturas de uma unica query com
+``ROW_NUMBER() OVER (PARTITION BY project_id ORDER BY order, created_at)``
+limitada a ``PROJECT_PREVIEW_LIMIT`` por projeto. Memoria e tempo da
+listagem deixam de depender do tamanho dos projetos.
+"""
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .annotations import related_count
+from .fast_serializers import media_url_builder
+from .models import ProjectImage
+
+PROJECT_PREVIEW_LIMIT = 4
+
+
+def project_list_queryset(queryset):
+    """Colunas e anotacoes usadas pelo ``ProjectListSerializer``."""
+    return (
+        queryset.select_related("user", "cover_image")
+        .prefetch_related("tags")
+        .annotate(image_count=related_count(ProjectImage, field="project"))
+    )
+
+
+def attach_project_previews(projects, request=None, limit=PROJECT_PREVIEW_LIMIT):
+    """Preenche ``project.previews`` (``[{id, image_url}]``) com uma query."""
+    projects = list(projects)
+    if not projects:
+        return projects
+    ranked = (
+        ProjectImage.objects.filter(project_id__in=[project.pk for project in projects])
+        .annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=F("project_id"),
+                order_by=(F("order").asc(), F("created_at").asc()),
+            )
+        )
+        .filter(rank__lte=limit)
+        .order_by("project_id", "rank")
+        .values_list("project_id", "image_id", "image__image")
+    )
+    media_url = media_url_builder(request)
+    previews = {}
+    for project_id, image_id, name in ranked:
+        previews.setdefault(project_id, []).append({"id": image_id, "image_url": media_url(name)})
+    for project in projects:
+        project.previews = previews.get(project.pk, [])
+    return projects
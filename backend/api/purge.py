@@ -0,0 +1,226 @@
+"""Exclusao de contas em segundo plano e coleta de arquivos orfaos de midia.
+
+``DeleteAccountView`` so desativa a conta (``soft_delete_user``): esconde o
+conteudo publico e libera e-mail/username em poucas queries. ``purge_user``
+(via ``purge_user_task``) apaga as linhas em lotes de
+``ACCOUNT_PURGE_CHUNK_SIZE``, cada lote em sua propria transacao, e remove os
+arquivos de cada lote do storage depois do commit. Uma execucao interrompida
+pode ser repetida: o que ja foi apagado nao volta. Arquivos sao
+deduplicados pelo hash (``media_layout``), entao so saem do storage quando
+nenhuma outra linha os referencia (``delete_unreferenced``) e nao foram
+reaproveitados nos ultimos ``MEDIA_REUSE_GRACE`` segundos.
+
+``sweep_orphan_files`` percorre ``MEDIA_ROOT`` com ``os.scandir`` (sem montar
+a lista inteira em memoria; num bucket, ``listdir`` por prefixo) e confere os
+arquivos contra o banco em lotes; arquivos sem dono e mais velhos que
+``MEDIA_SWEEP_GRACE`` segundos sao removidos. Cobre falhas de geracao,
+avatares substituidos, arquivos de um purge que caiu entre o commit e a
+remocao e os nomes antigos deixados por ``migrate_media_layout``.
+"""
+import logging
+import os
+import time
+from datetime import timedelta
+from itertools import islice
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .http_cache import invalidate_public_cache
+from .media import is_local, media_name, media_path
+from .models import (
+    Character,
+    CharacterReference,
+    CommentLike,
+    CreativeSession,
+    Image,
+    ImageComment,
+    ImageLike,
+    Project,
+    SessionMessage,
+)
+
+logger = logging.getLogger(__name__)
+
+# Prefixos (relativos a MEDIA_ROOT) gravados pela aplicacao.
+MEDIA_PREFIXES = ("users", "characters", "avatars", "covers")
+
+
+def soft_delete_user(user):
+    """Desativa ``user`` e tira o conteudo dele das listagens publicas."""
+    with transaction.atomic():
+        user.is_active = False
+        user.deleted_at = timezone.now()
+        # E-mail e username ficam livres para um novo cadastro.
+        user.email = f"deleted-{user.pk}@deleted.invalid"
+        user.username = f"deleted-{user.pk}"
+        user.set_unusable_password()
+        user.save(update_fields=["is_active", "deleted_at", "email", "username", "password"])
+        hidden = Image.objects.filter(user=user, is_public=True).update(is_public=False)
+        hidden += Project.objects.filter(user=user, is_public=True).update(is_public=False)
+    if hidden:
+        invalidate_public_cache()
+
+
+def delete_files(names: Iterable[str]) -> int:
+    """Remove ``names`` do storage; arquivos que ja sumiram sao ignorados."""
+    deleted = 0
+    for name in names:
+        if not name:
+            continue
+        try:
+            default_storage.delete(name)
+            deleted += 1
+        except OSError:
+            logger.warning("Falha ao remover %s do storage.", name, exc_info=True)
+    return deleted
+
+
+def delete_unreferenced(names: Iterable[str]) -> int:
+    """Como ``delete_files``, mas mantem arquivos que outra linha ainda usa (dedup por hash)."""
+    names = list({name for name in names if name})
+    if not names:
+        return 0
+    referenced = _referenced(names)
+    unreferenced = [name for name in names if name not in referenced]
+    recent = _recently_touched(unreferenced)
+    return delete_files(name for name in unreferenced if name not in recent)
+
+
+def _recently_touched(names):
+    # ``media_layout`` renova o mtime ao reaproveitar um arquivo, antes de a
+    # linha que o usa ser gravada; esses ficam para ``sweep_orphan_files``.
+    grace = settings.MEDIA_REUSE_GRACE
+    if grace <= 0:
+        return set()
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    recent = set()
+    for name in names:
+        try:
+            if default_storage.get_modified_time(name) >= cutoff:
+                recent.add(name)
+        except OSError:
+            continue
+    return recent
+
+
+def _delete_in_chunks(queryset, chunk_size, file_field=None):
+    """Apaga as linhas de ``queryset`` em lotes; retorna quantas linhas sairam."""
+    fields = ("pk", file_field) if file_field else ("pk",)
+    total = 0
+    while True:
+        rows = list(queryset.order_by("pk").values_list(*fields)[:chunk_size])
+        if not rows:
+            return total
+        with transaction.atomic():
+            queryset.model.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        if file_field:
+            delete_unreferenced(row[1] for row in rows)
+        total += len(rows)
+
+
+def purge_user(user_id, chunk_size=None):
+    """Apaga em lotes as linhas e os arquivos de uma conta excluida."""
+    chunk_size = chunk_size or settings.ACCOUNT_PURGE_CHUNK_SIZE
+    user = get_user_model().objects.filter(pk=user_id, deleted_at__isnull=False).first()
+    if user is None:
+        return False
+
+    # Linhas do usuario em conteudo de terceiros, depois o conteudo dele.
+    _delete_in_chunks(CommentLike.objects.filter(user_id=user_id), chunk_size)
+    _delete_in_chunks(ImageLike.objects.filter(user_id=user_id), chunk_size)
+    _delete_in_chunks(ImageComment.objects.filter(user_id=user_id, parent__isnull=False), chunk_size)
+    _delete_in_chunks(ImageComment.objects.filter(user_id=user_id), chunk_size)
+    _delete_in_chunks(Image.objects.filter(user_id=user_id), chunk_size, file_field="image")
+    _delete_in_chunks(CharacterReference.objects.filter(character__user_id=user_id), chunk_size, file_field="image")
+    _delete_in_chunks(Character.objects.filter(user_id=user_id), chunk_size)
+    _delete_in_chunks(SessionMessage.objects.filter(session__user_id=user_id), chunk_size)
+    _delete_in_chunks(CreativeSession.objects.filter(user_id=user_id), chunk_size)
+    _delete_in_chunks(Project.objects.filter(user_id=user_id), chunk_size)
+
+    pictures = [media_name(user.profile_picture), media_name(user.cover_picture)]
+    user.delete()
+    delete_unreferenced(pictures)
+    return True
+
+
+def iter_media_files(root=None) -> Iterator[tuple]:
+    """``(nome relativo, mtime)`` de cada arquivo sob ``MEDIA_PREFIXES``, sem listar tudo antes."""
+    if root is None and not is_local():
+        yield from _iter_storage_files(default_storage)
+        return
+    root = os.fspath(root or settings.MEDIA_ROOT)
+    stack = [os.path.join(root, prefix) for prefix in MEDIA_PREFIXES]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    name = os.path.relpath(entry.path, root).replace(os.sep, "/")
+                    yield name, entry.stat(follow_symlinks=False).st_mtime
+
+
+def _iter_storage_files(storage) -> Iterator[tuple]:
+    """Mesmo contrato de ``iter_media_files`` para storages sem disco (bucket)."""
+    stack = list(MEDIA_PREFIXES)
+    while stack:
+        directory = stack.pop()
+        try:
+            directories, files = storage.listdir(directory)
+        except FileNotFoundError:
+            continue
+        stack.extend(f"{directory}/{child}" for child in directories)
+        for filename in files:
+            name = f"{directory}/{filename}"
+            yield name, storage.get_modified_time(name).timestamp()
+
+
+def _referenced(names):
+    """Subconjunto de ``names`` ainda referenciado no banco (3 queries por lote)."""
+    referenced = set(Image.objects.filter(image__in=names).values_list("image", flat=True))
+    referenced.update(CharacterReference.objects.filter(image__in=names).values_list("image", flat=True))
+    urls = {media_path(name): name for name in names}
+    for profile, cover in get_user_model().objects.filter(
+        Q(profile_picture__in=urls) | Q(cover_picture__in=urls)
+    ).values_list("profile_picture", "cover_picture"):
+        referenced.update(urls[url] for url in (profile, cover) if url in urls)
+    return referenced
+
+
+def sweep_orphan_files(grace=None, batch_size=None, dry_run=False):
+    """Remove arquivos de midia sem linha no banco; retorna quantos eram orfaos."""
+    grace = settings.MEDIA_SWEEP_GRACE if grace is None else grace
+    batch_size = batch_size or settings.MEDIA_SWEEP_BATCH
+    cutoff = time.time() - grace
+    candidates = (name for name, mtime in iter_media_files() if mtime < cutoff)
+    orphans = 0
+    while True:
+        batch = list(islice(candidates, batch_size))
+        if not batch:
+            return orphans
+        referenced = _referenced(batch)
+        found = [name for name in batch if name not in referenced]
+        if found:
+            logger.info("Arquivos orfaos%s: %s", " (dry run)" if dry_run else "", found)
+            if not dry_run:
+                delete_files(found)
+        orphans += len(found)
+
+
+def stalled_purges(older_than):
+    """IDs de contas excluidas ha mais de ``older_than`` segundos e ainda nao apagadas."""
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return list(
+        get_user_model().objects.filter(deleted_at__lte=cutoff).values_list("pk", flat=True)
+    )
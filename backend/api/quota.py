@@ -0,0 +1,139 @@
+"""Reserva de cota mensal de geracao.
+
+Todas as views que enfileiram ``generate_image_task`` reservam cota aqui.
+A reserva e um unico ``UPDATE ... WHERE <cabe na cota> RETURNING``: sem
+``SELECT FOR UPDATE``, requests concorrentes da mesma conta nao serializam
+num lock de linha e nunca ultrapassam a cota. A virada de mes acontece no
+mesmo statement (contador volta para ``count`` quando ``last_reset_date`` e
+de outro periodo).
+
+Quando a geracao falha, o worker devolve a cota com ``refund_generations``.
+
+O estado da cota (plano, usado, restante, periodo) fica em cache por usuario
+com write-through a partir da reserva: ``PlanQuotaThrottle`` e
+``GET /api/users/me/quota/`` leem dali sem tocar o banco.
+"""
+from datetime import date
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+QUOTA_STATE_TIMEOUT = 60 * 10
+
+
+def period_start(day: Optional[date] = None) -> date:
+    """Primeiro dia do periodo de cota (mes corrente, UTC)."""
+    return (day or timezone.now().date()).replace(day=1)
+
+
+def plan_quota(user) -> Optional[int]:
+    """Cota mensal do plano do usuario; ``None`` para planos ilimitados."""
+    quotas = getattr(settings, "PLAN_QUOTAS", {})
+    return quotas.get(getattr(user, "plan", "free"))
+
+
+def next_period_start(day: Optional[date] = None) -> date:
+    """Primeiro dia do proximo periodo (quando a cota renova)."""
+    start = period_start(day)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def _state_key(user_id) -> str:
+    return f"quota-state:{user_id}"
+
+
+def _store_state(user_id, plan: str, used: int, period: date) -> dict:
+    quota = getattr(settings, "PLAN_QUOTAS", {}).get(plan)
+    state = {
+        "plan": plan,
+        "quota": quota,
+        "used": used,
+        "remaining": None if quota is None else max(quota - used, 0),
+        "period_start": period,
+    }
+    cache.set(_state_key(user_id), state, timeout=QUOTA_STATE_TIMEOUT)
+    return state
+
+
+def quota_state(user) -> dict:
+    """Estado da cota do periodo atual, do cache ou derivado de ``user``.
+
+    Na falta do cache usa os campos ja carregados em ``user`` (sem query) e
+    grava o resultado; troca de plano ou de mes descarta o estado anterior.
+    """
+    period = period_start()
+    state = cache.get(_state_key(user.pk))
+    if state is None or state["period_start"] != period or state["plan"] != user.plan:
+        used = user.image_generation_count if user.last_reset_date == period else 0
+        state = _store_state(user.pk, user.plan, used, period)
+    return state
+
+
+def _columns():
+    User = get_user_model()
+    quote = connection.ops.quote_name
+    meta = User._meta
+    return (
+        User,
+        quote(meta.db_table),
+        quote(meta.pk.column),
+        quote(meta.get_field("image_generation_count").column),
+        quote(meta.get_field("last_reset_date").column),
+    )
+
+
+def reserve_generations(user, count: int = 1) -> bool:
+    """Reserva ``count`` geracoes para ``user`` se couberem na cota do periodo.
+
+    Em caso de sucesso atualiza ``image_generation_count``/``last_reset_date``
+    no objeto ``user`` com os valores gravados e retorna ``True``.
+    """
+    User, table, pk, counter, reset = _columns()
+    quota = plan_quota(user)
+    period = connection.ops.adapt_datefield_value(period_start())
+    sql = (
+        f"UPDATE {table} SET "
+        f"{counter} = CASE WHEN {reset} = %s THEN {counter} + %s ELSE %s END, "
+        f"{reset} = %s "
+        f"WHERE {pk} = %s"
+    )
+    params = [period, count, count, period, User._meta.pk.get_db_prep_value(user.pk, connection)]
+    if quota is not None:
+        sql += f" AND (CASE WHEN {reset} = %s THEN {counter} ELSE 0 END) + %s <= %s"
+        params += [period, count, quota]
+    sql += f" RETURNING {counter}"
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        # Contagem exata desconhecida (outro request pode ter reservado):
+        # o proximo quota_state recalcula a partir do usuario.
+        cache.delete(_state_key(user.pk))
+        return False
+    user.image_generation_count = row[0]
+    user.last_reset_date = period_start()
+    _store_state(user.pk, user.plan, row[0], user.last_reset_date)
+    return True
+
+
+def refund_generations(user_id, count: int = 1, period: Optional[date] = None) -> bool:
+    """Devolve ``count`` geracoes reservadas em ``period`` (padrao: periodo atual).
+
+    Reservas de um mes que ja virou nao sao devolvidas: o contador ja zerou.
+    """
+    updated = get_user_model().objects.filter(
+        pk=user_id,
+        last_reset_date=period or period_start(),
+        image_generation_count__gte=count,
+    ).update(image_generation_count=F("image_generation_count") - count)
+    if updated:
+        cache.delete(_state_key(user_id))
+    return bool(updated)
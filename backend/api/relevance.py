@@ -6,6 +6,8 @@ from typing import Optional
 
 from django.db import transaction
 
+from .annotations import related_count
+
 
 @dataclass(frozen=True)
 class RelevanceWeights:
@@ -116,7 +118,9 @@ def update_image_relevance(image, commit: bool = True, now: Optional[datetime] =
     if comments is None:
         comments = ImageComment.objects.filter(image=image).count()
     downloads = image.download_count
-    tag_count = image.tags.count() if hasattr(image, "tags") else 0
+    tag_count = getattr(image, "tag_count", None)
+    if tag_count is None:
+        tag_count = image.tags.count() if hasattr(image, "tags") else 0
 
     new_score = calculate_relevance_score(
         likes=likes,
@@ -135,3 +139,22 @@ def update_image_relevance(image, commit: bool = True, now: Optional[datetime] =
     else:
         image.relevance_score = new_score
     return new_score
+
+
+def refresh_relevance(image_ids, now: Optional[datetime] = None):
+    """Recalcula e grava ``relevance_score`` de varias imagens com queries fixas."""
+    from api.models import Image, ImageComment, ImageLike
+
+    images = list(
+        Image.objects.filter(id__in=image_ids)
+        .only("id", "created_at", "download_count", "featured", "relevance_score")
+        .annotate(
+            like_count=related_count(ImageLike),
+            comment_count=related_count(ImageComment),
+            tag_count=related_count(Image.tags.through),
+        )
+    )
+    for image in images:
+        update_image_relevance(image, commit=False, now=now)
+    Image.objects.bulk_update(images, ["relevance_score"])
+    return len(images)
@@ -4,6 +4,8 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from drf_spectacular.utils import extend_schema_field
 
+from .like_cache import liked_image_ids
+from .media import file_url
 from .models import Image, ImageComment
 
 User = get_user_model()
@@ -71,14 +73,9 @@ class ImageSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.URLField(allow_null=True))
     def get_image_url(self, obj) -> Optional[str]:
-        if not obj.image:
-            return None
-
         request = self.context.get('request') if hasattr(self, 'context') else None
-        url = obj.image.url
-        if request:
-            return request.build_absolute_uri(url)
-        return url
+        # Disco: /media/...; bucket: URL pre-assinada ou do CDN (api/media.py).
+        return file_url(obj.image, request)
 
     @extend_schema_field(serializers.IntegerField())
     def get_like_count(self, obj) -> int:
@@ -100,7 +97,12 @@ class ImageSerializer(serializers.ModelSerializer):
             return False
         if hasattr(obj, 'is_liked'):
             return bool(obj.is_liked)
-        return obj.likes.filter(user=user).exists()
+        # Conjunto de curtidas carregado uma vez e compartilhado pelos itens
+        # (o context e o do serializer raiz).
+        liked_ids = self.context.get('liked_image_ids')
+        if liked_ids is None:
+            liked_ids = self.context['liked_image_ids'] = liked_image_ids(user)
+        return obj.id in liked_ids
 
     @extend_schema_field(serializers.ListField(child=serializers.CharField()))
     def get_tags(self, obj) -> List[str]:
@@ -151,6 +153,57 @@ class ImageShareUpdateSerializer(serializers.Serializer):
     is_public = serializers.BooleanField()
 
 
+IMAGE_BULK_MAX_IMAGES = 500
+IMAGE_BULK_MAX_TAGS = 20
+
+
+class ImageBulkSerializer(serializers.Serializer):
+    image_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=IMAGE_BULK_MAX_IMAGES,
+        help_text='IDs de imagens do usuário',
+    )
+
+    def validate_image_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
+class ImageBulkVisibilitySerializer(ImageBulkSerializer):
+    is_public = serializers.BooleanField()
+
+
+class ImageBulkTagsSerializer(ImageBulkSerializer):
+    add = serializers.ListField(
+        child=serializers.CharField(max_length=64),
+        required=False,
+        default=list,
+        max_length=IMAGE_BULK_MAX_TAGS,
+        help_text='Tags a adicionar (criadas se não existirem)',
+    )
+    remove = serializers.ListField(
+        child=serializers.CharField(max_length=64),
+        required=False,
+        default=list,
+        max_length=IMAGE_BULK_MAX_TAGS,
+        help_text='Tags a remover',
+    )
+
+    def _normalize(self, names):
+        return list(dict.fromkeys(name.strip() for name in names if name.strip()))
+
+    def validate_add(self, value):
+        return self._normalize(value)
+
+    def validate_remove(self, value):
+        return self._normalize(value)
+
+    def validate(self, attrs):
+        if not attrs['add'] and not attrs['remove']:
+            raise serializers.ValidationError('Informe tags em `add` e/ou `remove`.')
+        return attrs
+
+
 class ImageCommentReplySerializer(serializers.ModelSerializer):
     """Simplified serializer for replies (no nested replies)."""
     user = ImageUserSerializer(read_only=True)
@@ -185,17 +238,18 @@ class ImageCommentSerializer(serializers.ModelSerializer):
     is_liked = serializers.SerializerMethodField()
     reply_count = serializers.SerializerMethodField()
     replies = serializers.SerializerMethodField()
+    replies_cursor = serializers.SerializerMethodField()
     parent_id = serializers.IntegerField(source='parent.id', read_only=True, allow_null=True)
 
     class Meta:
         model = ImageComment
         fields = (
             'id', 'user', 'text', 'created_at', 'updated_at',
-            'like_count', 'is_liked', 'parent_id', 'reply_count', 'replies'
+            'like_count', 'is_liked', 'parent_id', 'reply_count', 'replies', 'replies_cursor'
         )
         read_only_fields = (
             'id', 'user', 'created_at', 'updated_at',
-            'like_count', 'is_liked', 'parent_id', 'reply_count', 'replies'
+            'like_count', 'is_liked', 'parent_id', 'reply_count', 'replies', 'replies_cursor'
         )
 
     @extend_schema_field(serializers.IntegerField())
@@ -225,12 +279,23 @@ class ImageCommentSerializer(serializers.ModelSerializer):
         # Only return replies for top-level comments (parent=None)
         if obj.parent is not None:
             return []
-        if hasattr(obj, '_prefetched_objects_cache') and 'replies' in obj._prefetched_objects_cache:
+        if hasattr(obj, 'reply_preview'):
+            # Primeiras respostas carregadas por attach_reply_previews.
+            replies = obj.reply_preview
+        elif hasattr(obj, '_prefetched_objects_cache') and 'replies' in obj._prefetched_objects_cache:
             replies = obj._prefetched_objects_cache['replies']
         else:
             replies = obj.replies.select_related('user').order_by('created_at')
         return ImageCommentReplySerializer(replies, many=True, context=self.context).data
 
+    @extend_schema_field(serializers.IntegerField(allow_null=True))
+    def get_replies_cursor(self, obj) -> Optional[int]:
+        """``after`` para buscar o restante das respostas; nulo se ``replies`` ja tem todas."""
+        preview = getattr(obj, 'reply_preview', None)
+        if not preview or len(preview) >= self.get_reply_count(obj):
+            return None
+        return preview[-1].id
+
 
 class ImageCommentCreateSerializer(serializers.ModelSerializer):
     parent_id = serializers.IntegerField(required=False, allow_null=True)
@@ -301,12 +366,7 @@ class CharacterReferenceSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.URLField(allow_null=True))
     def get_image_url(self, obj) -> Optional[str]:
-        if not obj.image:
-            return None
-        request = self.context.get('request')
-        if request:
-            return request.build_absolute_uri(obj.image.url)
-        return obj.image.url
+        return file_url(obj.image, self.context.get('request'))
 
 
 class CharacterSerializer(serializers.ModelSerializer):
@@ -382,22 +442,31 @@ class CharacterGenerateSerializer(serializers.Serializer):
 
 class SessionMessageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_status = serializers.SerializerMethodField()
 
     class Meta:
         from .models import SessionMessage
         model = SessionMessage
-        fields = ('id', 'role', 'text', 'image', 'image_url', 'prompt_used', 'created_at')
-        read_only_fields = ('id', 'role', 'image', 'image_url', 'prompt_used', 'created_at')
+        fields = ('id', 'role', 'text', 'status', 'image', 'image_url', 'image_status', 'prompt_used', 'created_at')
+        read_only_fields = ('id', 'role', 'status', 'image', 'image_url', 'image_status', 'prompt_used', 'created_at')
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.is_stalled():
+            # Worker perdido: o cliente para de esperar e pode enviar de novo.
+            data['status'] = instance.Status.FAILED
+            data['text'] = instance.ERROR_TEXT
+        return data
+
+    @extend_schema_field(serializers.ChoiceField(choices=Image.Status.choices, allow_null=True))
+    def get_image_status(self, obj) -> Optional[str]:
+        return obj.image.status if obj.image_id else None
 
     @extend_schema_field(serializers.URLField(allow_null=True))
     def get_image_url(self, obj) -> Optional[str]:
-        if not obj.image or not obj.image.image:
+        if not obj.image:
             return None
-        request = self.context.get('request')
-        url = obj.image.image.url
-        if request:
-            return request.build_absolute_uri(url)
-        return url
+        return file_url(obj.image.image, self.context.get('request'))
 
 
 class CreativeSessionSerializer(serializers.ModelSerializer):
@@ -492,13 +561,33 @@ class ProjectSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.URLField(allow_null=True))
     def get_cover_image_url(self, obj) -> Optional[str]:
-        if not obj.cover_image or not obj.cover_image.image:
+        if not obj.cover_image:
             return None
-        request = self.context.get('request')
-        url = obj.cover_image.image.url
-        if request:
-            return request.build_absolute_uri(url)
-        return url
+        return file_url(obj.cover_image.image, self.context.get('request'))
+
+
+class ProjectPreviewSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    image_url = serializers.URLField(allow_null=True)
+
+
+class ProjectListSerializer(ProjectSerializer):
+    """Lighter serializer for project lists: counts and previews, no entries.
+
+    Expects ``project_list_queryset`` annotations and ``previews`` filled by
+    ``attach_project_previews``.
+    """
+    images = None
+    image_count = serializers.IntegerField(read_only=True)
+    previews = ProjectPreviewSerializer(many=True, read_only=True)
+
+    class Meta(ProjectSerializer.Meta):
+        fields = (
+            'id', 'user', 'title', 'description', 'cover_image',
+            'cover_image_url', 'is_public', 'tags', 'previews',
+            'image_count', 'created_at', 'updated_at',
+        )
+        read_only_fields = fields
 
 
 class ProjectCreateSerializer(serializers.Serializer):
@@ -519,6 +608,22 @@ class ProjectReorderSerializer(serializers.Serializer):
     )
 
 
+PROJECT_BULK_MAX_IMAGES = 500
+
+
+class ProjectImageBulkSerializer(serializers.Serializer):
+    image_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=PROJECT_BULK_MAX_IMAGES,
+        help_text='IDs das imagens (na ordem em que devem ser adicionadas)',
+    )
+    caption = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate_image_ids(self, value):
+        return list(dict.fromkeys(value))
+
+
 # Prompt Assistant - DeepSeek LLM Serializers
 
 class RefinePromptRequestSerializer(serializers.Serializer):
@@ -0,0 +1,19 @@
+"""Receivers dos sinais de ``authentication`` (conectados em ``ApiConfig.ready``)."""
+from django.dispatch import receiver
+
+from authentication.signals import account_deleted, profile_media_replaced
+
+from .purge import delete_unreferenced, soft_delete_user
+from .tasks import purge_user_task
+
+
+@receiver(account_deleted)
+def purge_deleted_account(sender, user, **kwargs):
+    # Desativa na hora; linhas e arquivos saem em lotes no worker.
+    soft_delete_user(user)
+    purge_user_task.delay(str(user.pk))
+
+
+@receiver(profile_media_replaced)
+def delete_replaced_profile_media(sender, names, **kwargs):
+    delete_unreferenced(names)
@@ -5,13 +5,14 @@ Provides functions to find similar images based on embeddings.
 Supports both pgvector (PostgreSQL) and JSON fallback.
 """
 import logging
-from collections import Counter
-from typing import List, Optional, Tuple
+from typing import List, Optional
 
 from django.db import connection
 from django.db.models import Q
 
 from .models import Image, ImageEmbedding
+from .style_clusters import cluster_suggestions
+from .style_profile import style_suggestions
 
 logger = logging.getLogger(__name__)
 
@@ -210,12 +211,11 @@ def get_user_style_suggestions(
     limit: int = 5,
 ) -> List[dict]:
     """
-    Get style suggestions based on user's prompt history.
+    Get style suggestions based on user's image history.
 
-    MVP approach:
-    1. Analyze most frequent keywords in user's prompts
-    2. Group by common patterns/styles
-    3. Return suggestions with example prompts
+    Serves the user's cached visual style clusters (api/style_clusters.py);
+    users without clusters yet fall back to the precomputed term profile
+    (api/style_profile.py). Neither depends on the size of the history.
 
     Args:
         user_id: The user's ID
@@ -224,125 +224,4 @@ def get_user_style_suggestions(
     Returns:
         List of style suggestions with labels and examples
     """
-    import re
-
-    # Get user's prompts
-    prompts = list(
-        ImageEmbedding.objects.filter(image__user_id=user_id)
-        .exclude(prompt_text='')
-        .values_list('prompt_text', 'image_id')
-    )
-
-    if not prompts:
-        # Fall back to direct Image model if no embeddings yet
-        prompts = list(
-            Image.objects.filter(user_id=user_id, status=Image.Status.READY)
-            .exclude(prompt='')
-            .exclude(prompt__isnull=True)
-            .values_list('prompt', 'id')
-        )
-
-    if not prompts:
-        return []
-
-    # Common stopwords to ignore
-    stopwords = {
-        'a', 'an', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-        'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'been',
-        'be', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
-        'could', 'should', 'may', 'might', 'must', 'shall', 'can', 'need',
-        'it', 'its', 'this', 'that', 'these', 'those', 'i', 'you', 'he',
-        'she', 'we', 'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your',
-        'his', 'her', 'our', 'their', 'very', 'just', 'also', 'only', 'like',
-        'um', 'uma', 'uns', 'umas', 'o', 'os', 'as', 'de', 'da', 'do', 'das',
-        'dos', 'em', 'no', 'na', 'nos', 'nas', 'por', 'para', 'com', 'sem',
-        'sobre', 'entre', 'e', 'ou', 'mas', 'porque', 'que', 'se', 'quando',
-    }
-
-    # Style-related keywords to look for
-    style_keywords = {
-        # Art styles
-        'realistic', 'photorealistic', 'hyperrealistic', 'cinematic',
-        'anime', 'manga', 'cartoon', 'illustration', 'digital art',
-        'oil painting', 'watercolor', 'sketch', 'pencil', 'charcoal',
-        '3d', '3d render', 'cgi', 'unreal engine', 'octane render',
-        'pixel art', 'retro', 'vintage', 'minimalist', 'abstract',
-        'surreal', 'surrealistic', 'fantasy', 'sci-fi', 'cyberpunk',
-        'steampunk', 'gothic', 'dark', 'bright', 'colorful', 'vibrant',
-        'pastel', 'neon', 'moody', 'dramatic',
-        # Quality modifiers
-        '4k', '8k', 'hd', 'high quality', 'detailed', 'intricate',
-        'masterpiece', 'professional', 'studio',
-        # Lighting
-        'dramatic lighting', 'soft lighting', 'natural lighting',
-        'golden hour', 'blue hour', 'backlit', 'rim light',
-    }
-
-    # Extract and count keywords
-    keyword_counter = Counter()
-    keyword_examples = {}  # keyword -> (prompt, image_id)
-
-    for prompt_text, image_id in prompts:
-        # Lowercase and extract words
-        words = re.findall(r'\b[a-z]{3,}\b', prompt_text.lower())
-
-        for word in words:
-            if word not in stopwords:
-                keyword_counter[word] += 1
-                if word not in keyword_examples:
-                    keyword_examples[word] = (prompt_text, image_id)
-
-        # Also check for multi-word style keywords
-        prompt_lower = prompt_text.lower()
-        for style in style_keywords:
-            if style in prompt_lower:
-                keyword_counter[style] += 1
-                if style not in keyword_examples:
-                    keyword_examples[style] = (prompt_text, image_id)
-
-    if not keyword_counter:
-        return []
-
-    # Get most common keywords, prioritizing style keywords
-    suggestions = []
-    seen_labels = set()
-
-    # First pass: style keywords
-    for keyword in style_keywords:
-        if keyword in keyword_counter and keyword not in seen_labels:
-            count = keyword_counter[keyword]
-            if count >= 2:  # At least 2 uses
-                example_prompt, example_id = keyword_examples[keyword]
-                suggestions.append({
-                    'label': keyword.title(),
-                    'example_prompt': example_prompt,
-                    'example_image_id': example_id,
-                    'frequency': count,
-                    'confidence': min(count / len(prompts), 1.0),
-                })
-                seen_labels.add(keyword)
-
-            if len(suggestions) >= limit:
-                break
-
-    # Second pass: other frequent keywords
-    if len(suggestions) < limit:
-        for keyword, count in keyword_counter.most_common(limit * 2):
-            if keyword not in seen_labels and count >= 2:
-                example_prompt, example_id = keyword_examples[keyword]
-                suggestions.append({
-                    'label': keyword.title(),
-                    'example_prompt': example_prompt,
-                    'example_image_id': example_id,
-                    'frequency': count,
-                    'confidence': min(count / len(prompts), 1.0),
-                })
-                seen_labels.add(keyword)
-
-            if len(suggestions) >= limit:
-                break
-
-    # Sort by frequency/confidence
-    suggestions.sort(key=lambda x: x['confidence'], reverse=True)
-
-    return suggestions[:limit]
+    return cluster_suggestions(user_id, limit=limit) or style_suggestions(user_id, limit=limit)
@@ -0,0 +1,89 @@
+"""Server-Sent Events: formato, renderer e progresso de respostas do agente.
+
+O turno do agente roda no worker (``agent_turn_task``); o progresso (texto
+parcial, imagem disparada, fim) e publicado no cache compartilhado e o
+detalhe da mensagem le de la enquanto ela esta PENDING. O cliente acompanha
+por polling, sem prender um worker do gunicorn esperando o LLM.
+"""
+import json
+import time
+
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+AGENT_STREAM_TIMEOUT = 300
+PUBLISH_INTERVAL = 0.05
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Permite ``Accept: text/event-stream`` na negociacao do DRF.
+
+    As views de streaming devolvem ``StreamingHttpResponse`` ja formatado;
+    o renderer so existe para a negociacao nao responder 406.
+    """
+
+    media_type = "text/event-stream"
+    format = "sse"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event("error" if isinstance(data, dict) and "detail" in data else "message", data)
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def event_stream_response(events):
+    """``StreamingHttpResponse`` SSE sem cache nem buffering no proxy."""
+    response = StreamingHttpResponse(events, content_type="text/event-stream; charset=utf-8")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def wants_stream(request):
+    """``?stream=true`` ou ``Accept: text/event-stream``."""
+    if request.query_params.get("stream", "").lower() in ("1", "true", "yes"):
+        return True
+    return "text/event-stream" in request.META.get("HTTP_ACCEPT", "")
+
+
+def _agent_key(message_id):
+    return f"agent-stream:{message_id}"
+
+
+class AgentStreamPublisher:
+    """Publica o progresso de uma resposta do agente no cache.
+
+    Deltas de texto sao agrupados (no maximo uma escrita a cada
+    ``PUBLISH_INTERVAL``); eventos de imagem e o fim sao gravados na hora.
+    """
+
+    def __init__(self, message_id):
+        self.key = _agent_key(message_id)
+        self.state = {"text": "", "image_id": None, "done": False}
+        self._last_write = 0.0
+
+    def text(self, delta):
+        self.state["text"] += delta
+        now = time.monotonic()
+        if now - self._last_write >= PUBLISH_INTERVAL:
+            self._write(now)
+
+    def image(self, image_id):
+        self.state["image_id"] = image_id
+        self._write()
+
+    def done(self, text):
+        self.state.update(text=text, done=True)
+        self._write()
+
+    def _write(self, now=None):
+        cache.set(self.key, dict(self.state), timeout=AGENT_STREAM_TIMEOUT)
+        self._last_write = now or time.monotonic()
+
+
+def read_agent_stream(message_id):
+    return cache.get(_agent_key(message_id))
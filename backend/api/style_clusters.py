@@ -0,0 +1,222 @@
+"""Estilos visuais recorrentes por usuario: k-means sobre os embeddings de imagem.
+
+``cluster_user_styles`` agrupa os ``image_embedding`` (768-d, normalizados)
+das imagens READY do usuario com k-means em mini-lotes, todo em numpy: cada
+iteracao atribui um lote inteiro com um produto de matrizes e move os
+centros pela media do lote ponderada pelo total ja visto (a atualizacao de
+Sculley, feita por centro e nao por amostra). Com algumas centenas de
+vetores o ajuste leva alguns milissegundos.
+
+O resultado fica em ``StyleCluster`` (um registro por estilo): centro,
+tamanho, rotulo e a imagem medoide. Para vetores normalizados a distancia
+de cosseno total de ``x`` aos membros e ``n - x . soma``, entao o medoide e
+exatamente o membro de maior produto interno com a media do grupo.
+
+Novos embeddings entram por ``record_embedding``: vao para o centro mais
+proximo, que anda pela media corrida. Quando o numero de imagens passa de
+``REFIT_GROWTH`` vezes o do ultimo ajuste, o ajuste completo roda de novo
+(``cluster_styles_task``). A exclusao em lote de imagens tambem agenda o
+ajuste: so ele encolhe os grupos e troca um medoide apagado, que ate la
+fica de fora das sugestoes. ``cluster_suggestions`` le so os grupos (uma
+query); sem grupos, ``similarity.get_user_style_suggestions`` volta para o
+perfil de termos (``style_profile``).
+"""
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+from django.db import transaction
+
+from .models import Image, ImageEmbedding, StyleCluster, UserStyleProfile
+from .style_profile import STYLE_PHRASES, extract_terms, rebuild_style_profile
+
+MIN_EMBEDDINGS = 6
+MIN_CLUSTER_SIZE = 2
+MAX_CLUSTERS = 6
+MAX_SAMPLES = 2000
+BATCH_SIZE = 256
+MAX_ITERATIONS = 50
+STABLE_BATCHES = 3
+REFIT_GROWTH = 2
+
+
+def _load_vectors(user_id):
+    rows = list(
+        ImageEmbedding.objects.filter(image__user_id=user_id, image__status=Image.Status.READY)
+        .exclude(image_embedding_json__isnull=True)
+        .order_by('-image_id')
+        .values_list('image_id', 'image__prompt', 'image_embedding_json')[:MAX_SAMPLES]
+    )
+    if not rows:
+        return [], [], np.empty((0, 0), dtype=np.float32)
+    # Vetores de outra dimensao (modelo antigo) ficam de fora.
+    dim = len(rows[0][2])
+    rows = [row for row in rows if len(row[2]) == dim]
+    ids = [row[0] for row in rows]
+    prompts = [row[1] or '' for row in rows]
+    return ids, prompts, np.asarray([row[2] for row in rows], dtype=np.float32)
+
+
+def _sq_distances(X, centers):
+    # ||x - c||^2 para todos os pares, sem materializar as diferencas.
+    return (
+        (X * X).sum(axis=1)[:, None]
+        - 2.0 * X @ centers.T
+        + (centers * centers).sum(axis=1)[None, :]
+    )
+
+
+def _init_centers(X, k, rng):
+    """k-means++: cada novo centro e sorteado com peso na distancia ao mais proximo."""
+    centers = np.empty((k, X.shape[1]), dtype=X.dtype)
+    centers[0] = X[rng.integers(len(X))]
+    closest = _sq_distances(X, centers[:1])[:, 0]
+    for i in range(1, k):
+        weights = np.clip(closest, 0, None)
+        total = weights.sum()
+        pick = rng.choice(len(X), p=weights / total) if total > 0 else rng.integers(len(X))
+        centers[i] = X[pick]
+        closest = np.minimum(closest, _sq_distances(X, centers[i:i + 1])[:, 0])
+    return centers
+
+
+def _member_sums(X, labels, k):
+    # Soma dos membros de cada grupo como produto de matrizes (one-hot k x n).
+    one_hot = np.zeros((k, len(X)), dtype=X.dtype)
+    one_hot[labels, np.arange(len(X))] = 1
+    return one_hot @ X
+
+
+def mini_batch_kmeans(X, k, rng=None, batch_size=BATCH_SIZE, max_iterations=MAX_ITERATIONS):
+    """Centros e atribuicao final de ``X`` (n, d) em ``k`` grupos."""
+    rng = rng or np.random.default_rng(0)
+    k = min(k, len(X))
+    centers = _init_centers(X, k, rng)
+    seen = np.zeros(k)
+    batch_size = min(batch_size, len(X))
+    stable = 0
+    for _ in range(max_iterations):
+        batch = X[rng.choice(len(X), batch_size, replace=False)]
+        nearest = _sq_distances(batch, centers).argmin(axis=1)
+        counts = np.bincount(nearest, minlength=k)
+        sums = _member_sums(batch, nearest, k)
+        hit = counts > 0
+        seen[hit] += counts[hit]
+        # Taxa por centro = amostras do lote / amostras vistas ate aqui.
+        rate = (counts[hit] / seen[hit])[:, None]
+        centers[hit] += rate * (sums[hit] / counts[hit][:, None] - centers[hit])
+        # Convergiu quando lotes seguidos nao trocam nenhum ponto de grupo.
+        stable = stable + 1 if (_sq_distances(batch, centers).argmin(axis=1) == nearest).all() else 0
+        if stable >= STABLE_BATCHES:
+            break
+
+    labels = _sq_distances(X, centers).argmin(axis=1)
+    # Centros finais = media exata dos membros (base do medoide).
+    counts = np.bincount(labels, minlength=k)
+    sums = _member_sums(X, labels, k)
+    hit = counts > 0
+    centers[hit] = sums[hit] / counts[hit][:, None]
+    return centers, labels
+
+
+def _cluster_count(n):
+    return int(min(MAX_CLUSTERS, max(2, round((n / 2) ** 0.5))))
+
+
+def _label(prompts, taken):
+    counts = Counter()
+    for prompt in prompts:
+        counts.update(extract_terms(prompt))
+    ranked = sorted(counts.items(), key=lambda item: (item[0] not in STYLE_PHRASES, -item[1], item[0]))
+    for term, _ in ranked:
+        if term not in taken:
+            return term
+    return None
+
+
+def cluster_user_styles(user_id) -> List[StyleCluster]:
+    """Ajuste completo dos estilos do usuario; substitui os grupos salvos."""
+    ids, prompts, X = _load_vectors(user_id)
+    clusters = []
+    if len(ids) >= MIN_EMBEDDINGS:
+        centers, labels = mini_batch_kmeans(X, _cluster_count(len(ids)), np.random.default_rng(len(ids)))
+        scores = (X * centers[labels]).sum(axis=1)
+        taken = set()
+        for index in np.argsort(-np.bincount(labels, minlength=len(centers))):
+            members = np.flatnonzero(labels == index)
+            if not len(members):
+                continue
+            medoid = members[scores[members].argmax()]
+            label = _label([prompts[i] for i in members], taken) or f'style {len(clusters) + 1}'
+            taken.add(label)
+            clusters.append(StyleCluster(
+                user_id=user_id,
+                label=label[:100],
+                size=len(members),
+                centroid=centers[index].tolist(),
+                example_image_id=ids[medoid],
+                example_score=float(scores[medoid]),
+            ))
+
+    with transaction.atomic():
+        StyleCluster.objects.filter(user_id=user_id).delete()
+        StyleCluster.objects.bulk_create(clusters)
+        if not UserStyleProfile.objects.filter(user_id=user_id).update(clustered_count=len(ids)):
+            rebuild_style_profile(user_id)
+            UserStyleProfile.objects.filter(user_id=user_id).update(clustered_count=len(ids))
+    return clusters
+
+
+def record_embedding(image: Image, vector: Optional[List[float]]) -> bool:
+    """Soma um embedding novo ao grupo mais proximo; ``True`` pede um ajuste completo."""
+    if not vector:
+        return False
+    x = np.asarray(vector, dtype=np.float64)
+    with transaction.atomic():
+        clusters = list(StyleCluster.objects.select_for_update().filter(user_id=image.user_id).order_by('id'))
+        if not clusters or any(len(cluster.centroid) != len(x) for cluster in clusters):
+            # Sem grupos (ou de outro modelo): ajusta quando houver vetores suficientes.
+            return ImageEmbedding.objects.filter(
+                image__user_id=image.user_id, image__status=Image.Status.READY, image_embedding_json__isnull=False,
+            ).count() >= MIN_EMBEDDINGS
+
+        centers = np.asarray([cluster.centroid for cluster in clusters])
+        cluster = clusters[int(((centers - x) ** 2).sum(axis=1).argmin())]
+        center = np.asarray(cluster.centroid)
+        cluster.size += 1
+        center += (x - center) / cluster.size
+        cluster.centroid = center.tolist()
+        # O score do exemplo foi medido contra o centro antigo; o ajuste completo corrige.
+        score = float(x @ center)
+        if cluster.example_image_id is None or score > cluster.example_score:
+            cluster.example_image_id = image.id
+            cluster.example_score = score
+        cluster.save(update_fields=['size', 'centroid', 'example_image', 'example_score', 'updated_at'])
+
+        fitted = UserStyleProfile.objects.filter(user_id=image.user_id).values_list('clustered_count', flat=True).first()
+        return sum(c.size for c in clusters) >= REFIT_GROWTH * max(fitted or 0, MIN_EMBEDDINGS)
+
+
+def cluster_suggestions(user_id, limit: int = 5) -> List[dict]:
+    """Sugestoes a partir dos grupos salvos (uma query); vazio se nao ha grupos."""
+    clusters = list(
+        StyleCluster.objects.filter(user_id=user_id)
+        .select_related('example_image')
+        .only('label', 'size', 'example_image__id', 'example_image__prompt')
+    )
+    total = sum(cluster.size for cluster in clusters)
+    suggestions = []
+    for cluster in clusters:
+        # Exemplo apagado (SET_NULL) ou grupo de uma imagem so: nao e um estilo recorrente.
+        if cluster.example_image is None or cluster.size < MIN_CLUSTER_SIZE:
+            continue
+        suggestions.append({
+            'label': cluster.label.title(),
+            'example_prompt': cluster.example_image.prompt,
+            'example_image_id': cluster.example_image.id,
+            'frequency': cluster.size,
+            'confidence': cluster.size / total,
+        })
+        if len(suggestions) >= limit:
+            break
+    return suggestions
@@ -0,0 +1,270 @@
+"""Perfil de estilo por usuario: frequencia de termos mantida incrementalmente.
+
+``record_prompt`` roda quando uma imagem fica READY: extrai os termos do
+prompt (palavras e frases de estilo, cada termo contado uma vez por prompt)
+e soma no ``UserStyleProfile`` do dono. ``style_suggestions`` le so o perfil
+e os prompts de exemplo (duas queries), independente de quantos prompts o
+usuario ja escreveu.
+
+As frases de ``STYLE_PHRASES`` ("oil painting", "golden hour", ...) sao
+achadas com um automato de Aho-Corasick, numa unica passada pelo prompt, e
+so contam em fronteira de palavra ("art" nao casa dentro de "start").
+
+Cada termo guarda como exemplo a imagem mais recente que o usou.
+``forget_prompts`` (imagens apagadas) desconta os termos e troca os exemplos
+apagados por outra imagem com o termo; se o exemplo sumiu por outro caminho,
+``style_suggestions`` procura um substituto na hora.
+
+Para o perfil nao crescer sem limite, termos fora de ``STYLE_PHRASES`` sao
+podados para os ``MAX_TERMS`` mais frequentes quando passam do dobro disso.
+Usuarios sem perfil (historico anterior) ganham um na primeira leitura ou
+na proxima imagem (``rebuild_style_profile``).
+"""
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+from django.db import transaction
+
+from .models import Image, UserStyleProfile
+
+MAX_TERMS = 256
+MIN_FREQUENCY = 2
+# Prompts recentes examinados ao procurar um exemplo substituto.
+EXAMPLE_SCAN_LIMIT = 500
+
+STOPWORDS = frozenset({
+    'a', 'an', 'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'been',
+    'be', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'could', 'should', 'may', 'might', 'must', 'shall', 'can', 'need',
+    'it', 'its', 'this', 'that', 'these', 'those', 'i', 'you', 'he',
+    'she', 'we', 'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your',
+    'his', 'our', 'their', 'very', 'just', 'also', 'only', 'like',
+    'um', 'uma', 'uns', 'umas', 'o', 'os', 'de', 'da', 'do', 'das',
+    'dos', 'em', 'no', 'na', 'nos', 'nas', 'por', 'para', 'com', 'sem',
+    'sobre', 'entre', 'e', 'ou', 'mas', 'porque', 'que', 'se', 'quando',
+})
+
+STYLE_PHRASES = frozenset({
+    # Art styles
+    'realistic', 'photorealistic', 'hyperrealistic', 'cinematic',
+    'anime', 'manga', 'cartoon', 'illustration', 'digital art',
+    'oil painting', 'watercolor', 'sketch', 'pencil', 'charcoal',
+    '3d', '3d render', 'cgi', 'unreal engine', 'octane render',
+    'pixel art', 'retro', 'vintage', 'minimalist', 'abstract',
+    'surreal', 'surrealistic', 'fantasy', 'sci-fi', 'cyberpunk',
+    'steampunk', 'gothic', 'dark', 'bright', 'colorful', 'vibrant',
+    'pastel', 'neon', 'moody', 'dramatic',
+    # Quality modifiers
+    '4k', '8k', 'hd', 'high quality', 'detailed', 'intricate',
+    'masterpiece', 'professional', 'studio',
+    # Lighting
+    'dramatic lighting', 'soft lighting', 'natural lighting',
+    'golden hour', 'blue hour', 'backlit', 'rim light',
+})
+
+WORD_RE = re.compile(r'\b[a-z]{3,}\b')
+
+
+class PhraseMatcher:
+    """Automato de Aho-Corasick sobre ``phrases`` (todas em minusculas)."""
+
+    def __init__(self, phrases: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        for phrase in phrases:
+            node = 0
+            for char in phrase:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = child
+            self._out[node].append(phrase)
+
+        # Links de falha em largura: o maior sufixo proprio que tambem e prefixo.
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find(self, text: str) -> Set[str]:
+        """Frases presentes em ``text`` delimitadas por fronteira de palavra."""
+        found = set()
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for phrase in self._out[node]:
+                start = end - len(phrase) + 1
+                if _boundary(text, start - 1) and _boundary(text, end + 1):
+                    found.add(phrase)
+        return found
+
+
+def _boundary(text, index):
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+STYLE_MATCHER = PhraseMatcher(STYLE_PHRASES)
+
+
+def extract_terms(prompt: str) -> Set[str]:
+    """Termos de um prompt: palavras (3+ letras, sem stopwords) e frases de estilo."""
+    text = (prompt or '').lower()
+    terms = {word for word in WORD_RE.findall(text) if word not in STOPWORDS}
+    terms.update(STYLE_MATCHER.find(text))
+    return terms
+
+
+def _add(terms: dict, prompt: str, image_id: int):
+    for term in extract_terms(prompt):
+        entry = terms.get(term)
+        if entry is None:
+            terms[term] = [1, image_id]
+        else:
+            entry[0] += 1
+            entry[1] = image_id
+
+
+def _find_examples(user_id, wanted: Set[str], exclude=()) -> Dict[str, tuple]:
+    """``{termo: (id, prompt)}`` da imagem READY mais recente com cada termo de ``wanted`` (uma query)."""
+    found = {}
+    if not wanted:
+        return found
+    rows = (
+        Image.objects.filter(user_id=user_id, status=Image.Status.READY)
+        .exclude(prompt='')
+        .exclude(id__in=exclude)
+        .order_by('-id')
+        .values_list('id', 'prompt')[:EXAMPLE_SCAN_LIMIT]
+    )
+    for image_id, prompt in rows:
+        for term in extract_terms(prompt) & wanted:
+            found.setdefault(term, (image_id, prompt))
+        if len(found) == len(wanted):
+            break
+    return found
+
+
+def _prune(terms: dict):
+    words = [term for term in terms if term not in STYLE_PHRASES]
+    if len(words) <= 2 * MAX_TERMS:
+        return
+    words.sort(key=lambda term: terms[term][0], reverse=True)
+    for term in words[MAX_TERMS:]:
+        del terms[term]
+
+
+def rebuild_style_profile(user_id) -> UserStyleProfile:
+    """Recalcula o perfil a partir de todos os prompts READY (usuarios antigos, backfill)."""
+    terms = {}
+    prompt_count = 0
+    rows = (
+        Image.objects.filter(user_id=user_id, status=Image.Status.READY)
+        .exclude(prompt='')
+        .exclude(prompt__isnull=True)
+        .order_by('id')
+        .values_list('prompt', 'id')
+    )
+    for prompt, image_id in rows.iterator(chunk_size=2000):
+        _add(terms, prompt, image_id)
+        prompt_count += 1
+    _prune(terms)
+    profile, _ = UserStyleProfile.objects.update_or_create(
+        user_id=user_id, defaults={'terms': terms, 'prompt_count': prompt_count},
+    )
+    return profile
+
+
+def record_prompt(image: Image):
+    """Soma o prompt de ``image`` (que acabou de ficar READY) no perfil do dono."""
+    if not image.prompt:
+        return
+    with transaction.atomic():
+        profile = UserStyleProfile.objects.select_for_update().filter(user_id=image.user_id).first()
+        if profile is None:
+            # Sem perfil ainda: o rebuild ja inclui esta imagem.
+            rebuild_style_profile(image.user_id)
+            return
+        _add(profile.terms, image.prompt, image.id)
+        _prune(profile.terms)
+        profile.prompt_count += 1
+        profile.save(update_fields=['terms', 'prompt_count', 'updated_at'])
+
+
+def forget_prompts(user_id, images: Iterable):
+    """Desconta do perfil os prompts de imagens READY apagadas (``[(id, prompt)]``)."""
+    images = [(image_id, prompt) for image_id, prompt in images if prompt]
+    if not images:
+        return
+    deleted = {image_id for image_id, _ in images}
+    with transaction.atomic():
+        profile = UserStyleProfile.objects.select_for_update().filter(user_id=user_id).first()
+        if profile is None:
+            return
+        terms = profile.terms
+        for _, prompt in images:
+            for term in extract_terms(prompt):
+                entry = terms.get(term)
+                if entry is None:
+                    continue
+                entry[0] -= 1
+                if entry[0] <= 0:
+                    del terms[term]
+        orphaned = {term for term, entry in terms.items() if entry[1] in deleted}
+        examples = _find_examples(user_id, orphaned, exclude=deleted)
+        for term in orphaned:
+            terms[term][1] = examples[term][0] if term in examples else None
+        profile.prompt_count = max(profile.prompt_count - len(images), 0)
+        profile.save(update_fields=['terms', 'prompt_count', 'updated_at'])
+
+
+def style_suggestions(user_id, limit: int = 5) -> List[dict]:
+    """Sugestoes a partir do perfil: frases de estilo primeiro, depois palavras recorrentes."""
+    profile = UserStyleProfile.objects.filter(user_id=user_id).first()
+    if profile is None:
+        profile = rebuild_style_profile(user_id)
+    if not profile.prompt_count:
+        return []
+
+    frequent = [(term, entry) for term, entry in profile.terms.items() if entry[0] >= MIN_FREQUENCY]
+    frequent.sort(key=lambda item: (item[0] not in STYLE_PHRASES, -item[1][0], item[0]))
+    # Folga para termos que ja nao tem nenhuma imagem de exemplo.
+    candidates = frequent[:limit * 2]
+    examples = dict(
+        Image.objects.filter(user_id=user_id, id__in=[entry[1] for _, entry in candidates])
+        .values_list('id', 'prompt')
+    )
+    # Exemplo apagado fora de ``forget_prompts``: outra imagem com o termo.
+    replacements = _find_examples(user_id, {term for term, entry in candidates if entry[1] not in examples})
+    examples.update(replacements.values())
+
+    suggestions = []
+    for term, (count, image_id) in candidates:
+        image_id = replacements[term][0] if term in replacements else image_id
+        if image_id not in examples:
+            continue
+        suggestions.append({
+            'label': term.title(),
+            'example_prompt': examples[image_id],
+            'example_image_id': image_id,
+            'frequency': count,
+            'confidence': min(count / profile.prompt_count, 1.0),
+        })
+        if len(suggestions) >= limit:
+            break
+    suggestions.sort(key=lambda suggestion: suggestion['confidence'], reverse=True)
+    return suggestions
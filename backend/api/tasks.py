@@ -1,22 +1,36 @@
 import logging
-import os
-import uuid
 from io import BytesIO
 
 from celery import shared_task
 from decouple import config
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.base import ContentFile
-from django.db import connection
+from django.db import connection, transaction
 from huggingface_hub import InferenceClient
 
-from .models import Image, ImageEmbedding
-from .relevance import update_image_relevance
+from . import backfill
+from .agent_context import build_agent_context, summarize_messages
+from .downloads import flush_downloads
+from .embeddings import generate_image_embedding, generate_text_embedding
+from .http_cache import invalidate_public_cache
+from .llm import LLMError, LLMNotConfigured, StreamingJSONFields, chat_completion_stream, parse_agent_reply
+from .media import open_image
+from .media_layout import store_file
+from .models import CreativeSession, Image, ImageEmbedding, SessionMessage
+from .purge import delete_unreferenced, purge_user, stalled_purges, sweep_orphan_files
+from .quota import period_start, refund_generations, reserve_generations
+from .relevance import refresh_relevance, update_image_relevance
+from .streams import AgentStreamPublisher
+from .style_clusters import cluster_user_styles, record_embedding
+from .style_profile import record_prompt
 
 logger = logging.getLogger(__name__)
 
 # Check if embeddings are enabled
 EMBEDDINGS_ENABLED = getattr(settings, 'EMBEDDINGS_ENABLED', True)
+STYLE_CLUSTER_LOCK_TIMEOUT = 300
+BACKFILL_POLL_SECONDS = 10
 
 ASPECT_RATIO_DIMENSIONS = {
     Image.AspectRatio.SQUARE: (1024, 1024),
@@ -27,6 +41,24 @@ ASPECT_RATIO_DIMENSIONS = {
 }
 
 
+def _mark_failed(image_instance):
+    """Marca a imagem como FAILED e devolve a cota reservada pela view.
+
+    A cota volta so na primeira falha: reentregas da mesma task nao devolvem
+    de novo.
+    """
+    already_failed = image_instance.status == Image.Status.FAILED
+    image_instance.status = Image.Status.FAILED
+    image_instance.image = None
+    image_instance.retry_count += 1
+    image_instance.save(update_fields=["status", "image", "retry_count"])
+    if not already_failed:
+        refund_generations(
+            image_instance.user_id,
+            period=period_start(image_instance.created_at.date()),
+        )
+
+
 @shared_task
 def generate_image_task(image_id):
     image_instance = None
@@ -60,22 +92,18 @@ def generate_image_task(image_id):
             )
         except Exception as exc:
             logger.error("HF API error: %s", repr(exc), exc_info=True)
-            image_instance.status = Image.Status.FAILED
-            image_instance.image = None
-            image_instance.retry_count += 1
-            image_instance.save(update_fields=["status", "image", "retry_count"])
+            _mark_failed(image_instance)
             return
 
         logger.info("Imagem recebida com sucesso da API Hugging Face.")
 
-        image_name = f"{uuid.uuid4()}.png"
         buffer = BytesIO()
         image_data.save(buffer, format="PNG")
-        buffer.seek(0)
 
-        image_instance.image.save(
-            image_name,
-            ContentFile(buffer.read()),
+        # Nome pelo hash do conteudo (api/media_layout.py); repetido, reaproveita o arquivo.
+        store_file(
+            image_instance.image,
+            ContentFile(buffer.getvalue(), name="generated.png"),
             save=False,
         )
         image_instance.status = Image.Status.READY
@@ -84,6 +112,12 @@ def generate_image_task(image_id):
         update_image_relevance(image_instance)
         logger.info(f"[TASK_SUCCESS] Imagem pronta para Image ID: {image_id}")
 
+        # Perfil de estilo incremental (api/style_profile.py); falha aqui nao derruba a geracao.
+        try:
+            record_prompt(image_instance)
+        except Exception:
+            logger.warning(f"[TASK] Style profile update failed for Image ID {image_id}", exc_info=True)
+
         # Trigger embedding generation (non-blocking, graceful degradation)
         if EMBEDDINGS_ENABLED:
             try:
@@ -104,10 +138,194 @@ def generate_image_task(image_id):
             exc_info=True,
         )
         if image_instance:
-            image_instance.status = Image.Status.FAILED
-            image_instance.image = None
-            image_instance.retry_count += 1
-            image_instance.save(update_fields=["status", "image", "retry_count"])
+            _mark_failed(image_instance)
+
+
+AGENT_UNCONFIGURED_TEXT = 'Desculpe, o assistente criativo não está configurado no momento.'
+AGENT_ERROR_TEXT = SessionMessage.ERROR_TEXT
+AGENT_QUOTA_TEXT = '\n\n⚠️ Sua cota mensal de geração foi atingida.'
+
+
+@shared_task
+def agent_turn_task(message_id):
+    """Responde uma mensagem do agente criativo fora do request.
+
+    ``SessionMessageView`` cria a resposta do assistente como PENDING e
+    enfileira esta task. O LLM e lido em streaming: o texto parcial vai para
+    o cache (``AgentStreamPublisher``), de onde ``SessionMessageDetailView`` o
+    devolve ao cliente que faz polling da mensagem, e a geracao da imagem e
+    disparada assim que ``prompt``/``negative_prompt`` fecham, sem esperar o
+    resto da mensagem. Reentregas de uma mensagem ja resolvida sao ignoradas.
+
+    Qualquer saida que nao grave a resposta (excecao inesperada, mensagem
+    vencida por ``AGENT_TURN_TIMEOUT``) deixa a mensagem FAILED, para o
+    cliente nao esperar para sempre.
+    """
+    try:
+        agent_msg = SessionMessage.objects.select_related("session__user").get(
+            id=message_id, status=SessionMessage.Status.PENDING
+        )
+    except SessionMessage.DoesNotExist:
+        logger.warning(f"[AGENT] Mensagem {message_id} inexistente ou ja respondida.")
+        return
+
+    try:
+        if agent_msg.is_stalled():
+            logger.warning(f"[AGENT] Mensagem {message_id} vencida antes de ser processada.")
+            return
+        _run_agent_turn(agent_msg)
+    except Exception:
+        logger.exception(f"[AGENT] Falha inesperada na mensagem {message_id}.")
+    finally:
+        fail_pending_reply(message_id)
+
+
+def fail_pending_reply(message_id):
+    """Encerra como FAILED a resposta que ainda estiver PENDING."""
+    SessionMessage.objects.filter(id=message_id, status=SessionMessage.Status.PENDING).update(
+        status=SessionMessage.Status.FAILED, text=AGENT_ERROR_TEXT
+    )
+
+
+def _run_agent_turn(agent_msg):
+    session = agent_msg.session
+    context = build_agent_context(session)
+    if context.summarize_until and cache.add(_summary_lock_key(session.id), 1, timeout=SUMMARY_LOCK_TIMEOUT):
+        summarize_session_task.delay(str(session.id), context.summarize_until)
+
+    publisher = AgentStreamPublisher(agent_msg.id)
+    turn = _AgentTurn(agent_msg, publisher)
+    parser = StreamingJSONFields()
+    parts = []
+    try:
+        for chunk in chat_completion_stream(context.messages, operation="agent", max_tokens=800):
+            parts.append(chunk)
+            for kind, field, value in parser.feed(chunk):
+                if kind == "delta" and field == "message":
+                    publisher.text(value)
+                elif kind == "field":
+                    turn.maybe_generate(parser.fields, final=False)
+    except LLMNotConfigured:
+        turn.finish(AGENT_UNCONFIGURED_TEXT)
+        return
+    except LLMError as exc:
+        logger.error(f"DeepSeek error in agent: {exc}")
+        turn.finish(AGENT_ERROR_TEXT, failed=True)
+        return
+
+    content = "".join(parts)
+    if parser.complete:
+        fields = parser.fields
+        agent_text = fields.get("message", content)
+    else:
+        agent_text, prompt, negative_prompt = parse_agent_reply(content)
+        fields = {"action": "generate", "prompt": prompt, "negative_prompt": negative_prompt} if prompt else {}
+    turn.maybe_generate(fields, final=True)
+    turn.finish(agent_text)
+
+
+class _AgentTurn:
+    """Estado de uma resposta do agente: geracao disparada e gravacao final."""
+
+    def __init__(self, agent_msg, publisher):
+        self.agent_msg = agent_msg
+        self.session = agent_msg.session
+        self.publisher = publisher
+        self.prompt = ""
+        self.image = None
+        self.quota_exceeded = False
+
+    def maybe_generate(self, fields, *, final):
+        """Dispara a geracao uma unica vez, assim que os campos necessarios fecham.
+
+        Durante o stream espera ``action``, ``prompt`` e ``negative_prompt``;
+        no fim (``final``) basta ``prompt``.
+        """
+        if self.prompt or fields.get("action") != "generate" or not fields.get("prompt"):
+            return
+        if not final and "negative_prompt" not in fields:
+            return
+        self.prompt = fields["prompt"]
+        user = self.session.user
+        if not reserve_generations(user):
+            self.quota_exceeded = True
+            return
+        self.image = Image.objects.create(
+            user=user,
+            prompt=self.prompt,
+            negative_prompt=fields.get("negative_prompt", ""),
+            aspect_ratio=Image.AspectRatio.SQUARE,
+        )
+        generate_image_task.delay(self.image.id)
+        self.publisher.image(self.image.id)
+
+    def finish(self, text, failed=False):
+        agent_msg = self.agent_msg
+        if self.quota_exceeded:
+            text += AGENT_QUOTA_TEXT
+        agent_msg.text = text
+        agent_msg.status = SessionMessage.Status.FAILED if failed else SessionMessage.Status.READY
+        agent_msg.image = self.image
+        agent_msg.prompt_used = self.prompt
+        agent_msg.save(update_fields=["text", "status", "image", "prompt_used"])
+        self.publisher.done(text)
+        if failed:
+            return
+
+        session = self.session
+        # Auto-title session from first generation
+        if self.image and session.title == "Nova sessão":
+            user_text = (
+                session.messages.filter(role=SessionMessage.Role.USER, id__lt=agent_msg.id)
+                .order_by("-id")
+                .values_list("text", flat=True)
+                .first()
+            )
+            session.title = (user_text or self.prompt)[:80]
+        session.save(update_fields=["title", "updated_at"])
+
+
+SUMMARY_LOCK_TIMEOUT = 120
+
+
+def _summary_lock_key(session_id):
+    return f"agent-summary:{session_id}"
+
+
+@shared_task
+def summarize_session_task(session_id, until_id):
+    """Incorpora ao resumo da sessao as mensagens ate ``until_id``.
+
+    Enfileirada por ``agent_turn_task`` quando mensagens saem da janela de
+    contexto. Le no maximo ``AGENT_CONTEXT_MAX_MESSAGES`` mensagens por
+    execucao (as que sobrarem disparam outra no proximo turno) e grava com
+    ``UPDATE`` condicional em ``summarized_until_id``, para uma execucao
+    atrasada nao sobrescrever um resumo mais novo.
+    """
+    try:
+        session = CreativeSession.objects.get(id=session_id)
+        if session.summarized_until_id >= until_id:
+            return
+        rows = list(
+            session.messages.filter(id__gt=session.summarized_until_id, id__lte=until_id)
+            .exclude(status=SessionMessage.Status.PENDING)
+            .order_by("id")
+            .values_list("id", "role", "text")[:settings.AGENT_CONTEXT_MAX_MESSAGES]
+        )
+        if not rows:
+            return
+        try:
+            summary = summarize_messages(session.summary, [(role, text) for _, role, text in rows])
+        except LLMError as exc:
+            logger.warning(f"[AGENT] Falha ao resumir a sessao {session_id}: {exc}")
+            return
+        CreativeSession.objects.filter(
+            id=session_id, summarized_until_id=session.summarized_until_id
+        ).update(summary=summary, summarized_until_id=rows[-1][0])
+    except CreativeSession.DoesNotExist:
+        return
+    finally:
+        cache.delete(_summary_lock_key(session_id))
 
 
 @shared_task
@@ -125,9 +343,70 @@ def recalculate_relevance_scores(batch_size=200):
     for image in queryset.iterator(chunk_size=batch_size):
         update_image_relevance(image, commit=True)
         updated += 1
+    invalidate_public_cache()
     logger.info("[TASK] Relevance scores recalculated for %s images.", updated)
 
 
+@shared_task
+def refresh_relevance_task(image_ids):
+    """
+    Recalcula a relevância de um lote de imagens e invalida o cache público.
+    Enfileirada uma vez por operação em lote da biblioteca do usuário.
+    """
+    refreshed = refresh_relevance(image_ids)
+    invalidate_public_cache()
+    logger.info("[TASK] Relevance refreshed for %s images.", refreshed)
+
+
+@shared_task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_backoff_max=600,
+    max_retries=5,
+)
+def purge_user_task(user_id):
+    """
+    Apaga em lotes as linhas e os arquivos de uma conta excluída (api/purge.py).
+    Idempotente: reexecutar continua de onde a anterior parou.
+    """
+    if purge_user(user_id):
+        logger.info("[TASK] Account %s purged.", user_id)
+
+
+@shared_task
+def delete_media_files_task(names):
+    """Remove do storage arquivos de linhas já apagadas (exclusões em lote).
+
+    Arquivos deduplicados ainda usados por outra linha ficam.
+    """
+    delete_unreferenced(names)
+
+
+@shared_task
+def sweep_orphan_media():
+    """
+    Reenfileira purges de contas que ficaram para trás e remove arquivos de
+    mídia sem linha no banco. Agendada pelo Celery Beat (MEDIA_SWEEP_INTERVAL).
+    """
+    for user_id in stalled_purges(settings.ACCOUNT_PURGE_STALLED_AFTER):
+        purge_user_task.delay(str(user_id))
+    orphans = sweep_orphan_files()
+    logger.info("[TASK] Media sweep removed %s orphan files.", orphans)
+    return orphans
+
+
+@shared_task
+def flush_download_counters():
+    """
+    Grava no banco os downloads acumulados no Redis (ver api/downloads.py).
+    Agendada pelo Celery Beat a cada DOWNLOAD_FLUSH_INTERVAL segundos.
+    """
+    flushed = flush_downloads()
+    if flushed:
+        logger.info("[TASK] Flushed %s buffered downloads.", flushed)
+    return flushed
+
+
 @shared_task(
     bind=True,
     autoretry_for=(Exception,),
@@ -172,17 +451,16 @@ def create_embeddings_task(self, image_id):
         return
 
     prompt = image_instance.prompt or ""
-    image_path = image_instance.image.path
 
-    if not os.path.exists(image_path):
-        logger.error(f"[EMBEDDINGS] Image file not found: {image_path}")
+    # Le pelo storage (disco ou bucket): o worker nao precisa do MEDIA_ROOT.
+    try:
+        pil_image = open_image(image_instance.image)
+    except OSError as e:
+        logger.error(f"[EMBEDDINGS] Image file not readable: {image_instance.image.name} ({e})")
         return
 
     logger.info(f"[EMBEDDINGS] Generating embeddings for Image ID: {image_id}")
 
-    # Import here to avoid circular imports and allow lazy loading
-    from .embeddings import generate_text_embedding, generate_image_embedding
-
     prompt_embedding = None
     image_embedding = None
 
@@ -199,7 +477,7 @@ def create_embeddings_task(self, image_id):
 
     # Generate image embedding
     try:
-        image_embedding = generate_image_embedding(image_path)
+        image_embedding = generate_image_embedding(pil_image)
         if image_embedding:
             logger.info(f"[EMBEDDINGS] Image embedding generated for Image ID: {image_id}")
         else:
@@ -233,6 +511,37 @@ def create_embeddings_task(self, image_id):
         logger.error(f"[EMBEDDINGS] Failed to save embeddings for Image ID {image_id}: {e}")
         raise  # Let Celery retry
 
+    # Estilos visuais (api/style_clusters.py): so embeddings novos entram na media corrida.
+    if created:
+        try:
+            if record_embedding(image_instance, image_embedding):
+                user_id = image_instance.user_id
+                transaction.on_commit(lambda: schedule_style_clustering(user_id))
+        except Exception:
+            logger.warning(f"[EMBEDDINGS] Style cluster update failed for Image ID {image_id}", exc_info=True)
+
+
+def schedule_style_clustering(user_id):
+    # Um ajuste por usuario por vez: embeddings em rajada nao enfileiram varios.
+    if cache.add(f"style-clusters:{user_id}", 1, timeout=STYLE_CLUSTER_LOCK_TIMEOUT):
+        cluster_styles_task.delay(str(user_id))
+
+
+@shared_task
+def cluster_styles_task(user_id):
+    """
+    Reagrupa os embeddings de imagem do usuário em estilos visuais (k-means em mini-lotes).
+
+    Disparada por ``create_embeddings_task`` quando o usuário chega ao mínimo de
+    embeddings ou quando a coleção dobra desde o último ajuste, e pela exclusão
+    em lote de imagens (tamanhos e medoides apagados só se corrigem no ajuste).
+    """
+    try:
+        clusters = cluster_user_styles(user_id)
+    finally:
+        cache.delete(f"style-clusters:{user_id}")
+    logger.info(f"[EMBEDDINGS] {len(clusters)} style clusters for user {user_id}")
+
 
 def _save_vector_embeddings(image_id, prompt_embedding, image_embedding):
     """
@@ -275,34 +584,53 @@ def _save_vector_embeddings(image_id, prompt_embedding, image_embedding):
 
 
 @shared_task
-def backfill_embeddings_task(batch_size=50, skip_existing=True):
+def backfill_embeddings_task(batch_size=32, skip_existing=True):
     """
-    Backfill embeddings for existing images that don't have them.
+    Backfill embeddings for existing images (api/backfill.py).
 
-    Can be run manually or scheduled to process images created before
-    the Creative Memory feature was enabled.
+    Starts or resumes the checkpointed ``embeddings`` backfill (or
+    ``embeddings-refresh`` to recompute every image) and hands it to
+    ``backfill_task``, which dispatches chunks of ``batch_size`` images.
+    Equivalent to ``manage.py backfill embeddings``.
 
     Args:
-        batch_size: Number of images to process in one run
+        batch_size: Images per chunk job
         skip_existing: If True, skip images that already have embeddings
     """
     if not EMBEDDINGS_ENABLED:
         logger.info("[EMBEDDINGS] Backfill skipped - embeddings disabled")
         return
 
-    queryset = Image.objects.filter(status=Image.Status.READY).exclude(image='')
+    job = 'embeddings' if skip_existing else 'embeddings-refresh'
+    run = backfill.start(job)
+    logger.info(f"[EMBEDDINGS] Backfill {job} started: {run.total} images pending")
+    transaction.on_commit(lambda: backfill_task.delay(job, chunk_size=batch_size))
 
-    if skip_existing:
-        queryset = queryset.exclude(embedding__isnull=False)
 
-    queryset = queryset.order_by('-created_at')[:batch_size]
+@shared_task
+def backfill_task(job, chunk_size=None, max_in_flight=backfill.DEFAULT_MAX_IN_FLIGHT):
+    """
+    Caminha um backfill retomável (api/backfill.py): despacha lotes para
+    ``backfill_chunk_task`` até ``max_in_flight`` pendentes e se reagenda
+    até o último lote ser despachado. Cada lote grava o checkpoint. Os
+    enfileiramentos esperam o commit, caso a task rode dentro de uma transação.
+    """
+    run = backfill.advance(
+        job,
+        lambda ids: transaction.on_commit(lambda: backfill_chunk_task.delay(job, ids)),
+        chunk_size=chunk_size,
+        max_in_flight=max_in_flight,
+    )
+    logger.info(f"[BACKFILL] {job}: {backfill.progress(run)}")
+    if run.finished_at is None:
+        transaction.on_commit(lambda: backfill_task.apply_async(
+            (job,), {'chunk_size': chunk_size, 'max_in_flight': max_in_flight}, countdown=BACKFILL_POLL_SECONDS,
+        ))
 
-    processed = 0
-    for image in queryset:
-        try:
-            create_embeddings_task.delay(image.id)
-            processed += 1
-        except Exception as e:
-            logger.error(f"[EMBEDDINGS] Failed to queue backfill for Image ID {image.id}: {e}")
 
-    logger.info(f"[EMBEDDINGS] Backfill queued {processed} images for embedding generation")
+@shared_task
+def backfill_chunk_task(job, ids):
+    """Processa um lote de um backfill e soma o resultado no checkpoint."""
+    ok = backfill.run_chunk(job, ids)
+    if ok < len(ids):
+        logger.warning(f"[BACKFILL] {job}: {len(ids) - ok} of {len(ids)} rows failed")
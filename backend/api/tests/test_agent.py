@@ -0,0 +1,400 @@
+import json
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import requests
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.agent_context import SUMMARY_HEADER, build_agent_context, estimate_tokens
+from api.models import CreativeSession, Image, SessionMessage
+from api.quota import period_start
+from api.streams import AgentStreamPublisher
+from api.tasks import AGENT_ERROR_TEXT, AGENT_QUOTA_TEXT, agent_turn_task, summarize_session_task
+from tests.utils import capture_logger, create_user
+
+
+def _sse_lines(content, chunk_size=7):
+    """Linhas ``data:`` como o DeepSeek envia com ``stream: true``."""
+    for i in range(0, len(content), chunk_size):
+        delta = {"choices": [{"delta": {"content": content[i:i + chunk_size]}}]}
+        yield f"data: {json.dumps(delta)}".encode()
+        yield b""
+    yield b"data: [DONE]"
+
+
+def _llm_reply(payload):
+    """Resposta em streaming; ``consumed`` conta as linhas ja lidas pelo worker."""
+    content = payload if isinstance(payload, str) else json.dumps(payload)
+    lines = list(_sse_lines(content))
+    response = MagicMock(consumed=0, total=len(lines))
+
+    def iter_lines():
+        for line in lines:
+            response.consumed += 1
+            yield line
+
+    response.iter_lines.side_effect = iter_lines
+    return response
+
+
+GENERATE = {
+    "action": "generate",
+    "prompt": "a black cat on a rooftop at night",
+    "negative_prompt": "blurry",
+    "message": "Vou gerar!",
+}
+
+
+@patch("api.views.agent_turn_task.delay")
+class SessionMessageViewTests(APITestCase):
+    """O request so grava as mensagens e enfileira o turno do agente."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = create_user(email="agent@example.com", username="agent")
+        self.session = CreativeSession.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def test_returns_202_with_pending_reply(self, mock_delay):
+        """Resposta imediata: mensagem do usuario + resposta PENDING enfileirada."""
+        with patch("requests.Session.post") as upstream, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("session-messages", kwargs={"pk": self.session.pk}), {"text": "quero um gato"}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        upstream.assert_not_called()
+        self.assertEqual(response.data["message"]["text"], "quero um gato")
+        reply = response.data["agent_response"]
+        self.assertEqual(reply["status"], SessionMessage.Status.PENDING)
+        mock_delay.assert_called_once_with(reply["id"])
+
+    def test_enqueue_waits_for_commit(self, mock_delay):
+        """O turno so vai para a fila depois que as mensagens sao gravadas."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(
+                reverse("session-messages", kwargs={"pk": self.session.pk}), {"text": "quero um gato"}, format="json"
+            )
+            mock_delay.assert_not_called()
+
+        self.assertEqual(len(callbacks), 1)
+
+    def test_enqueue_failure_marks_reply_failed(self, mock_delay):
+        """Broker fora do ar: a resposta sai FAILED em vez de ficar PENDING para sempre."""
+        mock_delay.side_effect = ConnectionError("broker down")
+
+        with capture_logger("api.views"), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("session-messages", kwargs={"pk": self.session.pk}), {"text": "quero um gato"}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        reply = SessionMessage.objects.get(pk=response.data["agent_response"]["id"])
+        self.assertEqual(reply.status, SessionMessage.Status.FAILED)
+        self.assertEqual(reply.text, AGENT_ERROR_TEXT)
+
+    def test_stalled_pending_reply_reads_as_failed(self, mock_delay):
+        """PENDING alem de AGENT_TURN_TIMEOUT aparece como FAILED na sessao e no detalhe."""
+        message = SessionMessage.objects.create(
+            session=self.session, role=SessionMessage.Role.ASSISTANT, text="", status=SessionMessage.Status.PENDING
+        )
+        SessionMessage.objects.filter(pk=message.pk).update(created_at=timezone.now() - timedelta(minutes=10))
+        url = reverse("session-message-detail", kwargs={"pk": self.session.pk, "message_id": message.pk})
+
+        with override_settings(AGENT_TURN_TIMEOUT=60):
+            detail = self.client.get(url).data
+            session = self.client.get(reverse("session-detail", kwargs={"pk": self.session.pk})).data
+
+        self.assertEqual(detail["status"], SessionMessage.Status.FAILED)
+        self.assertEqual(detail["text"], AGENT_ERROR_TEXT)
+        self.assertEqual(session["messages"][-1]["status"], SessionMessage.Status.FAILED)
+
+    def test_message_detail_polls_status(self, mock_delay):
+        """Detalhe da mensagem mostra status da resposta e da imagem gerada."""
+        image = Image.objects.create(user=self.user, prompt="gato")
+        message = SessionMessage.objects.create(
+            session=self.session, role=SessionMessage.Role.ASSISTANT, text="Vou gerar!", image=image
+        )
+        url = reverse("session-message-detail", kwargs={"pk": self.session.pk, "message_id": message.pk})
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], SessionMessage.Status.READY)
+        self.assertEqual(response.data["image_status"], Image.Status.GENERATING)
+
+    def test_pending_message_detail_shows_partial_text(self, mock_delay):
+        """Enquanto a resposta esta PENDING, o detalhe traz o texto ja publicado pelo worker."""
+        message = SessionMessage.objects.create(
+            session=self.session, role=SessionMessage.Role.ASSISTANT, text="", status=SessionMessage.Status.PENDING
+        )
+        AgentStreamPublisher(message.id).text("Vou ")
+        url = reverse("session-message-detail", kwargs={"pk": self.session.pk, "message_id": message.pk})
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.data["status"], SessionMessage.Status.PENDING)
+        self.assertEqual(response.data["text"], "Vou ")
+
+    def test_message_detail_is_scoped_to_owner(self, mock_delay):
+        other = create_user(email="other@example.com", username="other")
+        message = SessionMessage.objects.create(
+            session=CreativeSession.objects.create(user=other), role=SessionMessage.Role.USER, text="oi"
+        )
+        url = reverse("session-message-detail", kwargs={"pk": message.session_id, "message_id": message.pk})
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(DEEPSEEK_API_KEY="test-key")
+@patch("api.tasks.generate_image_task.delay")
+class AgentTurnTaskTests(TestCase):
+    """Worker chama o LLM, grava a resposta e, se for o caso, enfileira a imagem."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = create_user(
+            email="turn@example.com",
+            username="turn",
+            image_generation_count=0,
+            last_reset_date=period_start(),
+        )
+        self.session = CreativeSession.objects.create(user=self.user)
+        SessionMessage.objects.create(session=self.session, role=SessionMessage.Role.USER, text="gato no telhado")
+        self.reply = SessionMessage.objects.create(
+            session=self.session, role=SessionMessage.Role.ASSISTANT, text="", status=SessionMessage.Status.PENDING
+        )
+
+    def _run(self, **post_kwargs):
+        with patch("requests.Session.post", **post_kwargs) as upstream:
+            agent_turn_task(self.reply.id)
+        self.reply.refresh_from_db()
+        return upstream
+
+    def test_generate_action_creates_image(self, mock_generate):
+        """Acao generate reserva cota, cria a imagem e titula a sessao."""
+        upstream = self._run(return_value=_llm_reply(GENERATE))
+
+        messages = upstream.call_args.kwargs["json"]["messages"]
+        self.assertEqual([m["role"] for m in messages], ["system", "user"])
+        self.assertEqual(self.reply.status, SessionMessage.Status.READY)
+        self.assertEqual(self.reply.text, "Vou gerar!")
+        self.assertEqual(self.reply.image.prompt, GENERATE["prompt"])
+        mock_generate.assert_called_once_with(self.reply.image_id)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.title, "gato no telhado")
+
+    def test_generation_starts_before_message_finishes(self, mock_generate):
+        """A imagem e enfileirada quando prompt/negative_prompt fecham, no meio do stream."""
+        reply = _llm_reply({**GENERATE, "message": "Montei um prompt com atmosfera noturna. " * 10})
+        dispatched_at = []
+        mock_generate.side_effect = lambda image_id: dispatched_at.append(reply.consumed)
+
+        self._run(return_value=reply)
+
+        self.assertEqual(len(dispatched_at), 1)
+        self.assertLess(dispatched_at[0], reply.total / 2)
+        self.assertEqual(self.reply.image.negative_prompt, "blurry")
+        self.assertTrue(self.reply.text.startswith("Montei um prompt"))
+
+    def test_plain_text_reply_falls_back(self, mock_generate):
+        """Resposta fora do JSON vira texto puro, sem geracao."""
+        reply = _llm_reply("so texto")
+
+        self._run(return_value=reply)
+
+        self.assertEqual(self.reply.text, "so texto")
+        mock_generate.assert_not_called()
+
+    def test_quota_exhausted_appends_warning(self, mock_generate):
+        type(self.user).objects.filter(pk=self.user.pk).update(image_generation_count=20)
+
+        self._run(return_value=_llm_reply(GENERATE))
+
+        self.assertEqual(self.reply.text, "Vou gerar!" + AGENT_QUOTA_TEXT)
+        self.assertIsNone(self.reply.image)
+        mock_generate.assert_not_called()
+
+    def test_upstream_failure_marks_reply_failed(self, mock_generate):
+        with capture_logger("api.tasks"):
+            self._run(side_effect=requests.exceptions.ConnectionError)
+
+        self.assertEqual(self.reply.status, SessionMessage.Status.FAILED)
+        self.assertEqual(self.reply.text, AGENT_ERROR_TEXT)
+
+    def test_unexpected_error_marks_reply_failed(self, mock_generate):
+        """Erro fora do LLM (ex.: banco) tambem encerra a resposta como FAILED."""
+        with capture_logger("api.tasks"), patch("api.tasks.build_agent_context", side_effect=RuntimeError("boom")):
+            self._run(return_value=_llm_reply(GENERATE))
+
+        self.assertEqual(self.reply.status, SessionMessage.Status.FAILED)
+        self.assertEqual(self.reply.text, AGENT_ERROR_TEXT)
+
+    def test_stalled_reply_is_not_processed(self, mock_generate):
+        """Mensagem vencida (o cliente ja a ve como FAILED) nao chama o LLM."""
+        SessionMessage.objects.filter(pk=self.reply.pk).update(created_at=timezone.now() - timedelta(minutes=10))
+
+        with override_settings(AGENT_TURN_TIMEOUT=60), capture_logger("api.tasks"):
+            upstream = self._run(return_value=_llm_reply(GENERATE))
+
+        upstream.assert_not_called()
+        self.assertEqual(self.reply.status, SessionMessage.Status.FAILED)
+
+    def test_redelivery_is_ignored(self, mock_generate):
+        """Mensagem ja respondida nao chama o LLM de novo."""
+        self._run(return_value=_llm_reply({"action": "ask", "message": "Qual estilo?"}))
+        with capture_logger("api.tasks"):
+            upstream = self._run(return_value=_llm_reply(GENERATE))
+
+        upstream.assert_not_called()
+        self.assertEqual(self.reply.text, "Qual estilo?")
+        mock_generate.assert_not_called()
+
+
+def _fill(session, count, text="mensagem {i} " * 20):
+    """``count`` mensagens alternando usuario/assistente; devolve os ids."""
+    roles = (SessionMessage.Role.USER, SessionMessage.Role.ASSISTANT)
+    return [
+        SessionMessage.objects.create(session=session, role=roles[i % 2], text=text.format(i=i)).id
+        for i in range(count)
+    ]
+
+
+@override_settings(
+    AGENT_CONTEXT_MAX_TOKENS=500,
+    AGENT_CONTEXT_MESSAGE_MAX_TOKENS=200,
+    AGENT_CONTEXT_MAX_MESSAGES=20,
+    AGENT_SUMMARY_BATCH=4,
+)
+class AgentContextTests(TestCase):
+    """Janela de contexto: mensagens mais novas, orcamento de tokens e resumo."""
+
+    def setUp(self):
+        super().setUp()
+        self.session = CreativeSession.objects.create(user=create_user(email="ctx@example.com", username="ctx"))
+
+    def test_window_keeps_newest_messages(self):
+        """Sessao longa: entram as ultimas mensagens, em ordem, dentro do orcamento."""
+        ids = _fill(self.session, 40, text="m{i}")
+
+        with self.assertNumQueries(1):
+            context = build_agent_context(self.session)
+
+        history = context.messages[1:]
+        self.assertEqual(len(history), 20)
+        self.assertEqual(history[-1]["content"], "m39")
+        self.assertEqual(history[0]["content"], "m20")
+        self.assertEqual(context.summarize_until, ids[19])
+
+    def test_token_budget_bounds_long_sessions(self):
+        """Custo do historico fica no orcamento qualquer que seja o tamanho da sessao."""
+        _fill(self.session, 60)
+
+        context = build_agent_context(self.session)
+
+        history = context.messages[1:]
+        self.assertLessEqual(sum(estimate_tokens(m["content"]) for m in history), 500)
+        self.assertIn("mensagem 59", history[-1]["content"])
+
+    def test_huge_last_message_is_truncated(self):
+        SessionMessage.objects.create(session=self.session, role=SessionMessage.Role.USER, text="x" * 10_000)
+
+        context = build_agent_context(self.session)
+
+        self.assertLessEqual(estimate_tokens(context.messages[-1]["content"]), 200)
+
+    def test_summary_replaces_folded_messages(self):
+        """Com resumo, mensagens ja incorporadas nao sao reenviadas."""
+        ids = _fill(self.session, 6, text="m{i}")
+        self.session.summary = "Usuario quer um gato preto."
+        self.session.summarized_until_id = ids[3]
+
+        context = build_agent_context(self.session)
+
+        self.assertEqual(context.messages[1], {"role": "system", "content": SUMMARY_HEADER + "Usuario quer um gato preto."})
+        self.assertEqual([m["content"] for m in context.messages[2:]], ["m4", "m5"])
+        self.assertIsNone(context.summarize_until)
+
+    def test_summary_waits_for_a_batch(self):
+        """Poucas mensagens fora da janela nao disparam resumo."""
+        _fill(self.session, 22, text="m{i}")
+
+        self.assertIsNone(build_agent_context(self.session).summarize_until)
+
+
+def _summary_reply(text):
+    response = MagicMock()
+    response.json.return_value = {"choices": [{"message": {"content": text}}]}
+    return response
+
+
+@override_settings(DEEPSEEK_API_KEY="test-key", AGENT_CONTEXT_MAX_MESSAGES=20)
+class SummarizeSessionTaskTests(TestCase):
+    """Resumo incremental: so resumo anterior + mensagens novas vao ao LLM."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.session = CreativeSession.objects.create(
+            user=create_user(email="sum@example.com", username="sum"), summary="Resumo antigo."
+        )
+        self.ids = _fill(self.session, 8, text="m{i}")
+        CreativeSession.objects.filter(pk=self.session.pk).update(summarized_until_id=self.ids[1])
+
+    def test_folds_new_messages(self):
+        with patch("requests.Session.post", return_value=_summary_reply(" Resumo novo. ")) as upstream:
+            summarize_session_task(str(self.session.id), self.ids[5])
+
+        prompt = upstream.call_args.kwargs["json"]["messages"][1]["content"]
+        self.assertIn("Resumo antigo.", prompt)
+        self.assertNotIn("m1", prompt)
+        self.assertIn("m2", prompt)
+        self.assertIn("m5", prompt)
+        self.assertNotIn("m6", prompt)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.summary, "Resumo novo.")
+        self.assertEqual(self.session.summarized_until_id, self.ids[5])
+
+    def test_stale_run_does_not_overwrite(self):
+        """Resumo gravado por outra execucao no meio do caminho prevalece."""
+
+        def concurrent(*args, **kwargs):
+            CreativeSession.objects.filter(pk=self.session.pk).update(summary="Outro.", summarized_until_id=self.ids[6])
+            return _summary_reply("Atrasado.")
+
+        with patch("requests.Session.post", side_effect=concurrent):
+            summarize_session_task(str(self.session.id), self.ids[5])
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.summary, "Outro.")
+
+    def test_llm_failure_keeps_summary(self):
+        with capture_logger("api.tasks"):
+            with patch("requests.Session.post", side_effect=requests.exceptions.ConnectionError):
+                summarize_session_task(str(self.session.id), self.ids[5])
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.summary, "Resumo antigo.")
+        self.assertEqual(self.session.summarized_until_id, self.ids[1])
+
+    @override_settings(AGENT_CONTEXT_MAX_MESSAGES=4, AGENT_SUMMARY_BATCH=2)
+    @patch("api.tasks.generate_image_task.delay")
+    @patch("api.tasks.summarize_session_task.delay")
+    def test_agent_turn_schedules_summary_once(self, mock_summarize, mock_generate):
+        """Turno com mensagens fora da janela enfileira um unico resumo."""
+        for _ in range(2):
+            reply = SessionMessage.objects.create(
+                session=self.session, role=SessionMessage.Role.ASSISTANT, text="", status=SessionMessage.Status.PENDING
+            )
+            with patch("requests.Session.post", return_value=_llm_reply({"action": "ask", "message": "Qual estilo?"})):
+                agent_turn_task(reply.id)
+
+        mock_summarize.assert_called_once()
+        self.assertEqual(mock_summarize.call_args.args[0], str(self.session.id))
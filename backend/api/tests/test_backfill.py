@@ -0,0 +1,212 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from api import backfill
+from api.backfill import BackfillJob, advance, progress, run_chunk, run_inline, start
+from api.models import BackfillRun, Image, ImageEmbedding, ImageTag
+from api.tasks import backfill_embeddings_task, backfill_task
+from tests.utils import create_user
+
+
+class BackfillTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="backfill@example.com", username="backfill")
+        self.images = [
+            Image.objects.create(user=self.user, prompt=f"farol {i}", image=f"x/{i}.png", status=Image.Status.READY)
+            for i in range(7)
+        ]
+        self.seen = []
+        job = BackfillJob("test", "Teste.", lambda: Image.objects.all(), self._process, chunk_size=3)
+        patcher = patch.dict(backfill.JOBS, {"test": job})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _process(self, ids):
+        self.seen.append(list(ids))
+        return len(ids)
+
+    def test_inline_run_walks_keyset_in_chunks(self):
+        run = run_inline("test")
+
+        ids = [image.id for image in self.images]
+        self.assertEqual(self.seen, [ids[0:3], ids[3:6], ids[6:]])
+        self.assertEqual(run.cursor, ids[-1])
+        self.assertEqual((run.total, run.completed, run.failed), (7, 7, 0))
+        self.assertTrue(progress(run).finished)
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        start("test")
+        advance("test", lambda ids: run_chunk("test", ids), max_chunks=1)
+
+        # Nova execucao (processo reiniciado): nao volta ao inicio.
+        with self.assertNumQueries(1):
+            run = start("test")
+        self.assertEqual(run.cursor, self.images[2].id)
+        run_inline("test")
+
+        processed = [pk for chunk in self.seen for pk in chunk]
+        self.assertEqual(processed, [image.id for image in self.images])
+
+    def test_finished_run_starts_over_and_restart_discards_checkpoint(self):
+        run_inline("test")
+        self.seen.clear()
+
+        run = start("test")
+        self.assertIsNone(run.cursor)
+        self.assertIsNone(run.finished_at)
+
+        advance("test", lambda ids: run_chunk("test", ids), max_chunks=1)
+        self.assertIsNone(start("test", restart=True).cursor)
+
+    def test_chunks_are_dispatched_after_the_checkpoint_commits(self):
+        start("test")
+        depth = len(connection.atomic_blocks)
+        seen = []
+
+        def dispatch(ids):
+            seen.append((len(connection.atomic_blocks), BackfillRun.objects.get(job="test").cursor))
+
+        advance("test", dispatch, max_chunks=1)
+
+        self.assertEqual(seen, [(depth, self.images[2].id)])
+
+    def test_failed_item_rolls_back_only_itself(self):
+        def tag(pk):
+            ImageTag.objects.create(name=f"tag-{pk}")
+            if pk == self.images[1].id:
+                raise ValueError("falhou")
+
+        with self.assertLogs("api.backfill", level="WARNING"):
+            self.assertEqual(backfill._each(tag, [image.id for image in self.images[:3]]), 2)
+        self.assertEqual(
+            set(ImageTag.objects.values_list("name", flat=True)),
+            {f"tag-{self.images[0].id}", f"tag-{self.images[2].id}"},
+        )
+
+    def test_dispatch_stops_at_max_in_flight(self):
+        start("test")
+        queued = []
+
+        run = advance("test", queued.append, max_in_flight=2)
+
+        self.assertEqual(len(queued), 2)
+        self.assertEqual(run.in_flight, 6)
+        run_chunk("test", queued[0])
+        advance("test", queued.append, max_in_flight=2)
+        self.assertEqual(len(queued), 3)
+
+    def test_stalled_chunks_do_not_block_forever(self):
+        start("test")
+        queued = []
+        advance("test", queued.append, max_in_flight=1)
+        BackfillRun.objects.filter(job="test").update(updated_at=timezone.now() - timedelta(hours=1))
+
+        advance("test", queued.append, max_in_flight=1)
+
+        self.assertEqual(len(queued), 2)
+
+    def test_progress_reports_throughput_and_eta(self):
+        run = BackfillRun(job="test", total=100, dispatched=40, completed=30, failed=10)
+        run.started_at = timezone.now() - timedelta(seconds=20)
+
+        report = progress(run, now=run.started_at + timedelta(seconds=20))
+
+        self.assertEqual(report.done, 40)
+        self.assertAlmostEqual(report.rate, 2.0)
+        self.assertEqual(report.eta, timedelta(seconds=30))
+        self.assertIn("40/100 (40.0%)", str(report))
+
+    def test_failures_are_counted(self):
+        backfill.JOBS["test"] = BackfillJob("test", "Teste.", lambda: Image.objects.all(), lambda ids: len(ids) - 1)
+
+        run = run_inline("test", chunk_size=4)
+
+        self.assertEqual((run.completed, run.failed), (5, 2))
+
+
+class BackfillJobsTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="jobs@example.com", username="jobs")
+
+    def _image(self, **extra):
+        return Image.objects.create(user=self.user, prompt="farol", image="x/1.png", status=Image.Status.READY, **extra)
+
+    @patch("api.tasks.create_embeddings_task")
+    def test_embeddings_job_skips_images_with_embeddings(self, mock_embed):
+        mock_embed.side_effect = lambda pk: ImageEmbedding.objects.create(image_id=pk, prompt_embedding_json=[0.2])
+        done = self._image()
+        ImageEmbedding.objects.create(image=done, prompt_embedding_json=[0.1])
+        pending = self._image()
+        Image.objects.create(user=self.user, prompt="sem arquivo", status=Image.Status.READY)
+
+        run = run_inline("embeddings")
+
+        mock_embed.assert_called_once_with(pending.id)
+        self.assertEqual(run.completed, 1)
+
+    @patch("api.tasks.EMBEDDINGS_ENABLED", True)
+    def test_embedding_that_was_not_saved_counts_as_failed(self):
+        """A task so registra e retorna quando o arquivo nao abre: o item entra em ``failed``."""
+        self._image()
+
+        with self.assertLogs("api.tasks", level="ERROR"):
+            run = run_inline("embeddings")
+
+        self.assertEqual((run.completed, run.failed), (0, 1))
+
+    def test_relevance_command_reports_progress(self):
+        image = self._image(is_public=True)
+        Image.objects.filter(pk=image.pk).update(relevance_score=99)
+        out = StringIO()
+
+        call_command("backfill", "relevance", "--inline", stdout=out)
+
+        image.refresh_from_db()
+        self.assertNotEqual(image.relevance_score, 99)
+        self.assertIn("relevance: 1/1 (100.0%)", out.getvalue())
+        self.assertIn("concluido", out.getvalue())
+
+        status = StringIO()
+        call_command("backfill", stdout=status)
+        self.assertIn("style: nunca executado", status.getvalue())
+
+    def test_style_job_walks_uuid_keys(self):
+        other = create_user(email="other@example.com", username="other")
+
+        with patch("api.style_clusters.cluster_user_styles") as mock_cluster:
+            run = run_inline("style", chunk_size=1)
+
+        self.assertEqual(run.completed, 2)
+        self.assertEqual({str(c.args[0]) for c in mock_cluster.call_args_list}, {str(self.user.id), str(other.id)})
+
+    @patch("api.tasks.EMBEDDINGS_ENABLED", True)
+    @patch("api.tasks.backfill_task.delay")
+    def test_backfill_embeddings_task_starts_checkpointed_run(self, mock_delay):
+        self._image()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            backfill_embeddings_task(batch_size=10)
+
+        mock_delay.assert_called_once_with("embeddings", chunk_size=10)
+        self.assertEqual(BackfillRun.objects.get(job="embeddings").total, 1)
+
+    @patch("api.tasks.backfill_task.apply_async")
+    @patch("api.tasks.backfill_chunk_task.delay")
+    def test_walker_task_dispatches_chunks_and_reschedules(self, mock_chunk, mock_reschedule):
+        for _ in range(5):
+            self._image(is_public=True)
+        start("relevance")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            backfill_task("relevance", chunk_size=2, max_in_flight=2)
+
+        self.assertEqual(mock_chunk.call_count, 2)
+        mock_reschedule.assert_called_once()
@@ -0,0 +1,139 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Image, ImageComment, ImageLike, ImageTag, Project, ProjectImage, UserStyleProfile
+from api.style_profile import rebuild_style_profile
+from api.tasks import refresh_relevance_task
+from tests.utils import create_user
+
+
+@patch("api.views.refresh_relevance_task.delay")
+class ImageBulkOperationTests(APITestCase):
+    """Visibilidade, tags e exclusao em lote: dono validado em uma query, custo fixo."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="librarian@example.com", username="librarian")
+        self.client.force_authenticate(user=self.user)
+        self.images = Image.objects.bulk_create(
+            Image(user=self.user, prompt=f"mar {i}", status=Image.Status.READY) for i in range(60)
+        )
+        self.ids = [image.id for image in self.images]
+        self.foreign = Image.objects.create(
+            user=create_user(email="neighbor@example.com", username="neighbor"), prompt="vizinho"
+        )
+
+    def _post(self, name, data):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse(name), data, format="json")
+        return response, len(ctx.captured_queries)
+
+    def test_publish_batch_in_fixed_queries(self, mock_delay):
+        """Publicar 5 ou 50 imagens custa as mesmas queries e um unico enfileiramento."""
+        _, small = self._post("image-bulk-visibility", {"image_ids": self.ids[:5], "is_public": True})
+        response, large = self._post("image-bulk-visibility", {"image_ids": self.ids[:50], "is_public": True})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # As 5 primeiras ja estavam publicas.
+        self.assertEqual(response.data, {"updated": 45})
+        self.assertEqual(small, large)
+        self.assertEqual(Image.objects.filter(is_public=True).count(), 50)
+        self.assertEqual(mock_delay.call_count, 2)
+        self.assertEqual(sorted(mock_delay.call_args.args[0]), self.ids[5:50])
+
+    def test_unpublish(self, mock_delay):
+        Image.objects.filter(id__in=self.ids[:10]).update(is_public=True)
+
+        with patch("api.views.invalidate_public_cache") as mock_invalidate:
+            response, _ = self._post("image-bulk-visibility", {"image_ids": self.ids[:20], "is_public": False})
+
+        self.assertEqual(response.data, {"updated": 10})
+        self.assertFalse(Image.objects.filter(is_public=True).exists())
+        mock_invalidate.assert_called_once_with()
+
+    def test_foreign_image_rejects_whole_batch(self, mock_delay):
+        for name, extra in (
+            ("image-bulk-visibility", {"is_public": True}),
+            ("image-bulk-tags", {"add": ["mar"]}),
+            ("image-bulk-delete", {}),
+        ):
+            with self.subTest(name=name):
+                response, _ = self._post(name, {"image_ids": [self.ids[0], self.foreign.id], **extra})
+
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(str(self.foreign.id), str(response.data["image_ids"]))
+        self.assertEqual(Image.objects.filter(user=self.user, is_public=False).count(), 60)
+        self.assertFalse(ImageTag.objects.exists())
+        mock_delay.assert_not_called()
+
+    def test_tag_and_untag(self, mock_delay):
+        ImageTag.objects.create(name="azul")
+
+        response, small = self._post("image-bulk-tags", {"image_ids": self.ids[:4], "add": ["azul", " ondas "]})
+        self.assertEqual(response.data, {"added": 8, "removed": 0})
+        self.assertEqual(sorted(ImageTag.objects.values_list("name", flat=True)), ["azul", "ondas"])
+
+        # Ja marcadas sao puladas; custo nao depende do tamanho do lote.
+        response, large = self._post("image-bulk-tags", {"image_ids": self.ids[:40], "add": ["azul", "ondas"]})
+        self.assertEqual(response.data, {"added": 72, "removed": 0})
+        self.assertEqual(small, large)
+
+        response, _ = self._post("image-bulk-tags", {"image_ids": self.ids[:10], "remove": ["ondas", "inexistente"]})
+        self.assertEqual(response.data, {"added": 0, "removed": 10})
+        self.assertEqual(Image.tags.through.objects.filter(imagetag__name="ondas").count(), 30)
+        self.assertEqual(Image.tags.through.objects.filter(imagetag__name="azul").count(), 40)
+        self.assertEqual(mock_delay.call_count, 3)
+
+    def test_tags_require_add_or_remove(self, mock_delay):
+        response, _ = self._post("image-bulk-tags", {"image_ids": self.ids[:2], "add": ["  "]})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_delete_batch(self, mock_delay):
+        project = Project.objects.create(user=self.user, title="Praia", cover_image=self.images[0])
+        ProjectImage.objects.create(project=project, image=self.images[0])
+        ImageLike.objects.create(image=self.images[0], user=self.user)
+        ImageComment.objects.create(image=self.images[1], user=self.user, text="bonita")
+
+        response, _ = self._post("image-bulk-delete", {"image_ids": self.ids[:30]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"deleted": 30})
+        self.assertEqual(Image.objects.filter(user=self.user).count(), 30)
+        self.assertFalse(ProjectImage.objects.exists())
+        self.assertFalse(ImageLike.objects.exists())
+        self.assertFalse(ImageComment.objects.exists())
+        project.refresh_from_db()
+        self.assertIsNone(project.cover_image)
+
+    @patch("api.views.delete_media_files_task.delay")
+    def test_delete_enqueues_file_removal(self, mock_files, mock_delay):
+        Image.objects.filter(id__in=self.ids[:3]).update(image="users/x/images/a.png")
+
+        self._post("image-bulk-delete", {"image_ids": self.ids[:5]})
+
+        mock_files.assert_called_once_with(["users/x/images/a.png"] * 3)
+
+    def test_delete_discounts_style_profile(self, mock_delay):
+        rebuild_style_profile(self.user.id)
+
+        self._post("image-bulk-delete", {"image_ids": self.ids[:45]})
+
+        profile = UserStyleProfile.objects.get(user=self.user)
+        self.assertEqual(profile.prompt_count, 15)
+        self.assertIn(profile.terms["mar"][1], self.ids[45:])
+
+    def test_relevance_task_refreshes_batch(self, mock_delay):
+        ImageLike.objects.create(image=self.images[0], user=self.user)
+
+        with patch("api.tasks.invalidate_public_cache") as mock_invalidate:
+            refresh_relevance_task(self.ids[:3])
+
+        scores = dict(Image.objects.filter(id__in=self.ids[:3]).values_list("id", "relevance_score"))
+        self.assertTrue(all(score > 0 for score in scores.values()))
+        mock_invalidate.assert_called_once_with()
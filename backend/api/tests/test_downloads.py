@@ -0,0 +1,243 @@
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api import downloads
+from api.models import Image, ImageDownloadDaily, ImageLike
+from api.tasks import flush_download_counters
+from tests.mixins import TemporaryMediaMixin
+from tests.utils import create_user
+
+
+class FakeRedis:
+    """Subconjunto de comandos de hash do Redis usado pelo contador."""
+
+    def __init__(self):
+        self.data = {}
+
+    def hincrby(self, key, field, amount):
+        field = field if isinstance(field, bytes) else field.encode()
+        bucket = self.data.setdefault(key, {})
+        bucket[field] = bucket.get(field, 0) + amount
+        return bucket[field]
+
+    def hgetall(self, key):
+        return {field: str(value).encode() for field, value in self.data.get(key, {}).items()}
+
+    def delete(self, key):
+        return int(self.data.pop(key, None) is not None)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """``MULTI``/``EXEC``: enfileira os comandos e roda todos no ``execute``."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((getattr(self.redis, name), args))
+
+    def execute(self):
+        return [command(*args) for command, args in self.commands]
+
+
+class BufferedDownloadTests(TemporaryMediaMixin, APITestCase):
+    """Downloads contados no Redis e gravados no banco em lote pelo flush."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.redis = FakeRedis()
+        patcher = patch.object(downloads, "_redis_client", lambda backend, key: self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.owner = create_user(email="counter-owner@example.com", username="counterowner")
+        self.images = [self._image(i) for i in range(3)]
+
+    def _image(self, index):
+        image = Image.objects.create(
+            user=self.owner,
+            prompt=f"farol {index}",
+            status=Image.Status.READY,
+            is_public=True,
+        )
+        image.image.save(f"download-{index}.png", ContentFile(b"fake"), save=True)
+        return image
+
+    def _download(self, image):
+        return self.client.post(reverse("image-download", kwargs={"pk": image.id}))
+
+    def test_download_does_not_write_image_row(self):
+        """O request so le a imagem; o contador visto inclui o pendente."""
+        image = self.images[0]
+        self._download(image)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._download(image)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["download_count"], 2)
+        self.assertFalse([q for q in ctx.captured_queries if not q["sql"].startswith("SELECT")])
+        image.refresh_from_db()
+        self.assertEqual(image.download_count, 0)
+
+    def test_flush_applies_aggregated_deltas(self):
+        for image, times in zip(self.images, (3, 1, 2)):
+            for _ in range(times):
+                self._download(image)
+        ImageLike.objects.create(image=self.images[0], user=self.owner)
+
+        self.assertEqual(flush_download_counters(), 6)
+
+        counts = dict(Image.objects.values_list("id", "download_count"))
+        self.assertEqual([counts[image.id] for image in self.images], [3, 1, 2])
+        today = timezone.localdate()
+        self.assertEqual(
+            dict(ImageDownloadDaily.objects.filter(day=today).values_list("image_id", "count")),
+            {self.images[0].id: 3, self.images[1].id: 1, self.images[2].id: 2},
+        )
+        self.assertEqual(self.redis.data, {})
+        # Pendente zerado: o proximo download parte do valor gravado.
+        self.assertEqual(self._download(self.images[0]).data["download_count"], 4)
+        self.assertEqual(flush_download_counters(), 1)
+        self.assertEqual(ImageDownloadDaily.objects.get(image=self.images[0], day=today).count, 4)
+
+    def test_flush_query_count_independent_of_volume(self):
+        """Uma ou muitas imagens tocadas: o mesmo numero de queries."""
+        self._download(self.images[0])
+        with CaptureQueriesContext(connection) as small:
+            flush_download_counters()
+
+        for image in self.images + [self._image(i) for i in range(3, 20)]:
+            self._download(image)
+            self._download(image)
+        with CaptureQueriesContext(connection) as large:
+            flush_download_counters()
+
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_flush_updates_relevance(self):
+        image = self.images[0]
+        before = Image.objects.get(pk=image.pk).relevance_score
+        for _ in range(5):
+            self._download(image)
+
+        flush_download_counters()
+
+        image.refresh_from_db()
+        self.assertGreater(image.relevance_score, before)
+
+    def test_failed_flush_returns_deltas_to_buffer(self):
+        """Falha na escrita devolve os contadores tirados do Redis."""
+        self._download(self.images[0])
+        with patch.object(downloads, "apply_download_deltas", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                flush_download_counters()
+        self._download(self.images[0])
+
+        self.assertEqual(flush_download_counters(), 2)
+        self.assertEqual(flush_download_counters(), 0)
+        self.images[0].refresh_from_db()
+        self.assertEqual(self.images[0].download_count, 2)
+
+    @patch.object(downloads, "FLUSH_CHUNK_SIZE", 2)
+    def test_flush_writes_in_chunks(self):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        for image in self.images:
+            self._download(image)
+            downloads.record_download(image, day=yesterday)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(flush_download_counters(), 6)
+
+        upserts = [q for q in ctx.captured_queries if "ON CONFLICT" in q["sql"]]
+        self.assertEqual(len(upserts), 2)
+        self.assertEqual(ImageDownloadDaily.objects.filter(day=yesterday).count(), 3)
+        self.assertEqual(sorted(Image.objects.values_list("download_count", flat=True)), [2, 2, 2])
+
+    def test_deltas_of_deleted_images_are_dropped(self):
+        self._download(self.images[0])
+        self._download(self.images[1])
+        Image.objects.filter(pk=self.images[1].pk).delete()
+
+        flush_download_counters()
+
+        self.assertEqual(list(ImageDownloadDaily.objects.values_list("image_id", flat=True)), [self.images[0].id])
+
+    def test_concurrent_flush_is_skipped(self):
+        self._download(self.images[0])
+        cache.add(downloads.FLUSH_LOCK_KEY, 1)
+
+        self.assertEqual(flush_download_counters(), 0)
+        self.assertTrue(self.redis.data)
+
+
+    def test_flush_keeps_lock_taken_over_by_another_flush(self):
+        """Flush que passou do timeout nao solta o lock de quem o pegou depois."""
+        self._download(self.images[0])
+
+        def slow_apply(deltas):
+            cache.set(downloads.FLUSH_LOCK_KEY, 12345)
+
+        with patch.object(downloads, "apply_download_deltas", side_effect=slow_apply):
+            flush_download_counters()
+
+        self.assertEqual(cache.get(downloads.FLUSH_LOCK_KEY), 12345)
+
+
+class DownloadStatsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user(email="stats-owner@example.com", username="statsowner")
+        self.image = Image.objects.create(user=self.owner, prompt="grafico", download_count=9)
+        today = timezone.localdate()
+        ImageDownloadDaily.objects.bulk_create(
+            ImageDownloadDaily(image=self.image, day=today - timedelta(days=offset), count=offset + 1)
+            for offset in (0, 2, 40)
+        )
+        self.url = reverse("image-download-stats", kwargs={"pk": self.image.pk})
+
+    def test_owner_sees_daily_downloads(self):
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.get(self.url, {"days": 7})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["download_count"], 9)
+        today = timezone.localdate()
+        self.assertEqual(
+            response.data["daily"],
+            [{"day": today - timedelta(days=2), "count": 3}, {"day": today, "count": 1}],
+        )
+        self.assertEqual(len(self.client.get(self.url).data["daily"]), 2)
+        self.assertEqual(len(self.client.get(self.url, {"days": 365}).data["daily"]), 3)
+
+    def test_other_users_get_404(self):
+        self.client.force_authenticate(user=create_user(email="peek@example.com", username="peek"))
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_days(self):
+        self.client.force_authenticate(user=self.owner)
+
+        self.assertEqual(self.client.get(self.url, {"days": "x"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_daily_rows_add_up_without_redis(self):
+        """Sem Redis cada download e aplicado na hora, somando no dia."""
+        downloads.apply_download_deltas({(self.image.pk, date.today()): 2})
+        downloads.apply_download_deltas({(self.image.pk, date.today()): 3})
+
+        self.image.refresh_from_db()
+        self.assertEqual(self.image.download_count, 14)
+        self.assertEqual(ImageDownloadDaily.objects.get(image=self.image, day=date.today()).count, 6)
@@ -13,6 +13,7 @@ import os
 import tempfile
 
 from django.test import TestCase, override_settings
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -117,30 +118,24 @@ class CreateEmbeddingsTaskTests(TemporaryMediaMixin, TestCase):
         mock_text.return_value = MOCK_TEXT_EMBEDDING
         mock_image.return_value = MOCK_IMAGE_EMBEDDING
 
-        # Create image with file
-        test_file = self._create_test_image_file()
-        try:
-            image = Image.objects.create(
-                user=self.user,
-                prompt="Test prompt for embedding",
-                status=Image.Status.READY,
-            )
-            image.image.name = test_file
-            image.save()
-
-            # Mock os.path.exists to return True for our test file
-            with patch('os.path.exists', return_value=True):
-                with patch.object(image.image, 'path', test_file):
-                    create_embeddings_task(image.id)
-
-            # Check embedding was created
-            embedding = ImageEmbedding.objects.get(image=image)
-            self.assertEqual(embedding.prompt_text, "Test prompt for embedding")
-            self.assertEqual(embedding.prompt_embedding_json, MOCK_TEXT_EMBEDDING)
-            self.assertEqual(embedding.image_embedding_json, MOCK_IMAGE_EMBEDDING)
-        finally:
-            if os.path.exists(test_file):
-                os.unlink(test_file)
+        # Saved through the storage API: the task reads it back with storage.open, not .path
+        image = Image.objects.create(
+            user=self.user,
+            prompt="Test prompt for embedding",
+            status=Image.Status.READY,
+        )
+        with open(self._create_test_image_file(), 'rb') as fh:
+            image.image.save('embedding.png', ContentFile(fh.read()), save=True)
+        os.unlink(fh.name)
+
+        create_embeddings_task(image.id)
+
+        # Check embedding was created
+        embedding = ImageEmbedding.objects.get(image=image)
+        self.assertEqual(embedding.prompt_text, "Test prompt for embedding")
+        self.assertEqual(embedding.prompt_embedding_json, MOCK_TEXT_EMBEDDING)
+        self.assertEqual(embedding.image_embedding_json, MOCK_IMAGE_EMBEDDING)
+        self.assertEqual(mock_image.call_args.args[0].size, (100, 100))
 
     @patch('api.tasks.EMBEDDINGS_ENABLED', False)
     def test_task_skips_when_disabled(self):
@@ -0,0 +1,154 @@
+from time import perf_counter
+
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.annotations import liked_by, related_count
+from api.fast_serializers import IMAGE_ROW_FIELDS, serialize_image_rows
+from api.models import Image, ImageComment, ImageLike, ImageTag
+from api.serializers import ImageSerializer
+from api.views import PublicImageListView
+from tests.utils import create_user
+
+
+class FastImageSerializerTests(TestCase):
+    """Caminho somente-leitura das listagens deve ser identico ao ImageSerializer."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="fast@example.com", username="fast")
+        self.other = create_user(email="other@example.com", username="other")
+        tags = [ImageTag.objects.create(name=name) for name in ("sunset", "beach", "Ocean")]
+        self.with_file = Image.objects.create(
+            user=self.user,
+            prompt="sunset over the sea",
+            negative_prompt="blur",
+            image="generated/fast/pôr do sol.png",
+            status=Image.Status.READY,
+            is_public=True,
+            seed=42,
+            strength=0.5,
+            relevance_score=3.25,
+        )
+        self.with_file.tags.set(tags)
+        self.without_file = Image.objects.create(user=self.other, prompt="pending", is_public=True)
+        ImageLike.objects.create(image=self.with_file, user=self.other)
+        ImageComment.objects.create(image=self.with_file, user=self.other, text="uau")
+        self.factory = APIRequestFactory()
+
+    def _request(self, user=None):
+        request = Request(self.factory.get("/api/images/public/"))
+        if user is not None:
+            request.user = user
+        return request
+
+    def _queryset(self, user):
+        return (
+            Image.objects.select_related("user")
+            .prefetch_related("tags")
+            .annotate(
+                like_count=related_count(ImageLike),
+                comment_count=related_count(ImageComment),
+                is_liked=liked_by(ImageLike, user),
+            )
+            .order_by("id")
+        )
+
+    def _assert_same_payload(self, user):
+        request = self._request(user)
+        queryset = self._queryset(request.user)
+        expected = ImageSerializer(queryset, many=True, context={"request": request}).data
+        rows = queryset.prefetch_related(None).values_list(*IMAGE_ROW_FIELDS)
+        self.assertEqual(serialize_image_rows(rows, request), [dict(item) for item in expected])
+        dict_rows = queryset.prefetch_related(None).values(*IMAGE_ROW_FIELDS)
+        self.assertEqual(serialize_image_rows(dict_rows, request), [dict(item) for item in expected])
+
+    def test_matches_image_serializer_for_anonymous(self):
+        """Anonimo: mesmo payload (URLs absolutas, tags ordenadas, is_liked False)."""
+        self._assert_same_payload(user=None)
+
+    def test_matches_image_serializer_for_authenticated(self):
+        """Autenticado: is_liked vem da anotacao."""
+        self._assert_same_payload(user=self.other)
+
+    def test_tags_loaded_in_single_query(self):
+        """Tags de toda a pagina em uma query, sem prefetch por imagem."""
+        request = self._request()
+        rows = list(self._queryset(request.user).prefetch_related(None).values_list(*IMAGE_ROW_FIELDS))
+        with self.assertNumQueries(1):
+            data = serialize_image_rows(rows, request)
+        self.assertEqual(data[0]["tags"], ["Ocean", "beach", "sunset"])
+        self.assertEqual(data[1]["tags"], [])
+
+    def test_public_list_view_uses_row_path(self):
+        """Galeria publica responde pelo caminho rapido com o mesmo formato."""
+        request = self.factory.get("/api/images/public/")
+        response = PublicImageListView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual(ids, [self.with_file.id])
+        self.assertTrue(response.data["results"][0]["image_url"].startswith("http://testserver/media/"))
+
+
+class FastImageSerializerBenchmarkTests(TestCase):
+    """Throughput do caminho rapido vs ImageSerializer(many=True) numa pagina cheia."""
+
+    PAGE = 200
+    ROUNDS = 5
+    MIN_SPEEDUP = 2.0
+
+    @classmethod
+    def setUpTestData(cls):
+        user = create_user(email="bench@example.com", username="bench")
+        tags = ImageTag.objects.bulk_create(ImageTag(name=f"tag{i}") for i in range(10))
+        images = Image.objects.bulk_create(
+            Image(
+                user=user,
+                prompt=f"benchmark prompt {i}",
+                image=f"generated/bench/{i}.png",
+                status=Image.Status.READY,
+                is_public=True,
+            )
+            for i in range(cls.PAGE)
+        )
+        Image.tags.through.objects.bulk_create(
+            Image.tags.through(image_id=image.id, imagetag_id=tags[(image.id + k) % len(tags)].id)
+            for image in images
+            for k in range(3)
+        )
+        cls.user = user
+
+    def _best_of(self, func):
+        timings = []
+        for _ in range(self.ROUNDS):
+            started = perf_counter()
+            func()
+            timings.append(perf_counter() - started)
+        return min(timings)
+
+    def test_row_path_outperforms_image_serializer(self):
+        """Pagina de 200 itens serializa ao menos 2x mais rapido (ja incluindo a query de tags)."""
+        request = Request(APIRequestFactory().get("/api/images/public/"))
+        request.user = self.user
+        queryset = (
+            Image.objects.select_related("user")
+            .prefetch_related("tags")
+            .annotate(
+                like_count=related_count(ImageLike),
+                comment_count=related_count(ImageComment),
+                is_liked=liked_by(ImageLike, self.user),
+            )
+        )
+        instances = list(queryset)
+        rows = list(queryset.prefetch_related(None).values_list(*IMAGE_ROW_FIELDS))
+
+        slow = self._best_of(lambda: ImageSerializer(instances, many=True, context={"request": request}).data)
+        fast = self._best_of(lambda: serialize_image_rows(rows, request))
+
+        speedup = slow / fast
+        self.assertGreaterEqual(
+            speedup,
+            self.MIN_SPEEDUP,
+            f"ImageSerializer {slow * 1000:.1f}ms vs rows {fast * 1000:.1f}ms ({speedup:.1f}x)",
+        )
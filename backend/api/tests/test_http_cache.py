@@ -0,0 +1,190 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Image
+from api.tasks import recalculate_relevance_scores
+from tests.utils import create_user
+
+PUBLIC_URL = "/api/images/public/"
+
+
+@override_settings(PUBLIC_RESPONSE_CACHE_TTL=30, PUBLIC_RESPONSE_CACHE_STALE=120)
+class AnonymousResponseCacheTests(APITestCase):
+    """Trafego anonimo da galeria e de relacionadas sai do cache."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.owner = create_user(email="cache@example.com", username="cacheowner")
+        self.image = Image.objects.create(
+            user=self.owner,
+            prompt="sunset over the sea",
+            status=Image.Status.READY,
+            is_public=True,
+        )
+
+    def _later(self, seconds):
+        """Adianta ``time.time`` em ``seconds`` durante o bloco."""
+        real_time = time.time
+        return patch("api.http_cache.time.time", side_effect=lambda: real_time() + seconds)
+
+    def test_second_anonymous_request_skips_database(self):
+        """Segunda chamada anonima e servida do cache sem nenhuma query."""
+        first = self.client.get(PUBLIC_URL)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            second = self.client.get(PUBLIC_URL)
+
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second.json()["results"][0]["id"], self.image.id)
+
+    def test_cache_headers(self):
+        """Resposta anonima expoe ETag, Last-Modified, Cache-Control e Vary."""
+        response = self.client.get(PUBLIC_URL)
+
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", response)
+        self.assertEqual(response["Cache-Control"], "public, max-age=30, stale-while-revalidate=120")
+        self.assertIn("Authorization", response["Vary"])
+
+    def test_if_none_match_returns_304(self):
+        """ETag igual devolve 304 sem corpo e sem banco."""
+        etag = self.client.get(PUBLIC_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(PUBLIC_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_if_modified_since_returns_304(self):
+        """If-Modified-Since igual ao Last-Modified devolve 304."""
+        last_modified = self.client.get(PUBLIC_URL)["Last-Modified"]
+
+        response = self.client.get(PUBLIC_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_query_params_are_normalized(self):
+        """Ordem dos parametros nao gera entradas diferentes; valores diferentes sim."""
+        self.client.get(f"{PUBLIC_URL}?search=sunset&page=1")
+
+        with self.assertNumQueries(0):
+            same = self.client.get(f"{PUBLIC_URL}?page=1&search=sunset")
+        self.assertEqual(same["X-Cache"], "HIT")
+
+        other = self.client.get(f"{PUBLIC_URL}?search=forest")
+        self.assertEqual(other["X-Cache"], "MISS")
+        self.assertEqual(other.json()["count"], 0)
+
+    def test_host_and_scheme_are_part_of_the_key(self):
+        """URLs absolutas no corpo: outro host ou esquema nao reaproveita a entrada."""
+        self.client.get(PUBLIC_URL, HTTP_HOST="a.example.com")
+
+        other_host = self.client.get(PUBLIC_URL, HTTP_HOST="b.example.com")
+        https = self.client.get(PUBLIC_URL, HTTP_HOST="a.example.com", secure=True)
+        same = self.client.get(PUBLIC_URL, HTTP_HOST="a.example.com")
+
+        self.assertEqual(other_host["X-Cache"], "MISS")
+        self.assertEqual(https["X-Cache"], "MISS")
+        self.assertEqual(same["X-Cache"], "HIT")
+
+    def test_authenticated_requests_bypass_cache(self):
+        """Usuario autenticado sempre passa pelo pipeline completo (is_liked por usuario)."""
+        self.client.get(PUBLIC_URL)
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.get(PUBLIC_URL)
+
+        self.assertNotIn("X-Cache", response)
+        self.assertNotIn("ETag", response)
+
+    def test_publish_invalidates_cache(self):
+        """Publicar imagem derruba o cache anonimo imediatamente."""
+        hidden = Image.objects.create(user=self.owner, prompt="forest", status=Image.Status.READY)
+        self.assertEqual(self.client.get(PUBLIC_URL).json()["count"], 1)
+
+        self.client.force_authenticate(user=self.owner)
+        self.client.post(f"/api/images/{hidden.id}/share/")
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get(PUBLIC_URL)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["count"], 2)
+
+    def test_unpublish_invalidates_cache(self):
+        """Despublicar remove a imagem da galeria cacheada."""
+        self.assertEqual(self.client.get(PUBLIC_URL).json()["count"], 1)
+
+        self.client.force_authenticate(user=self.owner)
+        self.client.patch(f"/api/images/{self.image.id}/share/", {"is_public": False}, format="json")
+        self.client.force_authenticate(user=None)
+
+        self.assertEqual(self.client.get(PUBLIC_URL).json()["count"], 0)
+
+    def test_relevance_refresh_invalidates_cache(self):
+        """recalculate_relevance_scores invalida as respostas cacheadas."""
+        self.client.get(PUBLIC_URL)
+
+        recalculate_relevance_scores()
+
+        self.assertEqual(self.client.get(PUBLIC_URL)["X-Cache"], "MISS")
+
+    def test_stale_entry_served_while_another_request_revalidates(self):
+        """Depois do TTL, quem nao pega o lock recebe a copia antiga sem banco."""
+        first = self.client.get(PUBLIC_URL)
+        # Outro worker ja esta revalidando: o lock nao e obtido.
+        with self._later(60), patch("api.http_cache.cache.add", return_value=False):
+            with self.assertNumQueries(0):
+                response = self.client.get(PUBLIC_URL)
+
+        self.assertEqual(response["X-Cache"], "STALE")
+        self.assertEqual(response.content, first.content)
+
+    def test_stale_entry_revalidated_by_lock_winner(self):
+        """Depois do TTL, o primeiro request recalcula e mantem Last-Modified se nada mudou."""
+        first = self.client.get(PUBLIC_URL)
+        with self._later(60):
+            response = self.client.get(PUBLIC_URL)
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response["ETag"], first["ETag"])
+        self.assertEqual(response["Last-Modified"], first["Last-Modified"])
+
+    def test_expired_entry_is_recomputed(self):
+        """Passada a janela stale, nao ha copia antiga: recalcula."""
+        self.client.get(PUBLIC_URL)
+        cache.clear()
+
+        self.assertEqual(self.client.get(PUBLIC_URL)["X-Cache"], "MISS")
+
+    def test_related_images_cached_for_anonymous(self):
+        """Imagens relacionadas de imagem publica tambem saem do cache."""
+        url = f"/api/images/{self.image.id}/related/"
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_errors_are_not_cached(self):
+        """404 de imagem privada nao entra no cache."""
+        private = Image.objects.create(user=self.owner, prompt="secret", status=Image.Status.READY)
+        url = f"/api/images/{private.id}/related/"
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn("X-Cache", response)
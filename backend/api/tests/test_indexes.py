@@ -0,0 +1,87 @@
+import re
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import Image, ImageComment, ImageLike
+from api.views import ImageCommentListCreateView, PublicImageListView
+from tests.utils import create_user
+
+
+class HotQueryIndexTests(TestCase):
+    """EXPLAIN das queries quentes nao pode cair em seq scan."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="explain@example.com", username="explain")
+        self.image = Image.objects.create(
+            user=self.user,
+            prompt="sunset over the sea",
+            is_public=True,
+            status=Image.Status.READY,
+        )
+        self.factory = APIRequestFactory()
+
+    def _explain(self, queryset):
+        if connection.vendor == "postgresql":
+            # Tabelas de teste sao minusculas; sem isto o planner prefere seq
+            # scan mesmo havendo indice utilizavel.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertNoSeqScan(self, queryset, table):
+        plan = self._explain(queryset)
+        if connection.vendor == "postgresql":
+            pattern = rf"Seq Scan on {table}\b"
+        else:
+            pattern = rf"\bSCAN {table}\b(?! USING)"
+        self.assertIsNone(
+            re.search(pattern, plan),
+            f"Seq scan em {table}:\n{plan}",
+        )
+
+    def _view_queryset(self, view_class, path, user=None, **kwargs):
+        request = self.factory.get(path)
+        if user is not None:
+            force_authenticate(request, user=user)
+        view = view_class()
+        view.setup(request, **kwargs)
+        view.request = view.initialize_request(request)
+        return view.get_queryset()
+
+    def test_public_gallery_uses_rank_index(self):
+        """Galeria publica usa o indice parcial de ranking."""
+        queryset = self._view_queryset(PublicImageListView, "/api/images/public/")
+        self.assertNoSeqScan(queryset[:20], "api_image")
+        plan = self._explain(queryset[:20])
+        self.assertIn("image_public_rank_idx", plan)
+
+    def test_user_library_uses_user_created_index(self):
+        """Acervo do usuario filtra por (user_id, created_at) via indice."""
+        queryset = Image.objects.filter(user=self.user).order_by("-created_at")[:20]
+        self.assertNoSeqScan(queryset, "api_image")
+
+    def test_is_liked_lookup_uses_index(self):
+        """Lookup (user, image) de curtidas nao varre a tabela."""
+        ImageLike.objects.create(image=self.image, user=self.user)
+        queryset = ImageLike.objects.filter(user=self.user, image_id__in=[self.image.id])
+        self.assertNoSeqScan(queryset, "api_imagelike")
+
+    def test_top_level_comments_use_image_parent_index(self):
+        """Comentarios top-level de uma imagem usam (image_id, parent_id)."""
+        ImageComment.objects.create(image=self.image, user=self.user, text="oi")
+        queryset = self._view_queryset(
+            ImageCommentListCreateView,
+            f"/api/images/{self.image.id}/comments/",
+            pk=self.image.id,
+        )
+        self.assertNoSeqScan(queryset, "api_imagecomment")
+
+    @skipUnless(connection.vendor == "postgresql", "Indice trigram existe apenas no PostgreSQL")
+    def test_prompt_search_uses_trigram_index(self):
+        """Busca por prompt (icontains) usa o indice trigram."""
+        queryset = Image.objects.filter(prompt__icontains="sunset")
+        self.assertNoSeqScan(queryset, "api_image")
@@ -0,0 +1,108 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from api.annotations import related_count
+from api.like_cache import invalidate_liked_image_ids, liked_image_ids
+from api.models import Image, ImageComment, ImageLike
+from api.serializers import ImageSerializer
+from tests.utils import create_user
+
+PUBLIC_URL = "/api/images/public/"
+
+
+class LikedImageIdsCacheTests(APITestCase):
+    """is_liked vem do conjunto de curtidas em cache, sem subquery por linha."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.owner = create_user(email="likes-owner@example.com", username="likesowner")
+        self.viewer = create_user(email="likes-viewer@example.com", username="likesviewer")
+        self.images = [
+            Image.objects.create(
+                user=self.owner,
+                prompt=f"prompt {i}",
+                status=Image.Status.READY,
+                is_public=True,
+            )
+            for i in range(3)
+        ]
+        ImageLike.objects.create(image=self.images[0], user=self.viewer)
+
+    def _liked_flags(self):
+        results = self.client.get(PUBLIC_URL).json()["results"]
+        return {item["id"]: item["is_liked"] for item in results}
+
+    def test_filled_lazily_once(self):
+        """Primeira leitura consulta o banco; as seguintes saem do cache."""
+        with self.assertNumQueries(1):
+            ids = liked_image_ids(self.viewer)
+        with self.assertNumQueries(0):
+            self.assertEqual(liked_image_ids(self.viewer), ids)
+        self.assertEqual(ids, {self.images[0].id})
+
+    def test_anonymous_has_no_likes(self):
+        """Anonimo nao toca banco nem cache."""
+        with self.assertNumQueries(0):
+            self.assertEqual(liked_image_ids(AnonymousUser()), frozenset())
+
+    def test_gallery_uses_cached_set(self):
+        """Com o conjunto aquecido, a galeria autenticada marca is_liked corretamente."""
+        self.client.force_authenticate(user=self.viewer)
+        liked_image_ids(self.viewer)
+
+        with self.assertNumQueries(3):
+            flags = self._liked_flags()
+
+        self.assertEqual(
+            flags,
+            {self.images[0].id: True, self.images[1].id: False, self.images[2].id: False},
+        )
+
+    @patch("api.views.ScopedRateThrottle.allow_request", return_value=True)
+    def test_like_and_unlike_keep_set_current(self, _throttle):
+        """Curtir/descurtir atualiza is_liked nas listagens seguintes."""
+        self.client.force_authenticate(user=self.viewer)
+        self.assertFalse(self._liked_flags()[self.images[1].id])
+
+        response = self.client.post(f"/api/images/{self.images[1].id}/like/")
+        self.assertTrue(response.json()["is_liked"])
+        self.assertTrue(self._liked_flags()[self.images[1].id])
+
+        self.client.delete(f"/api/images/{self.images[0].id}/like/")
+        self.assertFalse(self._liked_flags()[self.images[0].id])
+
+    def test_fill_after_invalidate_is_not_served(self):
+        """Leitor que grava o conjunto depois de um like concorrente nao esconde o like."""
+        real_set = cache.set
+
+        def like_between_select_and_set(key, value, timeout=None):
+            ImageLike.objects.create(image=self.images[1], user=self.viewer)
+            invalidate_liked_image_ids(self.viewer)
+            real_set(key, value, timeout=timeout)
+
+        with patch("api.like_cache.cache.set", side_effect=like_between_select_and_set):
+            stale = liked_image_ids(self.viewer)
+
+        self.assertNotIn(self.images[1].id, stale)
+        self.assertIn(self.images[1].id, liked_image_ids(self.viewer))
+
+    def test_image_serializer_loads_set_once_per_page(self):
+        """Sem anotacao, ImageSerializer(many=True) busca as curtidas uma vez so."""
+        request = Request(APIRequestFactory().get(PUBLIC_URL))
+        request.user = self.viewer
+        images = list(
+            Image.objects.select_related("user")
+            .prefetch_related("tags")
+            .annotate(like_count=related_count(ImageLike), comment_count=related_count(ImageComment))
+            .order_by("id")
+        )
+
+        with self.assertNumQueries(1):
+            data = ImageSerializer(images, many=True, context={"request": request}).data
+
+        self.assertEqual([item["is_liked"] for item in data], [True, False, False])
@@ -0,0 +1,284 @@
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import requests
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api import llm
+from tests.utils import create_user
+
+REFINED = {"refined_prompt": "a lighthouse at dusk, highly detailed", "negative_prompt": "blur"}
+
+
+def _upstream(delay=0.0, content=None):
+    """``Session.post`` falso que responde ``REFINED`` depois de ``delay`` segundos."""
+    body = {"choices": [{"message": {"content": content or json.dumps(REFINED)}}]}
+
+    def post(*args, **kwargs):
+        time.sleep(delay)
+        response = MagicMock()
+        response.json.return_value = body
+        return response
+
+    return patch("requests.Session.post", side_effect=post)
+
+
+@override_settings(DEEPSEEK_API_KEY="test-key", LLM_REFINE_CACHE_TTL=3600, LLM_REFINE_CACHE_MAX_ENTRIES=2)
+class RefineCacheTests(SimpleTestCase):
+    """Cache de refinamentos: chave normalizada, LRU local e single-flight."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        llm._local_cache.clear()
+
+    def test_repeated_description_skips_upstream(self):
+        """Mesma descricao com caixa/espacos diferentes chama o LLM uma vez."""
+        with _upstream() as post:
+            first = llm.refine_prompt("Um farol  ao entardecer", "anime")
+            second = llm.refine_prompt("  um FAROL ao entardecer ", "anime")
+
+        self.assertEqual(first, REFINED)
+        self.assertEqual(second, REFINED)
+        self.assertEqual(post.call_count, 1)
+
+    def test_style_is_part_of_the_key(self):
+        """Outro estilo gera outro prompt."""
+        with _upstream() as post:
+            llm.refine_prompt("um farol", "anime")
+            llm.refine_prompt("um farol", "sketch")
+
+        self.assertEqual(post.call_count, 2)
+
+    def test_local_lru_is_bounded(self):
+        """A LRU local guarda no maximo LLM_REFINE_CACHE_MAX_ENTRIES chaves."""
+        with _upstream():
+            for description in ("um", "dois", "tres"):
+                llm.refine_prompt(description, "anime")
+
+        self.assertEqual(len(llm._local_cache._data), 2)
+        self.assertIsNone(llm._local_cache.get(llm.refinement_cache_key("um", "anime")))
+
+    def test_concurrent_duplicates_are_coalesced(self):
+        """Requests identicos em voo esperam o primeiro em vez de chamar o LLM."""
+        results = []
+
+        def worker():
+            results.append(llm.refine_prompt("um farol ao entardecer", "anime"))
+
+        before = llm.refine_cache_requests.values()
+        with _upstream(delay=0.3) as post:
+            threads = [threading.Thread(target=worker) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        after = llm.refine_cache_requests.values()
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(results, [REFINED] * 5)
+        self.assertEqual(after["miss"] - before["miss"], 1)
+        self.assertEqual(after["coalesced"] - before["coalesced"], 4)
+
+    def test_waiter_past_deadline_keeps_owner_lock(self):
+        """Quem desiste de esperar chama o LLM, mas nao apaga o lock de outro."""
+        lock_key = f"{llm.refinement_cache_key('um farol', 'anime')}:lock"
+        cache.set(lock_key, 42, timeout=60)
+
+        with patch.object(llm, "LOCK_TIMEOUT", 0), _upstream() as post:
+            self.assertEqual(llm.refine_prompt("um farol", "anime"), REFINED)
+
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(cache.get(lock_key), 42)
+
+    def test_errors_are_not_cached(self):
+        """Falha do upstream libera o lock e nao fica no cache."""
+        with patch("requests.Session.post", side_effect=requests.exceptions.Timeout):
+            with self.assertRaises(llm.LLMTimeout):
+                llm.refine_prompt("um farol", "anime")
+
+        with _upstream() as post:
+            self.assertEqual(llm.refine_prompt("um farol", "anime"), REFINED)
+        self.assertEqual(post.call_count, 1)
+
+    @override_settings(LLM_REFINE_CACHE_TTL=0)
+    def test_zero_ttl_disables_cache(self):
+        """TTL 0 sempre chama o upstream."""
+        with _upstream() as post:
+            llm.refine_prompt("um farol", "anime")
+            llm.refine_prompt("um farol", "anime")
+
+        self.assertEqual(post.call_count, 2)
+
+
+@override_settings(DEEPSEEK_API_KEY="test-key", LLM_REFINE_CACHE_TTL=3600)
+class RefinePromptViewTests(APITestCase):
+    """Endpoint mantem os mesmos codigos de erro e expoe as metricas."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        llm._local_cache.clear()
+        self.user = create_user(email="refine@example.com", username="refine")
+        self.client.force_authenticate(user=self.user)
+
+    def _refine(self):
+        return self.client.post(
+            "/api/refine-prompt/", {"description": "um farol", "style": "anime"}, format="json"
+        )
+
+    @override_settings(DEEPSEEK_API_KEY="")
+    def test_not_configured(self):
+        self.assertEqual(self._refine().status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_upstream_errors_map_to_gateway_codes(self):
+        """Timeout -> 504, falha de conexao -> 502, resposta invalida -> 500."""
+        cases = [
+            (patch("requests.Session.post", side_effect=requests.exceptions.Timeout), 504),
+            (patch("requests.Session.post", side_effect=requests.exceptions.ConnectionError), 502),
+            (_upstream(content='{"refined_prompt": }'), 500),
+        ]
+        for patcher, expected in cases:
+            with self.subTest(expected=expected), patcher:
+                self.assertEqual(self._refine().status_code, expected)
+
+    def test_metrics_endpoint_exports_cache_and_latency(self):
+        """Staff le hit ratio e histograma de latencia em formato Prometheus."""
+        with _upstream():
+            self.assertEqual(self._refine().data, REFINED)
+            self.assertEqual(self._refine().data, REFINED)
+
+        staff = create_user(email="staff@example.com", username="staff", is_staff=True)
+        self.client.force_authenticate(user=staff)
+        response = self.client.get("/api/metrics/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn('llm_refine_cache_requests_total{result="hit"}', body)
+        self.assertIn("llm_refine_cache_hit_ratio 0.5000", body)
+        self.assertIn('llm_upstream_latency_seconds_count{operation="refine",outcome="ok"} 1', body)
+        self.assertIn('llm_upstream_latency_seconds_bucket{operation="refine",outcome="ok",le="+Inf"} 1', body)
+
+    def test_metrics_require_staff(self):
+        self.assertEqual(self.client.get("/api/metrics/").status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_histogram_observation_is_one_redis_round_trip(self):
+        """Bucket, contagem e soma vao juntos num unico pipeline."""
+        fake_cache = MagicMock()
+        fake_cache.make_and_validate_key.side_effect = lambda key: key
+        pipe = fake_cache._cache.get_client.return_value.pipeline.return_value
+        with patch("api.metrics.cache", fake_cache):
+            llm.upstream_latency.observe(0.3, operation="refine", outcome="ok")
+
+        pipe.execute.assert_called_once_with()
+        prefix = "metrics:llm_upstream_latency_seconds:refine,ok"
+        self.assertEqual(
+            [c.args for c in pipe.incrby.call_args_list],
+            [(f"{prefix}:bucket:0.5", 1), (f"{prefix}:count", 1), (f"{prefix}:sum_ms", 300)],
+        )
+        fake_cache.incr.assert_not_called()
+
+
+def _stream_upstream(content, fail_after=None):
+    """``Session.post`` falso em streaming (linhas ``data:`` do DeepSeek)."""
+
+    def iter_lines():
+        for i in range(0, len(content), 5):
+            if fail_after is not None and i >= fail_after:
+                raise requests.exceptions.ConnectionError("reset")
+            yield f"data: {json.dumps({'choices': [{'delta': {'content': content[i:i + 5]}}]})}".encode()
+        yield b"data: [DONE]"
+
+    response = MagicMock()
+    response.iter_lines.side_effect = iter_lines
+    return patch("requests.Session.post", return_value=response)
+
+
+class StreamingJSONFieldsTests(SimpleTestCase):
+    def test_fields_from_arbitrary_chunks(self):
+        """Mesmo resultado que json.loads, com escapes, para qualquer fatiamento."""
+        doc = {"action": "generate", "prompt": 'a "cat" \U0001f431\nat night', "n": 3, "message": "Vou gerar!"}
+        text = "Claro! " + json.dumps(doc) + " fim"
+        for size in (1, 2, 3, 7, 64):
+            parser = llm.StreamingJSONFields()
+            deltas = {}
+            for i in range(0, len(text), size):
+                for kind, field, value in parser.feed(text[i:i + size]):
+                    if kind == "delta":
+                        deltas[field] = deltas.get(field, "") + value
+            with self.subTest(size=size):
+                self.assertTrue(parser.complete)
+                self.assertEqual(parser.fields, doc)
+                self.assertEqual(deltas, {k: v for k, v in doc.items() if isinstance(v, str)})
+
+    def test_field_event_when_value_closes(self):
+        parser = llm.StreamingJSONFields()
+        self.assertEqual(parser.feed('{"prompt": "a c'), [("delta", "prompt", "a c")])
+        self.assertEqual(parser.feed('at", "mes'), [("delta", "prompt", "at"), ("field", "prompt", "a cat")])
+        self.assertFalse(parser.complete)
+
+
+@override_settings(DEEPSEEK_API_KEY="test-key", LLM_REFINE_CACHE_TTL=3600)
+class RefinePromptStreamTests(APITestCase):
+    """``?stream=true``: deltas de refined_prompt em SSE e o mesmo cache do modo normal."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        llm._local_cache.clear()
+        self.client.force_authenticate(user=create_user(email="stream@example.com", username="stream"))
+
+    def _events(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = b"".join(response.streaming_content).decode()
+        events = []
+        for block in body.strip().split("\n\n"):
+            event, data = block.split("\n")
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+        return events
+
+    def _refine(self, **extra):
+        return self.client.post(
+            "/api/refine-prompt/?stream=true", {"description": "um farol", "style": "anime"}, format="json", **extra
+        )
+
+    def test_streams_deltas_then_done(self):
+        with _stream_upstream(json.dumps(REFINED)):
+            events = self._events(self._refine())
+
+        deltas = "".join(data["text"] for event, data in events if event == "delta")
+        self.assertEqual(deltas, REFINED["refined_prompt"])
+        self.assertEqual(events[-1], ("done", REFINED))
+        self.assertGreater(len(events), 2)
+
+    def test_streamed_result_feeds_cache(self):
+        """Resultado do stream vale para o modo normal e para o proximo stream."""
+        with _stream_upstream(json.dumps(REFINED)) as post:
+            self._events(self._refine())
+            self.assertEqual(
+                self.client.post("/api/refine-prompt/", {"description": "um farol", "style": "anime"}, format="json").data,
+                REFINED,
+            )
+            events = self._events(self._refine(HTTP_ACCEPT="text/event-stream"))
+
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(events, [("done", REFINED)])
+
+    @override_settings(DEEPSEEK_API_KEY="")
+    def test_not_configured_is_plain_503(self):
+        response = self._refine()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.data["detail"], "Prompt assistant is not configured.")
+
+    def test_midstream_failure_becomes_error_event(self):
+        with _stream_upstream(json.dumps(REFINED), fail_after=40):
+            events = self._events(self._refine())
+
+        self.assertEqual(events[-1], ("error", {"detail": "Failed to connect to prompt assistant."}))
+        self.assertIsNone(cache.get(llm.refinement_cache_key("um farol", "anime")))
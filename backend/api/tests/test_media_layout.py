@@ -0,0 +1,152 @@
+import os
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api import media_layout
+from api.media_layout import is_content_addressed, relayout, sharded_name, store_file
+from api.models import Character, CharacterReference, Image
+from api.purge import delete_unreferenced
+from api.tasks import delete_media_files_task
+from tests.mixins import TemporaryMediaMixin
+from tests.utils import create_user
+
+DIGEST = "ab" * 32
+
+
+class ShardedNameTests(SimpleTestCase):
+    def test_digest_names_are_sharded_by_prefix(self):
+        self.assertEqual(sharded_name("avatars", f"{DIGEST}.webp"), f"avatars/ab/ab/{DIGEST}.webp")
+        self.assertTrue(is_content_addressed(f"users/1/images/ab/ab/{DIGEST}.png"))
+
+    def test_other_names_get_a_sharded_uuid(self):
+        name = sharded_name("users/1/images", "foto")
+
+        self.assertTrue(name.startswith("users/1/images/"))
+        self.assertTrue(name.endswith(".png"))
+        self.assertEqual(len(name.split("/")), 6)
+        self.assertFalse(is_content_addressed("users/1/images/3f2b6c1e-0000-4000-8000-000000000000.png"))
+
+
+class ContentAddressedStorageTests(TemporaryMediaMixin, TestCase):
+    """Mesmo conteudo vira o mesmo arquivo; so sai do storage sem referencias."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="layout@example.com", username="layout")
+
+    def _image(self, data=b"mesmos bytes", user=None):
+        image = Image.objects.create(user=user or self.user, prompt="igual", status=Image.Status.READY)
+        store_file(image.image, ContentFile(data, name="generated.png"))
+        return image
+
+    def test_identical_content_is_stored_once(self):
+        first, second = self._image(), self._image()
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_content_addressed(first.image.name))
+        self.assertTrue(first.image.name.startswith(f"users/{self.user.pk}/images/"))
+        Image.objects.filter(pk=first.pk).update(image="")
+        self.assertEqual(Image.objects.get(pk=second.pk).image.name, first.image.name)
+
+    def test_other_users_keep_their_own_prefix(self):
+        other = self._image(user=create_user(email="other@example.com", username="other"))
+
+        self.assertNotEqual(other.image.name, self._image().image.name)
+
+    def test_shared_file_survives_deleting_one_row(self):
+        first, second = self._image(), self._image()
+        name = first.image.name
+
+        first.delete()
+        delete_media_files_task([name])
+        self.assertTrue(default_storage.exists(name))
+
+        second.delete()
+        self.assertEqual(delete_unreferenced([name]), 1)
+        self.assertFalse(default_storage.exists(name))
+
+    @override_settings(MEDIA_REUSE_GRACE=600)
+    def test_reused_file_is_touched_and_kept_by_cleanup(self):
+        """Um upload que reaproveita o arquivo protege-o ate gravar a propria linha."""
+        first = self._image()
+        name = first.image.name
+        path = default_storage.path(name)
+        os.utime(path, (0, 0))
+        first.delete()
+
+        reused = self._image()
+        # Limpeza que nao ve a linha nova (ainda sem commit no outro processo).
+        Image.objects.filter(pk=reused.pk).delete()
+
+        self.assertEqual(reused.image.name, name)
+        self.assertGreater(os.path.getmtime(path), 0)
+        self.assertEqual(delete_unreferenced([name]), 0)
+        self.assertTrue(default_storage.exists(name))
+
+
+class MigrateMediaLayoutTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="legacy@example.com", username="legacy")
+        self.images = []
+        for i in range(5):
+            legacy = default_storage.save(
+                f"users/{self.user.pk}/images/legado-{i}.png", ContentFile(f"png {i % 3}".encode())
+            )
+            self.images.append(Image.objects.create(user=self.user, prompt=f"velha {i}", image=legacy))
+        character = Character.objects.create(user=self.user, name="Antiga")
+        legacy_ref = default_storage.save(f"characters/{character.pk}/refs/ref.png", ContentFile(b"ref"))
+        self.reference = CharacterReference.objects.create(character=character, image=legacy_ref)
+        Image.objects.create(user=self.user, prompt="sem arquivo")
+
+    def test_moves_files_in_batches(self):
+        out = StringIO()
+        call_command("migrate_media_layout", "--batch-size", "2", stdout=out)
+
+        self.assertIn("imagens: 5", out.getvalue())
+        self.assertIn("referencias: 1", out.getvalue())
+        names = [Image.objects.get(pk=image.pk).image.name for image in self.images]
+        self.assertTrue(all(is_content_addressed(name) for name in names))
+        self.assertTrue(all(default_storage.exists(name) for name in names))
+        # Conteudos repetidos (i % 3) viram o mesmo arquivo.
+        self.assertEqual(len(set(names)), 3)
+        self.reference.refresh_from_db()
+        self.assertTrue(self.reference.image.name.startswith(f"characters/{self.reference.character_id}/refs/"))
+        # O arquivo antigo fica para a varredura de orfaos.
+        self.assertTrue(default_storage.exists(self.images[0].image.name))
+
+        self.assertEqual(relayout(Image.objects.all()), 0)
+
+    def test_dry_run_changes_nothing(self):
+        self.assertEqual(relayout(Image.objects.all(), dry_run=True), 5)
+        self.assertEqual(Image.objects.get(pk=self.images[0].pk).image.name, self.images[0].image.name)
+
+    def test_missing_file_is_kept(self):
+        default_storage.delete(self.images[0].image.name)
+
+        with patch("api.media_layout.logger") as mock_logger:
+            moved = relayout(Image.objects.filter(pk=self.images[0].pk))
+
+        self.assertEqual(moved, 0)
+        mock_logger.warning.assert_called_once()
+        self.assertEqual(Image.objects.get(pk=self.images[0].pk).image.name, self.images[0].image.name)
+
+    def test_concurrent_change_wins(self):
+        image = self.images[1]
+        real_save_once = media_layout._save_once
+
+        def change_meanwhile(*args):
+            # A aplicacao troca a imagem entre a leitura do lote e o UPDATE.
+            Image.objects.filter(pk=image.pk).update(image="users/trocada.png")
+            return real_save_once(*args)
+
+        with patch("api.media_layout._save_once", side_effect=change_meanwhile):
+            moved = relayout(Image.objects.filter(pk=image.pk))
+
+        self.assertEqual(moved, 0)
+        self.assertEqual(Image.objects.get(pk=image.pk).image.name, "users/trocada.png")
@@ -0,0 +1,98 @@
+from io import BytesIO
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from PIL import Image as PILImage
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.media import is_local, media_name, media_path
+from api.models import Image
+from api.purge import sweep_orphan_files
+from api.tasks import create_embeddings_task
+from tests.mixins import ObjectStorageMixin
+from tests.utils import create_user
+
+
+def _png(size=(64, 64)):
+    buffer = BytesIO()
+    PILImage.new("RGB", size, (10, 120, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ObjectStorageApiTests(ObjectStorageMixin, APITestCase):
+    """Com um bucket (sem ``path()``), URLs saem do storage e nada le o disco."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="bucket@example.com", username="bucket")
+        self.client.force_authenticate(user=self.user)
+        self.image = Image.objects.create(user=self.user, prompt="nuvem", status=Image.Status.READY)
+        self.image.image.save("nuvem.png", ContentFile(_png()), save=True)
+
+    def test_storage_is_not_local(self):
+        self.assertFalse(is_local())
+        self.assertTrue(default_storage.exists(self.image.image.name))
+
+    def test_image_urls_are_signed(self):
+        response = self.client.get(reverse("user-images"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        url = response.data["results"][0]["image_url"]
+        self.assertTrue(url.startswith("https://bucket.test/media/users/"))
+        self.assertIn("X-Amz-Signature", url)
+
+    def test_download_returns_signed_url(self):
+        response = self.client.post(reverse("image-download", args=[self.image.pk]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("X-Amz-Signature", response.data["download_url"])
+
+    def test_avatar_keeps_stable_path_and_resolves_on_read(self):
+        response = self.client.post(
+            reverse("authentication:user_avatar"),
+            {"file": SimpleUploadedFile("eu.png", _png((400, 300)), content_type="image/png")},
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        # O banco guarda MEDIA_URL + nome; a URL assinada e gerada na leitura.
+        name = media_name(self.user.profile_picture)
+        self.assertEqual(self.user.profile_picture, media_path(name))
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(response.data["avatar_url"], default_storage.url(name))
+
+    @patch("api.tasks.EMBEDDINGS_ENABLED", True)
+    @patch("api.tasks.generate_text_embedding", return_value=[0.1] * 384)
+    @patch("api.tasks.generate_image_embedding", return_value=[0.2] * 768)
+    def test_embeddings_read_image_from_bucket(self, mock_image, mock_text):
+        create_embeddings_task(self.image.id)
+
+        self.assertEqual(mock_image.call_args.args[0].size, (64, 64))
+        self.assertTrue(self.image.embedding.image_embedding_json)
+
+
+class ObjectStorageSweepTests(ObjectStorageMixin, TestCase):
+    def test_sweep_lists_bucket_prefixes(self):
+        user = create_user(email="sweeper@example.com", username="sweeper")
+        image = Image.objects.create(user=user, prompt="fica", status=Image.Status.READY)
+        image.image.save("fica.png", ContentFile(b"png"), save=True)
+        avatar = default_storage.save(f"avatars/{user.pk}-atual.webp", ContentFile(b"a"))
+        user.profile_picture = media_path(avatar)
+        user.save(update_fields=["profile_picture"])
+        orphans = [
+            default_storage.save(f"users/{user.pk}/images/falhou.png", ContentFile(b"x")),
+            default_storage.save(f"avatars/{user.pk}-antigo.webp", ContentFile(b"x")),
+        ]
+
+        self.assertEqual(sweep_orphan_files(grace=0), 2)
+
+        for name in orphans:
+            self.assertFalse(default_storage.exists(name), name)
+        self.assertTrue(default_storage.exists(image.image.name))
+        self.assertTrue(default_storage.exists(avatar))
@@ -0,0 +1,142 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from api import llm
+
+REFINED = {"refined_prompt": "a lighthouse at dusk", "negative_prompt": "blur"}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """DeepSeek falso: responde o proximo status da fila do servidor."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.hits.append(self.client_address[1])
+            status_code = server.statuses.pop(0) if server.statuses else 200
+        if status_code != 200:
+            payload = b'{"error": "stub"}'
+        elif body.get("stream"):
+            content = json.dumps(REFINED)
+            lines = [
+                f"data: {json.dumps({'choices': [{'delta': {'content': content[i:i + 8]}}]})}\n\n"
+                for i in range(0, len(content), 8)
+            ]
+            payload = ("".join(lines) + "data: [DONE]\n\n").encode()
+        else:
+            payload = json.dumps({"choices": [{"message": {"content": json.dumps(REFINED)}}]}).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class OutboundClientTests(SimpleTestCase):
+    """Cliente do DeepSeek contra um servidor HTTP local."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.server.hits = []
+        self.server.statuses = []
+        overrides = override_settings(
+            DEEPSEEK_API_KEY="test-key",
+            DEEPSEEK_BASE_URL=f"http://127.0.0.1:{self.server.server_port}",
+            LLM_HTTP_RETRIES=2,
+            LLM_HTTP_BACKOFF=0.001,
+            LLM_CIRCUIT_FAILURE_THRESHOLD=2,
+            LLM_CIRCUIT_COOLDOWN=30,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(llm.deepseek.close)
+
+    def _complete(self):
+        return llm.chat_completion([{"role": "user", "content": "oi"}], operation="refine")
+
+    def test_connection_is_reused(self):
+        """Chamadas seguidas saem pela mesma conexao (keep-alive)."""
+        for _ in range(3):
+            self._complete()
+
+        self.assertEqual(len(self.server.hits), 3)
+        self.assertEqual(len(set(self.server.hits)), 1)
+
+    def test_retries_transient_status(self):
+        """503 seguido de 200 e transparente para quem chama."""
+        self.server.statuses = [503]
+
+        self.assertEqual(self._complete(), json.dumps(REFINED))
+        self.assertEqual(len(self.server.hits), 2)
+        self.assertEqual(llm.deepseek.retries.values()["chat_completions"], 1)
+
+    def test_client_error_is_not_retried(self):
+        """4xx e erro do request: falha na hora e nao conta para o breaker."""
+        self.server.statuses = [400, 400, 400]
+
+        for _ in range(3):
+            with self.assertRaises(llm.LLMError):
+                self._complete()
+
+        self.assertEqual(len(self.server.hits), 3)
+        self.assertEqual(llm.deepseek.breaker.allow(), "closed")
+
+    def test_circuit_opens_and_recovers(self):
+        """Falhas seguidas abrem o circuito; depois do cooldown uma prova o fecha."""
+        self.server.statuses = [503] * 6
+
+        for _ in range(2):
+            with self.assertRaises(llm.LLMError):
+                self._complete()
+        self.assertEqual(len(self.server.hits), 6)
+
+        with self.assertRaises(llm.LLMUnavailable):
+            self._complete()
+        self.assertEqual(len(self.server.hits), 6)
+
+        with patch("api.outbound.time.time", return_value=cache.get("circuit:deepseek:open-until") + 1):
+            self.assertEqual(self._complete(), json.dumps(REFINED))
+        self.assertEqual(llm.deepseek.breaker.allow(), "closed")
+
+    def test_streaming_through_pool(self):
+        """Respostas em streaming usam o mesmo cliente."""
+        text = "".join(llm.chat_completion_stream([{"role": "user", "content": "oi"}], operation="agent"))
+
+        self.assertEqual(json.loads(text), REFINED)
+
+    def test_latency_per_endpoint(self):
+        """Cada tentativa vai para o histograma do endpoint com seu desfecho."""
+        self.server.statuses = [502]
+        self._complete()
+
+        rendered = llm.deepseek.latency.render()
+        for outcome in ("ok", "http_error"):
+            self.assertIn(
+                f'outbound_deepseek_request_seconds_count{{endpoint="chat_completions",outcome="{outcome}"}} 1', rendered
+            )
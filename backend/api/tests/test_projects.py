@@ -0,0 +1,161 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Image, Project, ProjectImage
+from api.project_list import PROJECT_PREVIEW_LIMIT
+from tests.utils import create_user
+
+
+class ProjectBulkEditTests(APITestCase):
+    """Reordenacao e inclusao/remocao em lote: custo fixo em queries."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="curator@example.com", username="curator")
+        self.client.force_authenticate(user=self.user)
+        self.project = Project.objects.create(user=self.user, title="Farois")
+        self.images = Image.objects.bulk_create(Image(user=self.user, prompt=f"farol {i}") for i in range(60))
+        ProjectImage.objects.bulk_create(
+            ProjectImage(project=self.project, image=image, order=order) for order, image in enumerate(self.images[:40])
+        )
+
+    def _order(self):
+        return list(ProjectImage.objects.filter(project=self.project).values_list("image_id", flat=True))
+
+    def _queries(self, method, name, data):
+        url = reverse(name, kwargs={"pk": self.project.pk})
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, format="json")
+        return response, len(ctx.captured_queries)
+
+    def test_reorder_is_set_based(self):
+        """Reordenar 10 ou 40 imagens custa as mesmas queries."""
+        ids = [image.id for image in self.images[:40]]
+
+        _, small = self._queries("patch", "project-reorder", {"image_ids": ids[:10][::-1]})
+        response, large = self._queries("patch", "project-reorder", {"image_ids": ids[::-1]})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(small, large)
+        self.assertEqual(self._order(), ids[::-1])
+
+    def test_reorder_ignores_foreign_and_duplicate_ids(self):
+        ids = [image.id for image in self.images[:40]]
+        outsider = self.images[50].id
+
+        response = self.client.patch(
+            reverse("project-reorder", kwargs={"pk": self.project.pk}),
+            {"image_ids": [ids[1], outsider, ids[0], ids[1]]},
+            format="json",
+        )
+
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(self._order()[:2], [ids[1], ids[0]])
+
+    def test_bulk_add_appends_in_order(self):
+        """Novas imagens vao para o fim; as que ja estao no projeto sao puladas."""
+        new_ids = [image.id for image in self.images[40:60]]
+
+        response, queries = self._queries(
+            "post", "project-images-bulk-add", {"image_ids": [*new_ids, self.images[0].id], "caption": "lote"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["added"], new_ids)
+        self.assertEqual(response.data["skipped"], [self.images[0].id])
+        self.assertEqual(self._order()[40:], new_ids)
+        self.assertLessEqual(queries, 7)
+
+    def test_bulk_add_rejects_foreign_images(self):
+        """Um id de outro usuario invalida o lote inteiro."""
+        other = create_user(email="other@example.com", username="other")
+        foreign = Image.objects.create(user=other, prompt="alheia")
+
+        response = self.client.post(
+            reverse("project-images-bulk-add", kwargs={"pk": self.project.pk}),
+            {"image_ids": [self.images[45].id, foreign.id]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(foreign.id), str(response.data["image_ids"]))
+        self.assertEqual(len(self._order()), 40)
+
+    def test_bulk_remove(self):
+        ids = [image.id for image in self.images[:30]]
+
+        response, queries = self._queries("post", "project-images-bulk-remove", {"image_ids": ids})
+
+        self.assertEqual(response.data, {"removed": 30})
+        self.assertEqual(len(self._order()), 10)
+        self.assertEqual(queries, 2)
+        self.assertEqual(Image.objects.filter(id__in=ids).count(), 30)
+
+    def test_bulk_endpoints_are_scoped_to_owner(self):
+        intruder = create_user(email="intruder@example.com", username="intruder")
+        self.client.force_authenticate(user=intruder)
+
+        response = self.client.post(
+            reverse("project-images-bulk-remove", kwargs={"pk": self.project.pk}),
+            {"image_ids": [self.images[0].id]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(self._order()), 40)
+
+
+class ProjectListTests(APITestCase):
+    """Listagens: contagem anotada e no maximo PROJECT_PREVIEW_LIMIT miniaturas por projeto."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="lister@example.com", username="lister")
+        self.client.force_authenticate(user=self.user)
+
+    def _project(self, size, **fields):
+        project = Project.objects.create(user=self.user, title=f"{size} imagens", **fields)
+        images = Image.objects.bulk_create(
+            Image(user=self.user, prompt=f"img {i}", image=f"generated_images/{project.pk}-{i}.png") for i in range(size)
+        )
+        ProjectImage.objects.bulk_create(
+            ProjectImage(project=project, image=image, order=size - i) for i, image in enumerate(images)
+        )
+        return project, images
+
+    def test_previews_and_counts(self):
+        big, big_images = self._project(30)
+        small, small_images = self._project(2)
+        self._project(0)
+
+        response = self.client.get(reverse("project-list-create"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        by_id = {item["id"]: item for item in response.data}
+        self.assertEqual(by_id[str(big.pk)]["image_count"], 30)
+        # Ordem do projeto (campo order), nao de criacao.
+        self.assertEqual(
+            [preview["id"] for preview in by_id[str(big.pk)]["previews"]],
+            [image.id for image in big_images[::-1][:PROJECT_PREVIEW_LIMIT]],
+        )
+        self.assertTrue(by_id[str(big.pk)]["previews"][0]["image_url"].startswith("http://testserver/media/"))
+        self.assertEqual(len(by_id[str(small.pk)]["previews"]), 2)
+        self.assertNotIn("images", by_id[str(small.pk)])
+
+    def test_query_count_independent_of_project_size(self):
+        for size in (1, 5, 40):
+            self._project(size, is_public=True)
+
+        with CaptureQueriesContext(connection) as private:
+            self.client.get(reverse("project-list-create"))
+        self.client.force_authenticate(user=None)
+        with CaptureQueriesContext(connection) as public:
+            response = self.client.get(reverse("public-projects"))
+
+        self.assertEqual(len(private.captured_queries), 3)
+        self.assertEqual(len(public.captured_queries), 4)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(sorted(item["image_count"] for item in response.data["results"]), [1, 5, 40])
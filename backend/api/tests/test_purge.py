@@ -0,0 +1,199 @@
+import os
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import (
+    Character,
+    CharacterReference,
+    CommentLike,
+    CreativeSession,
+    Image,
+    ImageComment,
+    ImageLike,
+    Project,
+    ProjectImage,
+    SessionMessage,
+)
+from api.purge import purge_user, soft_delete_user, sweep_orphan_files
+from api.tasks import sweep_orphan_media
+from tests.mixins import TemporaryMediaMixin
+from tests.utils import create_user
+
+User = get_user_model()
+
+
+def _age(name, seconds):
+    """Recua o mtime do arquivo ``name`` em ``seconds``."""
+    path = default_storage.path(name)
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+class DeleteAccountViewTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="leaving@example.com", username="leaving")
+        self.image = Image.objects.create(user=self.user, prompt="adeus", is_public=True)
+        self.project = Project.objects.create(user=self.user, title="Fim", is_public=True)
+        self.client.force_authenticate(user=self.user)
+
+    @patch("api.signals.purge_user_task.delay")
+    def test_soft_deletes_and_enqueues_purge(self, mock_delay):
+        response = self.client.delete(
+            reverse("authentication:delete_account"), {"password": "Str0ngPass!"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_delay.assert_called_once_with(str(self.user.pk))
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.deleted_at)
+        self.assertNotEqual(self.user.email, "leaving@example.com")
+        # Linhas continuam ate o purge, mas fora das listagens publicas.
+        self.assertFalse(Image.objects.get(pk=self.image.pk).is_public)
+        self.assertFalse(Project.objects.get(pk=self.project.pk).is_public)
+
+    @patch("api.signals.purge_user_task.delay")
+    def test_wrong_password_keeps_account(self, mock_delay):
+        response = self.client.delete(
+            reverse("authentication:delete_account"), {"password": "errada"}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_delay.assert_not_called()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)
+
+    @patch("api.signals.purge_user_task.delay")
+    def test_email_is_free_right_away(self, mock_delay):
+        self.client.delete(reverse("authentication:delete_account"), {"password": "Str0ngPass!"}, format="json")
+
+        create_user(email="leaving@example.com", username="leaving")
+
+        self.assertEqual(User.objects.filter(email="leaving@example.com").count(), 1)
+
+
+class PurgeUserTests(TemporaryMediaMixin, TestCase):
+    """Purge em lotes: linhas e arquivos do usuario saem, o resto fica."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="gone@example.com", username="gone")
+        self.other = create_user(email="stays@example.com", username="stays")
+        self.other_image = Image.objects.create(user=self.other, prompt="fica")
+
+        self.files = []
+        self.images = []
+        for i in range(7):
+            image = Image.objects.create(user=self.user, prompt=f"img {i}", status=Image.Status.READY)
+            image.image.save(f"{i}.png", ContentFile(b"png"), save=True)
+            self.images.append(image)
+            self.files.append(image.image.name)
+        character = Character.objects.create(user=self.user, name="Heroina")
+        reference = CharacterReference(character=character)
+        reference.image.save("ref.png", ContentFile(b"ref"), save=True)
+        self.files.append(reference.image.name)
+        avatar = default_storage.save(f"avatars/{self.user.pk}-me.png", ContentFile(b"avatar"))
+        self.files.append(avatar)
+        self.user.profile_picture = default_storage.url(avatar)
+        self.user.save(update_fields=["profile_picture"])
+
+        session = CreativeSession.objects.create(user=self.user, title="Ideias")
+        SessionMessage.objects.bulk_create(
+            SessionMessage(session=session, role=SessionMessage.Role.USER, text=f"m{i}") for i in range(5)
+        )
+        project = Project.objects.create(user=self.user, title="Meu")
+        ProjectImage.objects.create(project=project, image=self.images[0])
+        others_project = Project.objects.create(user=self.other, title="Dele", cover_image=self.images[1])
+        ProjectImage.objects.create(project=others_project, image=self.images[1])
+        ImageLike.objects.create(image=self.other_image, user=self.user)
+        comment = ImageComment.objects.create(image=self.other_image, user=self.user, text="oi")
+        CommentLike.objects.create(comment=comment, user=self.other)
+        ImageComment.objects.create(image=self.other_image, user=self.other, text="resposta", parent=comment)
+        ImageComment.objects.create(image=self.images[2], user=self.other, text="linda")
+
+    def test_purge_removes_rows_and_files(self):
+        soft_delete_user(self.user)
+
+        self.assertTrue(purge_user(self.user.pk, chunk_size=3))
+
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        for model in (Image, Character, CharacterReference, CreativeSession, SessionMessage):
+            self.assertFalse(model.objects.exclude(pk=self.other_image.pk).exists(), model.__name__)
+        self.assertEqual(list(Project.objects.values_list("title", flat=True)), ["Dele"])
+        self.assertIsNone(Project.objects.get(title="Dele").cover_image)
+        self.assertFalse(ProjectImage.objects.exists())
+        self.assertFalse(ImageComment.objects.exists())
+        self.assertFalse(ImageLike.objects.exists())
+        for name in self.files:
+            self.assertFalse(default_storage.exists(name), name)
+        self.assertTrue(Image.objects.filter(pk=self.other_image.pk).exists())
+
+    def test_storage_errors_do_not_stop_purge(self):
+        soft_delete_user(self.user)
+        with patch("api.purge.default_storage.delete", side_effect=OSError("disco")):
+            self.assertTrue(purge_user(self.user.pk, chunk_size=3))
+
+        self.assertFalse(purge_user(self.user.pk))
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_active_accounts_are_not_purged(self):
+        self.assertFalse(purge_user(self.user.pk))
+        self.assertEqual(Image.objects.filter(user=self.user).count(), 7)
+
+
+class OrphanSweepTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="sweep@example.com", username="sweep")
+        self.image = Image.objects.create(user=self.user, prompt="viva", status=Image.Status.READY)
+        self.image.image.save("kept.png", ContentFile(b"png"), save=True)
+        avatar = default_storage.save(f"avatars/{self.user.pk}-atual.png", ContentFile(b"a"))
+        self.user.profile_picture = default_storage.url(avatar)
+        self.user.save(update_fields=["profile_picture"])
+        self.referenced = [self.image.image.name, avatar]
+        self.orphans = [
+            default_storage.save(f"users/{self.user.pk}/images/falhou.png", ContentFile(b"x")),
+            default_storage.save(f"avatars/{self.user.pk}-antigo.png", ContentFile(b"x")),
+            default_storage.save("characters/sumiu/refs/ref.png", ContentFile(b"x")),
+        ]
+        self.outside = default_storage.save("outros/nao-mexer.png", ContentFile(b"x"))
+        for name in self.referenced + self.orphans + [self.outside]:
+            _age(name, 2 * 60 * 60)
+        self.recent = default_storage.save(f"users/{self.user.pk}/images/gerando.png", ContentFile(b"x"))
+
+    def test_removes_only_old_unreferenced_files(self):
+        removed = sweep_orphan_files(batch_size=2)
+
+        self.assertEqual(removed, 3)
+        for name in self.orphans:
+            self.assertFalse(default_storage.exists(name), name)
+        for name in self.referenced + [self.outside, self.recent]:
+            self.assertTrue(default_storage.exists(name), name)
+
+    def test_dry_run_keeps_files(self):
+        self.assertEqual(sweep_orphan_files(dry_run=True), 3)
+        for name in self.orphans:
+            self.assertTrue(default_storage.exists(name), name)
+
+    @patch("api.tasks.purge_user_task.delay")
+    def test_task_requeues_stalled_purges(self, mock_delay):
+        gone = create_user(email="stalled@example.com", username="stalled")
+        soft_delete_user(gone)
+        User.objects.filter(pk=gone.pk).update(deleted_at=timezone.now() - timedelta(days=1))
+        fresh = create_user(email="fresh@example.com", username="fresh")
+        soft_delete_user(fresh)
+
+        self.assertEqual(sweep_orphan_media(), 3)
+
+        mock_delay.assert_called_once_with(str(gone.pk))
@@ -0,0 +1,228 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Image
+from api.quota import period_start, quota_state, refund_generations, reserve_generations
+from api.tasks import generate_image_task
+from tests.utils import capture_logger, create_user
+
+
+class QuotaReservationTests(TestCase):
+    """Reserva atomica: um UPDATE condicional, virada de mes e devolucao."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = create_user(
+            email="quota@example.com",
+            username="quota",
+            plan="free",
+            image_generation_count=18,
+            last_reset_date=period_start(),
+        )
+
+    def _stored_count(self):
+        self.user.refresh_from_db(fields=["image_generation_count", "last_reset_date"])
+        return self.user.image_generation_count
+
+    def test_reserve_is_a_single_query(self):
+        """Reserva dentro da cota custa uma query e atualiza o objeto em memoria."""
+        with self.assertNumQueries(1):
+            self.assertTrue(reserve_generations(self.user))
+        self.assertEqual(self.user.image_generation_count, 19)
+        self.assertEqual(self._stored_count(), 19)
+
+    def test_reserve_never_overshoots(self):
+        """Pedido que nao cabe inteiro na cota e recusado sem alterar o contador."""
+        self.assertFalse(reserve_generations(self.user, 3))
+        self.assertEqual(self._stored_count(), 18)
+        self.assertTrue(reserve_generations(self.user, 2))
+        self.assertFalse(reserve_generations(self.user))
+        self.assertEqual(self._stored_count(), 20)
+
+    def test_monthly_rollover_in_same_statement(self):
+        """Contador de um mes anterior zera antes de somar a reserva."""
+        last_month = period_start() - timedelta(days=1)
+        type(self.user).objects.filter(pk=self.user.pk).update(
+            image_generation_count=20, last_reset_date=last_month
+        )
+
+        self.assertTrue(reserve_generations(self.user, 4))
+
+        self.assertEqual(self._stored_count(), 4)
+        self.assertEqual(self.user.last_reset_date, period_start())
+
+    @override_settings(PLAN_QUOTAS={"free": 20, "studio": None})
+    def test_unlimited_plan(self):
+        """Plano sem cota sempre reserva, mas o contador continua andando."""
+        type(self.user).objects.filter(pk=self.user.pk).update(plan="studio", image_generation_count=500)
+        self.user.plan = "studio"
+
+        self.assertTrue(reserve_generations(self.user, 10))
+        self.assertEqual(self._stored_count(), 510)
+
+    def test_refund_only_for_current_period(self):
+        """Devolucao vale no periodo da reserva e nunca deixa o contador negativo."""
+        self.assertTrue(refund_generations(self.user.pk))
+        self.assertEqual(self._stored_count(), 17)
+
+        self.assertFalse(refund_generations(self.user.pk, period=period_start() - timedelta(days=40)))
+        self.assertFalse(refund_generations(self.user.pk, count=50))
+        self.assertEqual(self._stored_count(), 17)
+
+
+class QuotaStateCacheTests(TestCase):
+    """Estado da cota em cache com write-through da reserva."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = create_user(
+            email="state@example.com",
+            username="state",
+            plan="free",
+            image_generation_count=19,
+            last_reset_date=period_start(),
+        )
+
+    def test_state_derived_from_user_without_queries(self):
+        """Cache frio: estado sai dos campos ja carregados do usuario."""
+        with self.assertNumQueries(0):
+            state = quota_state(self.user)
+        self.assertEqual(
+            state,
+            {"plan": "free", "quota": 20, "used": 19, "remaining": 1, "period_start": period_start()},
+        )
+
+    def test_reservation_writes_through(self):
+        """Objeto de usuario carregado antes da reserva ve o estado novo pelo cache."""
+        stale = type(self.user).objects.get(pk=self.user.pk)
+        quota_state(stale)
+
+        reserve_generations(self.user)
+
+        self.assertEqual(quota_state(stale)["remaining"], 0)
+
+    def test_previous_period_state_is_discarded(self):
+        """Estado de um mes anterior vira contador zerado no periodo atual."""
+        last_period = (period_start() - timedelta(days=1)).replace(day=1)
+        self.user.last_reset_date = last_period
+        with patch("api.quota.period_start", return_value=last_period):
+            self.assertEqual(quota_state(self.user)["used"], 19)
+
+        state = quota_state(self.user)
+        self.assertEqual(state["used"], 0)
+        self.assertEqual(state["period_start"], period_start())
+
+    def test_plan_change_recomputes(self):
+        """Upgrade de plano nao espera o TTL do cache."""
+        quota_state(self.user)
+        self.user.plan = "pro"
+
+        self.assertEqual(quota_state(self.user)["remaining"], 31)
+
+    def test_refund_invalidates_state(self):
+        """Devolucao descarta o estado em cache."""
+        reserve_generations(self.user)
+        refund_generations(self.user.pk)
+        self.user.refresh_from_db()
+
+        self.assertEqual(quota_state(self.user)["remaining"], 1)
+
+
+class GenerationRefundTests(TestCase):
+    @patch("api.tasks.InferenceClient")
+    def test_failed_generation_refunds_once(self, mock_client):
+        """Falha no worker devolve a cota; reentrega da task nao devolve de novo."""
+        user = create_user(
+            email="refund@example.com",
+            username="refund",
+            image_generation_count=5,
+            last_reset_date=period_start(),
+        )
+        image = Image.objects.create(user=user, prompt="will fail")
+        mock_client.return_value.text_to_image.side_effect = RuntimeError("boom")
+
+        with capture_logger("api.tasks"):
+            generate_image_task(image.id)
+            generate_image_task(image.id)
+
+        user.refresh_from_db()
+        image.refresh_from_db()
+        self.assertEqual(image.status, Image.Status.FAILED)
+        self.assertEqual(image.retry_count, 2)
+        self.assertEqual(user.image_generation_count, 4)
+
+
+@patch("api.views.generate_image_task.delay")
+class GeneratingEndpointsQuotaTests(APITestCase):
+    """Todos os endpoints que geram imagem passam pela mesma reserva."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = create_user(
+            email="endpoints@example.com",
+            username="endpoints",
+            plan="free",
+            image_generation_count=19,
+            last_reset_date=period_start(),
+        )
+        self.source = Image.objects.create(user=self.user, prompt="source", status=Image.Status.READY)
+        self.client.force_authenticate(user=self.user)
+
+    def _count(self):
+        self.user.refresh_from_db(fields=["image_generation_count"])
+        return self.user.image_generation_count
+
+    def test_variations_reserve_whole_batch(self, mock_delay):
+        """Lote que estoura a cota e recusado inteiro; nenhuma imagem e criada."""
+        url = reverse("image-variations", kwargs={"pk": self.source.pk})
+
+        response = self.client.post(url, {"count": 2}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self._count(), 19)
+        self.assertEqual(Image.objects.count(), 1)
+        mock_delay.assert_not_called()
+
+    def test_restyle_consumes_last_slot(self, mock_delay):
+        """Restyle reserva a ultima geracao; a seguinte recebe 429."""
+        url = reverse("image-restyle", kwargs={"pk": self.source.pk})
+
+        first = self.client.post(url, {"style": "anime"}, format="json")
+        second = self.client.post(url, {"style": "anime"}, format="json")
+
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(second.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self._count(), 20)
+        mock_delay.assert_called_once()
+
+    def test_throttle_rejects_before_touching_database(self, mock_delay):
+        """Cota esgotada no cache: 429 direto do throttle, sem queries."""
+        reserve_generations(self.user)
+
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse("generate-image"), {"prompt": "one more"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        mock_delay.assert_not_called()
+
+    def test_quota_endpoint_reads_cache(self, mock_delay):
+        """GET /users/me/quota/ responde do cache, sem banco."""
+        self.client.post(reverse("image-restyle", kwargs={"pk": self.source.pk}), {"style": "anime"}, format="json")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("user-quota"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["used"], 20)
+        self.assertEqual(response.data["remaining"], 0)
+        self.assertEqual(response.data["quota"], 20)
+        self.assertEqual(response.data["period_start"], period_start().isoformat())
@@ -0,0 +1,191 @@
+from io import BytesIO
+from unittest.mock import patch
+
+import numpy as np
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase
+from PIL import Image as PILImage
+from rest_framework.test import APITestCase
+
+from api.models import Image, ImageEmbedding, StyleCluster, UserStyleProfile
+from api.style_clusters import cluster_suggestions, cluster_user_styles, mini_batch_kmeans, record_embedding
+from api.tasks import create_embeddings_task
+from tests.mixins import TemporaryMediaMixin
+from tests.utils import create_user
+
+STYLES = ("watercolor", "cyberpunk", "pixel art")
+
+
+def _blobs(sizes, dim=768, seed=0):
+    """Vetores normalizados em torno de centros ortogonais, um grupo por tamanho."""
+    rng = np.random.default_rng(seed)
+    vectors = []
+    for index, size in enumerate(sizes):
+        center = np.zeros(dim)
+        center[index] = 1.0
+        points = center + rng.normal(scale=0.02, size=(size, dim))
+        vectors.append(points / np.linalg.norm(points, axis=1, keepdims=True))
+    return np.vstack(vectors)
+
+
+class MiniBatchKMeansTests(SimpleTestCase):
+    def test_recovers_separated_groups(self):
+        X = _blobs((40, 30, 20)).astype(np.float32)
+
+        centers, labels = mini_batch_kmeans(X, 3, np.random.default_rng(1), batch_size=32)
+
+        self.assertEqual(centers.shape, (3, 768))
+        groups = [set(labels[:40]), set(labels[40:70]), set(labels[70:])]
+        self.assertTrue(all(len(group) == 1 for group in groups))
+        self.assertEqual(len(set().union(*groups)), 3)
+
+
+class StyleClusterTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="clusters@example.com", username="clusters")
+
+    def _embed(self, vectors, style):
+        images = []
+        for i, vector in enumerate(vectors):
+            image = Image.objects.create(user=self.user, prompt=f"{style} harbor scene {i}", status=Image.Status.READY)
+            ImageEmbedding.objects.create(image=image, image_embedding_json=[float(v) for v in vector])
+            images.append(image)
+        return images
+
+    def _populate(self, sizes=(8, 6, 4)):
+        vectors = _blobs(sizes)
+        start = 0
+        for size, style in zip(sizes, STYLES):
+            self._embed(vectors[start:start + size], style)
+            start += size
+
+    def test_clusters_are_labelled_with_medoid_examples(self):
+        self._populate()
+
+        cluster_user_styles(self.user.id)
+
+        clusters = list(StyleCluster.objects.filter(user=self.user))
+        self.assertEqual([c.label for c in clusters], list(STYLES))
+        self.assertEqual([c.size for c in clusters], [8, 6, 4])
+        self.assertEqual(UserStyleProfile.objects.get(user=self.user).clustered_count, 18)
+        for cluster in clusters:
+            # Medoide = membro mais proximo da media (cosseno).
+            members = ImageEmbedding.objects.filter(image__prompt__startswith=cluster.label)
+            best = max(members, key=lambda e: np.dot(e.image_embedding_json, cluster.centroid))
+            self.assertEqual(cluster.example_image_id, best.image_id)
+
+    def test_suggestions_are_one_query_and_skip_deleted_examples(self):
+        self._populate()
+        cluster_user_styles(self.user.id)
+        Image.objects.filter(pk=StyleCluster.objects.get(label="cyberpunk").example_image_id).delete()
+
+        with self.assertNumQueries(1):
+            suggestions = cluster_suggestions(self.user.id)
+
+        self.assertEqual([s["label"] for s in suggestions], ["Watercolor", "Pixel Art"])
+        self.assertEqual(suggestions[0]["frequency"], 8)
+        self.assertAlmostEqual(suggestions[0]["confidence"], 8 / 18)
+
+    def test_too_few_embeddings_leave_no_clusters(self):
+        self._embed(_blobs((3,)), "watercolor")
+
+        self.assertEqual(cluster_user_styles(self.user.id), [])
+        self.assertFalse(StyleCluster.objects.filter(user=self.user).exists())
+
+    def test_new_embedding_joins_nearest_cluster(self):
+        self._populate()
+        cluster_user_styles(self.user.id)
+        [image] = self._embed(_blobs((0, 1), seed=7), "cyberpunk")
+
+        needs_refit = record_embedding(image, ImageEmbedding.objects.get(image=image).image_embedding_json)
+
+        self.assertFalse(needs_refit)
+        self.assertEqual(StyleCluster.objects.get(label="cyberpunk").size, 7)
+        self.assertEqual(StyleCluster.objects.get(label="watercolor").size, 8)
+
+    def test_refit_is_requested_when_collection_doubles(self):
+        self._populate()
+        cluster_user_styles(self.user.id)
+        UserStyleProfile.objects.filter(user=self.user).update(clustered_count=9)
+        [image] = self._embed(_blobs((1,), seed=3), "watercolor")
+
+        self.assertTrue(record_embedding(image, ImageEmbedding.objects.get(image=image).image_embedding_json))
+
+
+class StyleClusterEndpointTests(APITestCase):
+    def test_endpoint_serves_clusters_before_term_profile(self):
+        user = create_user(email="endpoint@example.com", username="endpoint")
+        vectors = _blobs((4, 3))
+        for i, vector in enumerate(vectors):
+            style = "watercolor" if i < 4 else "cyberpunk"
+            image = Image.objects.create(user=user, prompt=f"{style} study {i}", status=Image.Status.READY)
+            ImageEmbedding.objects.create(image=image, image_embedding_json=vector.tolist())
+        cluster_user_styles(user.id)
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get("/api/users/me/style-suggestions/")
+
+        self.assertEqual([r["label"] for r in response.data["results"]], ["Watercolor", "Cyberpunk"])
+        self.assertEqual(response.data["results"][0]["frequency"], 4)
+
+    @patch("api.tasks.cluster_styles_task.delay")
+    def test_bulk_delete_schedules_refit(self, mock_delay):
+        cache.clear()
+        user = create_user(email="refit@example.com", username="refit")
+        vectors = _blobs((4, 3))
+        for i, vector in enumerate(vectors):
+            image = Image.objects.create(user=user, prompt=f"study {i}", status=Image.Status.READY)
+            ImageEmbedding.objects.create(image=image, image_embedding_json=vector.tolist())
+        cluster_user_styles(user.id)
+        medoid = StyleCluster.objects.filter(user=user).first().example_image_id
+        self.client.force_authenticate(user=user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/images/bulk/delete/", {"image_ids": [medoid]}, format="json")
+
+        mock_delay.assert_called_once_with(str(user.id))
+
+
+@patch("api.tasks.EMBEDDINGS_ENABLED", True)
+@patch("api.tasks.cluster_styles_task.delay")
+@patch("api.tasks.generate_text_embedding", return_value=None)
+@patch("api.tasks.generate_image_embedding")
+class CreateEmbeddingsSchedulesClusteringTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = create_user(email="schedule@example.com", username="schedule")
+        self.vectors = _blobs((4, 4)).tolist()
+
+    def _generate(self, index):
+        image = Image.objects.create(user=self.user, prompt=f"study {index}", status=Image.Status.READY)
+        image.image.save("study.png", ContentFile(_png()), save=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_embeddings_task(image.id)
+
+    def test_first_fit_is_scheduled_once_at_minimum(self, mock_image, mock_text, mock_delay):
+        mock_image.side_effect = self.vectors
+        for index in range(8):
+            self._generate(index)
+
+        # Minimo (6) atingido na sexta imagem; as seguintes esperam o ajuste em andamento.
+        mock_delay.assert_called_once_with(str(self.user.id))
+
+    def test_existing_clusters_are_updated_incrementally(self, mock_image, mock_text, mock_delay):
+        mock_image.side_effect = self.vectors
+        for index in range(7):
+            self._generate(index)
+        cluster_user_styles(self.user.id)
+        before = sum(StyleCluster.objects.filter(user=self.user).values_list("size", flat=True))
+
+        self._generate(7)
+
+        self.assertEqual(sum(StyleCluster.objects.filter(user=self.user).values_list("size", flat=True)), before + 1)
+
+
+def _png():
+    buffer = BytesIO()
+    PILImage.new("RGB", (8, 8)).save(buffer, format="PNG")
+    return buffer.getvalue()
@@ -0,0 +1,120 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase
+from PIL import Image as PILImage
+
+from api import style_profile
+from api.models import Image, UserStyleProfile
+from api.style_profile import PhraseMatcher, extract_terms, forget_prompts, record_prompt, style_suggestions
+from api.tasks import generate_image_task
+from tests.mixins import TemporaryMediaMixin
+from tests.utils import create_user
+
+
+class PhraseMatcherTests(SimpleTestCase):
+    def test_finds_overlapping_phrases_in_one_pass(self):
+        matcher = PhraseMatcher(["he", "she", "his", "hers"])
+
+        self.assertEqual(matcher.find("ushers he his"), {"he", "his"})
+        self.assertEqual(PhraseMatcher(["she", "he", "hers"]).find("she hers"), {"she", "hers"})
+
+    def test_only_matches_whole_words(self):
+        terms = extract_terms("A START of Dramatic Lighting, oil painting; golden-hour, sci-fi")
+
+        self.assertIn("dramatic lighting", terms)
+        self.assertIn("dramatic", terms)
+        self.assertIn("oil painting", terms)
+        self.assertIn("sci-fi", terms)
+        self.assertNotIn("golden hour", terms)
+        self.assertNotIn("art", terms)
+        self.assertNotIn("the", extract_terms("the lighthouse"))
+
+
+class StyleProfileTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="profile@example.com", username="profile")
+
+    def _ready(self, prompt):
+        image = Image.objects.create(user=self.user, prompt=prompt, status=Image.Status.READY)
+        record_prompt(image)
+        return image
+
+    def test_profile_is_built_then_updated_incrementally(self):
+        # Historico anterior ao perfil entra no primeiro rebuild.
+        Image.objects.create(user=self.user, prompt="cinematic harbor", status=Image.Status.READY)
+        Image.objects.create(user=self.user, prompt="cinematic cinematic", status=Image.Status.GENERATING)
+
+        self._ready("Cinematic portrait, golden hour")
+        latest = self._ready("watercolor portrait at golden hour")
+
+        profile = UserStyleProfile.objects.get(user=self.user)
+        self.assertEqual(profile.prompt_count, 3)
+        self.assertEqual(profile.terms["cinematic"][0], 2)
+        # Exemplo = imagem mais recente com o termo.
+        self.assertEqual(profile.terms["golden hour"], [2, latest.id])
+        self.assertEqual(profile.terms["portrait"][0], 2)
+
+    def test_suggestions_cost_does_not_grow_with_history(self):
+        for i in range(3):
+            self._ready(f"oil painting of a cinematic harbor {i}")
+        with self.assertNumQueries(2):
+            small = style_suggestions(self.user.id)
+        for i in range(40):
+            self._ready(f"oil painting of a cinematic harbor {i}")
+        with self.assertNumQueries(2):
+            large = style_suggestions(self.user.id, limit=3)
+
+        self.assertEqual([s["label"] for s in small][:2], ["Cinematic", "Oil Painting"])
+        self.assertEqual(len(large), 3)
+        self.assertEqual(large[0]["frequency"], 43)
+        self.assertEqual(large[0]["confidence"], 1.0)
+
+    def test_deleted_example_is_skipped(self):
+        """Exemplo apagado sem passar pelo perfil: outra imagem com o termo assume."""
+        first = self._ready("neon alley")
+        self._ready("neon market")
+        last = self._ready("neon harbor")
+        Image.objects.filter(pk__in=[first.pk, last.pk]).delete()
+
+        suggestions = {s["label"]: s for s in style_suggestions(self.user.id)}
+
+        self.assertIn("Neon", suggestions)
+        self.assertEqual(suggestions["Neon"]["example_prompt"], "neon market")
+
+    def test_forgotten_prompts_are_discounted(self):
+        self._ready("neon alley")
+        second = self._ready("neon market")
+        last = self._ready("neon harbor")
+        Image.objects.filter(pk=last.pk).delete()
+
+        forget_prompts(self.user.id, [(last.id, last.prompt)])
+
+        profile = UserStyleProfile.objects.get(user=self.user)
+        self.assertEqual(profile.prompt_count, 2)
+        self.assertEqual(profile.terms["neon"][0], 2)
+        self.assertNotIn("harbor", profile.terms)
+        self.assertEqual(profile.terms["neon"][1], second.id)
+
+    def test_rare_words_are_pruned(self):
+        with patch.object(style_profile, "MAX_TERMS", 4):
+            for i in range(6):
+                self._ready(f"neon word{'abcdefghij'[i]}x extra{'abcdefghij'[i]}y")
+
+        terms = UserStyleProfile.objects.get(user=self.user).terms
+        self.assertIn("neon", terms)
+        self.assertLessEqual(len(terms), 2 * 4 + 1)
+
+
+@patch("api.tasks.create_embeddings_task.delay")
+@patch("api.tasks.InferenceClient")
+class GenerateImageUpdatesProfileTests(TemporaryMediaMixin, TestCase):
+    def test_ready_image_updates_profile(self, mock_client, mock_embeddings):
+        user = create_user(email="gen@example.com", username="gen")
+        image = Image.objects.create(user=user, prompt="pixel art castle")
+        mock_client.return_value.text_to_image.return_value = PILImage.new("RGB", (8, 8))
+
+        generate_image_task(image.id)
+
+        profile = UserStyleProfile.objects.get(user=user)
+        self.assertEqual(profile.terms["pixel art"], [1, image.id])
@@ -0,0 +1,169 @@
+from time import perf_counter
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework import throttling
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIRequestFactory
+
+from api.throttles import AnonRateThrottle, ScopedRateThrottle, UserRateThrottle
+
+RATES = {"bench": "5/minute", "burst": "5000/hour"}
+
+
+class _ScopedView:
+    throttle_scope = "bench"
+
+
+class _FakeRedis:
+    """Cliente minimo (INCR/EXPIRE/GET/DECR + pipeline) para o caminho Redis."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttl = {}
+
+    def get_client(self, key, write=False):
+        return self
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+    def incr(self, key):
+        self.data[key] = self.data.get(key, 0) + 1
+        return self.data[key]
+
+    def decr(self, key):
+        self.data[key] -= 1
+        return self.data[key]
+
+    def expire(self, key, seconds):
+        self.ttl[key] = seconds
+        return True
+
+    def get(self, key):
+        value = self.data.get(key)
+        return None if value is None else str(value).encode()
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.calls.append((name, args))
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.calls]
+
+
+@patch.object(ScopedRateThrottle, "THROTTLE_RATES", RATES)
+class SlidingWindowThrottleTests(SimpleTestCase):
+    """Janela deslizante por contadores: limite, peso da janela anterior e wait."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.request = Request(APIRequestFactory().get("/", REMOTE_ADDR="10.0.0.1"))
+        self.now = 60 * 1000.0  # inicio exato de uma janela de 60s
+
+    def _hit(self, at):
+        throttle = ScopedRateThrottle()
+        throttle.timer = lambda: at
+        return throttle, throttle.allow_request(self.request, _ScopedView())
+
+    def test_allows_limit_then_rejects(self):
+        """Cinco requests passam, o sexto recebe throttle."""
+        results = [self._hit(self.now + i)[1] for i in range(6)]
+        self.assertEqual(results, [True] * 5 + [False])
+
+    def test_rejected_requests_do_not_count(self):
+        """Rejeicoes nao consomem a janela, como no SimpleRateThrottle."""
+        for i in range(5):
+            self._hit(self.now + i)
+        for _ in range(10):
+            self._hit(self.now + 10)
+
+        throttle, allowed = self._hit(self.now + 30)
+        self.assertFalse(allowed)
+        self.assertEqual(throttle.current, 5)
+
+    def test_previous_window_weight_decays(self):
+        """Na janela seguinte a anterior pesa pelo tempo que falta."""
+        for i in range(5):
+            self._hit(self.now + i)
+
+        # 12s dentro da proxima janela: 5 * 48/60 = 4 -> cabe mais um.
+        self.assertTrue(self._hit(self.now + 72)[1])
+        self.assertFalse(self._hit(self.now + 72)[1])
+        # Janela anterior ja sem peso nenhum depois de dois periodos.
+        self.assertTrue(self._hit(self.now + 121)[1])
+
+    def test_wait_points_to_next_free_slot(self):
+        """wait() indica quando o proximo request cabe na estimativa."""
+        for i in range(5):
+            self._hit(self.now + i)
+        throttle, allowed = self._hit(self.now + 30)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 30 + 60 * (1 - 4 / 5))
+
+        later, allowed = self._hit(self.now + 70)
+        self.assertFalse(allowed)
+        # 5 * (60 - 10 - x) / 60 + 1 <= 5  ->  x = 2
+        self.assertAlmostEqual(later.wait(), 2)
+        self.assertTrue(self._hit(self.now + 72)[1])
+
+    def test_redis_path_uses_single_pipeline(self):
+        """Com RedisCache o hit e um pipeline INCR+EXPIRE+GET; rejeicao faz DECR."""
+        fake = _FakeRedis()
+        with patch.object(ScopedRateThrottle, "_redis_client", lambda self, key: fake):
+            results = [self._hit(self.now + i)[1] for i in range(6)]
+
+        self.assertEqual(results, [True] * 5 + [False])
+        (key,) = fake.data
+        self.assertEqual(fake.data[key], 5)
+        self.assertEqual(fake.ttl[key], 120)
+
+    def test_default_classes_use_sliding_window(self):
+        """user/anon/scoped padrao do REST_FRAMEWORK apontam para as novas classes."""
+        self.assertEqual(
+            list(api_settings.DEFAULT_THROTTLE_CLASSES),
+            [UserRateThrottle, AnonRateThrottle, ScopedRateThrottle],
+        )
+
+
+@patch.object(throttling.ScopedRateThrottle, "THROTTLE_RATES", RATES)
+class ThrottleBenchmarkTests(SimpleTestCase):
+    """Custo por request do DRF (lista de timestamps) vs contadores, com limite alto."""
+
+    REQUESTS = 3000
+    MIN_SPEEDUP = 2.0
+
+    def _run(self, throttle_class):
+        cache.clear()
+        request = Request(APIRequestFactory().get("/", REMOTE_ADDR="10.0.0.2"))
+        view = type("BurstView", (), {"throttle_scope": "burst"})()
+        now = [1_000_000.0]
+        started = perf_counter()
+        for _ in range(self.REQUESTS):
+            throttle = throttle_class()
+            throttle.timer = lambda: now[0]
+            self.assertTrue(throttle.allow_request(request, view))
+            now[0] += 0.01
+        return perf_counter() - started
+
+    def test_sliding_window_outperforms_timestamp_list(self):
+        """3000 hits no mesmo key: contador ao menos 2x mais rapido que a lista do DRF."""
+        drf = self._run(throttling.ScopedRateThrottle)
+        sliding = self._run(ScopedRateThrottle)
+
+        speedup = drf / sliding
+        self.assertGreaterEqual(
+            speedup,
+            self.MIN_SPEEDUP,
+            f"DRF {drf * 1000:.0f}ms vs sliding {sliding * 1000:.0f}ms ({speedup:.1f}x)",
+        )
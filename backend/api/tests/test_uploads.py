@@ -0,0 +1,153 @@
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from PIL import Image as PILImage
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.media import media_name
+from api.media_layout import is_content_addressed
+from api.models import Character
+from api.uploads import AVATAR, CHARACTER_REFERENCE, COVER, UploadRejected, process_upload
+from tests.mixins import TemporaryMediaMixin
+from tests.utils import create_user
+
+
+def _image_file(name="foto.png", size=(2000, 1500), fmt="PNG", color=(200, 30, 30)):
+    buffer = BytesIO()
+    PILImage.new("RGB", size, color).save(buffer, format=fmt)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f"image/{fmt.lower()}")
+
+
+def _decoded(content):
+    content.seek(0)
+    image = PILImage.open(content)
+    image.load()
+    return image
+
+
+class ProcessUploadTests(SimpleTestCase):
+    """Pipeline isolado: tamanho fixo de saida e limites antes de decodificar."""
+
+    def test_renditions_have_fixed_size(self):
+        for rendition, source, fmt in (
+            (AVATAR, (3000, 2000), "JPEG"),
+            (COVER, (4000, 3000), "PNG"),
+            (CHARACTER_REFERENCE, (3000, 1500), "JPEG"),
+        ):
+            with self.subTest(rendition=rendition):
+                result = process_upload(_image_file(size=source, fmt=fmt), rendition)
+
+                image = _decoded(result)
+                self.assertEqual(image.format, "WEBP")
+                self.assertTrue(result.name.endswith(".webp"))
+                if rendition.crop:
+                    self.assertEqual(image.size, rendition.size)
+        self.assertEqual(_decoded(process_upload(_image_file(size=(3000, 1500)), CHARACTER_REFERENCE)).size, (1024, 512))
+
+    def test_small_reference_is_not_upscaled(self):
+        image = _decoded(process_upload(_image_file(size=(300, 200)), CHARACTER_REFERENCE))
+
+        self.assertEqual(image.size, (300, 200))
+
+    @override_settings(UPLOAD_MAX_BYTES=1024)
+    def test_oversized_file_is_rejected(self):
+        with self.assertRaises(UploadRejected) as ctx:
+            process_upload(_image_file(size=(800, 800)), AVATAR)
+
+        self.assertEqual(ctx.exception.status_code, 413)
+
+    @override_settings(UPLOAD_MAX_PIXELS=1_000_000)
+    def test_too_many_pixels_is_rejected(self):
+        with self.assertRaises(UploadRejected) as ctx:
+            process_upload(_image_file(size=(2000, 1000)), AVATAR)
+
+        self.assertEqual(ctx.exception.status_code, 413)
+
+    def test_non_image_is_rejected(self):
+        upload = SimpleUploadedFile("notas.txt", b"nao sou uma imagem", content_type="text/plain")
+
+        with self.assertRaises(UploadRejected) as ctx:
+            process_upload(upload, AVATAR)
+
+        self.assertEqual(ctx.exception.status_code, 400)
+
+
+class ProfileUploadViewTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="avatar@example.com", username="avatar")
+        self.client.force_authenticate(user=self.user)
+
+    def _upload(self, name, file):
+        return self.client.post(reverse(name), {"file": file}, format="multipart")
+
+    def test_avatar_is_stored_as_webp_and_replaces_previous(self):
+        first = self._upload("authentication:user_avatar", _image_file(size=(1200, 900)))
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        old_name = media_name(self.user.profile_picture)
+        self.assertTrue(is_content_addressed(old_name))
+        self.assertTrue(old_name.startswith("avatars/"))
+        self.assertTrue(old_name.endswith(".webp"))
+
+        second = self._upload("authentication:user_avatar", _image_file(fmt="JPEG", name="nova.jpg", color=(20, 90, 200)))
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        new_name = media_name(self.user.profile_picture)
+        self.assertNotEqual(new_name, old_name)
+        self.assertFalse(default_storage.exists(old_name))
+        with default_storage.open(new_name) as stored:
+            self.assertEqual(_decoded(stored).size, AVATAR.size)
+
+    def test_same_avatar_twice_keeps_file(self):
+        self._upload("authentication:user_avatar", _image_file(size=(600, 600)))
+        self.user.refresh_from_db()
+        first = self.user.profile_picture
+
+        self._upload("authentication:user_avatar", _image_file(size=(600, 600)))
+
+        self.user.refresh_from_db()
+        # Mesmo conteudo, mesmo nome: a "substituicao" nao apaga o arquivo em uso.
+        self.assertEqual(self.user.profile_picture, first)
+        self.assertTrue(default_storage.exists(media_name(first)))
+
+    def test_cover_rejects_invalid_file(self):
+        response = self._upload(
+            "authentication:user_cover", SimpleUploadedFile("capa.png", b"quebrado", content_type="image/png")
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.cover_picture)
+
+    @override_settings(UPLOAD_MAX_BYTES=2048)
+    def test_oversized_avatar_returns_413(self):
+        response = self._upload("authentication:user_avatar", _image_file(size=(1000, 1000)))
+
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+
+class CharacterReferenceUploadTests(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(email="refs@example.com", username="refs")
+        self.character = Character.objects.create(user=self.user, name="Heroina")
+        self.client.force_authenticate(user=self.user)
+
+    def test_reference_is_stored_as_webp(self):
+        response = self.client.post(
+            reverse("character-ref-upload", args=[self.character.pk]),
+            {"file": _image_file(size=(2400, 1200), fmt="JPEG", name="ref.jpg")},
+            format="multipart",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        reference = self.character.references.get()
+        self.assertTrue(reference.image.name.endswith(".webp"))
+        with reference.image.open() as stored:
+            self.assertEqual(_decoded(stored).size, (1024, 512))
@@ -1,13 +1,16 @@
 from datetime import timedelta
 from unittest.mock import patch
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.exceptions import Throttled
 from rest_framework.test import APITestCase
 
-from api.models import Image, ImageComment, ImageLike, ImageTag
+from api.comment_threads import COMMENT_REPLY_PREVIEW
+from api.models import CommentLike, Image, ImageComment, ImageLike, ImageTag
 from api.relevance import RelevanceWeights, update_image_relevance
 from tests.utils import create_user
 
@@ -584,6 +587,80 @@ class ImageCommentViewTests(APITestCase):
         mock_allow.assert_called_once()
 
 
+class CommentThreadTests(APITestCase):
+    """Threads de comentarios: primeiras replies por janela e o resto por cursor."""
+
+    def setUp(self):
+        super().setUp()
+        self.owner = create_user(email="thread-owner@example.com", username="threadowner")
+        self.viewer = create_user(email="thread-viewer@example.com", username="threadviewer")
+        self.image = Image.objects.create(user=self.owner, prompt="thread", is_public=True, status=Image.Status.READY)
+
+    def _thread(self, replies):
+        parent = ImageComment.objects.create(image=self.image, user=self.owner, text="topo")
+        children = ImageComment.objects.bulk_create(
+            ImageComment(image=self.image, user=self.viewer, parent=parent, text=f"resposta {i}") for i in range(replies)
+        )
+        return parent, children
+
+    def _list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("image-comments", kwargs={"pk": self.image.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(ctx.captured_queries)
+
+    def test_page_cost_is_independent_of_thread_size(self):
+        """Mesmo numero de queries com 1 ou 500 replies; so as primeiras vem na listagem."""
+        self._thread(1)
+        _, small = self._list()
+        parent, children = self._thread(500)
+        CommentLike.objects.create(comment=children[0], user=self.viewer)
+        self.client.force_authenticate(user=self.viewer)
+
+        response, large = self._list()
+
+        self.assertEqual(large, small)
+        thread = response.data["results"][1]
+        self.assertEqual(thread["reply_count"], 500)
+        self.assertEqual([r["id"] for r in thread["replies"]], [c.id for c in children[:COMMENT_REPLY_PREVIEW]])
+        self.assertEqual(thread["replies"][0]["like_count"], 1)
+        self.assertTrue(thread["replies"][0]["is_liked"])
+        self.assertEqual(thread["replies_cursor"], children[COMMENT_REPLY_PREVIEW - 1].id)
+        self.assertIsNone(response.data["results"][0]["replies_cursor"])
+
+    def test_replies_cursor_walks_the_thread(self):
+        parent, children = self._thread(12)
+        url = reverse("comment-replies", kwargs={"pk": self.image.id, "comment_id": parent.id})
+
+        seen = []
+        cursor = children[COMMENT_REPLY_PREVIEW - 1].id
+        while cursor is not None:
+            response = self.client.get(url, {"after": cursor, "limit": 4})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [reply["id"] for reply in response.data["results"]]
+            cursor = response.data["next_cursor"]
+
+        self.assertEqual(seen, [child.id for child in children[COMMENT_REPLY_PREVIEW:]])
+
+    def test_replies_of_private_image_are_hidden(self):
+        self.image.is_public = False
+        self.image.save(update_fields=["is_public"])
+        parent, _ = self._thread(2)
+
+        response = self.client.get(reverse("comment-replies", kwargs={"pk": self.image.id, "comment_id": parent.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_replies_endpoint_rejects_bad_cursor(self):
+        parent, _ = self._thread(2)
+
+        response = self.client.get(
+            reverse("comment-replies", kwargs={"pk": self.image.id, "comment_id": parent.id}), {"after": "x"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class ImageDownloadViewTests(APITestCase):
     def test_public_download_increments_counter(self):
         """Download de imagem publica incrementa contador e retorna URL."""
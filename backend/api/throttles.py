@@ -1,24 +1,115 @@
-from django.conf import settings
-from django.utils import timezone
-from rest_framework.throttling import BaseThrottle
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from rest_framework import throttling
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+from .quota import quota_state
 
 
 class PlanQuotaThrottle(BaseThrottle):
-    """Enforce per-plan monthly generation quotas."""
+    """Enforce per-plan monthly generation quotas.
+
+    Reads the cached quota state (written through by ``reserve_generations``),
+    so over-quota users are rejected before the view touches the database.
+    The reservation in the view stays authoritative.
+    """
 
     def allow_request(self, request, view):
         user = getattr(request, "user", None)
         if not user or not user.is_authenticated:
             return True
 
-        quotas = getattr(settings, "PLAN_QUOTAS", {})
-        quota = quotas.get(getattr(user, "plan", "free"))
-        if quota is None:
+        remaining = quota_state(user)["remaining"]
+        return remaining is None or remaining > 0
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """Sliding-window counter in place of DRF's timestamp list.
+
+    ``SimpleRateThrottle`` keeps a list with one timestamp per request in the
+    cache and reads, trims and rewrites the whole list on every hit (O(n) and
+    last-writer-wins across workers). Here each key keeps one integer counter
+    per fixed window; the rate is estimated as
+    ``previous * (unelapsed fraction of the window) + current``. The counter
+    is bumped with an atomic INCR (one pipelined round trip on Redis), so
+    concurrent workers never lose hits. Rejected requests are not counted,
+    same as DRF.
+    """
+
+    cache_alias = DEFAULT_CACHE_ALIAS
+
+    def allow_request(self, request, view):
+        if self.rate is None:
             return True
 
-        today = timezone.now().date()
-        period_start = today.replace(day=1)
-        if getattr(user, "last_reset_date", None) != period_start:
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
             return True
 
-        return getattr(user, "image_generation_count", 0) < quota
+        # Backend resolvido uma vez por request (o proxy ``cache`` do Django
+        # consulta o contexto a cada atributo).
+        self.backend = caches[self.cache_alias]
+        window, elapsed = divmod(self.timer(), self.duration)
+        current_key = f"{self.key}:{int(window)}"
+        previous_key = f"{self.key}:{int(window) - 1}"
+        self.previous, self.current = self._hit(previous_key, current_key)
+        self.elapsed = elapsed
+        estimated = self.previous * (self.duration - elapsed) / self.duration + self.current
+        if estimated <= self.num_requests:
+            return True
+
+        self._decr(current_key)
+        self.current -= 1
+        return False
+
+    def _redis_client(self, key):
+        client = getattr(self.backend, "_cache", None)
+        if not hasattr(client, "get_client"):
+            return None
+        return client.get_client(key, write=True)
+
+    def _hit(self, previous_key, current_key):
+        """Incrementa a janela atual e retorna ``(anterior, atual)``."""
+        backend = self.backend
+        client = self._redis_client(current_key)
+        if client is not None:
+            current_raw = backend.make_and_validate_key(current_key)
+            pipe = client.pipeline()
+            pipe.incr(current_raw)
+            pipe.expire(current_raw, self.duration * 2)
+            pipe.get(backend.make_and_validate_key(previous_key))
+            current, _, previous = pipe.execute()
+            return int(previous or 0), current
+
+        backend.add(current_key, 0, timeout=self.duration * 2)
+        return backend.get(previous_key, 0), backend.incr(current_key)
+
+    def _decr(self, current_key):
+        client = self._redis_client(current_key)
+        if client is not None:
+            client.decr(self.backend.make_and_validate_key(current_key))
+        else:
+            self.backend.decr(current_key)
+
+    def wait(self):
+        """Seconds until one more request would fit in the window."""
+        free = self.num_requests - self.current - 1
+        remaining = self.duration - self.elapsed
+        if free >= 0:
+            if not self.previous:
+                return None
+            return max(remaining - free * self.duration / self.previous, 0)
+        # A janela atual sozinha ja estourou: espera ela virar "anterior" e
+        # perder peso suficiente.
+        return remaining + self.duration * (1 - (self.num_requests - 1) / self.current)
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class UserRateThrottle(throttling.UserRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle, SlidingWindowRateThrottle):
+    pass
@@ -0,0 +1,116 @@
+"""Processamento de uploads de imagem (avatar, capa, referencias de personagem).
+
+O arquivo enviado nunca e lido inteiro para a memoria: ``spool_upload`` copia
+os chunks para um arquivo temporario e interrompe ao passar de
+``UPLOAD_MAX_BYTES``. A decodificacao confere o tamanho declarado no
+cabecalho (``UPLOAD_MAX_PIXELS``) antes de carregar pixels e usa
+``draft()`` (JPEG decodificado direto em escala reduzida) e
+``reducing_gap`` (``reduce()`` inteiro antes do resample) para a memoria
+acompanhar o tamanho da saida, nao o da entrada. So a rendicao WebP de
+tamanho fixo e gravada no storage; o original e descartado.
+"""
+import tempfile
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image as PILImage
+from PIL import ImageOps, UnidentifiedImageError
+
+ACCEPTED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+SPOOL_MEMORY_BYTES = 1024 * 1024
+WEBP_QUALITY = 82
+
+
+class UploadRejected(ValueError):
+    """Upload recusado; ``status_code`` e o HTTP sugerido para a resposta."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """Tamanho de saida: ``crop`` preenche exatamente ``size``; sem crop, cabe dentro dele."""
+
+    size: Tuple[int, int]
+    crop: bool
+
+
+AVATAR = Rendition((256, 256), crop=True)
+COVER = Rendition((1500, 500), crop=True)
+CHARACTER_REFERENCE = Rendition((1024, 1024), crop=False)
+
+
+def spool_upload(uploaded, max_bytes=None):
+    """Copia ``uploaded`` em chunks para um temporario; recusa acima de ``max_bytes``."""
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    limit_mb = max_bytes / (1024 * 1024)
+    if uploaded.size is not None and uploaded.size > max_bytes:
+        raise UploadRejected(f"Arquivo maior que {limit_mb:.0f} MB.", status_code=413)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    written = 0
+    try:
+        for chunk in uploaded.chunks():
+            written += len(chunk)
+            if written > max_bytes:
+                raise UploadRejected(f"Arquivo maior que {limit_mb:.0f} MB.", status_code=413)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def _open(fp, max_pixels):
+    try:
+        image = PILImage.open(fp)
+    except PILImage.DecompressionBombError:
+        raise UploadRejected("Imagem grande demais.", status_code=413)
+    except (UnidentifiedImageError, OSError):
+        raise UploadRejected("Arquivo não é uma imagem válida.")
+    if image.format not in ACCEPTED_FORMATS:
+        raise UploadRejected("Formato não suportado (use JPEG, PNG, WebP ou GIF).")
+    width, height = image.size
+    if width * height > max_pixels:
+        raise UploadRejected(f"Imagem grande demais ({width}x{height}).", status_code=413)
+    return image
+
+
+def render_webp(fp, rendition: Rendition, max_pixels: Optional[int] = None) -> bytes:
+    """Decodifica ``fp`` com memoria limitada e devolve a rendicao em WebP."""
+    image = _open(fp, max_pixels or settings.UPLOAD_MAX_PIXELS)
+    target = rendition.size
+    if rendition.crop:
+        # Escala que cobre o alvo nos dois eixos; o excesso sai no crop.
+        scale = min(1.0, max(target[0] / image.width, target[1] / image.height))
+        size = (max(target[0], round(image.width * scale)), max(target[1], round(image.height * scale)))
+    else:
+        size = target
+    try:
+        # JPEG: decodifica ja em 1/2, 1/4 ou 1/8 (no-op nos demais formatos).
+        image.draft("RGB", size)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        image.thumbnail(size, resample=PILImage.Resampling.LANCZOS, reducing_gap=2.0)
+        if rendition.crop:
+            image = ImageOps.fit(image, target, method=PILImage.Resampling.LANCZOS)
+    except (OSError, SyntaxError, ValueError):
+        # SyntaxError: o Pillow usa para chunks corrompidos (PNG).
+        raise UploadRejected("Não foi possível decodificar a imagem.")
+
+    out = BytesIO()
+    image.save(out, format="WEBP", quality=WEBP_QUALITY, method=4)
+    return out.getvalue()
+
+
+def process_upload(uploaded, rendition: Rendition) -> ContentFile:
+    """Pipeline completo: spool, limites, decodificacao e WebP pronto para o storage."""
+    with spool_upload(uploaded) as spool:
+        data = render_webp(spool, rendition)
+    # O nome final sai do hash do conteudo (api/media_layout.py).
+    return ContentFile(data, name="upload.webp")
@@ -2,10 +2,15 @@ from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import (
     CommentLikeView,
+    CommentRepliesView,
     GenerateImageView,
+    ImageBulkDeleteView,
+    ImageBulkTagsView,
+    ImageBulkVisibilityView,
     ImageCommentDetailView,
     ImageCommentListCreateView,
     ImageDownloadView,
+    ImageDownloadStatsView,
     ImageLikeView,
     CharacterDetailView,
     CharacterGenerateView,
@@ -13,7 +18,10 @@ from .views import (
     CharacterReferenceUploadView,
     ImageRestyleView,
     ImageVariationsView,
+    MetricsView,
     ProjectDetailView,
+    ProjectImageBulkAddView,
+    ProjectImageBulkRemoveView,
     ProjectImageManageView,
     ProjectListCreateView,
     ProjectReorderView,
@@ -23,26 +31,34 @@ from .views import (
     RelatedImagesView,
     SessionDetailView,
     SessionListCreateView,
+    SessionMessageDetailView,
     SessionMessageView,
     ShareImageView,
     StyleSuggestionsView,
     UserImageListView,
     UserLikedImagesView,
+    UserQuotaView,
 )
 
 urlpatterns = [
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('generate/', GenerateImageView.as_view(), name='generate-image'),
+    path('users/me/quota/', UserQuotaView.as_view(), name='user-quota'),
     path('images/public/', PublicImageListView.as_view(), name='public-images'),
     path('images/my-images/', UserImageListView.as_view(), name='user-images'),
     path('images/liked/', UserLikedImagesView.as_view(), name='user-liked-images'),
+    path('images/bulk/visibility/', ImageBulkVisibilityView.as_view(), name='image-bulk-visibility'),
+    path('images/bulk/tags/', ImageBulkTagsView.as_view(), name='image-bulk-tags'),
+    path('images/bulk/delete/', ImageBulkDeleteView.as_view(), name='image-bulk-delete'),
     path('images/<int:pk>/share/', ShareImageView.as_view(), name='share-image'),
     path('images/<int:pk>/like/', ImageLikeView.as_view(), name='image-like'),
     path('images/<int:pk>/comments/', ImageCommentListCreateView.as_view(), name='image-comments'),
     path('images/<int:pk>/comments/<int:comment_id>/', ImageCommentDetailView.as_view(), name='image-comment-detail'),
     path('images/<int:pk>/comments/<int:comment_id>/like/', CommentLikeView.as_view(), name='comment-like'),
+    path('images/<int:pk>/comments/<int:comment_id>/replies/', CommentRepliesView.as_view(), name='comment-replies'),
     path('images/<int:pk>/download/', ImageDownloadView.as_view(), name='image-download'),
+    path('images/<int:pk>/downloads/', ImageDownloadStatsView.as_view(), name='image-download-stats'),
     # Characters
     path('characters/', CharacterListCreateView.as_view(), name='character-list-create'),
     path('characters/<uuid:pk>/', CharacterDetailView.as_view(), name='character-detail'),
@@ -57,10 +73,13 @@ urlpatterns = [
     path('users/me/style-suggestions/', StyleSuggestionsView.as_view(), name='style-suggestions'),
     # Prompt Assistant - DeepSeek LLM
     path('refine-prompt/', RefinePromptView.as_view(), name='refine-prompt'),
+    # Observabilidade (staff)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     # Creative Agent
     path('sessions/', SessionListCreateView.as_view(), name='session-list-create'),
     path('sessions/<uuid:pk>/', SessionDetailView.as_view(), name='session-detail'),
     path('sessions/<uuid:pk>/messages/', SessionMessageView.as_view(), name='session-messages'),
+    path('sessions/<uuid:pk>/messages/<int:message_id>/', SessionMessageDetailView.as_view(), name='session-message-detail'),
     # Projects
     path('projects/', ProjectListCreateView.as_view(), name='project-list-create'),
     path('projects/public/', PublicProjectListView.as_view(), name='public-projects'),
@@ -68,5 +87,7 @@ urlpatterns = [
     path('projects/<uuid:pk>/images/', ProjectImageManageView.as_view(), name='project-image-add'),
     path('projects/<uuid:pk>/images/<int:image_id>/remove/', ProjectImageManageView.as_view(), name='project-image-remove'),
     path('projects/<uuid:pk>/images/reorder/', ProjectReorderView.as_view(), name='project-reorder'),
+    path('projects/<uuid:pk>/images/bulk/', ProjectImageBulkAddView.as_view(), name='project-images-bulk-add'),
+    path('projects/<uuid:pk>/images/bulk-remove/', ProjectImageBulkRemoveView.as_view(), name='project-images-bulk-remove'),
 ]
 
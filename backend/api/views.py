@@ -1,29 +1,55 @@
-from django.conf import settings
+import logging
+from itertools import chain
+
 from django.db import transaction
 from django.db.models import (
     BooleanField,
     Count,
-    Exists,
     F,
-    OuterRef,
+    IntegerField,
+    Max,
+    Prefetch,
     Value,
 )
 from django.db.models.functions import Coalesce
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
 
-from authentication.models import User
 from rest_framework import filters, generics, serializers as drf_serializers, status
-from rest_framework.exceptions import PermissionDenied, Throttled
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import PermissionDenied, Throttled, ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
-from rest_framework.throttling import ScopedRateThrottle
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, inline_serializer
 
-from .models import Image, ImageComment, ImageLike, CommentLike, Project, ProjectImage, CreativeSession, SessionMessage, Character, CharacterReference, CharacterGeneration
-from .relevance import update_image_relevance
+from .fast_serializers import IMAGE_ROW_FIELDS, serialize_image_rows
+from .http_cache import anonymous_response_cache, invalidate_public_cache
+from .like_cache import invalidate_liked_image_ids, liked_image_ids
+from .llm import (
+    LLMBadResponse,
+    LLMError,
+    LLMNotConfigured,
+    LLMTimeout,
+    LLMUnavailable,
+    refine_prompt,
+    refine_prompt_stream,
+)
+from .annotations import related_count
+from .downloads import DOWNLOAD_STATS_DEFAULT_DAYS, DOWNLOAD_STATS_MAX_DAYS, daily_downloads, record_download
+from .comment_threads import (
+    COMMENT_REPLY_PAGE_MAX,
+    COMMENT_REPLY_PAGE_SIZE,
+    attach_reply_previews,
+    replies_page,
+    top_level_comments,
+)
+from .metrics import render_prometheus
+from .project_list import attach_project_previews, project_list_queryset
+from .models import Image, ImageComment, ImageLike, ImageTag, CommentLike, Project, ProjectImage, CreativeSession, SessionMessage, Character, CharacterReference, CharacterGeneration, StyleCluster
+from .quota import next_period_start, quota_state, reserve_generations
+from .relevance import RelevanceWeights, update_image_relevance
 from .serializers import (
     CharacterCreateSerializer,
     CharacterGenerateSerializer,
@@ -32,14 +58,21 @@ from .serializers import (
     CreativeSessionListSerializer,
     CreativeSessionSerializer,
     GenerateImageSerializer,
+    ImageBulkSerializer,
+    ImageBulkTagsSerializer,
+    ImageBulkVisibilitySerializer,
     ImageCommentCreateSerializer,
+    ImageCommentReplySerializer,
     ImageCommentSerializer,
     ImageSerializer,
     ImageShareUpdateSerializer,
     RestyleRequestSerializer,
     VariationRequestSerializer,
     ProjectCreateSerializer,
+    PROJECT_BULK_MAX_IMAGES,
     ProjectImageAddSerializer,
+    ProjectImageBulkSerializer,
+    ProjectListSerializer,
     ProjectReorderSerializer,
     ProjectSerializer,
     RelatedImageSerializer,
@@ -50,9 +83,45 @@ from .serializers import (
     SessionMessageSerializer,
     StyleSuggestionSerializer,
 )
-from .throttles import PlanQuotaThrottle
-from .tasks import generate_image_task
+from .throttles import PlanQuotaThrottle, ScopedRateThrottle
+from .media_layout import store_file
+from .uploads import CHARACTER_REFERENCE, UploadRejected, process_upload
+from .tasks import (
+    agent_turn_task,
+    delete_media_files_task,
+    fail_pending_reply,
+    generate_image_task,
+    refresh_relevance_task,
+    schedule_style_clustering,
+)
 from .similarity import find_related_images, get_user_style_suggestions
+from .style_profile import forget_prompts
+from .streams import (
+    EventStreamRenderer,
+    event_stream_response,
+    read_agent_stream,
+    sse_event,
+    wants_stream,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _project_images_prefetch(user):
+    """Prefetch project entries with their images already annotated for ImageSerializer."""
+    # is_liked sai do conjunto em cache (like_cache), nao de subquery.
+    images = (
+        Image.objects.select_related("user")
+        .prefetch_related("tags")
+        .annotate(
+            like_count=related_count(ImageLike),
+            comment_count=related_count(ImageComment),
+        )
+    )
+    return Prefetch(
+        "images",
+        queryset=ProjectImage.objects.prefetch_related(Prefetch("image", queryset=images)),
+    )
 
 
 class GenerateImageView(APIView):
@@ -94,57 +163,22 @@ class GenerateImageView(APIView):
             )
             seed = serializer.validated_data.get("seed")
 
-            quotas = getattr(settings, "PLAN_QUOTAS", {})
-            quota = quotas.get(getattr(user, "plan", "free"))
-
-            today = timezone.now().date()
-            period_start = today.replace(day=1)
-            if user.last_reset_date != period_start:
-                user.image_generation_count = 0
-                user.last_reset_date = period_start
-
-            if quota is not None and user.image_generation_count >= quota:
+            if not reserve_generations(user):
                 return Response(
                     {"detail": "Monthly quota reached. Faça upgrade para o plano Pro."},
                     status=status.HTTP_429_TOO_MANY_REQUESTS,
                 )
 
-            # Atomically increment the counter to prevent race conditions
-            # Uses SELECT FOR UPDATE to lock the row during the transaction
-            with transaction.atomic():
-                # Lock the user row and verify quota again
-                locked_user = User.objects.select_for_update().get(pk=user.pk)
-
-                # Handle monthly reset if needed
-                today = timezone.now().date()
-                period_start = today.replace(day=1)
-                if locked_user.last_reset_date != period_start:
-                    locked_user.image_generation_count = 0
-                    locked_user.last_reset_date = period_start
-
-                # Re-check quota with locked row to prevent race condition
-                if quota is not None and locked_user.image_generation_count >= quota:
-                    return Response(
-                        {"detail": "Monthly quota reached. Faça upgrade para o plano Pro."},
-                        status=status.HTTP_429_TOO_MANY_REQUESTS,
-                    )
-
-                # Increment counter (safe because we hold the row lock)
-                locked_user.image_generation_count += 1
-                locked_user.save(update_fields=["image_generation_count", "last_reset_date"])
-
-            # Refresh user object to reflect the changes made to locked_user
-            user.refresh_from_db(fields=["image_generation_count", "last_reset_date"])
-
-            # Create image placeholder after quota is secured
+            # Create image placeholder after quota is secured; a fresh image
+            # always starts at the boost floor, no need for a second write.
             image = Image.objects.create(
                 user=user,
                 prompt=prompt,
                 negative_prompt=negative_prompt,
                 aspect_ratio=aspect_ratio,
                 seed=seed,
+                relevance_score=RelevanceWeights().boost_min_score,
             )
-            update_image_relevance(image)
 
             generate_image_task.delay(image.id)
 
@@ -155,6 +189,54 @@ class GenerateImageView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class UserQuotaView(APIView):
+    """Estado da cota mensal de geração do usuário autenticado."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Generation'],
+        summary='Minha cota',
+        description=(
+            'Plano, gerações usadas e restantes no período atual e a data de renovação. '
+            'Lido do cache de cota; `quota` e `remaining` são nulos em planos ilimitados.'
+        ),
+        responses={200: inline_serializer('QuotaState', fields={
+            'plan': drf_serializers.CharField(),
+            'quota': drf_serializers.IntegerField(allow_null=True),
+            'used': drf_serializers.IntegerField(),
+            'remaining': drf_serializers.IntegerField(allow_null=True),
+            'period_start': drf_serializers.DateField(),
+            'resets_on': drf_serializers.DateField(),
+        })},
+    )
+    def get(self, request, *args, **kwargs):
+        state = quota_state(request.user)
+        return Response({
+            **state,
+            'period_start': state['period_start'].isoformat(),
+            'resets_on': next_period_start(state['period_start']).isoformat(),
+        })
+
+
+class ImageRowListMixin:
+    # Listagem paginada via values_list + serialize_image_rows. O get_queryset
+    # da view precisa anotar like_count e comment_count (is_liked vem do
+    # conjunto de curtidas em cache);
+    # serializer_class segue ImageSerializer para o schema. Sem docstring de
+    # proposito: o drf-spectacular a herdaria como descricao das operacoes.
+
+    def list(self, request, *args, **kwargs):
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .prefetch_related(None)
+            .values_list(*IMAGE_ROW_FIELDS)
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_image_rows(page, request))
+        return Response(serialize_image_rows(queryset, request))
+
+
 @extend_schema_view(
     list=extend_schema(
         tags=['Gallery'],
@@ -169,42 +251,35 @@ class GenerateImageView(APIView):
         ],
     ),
 )
-class PublicImageListView(generics.ListAPIView):
+class PublicImageListView(ImageRowListMixin, generics.ListAPIView):
     serializer_class = ImageSerializer
     permission_classes = [AllowAny]
     filter_backends = [filters.SearchFilter]
     search_fields = ["prompt"]
 
+    @anonymous_response_cache("gallery")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def get_queryset(self):
-        base_queryset = Image.objects.filter(is_public=True).select_related(
-            "user"
-        ).prefetch_related("tags")
+        # Matches the partial index image_public_rank_idx (is_public AND READY,
+        # ordered by featured/relevance_score/created_at).
+        base_queryset = Image.objects.filter(
+            is_public=True, status=Image.Status.READY
+        ).select_related("user").prefetch_related("tags")
 
         tag = self.request.query_params.get("tag")
         if tag:
             base_queryset = base_queryset.filter(tags__name__iexact=tag)
+        # Correlated counts instead of Count() over joins: no GROUP BY, so the
+        # planner can walk the rank index and stop at the page limit.
         annotated_queryset = base_queryset.annotate(
-            like_count=Count("likes", distinct=True),
-            comment_count=Count("comments", distinct=True),
-            effective_score=Coalesce(F("relevance_score"), Value(0.0)),
+            like_count=related_count(ImageLike),
+            comment_count=related_count(ImageComment),
         )
-
-        request = self.request
-        if request.user.is_authenticated:
-            annotated_queryset = annotated_queryset.annotate(
-                is_liked=Exists(
-                    ImageLike.objects.filter(
-                        image=OuterRef("pk"), user=request.user
-                    )
-                )
-            )
-        else:
-            annotated_queryset = annotated_queryset.annotate(
-                is_liked=Value(False, output_field=BooleanField())
-            )
         return annotated_queryset.order_by(
             "-featured",
-            "-effective_score",
+            "-relevance_score",
             "-created_at",
         )
 
@@ -219,7 +294,7 @@ class PublicImageListView(generics.ListAPIView):
         ],
     ),
 )
-class UserImageListView(generics.ListAPIView):
+class UserImageListView(ImageRowListMixin, generics.ListAPIView):
     serializer_class = ImageSerializer
     permission_classes = [IsAuthenticated]
 
@@ -232,7 +307,7 @@ class UserImageListView(generics.ListAPIView):
         if tag:
             queryset = queryset.filter(tags__name__iexact=tag)
 
-        queryset = (
+        return (
             queryset.annotate(
                 like_count=Count("likes", distinct=True),
                 comment_count=Count("comments", distinct=True),
@@ -240,13 +315,6 @@ class UserImageListView(generics.ListAPIView):
             )
             .order_by("-featured", "-effective_score", "-created_at")
         )
-        return queryset.annotate(
-            is_liked=Exists(
-                ImageLike.objects.filter(
-                    image=OuterRef("pk"), user=self.request.user
-                )
-            )
-        )
 
 
 @extend_schema_view(
@@ -256,7 +324,7 @@ class UserImageListView(generics.ListAPIView):
         description='Lista paginada de imagens curtidas pelo usuário autenticado.',
     ),
 )
-class UserLikedImagesView(generics.ListAPIView):
+class UserLikedImagesView(ImageRowListMixin, generics.ListAPIView):
     serializer_class = ImageSerializer
     permission_classes = [IsAuthenticated]
 
@@ -273,7 +341,6 @@ class UserLikedImagesView(generics.ListAPIView):
                 like_count=Count("likes", distinct=True),
                 comment_count=Count("comments", distinct=True),
                 effective_score=Coalesce(F("relevance_score"), Value(0.0)),
-                is_liked=Value(True, output_field=BooleanField()),
             )
             .order_by("-likes__created_at")
         )
@@ -303,6 +370,7 @@ class ShareImageView(APIView):
         image.is_public = True
         image.save(update_fields=["is_public"])
         update_image_relevance(image)
+        invalidate_public_cache()
         return Response(
             ImageSerializer(image, context={"request": request}).data,
             status=status.HTTP_200_OK,
@@ -329,12 +397,153 @@ class ShareImageView(APIView):
         image.is_public = serializer.validated_data["is_public"]
         image.save(update_fields=["is_public"])
         update_image_relevance(image)
+        invalidate_public_cache()
         return Response(
             ImageSerializer(image, context={"request": request}).data,
             status=status.HTTP_200_OK,
         )
 
 
+def _owned_images(user, image_ids, *fields):
+    """``{id: (id, *fields)}`` das imagens de ``user`` em uma query; 400 se algum ID nao for dele."""
+    owned = {
+        row[0]: row
+        for row in Image.objects.filter(user=user, id__in=image_ids).order_by().values_list('id', *fields)
+    }
+    missing = [img_id for img_id in image_ids if img_id not in owned]
+    if missing:
+        raise ValidationError({'image_ids': [f'Imagens inexistentes ou de outro usuário: {missing}.']})
+    return owned
+
+
+class ImageBulkVisibilityView(APIView):
+    """Publica ou despublica várias imagens do usuário."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Gallery'],
+        summary='Alterar visibilidade (lote)',
+        description=(
+            'Publica ou despublica várias imagens do usuário com um único UPDATE. '
+            'Se algum ID não for do usuário, nada é alterado. A relevância é recalculada em segundo plano.'
+        ),
+        request=ImageBulkVisibilitySerializer,
+        responses={200: inline_serializer('ImageBulkVisibilityResult', fields={
+            'updated': drf_serializers.IntegerField(),
+        })},
+    )
+    def post(self, request):
+        serializer = ImageBulkVisibilitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        is_public = serializer.validated_data['is_public']
+
+        with transaction.atomic():
+            owned = _owned_images(request.user, serializer.validated_data['image_ids'], 'is_public')
+            changed = [img_id for img_id, (_, current) in owned.items() if current != is_public]
+            if changed:
+                Image.objects.filter(id__in=changed).update(is_public=is_public)
+
+        if changed:
+            invalidate_public_cache()
+            refresh_relevance_task.delay(changed)
+        return Response({'updated': len(changed)}, status=status.HTTP_200_OK)
+
+
+class ImageBulkTagsView(APIView):
+    """Adiciona e remove tags de várias imagens do usuário."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Gallery'],
+        summary='Editar tags (lote)',
+        description=(
+            'Adiciona as tags de `add` (criadas se não existirem) e remove as de `remove` em todas as imagens '
+            'informadas, com inserções em lote na tabela de associação. Se algum ID não for do usuário, nada é alterado.'
+        ),
+        request=ImageBulkTagsSerializer,
+        responses={200: inline_serializer('ImageBulkTagsResult', fields={
+            'added': drf_serializers.IntegerField(),
+            'removed': drf_serializers.IntegerField(),
+        })},
+    )
+    def post(self, request):
+        serializer = ImageBulkTagsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        image_ids = serializer.validated_data['image_ids']
+        add = serializer.validated_data['add']
+        remove = [name for name in serializer.validated_data['remove'] if name not in add]
+        through = Image.tags.through
+
+        with transaction.atomic():
+            owned = _owned_images(request.user, image_ids, 'is_public')
+            added = removed = 0
+            if add:
+                ImageTag.objects.bulk_create([ImageTag(name=name) for name in add], ignore_conflicts=True)
+                tag_ids = list(ImageTag.objects.filter(name__in=add).values_list('id', flat=True))
+                present = set(
+                    through.objects.filter(image_id__in=image_ids, imagetag_id__in=tag_ids)
+                    .values_list('image_id', 'imagetag_id')
+                )
+                rows = [
+                    through(image_id=img_id, imagetag_id=tag_id)
+                    for img_id in image_ids
+                    for tag_id in tag_ids
+                    if (img_id, tag_id) not in present
+                ]
+                through.objects.bulk_create(rows, ignore_conflicts=True)
+                added = len(rows)
+            if remove:
+                removed, _ = through.objects.filter(image_id__in=image_ids, imagetag__name__in=remove).delete()
+
+        if added or removed:
+            if any(is_public for _, is_public in owned.values()):
+                invalidate_public_cache()
+            refresh_relevance_task.delay(image_ids)
+        return Response({'added': added, 'removed': removed}, status=status.HTTP_200_OK)
+
+
+class ImageBulkDeleteView(APIView):
+    """Apaga várias imagens do usuário."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Gallery'],
+        summary='Apagar imagens (lote)',
+        description=(
+            'Apaga várias imagens do usuário (e curtidas, comentários e entradas de projetos delas). '
+            'Os arquivos são removidos do storage em segundo plano. Se algum ID não for do usuário, nada é apagado.'
+        ),
+        request=ImageBulkSerializer,
+        responses={200: inline_serializer('ImageBulkDeleteResult', fields={
+            'deleted': drf_serializers.IntegerField(),
+        })},
+    )
+    def post(self, request):
+        serializer = ImageBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        image_ids = serializer.validated_data['image_ids']
+
+        with transaction.atomic():
+            owned = _owned_images(request.user, image_ids, 'is_public', 'image', 'status', 'prompt')
+            _, deleted = Image.objects.filter(id__in=image_ids).delete()
+            ready = [
+                (image_id, prompt) for image_id, _, _, image_status, prompt in owned.values()
+                if image_status == Image.Status.READY
+            ]
+            forget_prompts(request.user.id, ready)
+            if ready and StyleCluster.objects.filter(user=request.user).exists():
+                # Estilos visuais: tamanhos e medoides apagados so se corrigem num ajuste completo.
+                user_id = request.user.id
+                transaction.on_commit(lambda: schedule_style_clustering(user_id))
+
+        if any(is_public for _, is_public, _, _, _ in owned.values()):
+            invalidate_public_cache()
+        files = [name for _, _, name, _, _ in owned.values() if name]
+        if files:
+            delete_media_files_task.delay(files)
+        return Response({'deleted': deleted.get(Image._meta.label, 0)}, status=status.HTTP_200_OK)
+
+
 class ImageLikeView(APIView):
     """Curtir ou descurtir uma imagem."""
     permission_classes = [IsAuthenticated]
@@ -359,9 +568,11 @@ class ImageLikeView(APIView):
         like, created = ImageLike.objects.get_or_create(
             image=image, user=request.user
         )
+        if created:
+            invalidate_liked_image_ids(request.user)
         update_image_relevance(image)
         status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
-        # Refresh to get updated like_count and annotate is_liked
+        # Refresh to get updated like_count; the viewer has just liked it.
         image = (
             Image.objects.filter(pk=pk)
             .select_related("user")
@@ -369,9 +580,7 @@ class ImageLikeView(APIView):
             .annotate(
                 like_count=Count("likes", distinct=True),
                 comment_count=Count("comments", distinct=True),
-                is_liked=Exists(
-                    ImageLike.objects.filter(image=OuterRef("pk"), user=request.user)
-                ),
+                is_liked=Value(True, output_field=BooleanField()),
             )
             .first()
         )
@@ -393,6 +602,7 @@ class ImageLikeView(APIView):
             image=image, user=request.user
         ).delete()
         if deleted:
+            invalidate_liked_image_ids(request.user)
             update_image_relevance(image)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
@@ -400,11 +610,25 @@ class ImageLikeView(APIView):
         )
 
 
+def _commentable_image(pk, user, image=None):
+    """Imagem cujos comentarios ``user`` pode ver (publica ou dele); 404 caso contrario."""
+    if image is None:
+        image = get_object_or_404(Image, pk=pk)
+    if image.is_public:
+        return image
+    if user.is_authenticated and image.user_id == user.pk:
+        return image
+    raise Http404
+
+
 @extend_schema_view(
     list=extend_schema(
         tags=['Social'],
         summary='Listar comentários',
-        description='Lista comentários paginados de uma imagem (top-level com replies aninhadas).',
+        description=(
+            'Lista comentários paginados de uma imagem (top-level com as primeiras replies aninhadas). '
+            'Quando `replies_cursor` não é nulo, o restante das replies vem de `.../comments/{comment_id}/replies/`.'
+        ),
     ),
     create=extend_schema(
         tags=['Social'],
@@ -436,43 +660,16 @@ class ImageCommentListCreateView(generics.ListCreateAPIView):
         return [throttle() for throttle in self.throttle_classes]
 
     def _get_image(self):
-        image = get_object_or_404(Image, pk=self.kwargs["pk"])
-        user = self.request.user
-        if image.is_public:
-            return image
-        if user.is_authenticated and image.user == user:
-            return image
-        raise Http404
+        return _commentable_image(self.kwargs["pk"], self.request.user)
 
     def get_queryset(self):
-        image = self._get_image()
-        queryset = (
-            ImageComment.objects.filter(image=image, parent__isnull=True)
-            .select_related("user")
-            .prefetch_related("replies", "replies__user")
-            .annotate(
-                like_count=Count("likes", distinct=True),
-                reply_count=Count("replies", distinct=True),
-            )
-            .order_by("created_at")
-        )
+        return top_level_comments(self._get_image(), self.request.user)
 
-        # Annotate is_liked for authenticated users
-        user = self.request.user
-        if user.is_authenticated:
-            queryset = queryset.annotate(
-                is_liked=Exists(
-                    CommentLike.objects.filter(
-                        comment=OuterRef("pk"), user=user
-                    )
-                )
-            )
-        else:
-            queryset = queryset.annotate(
-                is_liked=Value(False, output_field=BooleanField())
-            )
-
-        return queryset
+    def list(self, request, *args, **kwargs):
+        # Comentarios da pagina + primeiras replies de todos eles: 2 queries.
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        attach_reply_previews(page, request.user)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -508,6 +705,48 @@ class ImageCommentListCreateView(generics.ListCreateAPIView):
         )
 
 
+class CommentRepliesView(APIView):
+    """Cursor pages of replies to a top-level comment."""
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        tags=['Social'],
+        summary='Mais respostas',
+        description=(
+            'Respostas de um comentário em ordem de criação, depois do id `after` '
+            '(use `replies_cursor` da listagem de comentários e depois `next_cursor`).'
+        ),
+        parameters=[
+            OpenApiParameter('after', OpenApiTypes.INT, OpenApiParameter.QUERY, required=False),
+            OpenApiParameter(
+                'limit', OpenApiTypes.INT, OpenApiParameter.QUERY, required=False,
+                description=f'Padrão {COMMENT_REPLY_PAGE_SIZE}, máximo {COMMENT_REPLY_PAGE_MAX}.',
+            ),
+        ],
+        responses={200: inline_serializer('CommentRepliesPage', fields={
+            'results': ImageCommentReplySerializer(many=True),
+            'next_cursor': drf_serializers.IntegerField(allow_null=True),
+        })},
+    )
+    def get(self, request, pk, comment_id):
+        parent = get_object_or_404(
+            ImageComment.objects.select_related('image'), pk=comment_id, image_id=pk, parent__isnull=True
+        )
+        _commentable_image(pk, request.user, image=parent.image)
+        try:
+            after = int(request.query_params['after']) if 'after' in request.query_params else None
+            limit = int(request.query_params.get('limit', COMMENT_REPLY_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({'detail': '`after` e `limit` devem ser inteiros.'})
+        limit = max(1, min(limit, COMMENT_REPLY_PAGE_MAX))
+
+        replies, next_cursor = replies_page(parent, request.user, after=after, limit=limit)
+        return Response({
+            'results': ImageCommentReplySerializer(replies, many=True, context={'request': request}).data,
+            'next_cursor': next_cursor,
+        })
+
+
 @extend_schema_view(
     destroy=extend_schema(
         tags=['Social'],
@@ -629,7 +868,10 @@ class ImageDownloadView(APIView):
     @extend_schema(
         tags=['Social'],
         summary='Download de imagem',
-        description='Incrementa o contador de downloads e retorna a URL para download.',
+        description=(
+            'Conta o download e retorna a URL para download. O contador é acumulado no Redis e '
+            'gravado no banco em lote; `download_count` já inclui os downloads pendentes.'
+        ),
         request=None,
         responses={200: inline_serializer('DownloadResponse', fields={
             'download_url': drf_serializers.URLField(),
@@ -649,11 +891,9 @@ class ImageDownloadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        Image.objects.filter(pk=image.pk).update(
-            download_count=F("download_count") + 1
-        )
-        image.refresh_from_db(fields=["download_count"])
-        update_image_relevance(image)
+        # Contador bufferizado (api/downloads.py): o banco e a relevancia
+        # sao atualizados em lote por flush_download_counters.
+        download_count = record_download(image)
 
         url = image.image.url
         if request:
@@ -662,12 +902,48 @@ class ImageDownloadView(APIView):
         return Response(
             {
                 "download_url": url,
-                "download_count": image.download_count,
+                "download_count": download_count,
             },
             status=status.HTTP_200_OK,
         )
 
 
+class ImageDownloadStatsView(APIView):
+    """Downloads por dia de uma imagem do usuario."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Social'],
+        summary='Downloads por dia',
+        description=(
+            'Downloads diários de uma imagem do usuário nos últimos `days` dias '
+            f'(padrão {DOWNLOAD_STATS_DEFAULT_DAYS}, máximo {DOWNLOAD_STATS_MAX_DAYS}). Dias sem download não aparecem; '
+            'os contadores são gravados em lote, com atraso de até um intervalo de flush.'
+        ),
+        parameters=[OpenApiParameter('days', OpenApiTypes.INT, OpenApiParameter.QUERY)],
+        responses={200: inline_serializer('ImageDownloadStats', fields={
+            'download_count': drf_serializers.IntegerField(),
+            'daily': inline_serializer('ImageDownloadDay', fields={
+                'day': drf_serializers.DateField(),
+                'count': drf_serializers.IntegerField(),
+            }, many=True),
+        })},
+    )
+    def get(self, request, pk, *args, **kwargs):
+        image = get_object_or_404(
+            Image.objects.only("id", "user_id", "download_count"), pk=pk, user=request.user
+        )
+        try:
+            days = int(request.query_params.get("days", DOWNLOAD_STATS_DEFAULT_DAYS))
+        except ValueError:
+            raise ValidationError({'detail': '`days` deve ser inteiro.'})
+        days = min(max(days, 1), DOWNLOAD_STATS_MAX_DAYS)
+        return Response({
+            "download_count": image.download_count,
+            "daily": [{"day": day, "count": count} for day, count in daily_downloads(image, days)],
+        })
+
+
 # =============================================================================
 # Creative Memory - Related Images and Style Suggestions
 # =============================================================================
@@ -692,6 +968,7 @@ class RelatedImagesView(APIView):
             'results': RelatedImageSerializer(many=True),
         })},
     )
+    @anonymous_response_cache("related")
     def get(self, request, pk, *args, **kwargs):
         # Get the source image
         image = get_object_or_404(Image, pk=pk)
@@ -740,16 +1017,7 @@ class RelatedImagesView(APIView):
                 comment_count=Count('comments', distinct=True),
             )
         )
-
-        # Annotate is_liked for authenticated users
-        if user.is_authenticated:
-            images = images.annotate(
-                is_liked=Exists(
-                    ImageLike.objects.filter(
-                        image=OuterRef('pk'), user=user
-                    )
-                )
-            )
+        liked_ids = liked_image_ids(user)
 
         # Build response maintaining similarity order
         images_by_id = {img.id: img for img in images}
@@ -758,7 +1026,9 @@ class RelatedImagesView(APIView):
             img = images_by_id.get(r['image_id'])
             if img:
                 results.append({
-                    'image': ImageSerializer(img, context={'request': request}).data,
+                    'image': ImageSerializer(
+                        img, context={'request': request, 'liked_image_ids': liked_ids}
+                    ).data,
                     'similarity_score': r['similarity_score'],
                 })
 
@@ -769,15 +1039,16 @@ class RelatedImagesView(APIView):
 
 
 class StyleSuggestionsView(APIView):
-    """Sugestões de estilo baseadas no histórico de prompts do usuário."""
+    """Sugestões de estilo a partir dos estilos visuais recorrentes do usuário."""
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
         tags=['Creative Memory'],
         summary='Sugestões de estilo',
         description=(
-            'Analisa o histórico de prompts do usuário para identificar padrões '
-            'recorrentes de estilo, modificadores e temas. Retorna até 5 sugestões.'
+            'Retorna os estilos visuais recorrentes do usuário (grupos de embeddings '
+            'de imagem, com a imagem mais representativa de cada um como exemplo). '
+            'Sem grupos ainda, usa os padrões recorrentes dos prompts. Retorna até 5 sugestões.'
         ),
         parameters=[
             OpenApiParameter('limit', int, description='Máximo de sugestões (default 5, max 10)'),
@@ -814,19 +1085,42 @@ class StyleSuggestionsView(APIView):
 # Prompt Assistant - DeepSeek LLM Integration
 # =============================================================================
 
+def _llm_error(exc):
+    """``(detail, status)`` da resposta para uma falha do LLM, com log."""
+    if isinstance(exc, LLMNotConfigured):
+        logger.error("DEEPSEEK_API_KEY not configured")
+        return "Prompt assistant is not configured.", status.HTTP_503_SERVICE_UNAVAILABLE
+    if isinstance(exc, LLMUnavailable):
+        logger.warning(f"DeepSeek circuit open: {exc}")
+        return "Prompt assistant is temporarily unavailable.", status.HTTP_503_SERVICE_UNAVAILABLE
+    if isinstance(exc, LLMTimeout):
+        logger.error("DeepSeek API timeout")
+        return "Request timeout. Please try again.", status.HTTP_504_GATEWAY_TIMEOUT
+    if isinstance(exc, LLMBadResponse):
+        logger.error(f"Failed to parse DeepSeek response: {exc}")
+        return "Failed to process response from assistant.", status.HTTP_500_INTERNAL_SERVER_ERROR
+    logger.error(f"DeepSeek API error: {exc}")
+    return "Failed to connect to prompt assistant.", status.HTTP_502_BAD_GATEWAY
+
+
 class RefinePromptView(APIView):
     """Refina um prompt casual em prompt otimizado para geração de imagem via LLM."""
     permission_classes = [IsAuthenticated]
     throttle_classes = [ScopedRateThrottle]
     throttle_scope = "llm_refine"
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
 
     @extend_schema(
         tags=['Prompt Assistant'],
         summary='Refinar prompt',
         description=(
             'Transforma uma descrição casual em um prompt otimizado para geração de imagem. '
-            'Usa o DeepSeek LLM para gerar prompt em inglês com modificadores técnicos.'
+            'Usa o DeepSeek LLM para gerar prompt em inglês com modificadores técnicos. '
+            'Com `?stream=true` (ou `Accept: text/event-stream`) responde em SSE: eventos '
+            '`delta` com trechos de `refined_prompt` e um `done` final com o resultado completo '
+            '(ou `error` com `detail`).'
         ),
+        parameters=[OpenApiParameter('stream', bool, description='Responde em Server-Sent Events.')],
         request=RefinePromptRequestSerializer,
         responses={
             200: RefinePromptResponseSerializer,
@@ -835,11 +1129,6 @@ class RefinePromptView(APIView):
         },
     )
     def post(self, request, *args, **kwargs):
-        import requests
-        import logging
-
-        logger = logging.getLogger(__name__)
-
         serializer = RefinePromptRequestSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -847,114 +1136,41 @@ class RefinePromptView(APIView):
         description = serializer.validated_data['description']
         style = serializer.validated_data.get('style', 'photorealistic')
 
-        # Get API configuration from settings
-        api_key = getattr(settings, 'DEEPSEEK_API_KEY', '')
-        base_url = getattr(settings, 'DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
-        model = getattr(settings, 'DEEPSEEK_MODEL', 'deepseek-chat')
-
-        if not api_key:
-            logger.error("DEEPSEEK_API_KEY not configured")
-            return Response(
-                {"detail": "Prompt assistant is not configured."},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
-
-        # Build system prompt for the LLM
-        style_descriptions = {
-            'photorealistic': 'fotorrealista, como uma fotografia profissional',
-            'anime': 'estilo anime/mangá japonês',
-            'digital_art': 'arte digital moderna e detalhada',
-            'oil_painting': 'pintura a óleo clássica',
-            'watercolor': 'aquarela suave e artística',
-            '3d_render': 'renderização 3D de alta qualidade',
-            'pixel_art': 'pixel art estilo retro/jogos',
-            'sketch': 'esboço ou desenho a lápis',
-        }
-        style_desc = style_descriptions.get(style, style_descriptions['photorealistic'])
-
-        system_prompt = f"""Você é um especialista em criar prompts otimizados para geração de imagens com IA (como Stable Diffusion, DALL-E, Midjourney).
-
-Sua tarefa é transformar a descrição casual do usuário em um prompt estruturado e detalhado em INGLÊS.
-
-Estilo solicitado: {style_desc}
-
-Regras:
-1. O prompt DEVE estar em inglês
-2. Inclua detalhes sobre: composição, iluminação, atmosfera, cores, texturas
-3. Use termos técnicos de fotografia/arte quando apropriado
-4. Adicione modificadores de qualidade (highly detailed, 8k, professional, etc.)
-5. Mantenha o prompt com 50-150 palavras
-6. Retorne APENAS o prompt, sem explicações
-
-Também sugira um negative_prompt curto com elementos a evitar (blur, low quality, watermark, etc.)
-
-Formato de resposta (JSON):
-{{"refined_prompt": "seu prompt aqui", "negative_prompt": "elementos a evitar"}}"""
+        if wants_stream(request):
+            events = refine_prompt_stream(description, style)
+            try:
+                # Falhas antes do primeiro trecho (sem chave, timeout de
+                # conexao) ainda saem como resposta HTTP normal.
+                first = next(events)
+            except LLMError as e:
+                detail, code = _llm_error(e)
+                return Response({"detail": detail}, status=code)
+            return event_stream_response(self._sse(chain([first], events)))
 
         try:
-            response = requests.post(
-                f"{base_url}/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": description},
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 500,
-                },
-                timeout=30,
-            )
-            response.raise_for_status()
+            result = refine_prompt(description, style)
+        except LLMError as e:
+            detail, code = _llm_error(e)
+            return Response({"detail": detail}, status=code)
 
-        except requests.exceptions.Timeout:
-            logger.error("DeepSeek API timeout")
-            return Response(
-                {"detail": "Request timeout. Please try again."},
-                status=status.HTTP_504_GATEWAY_TIMEOUT,
-            )
-        except requests.exceptions.RequestException as e:
-            logger.error(f"DeepSeek API error: {e}")
-            return Response(
-                {"detail": "Failed to connect to prompt assistant."},
-                status=status.HTTP_502_BAD_GATEWAY,
-            )
+        return Response(result, status=status.HTTP_200_OK)
 
+    @staticmethod
+    def _sse(events):
         try:
-            result = response.json()
-            content = result['choices'][0]['message']['content']
-
-            # Parse JSON response from LLM
-            import json
-            # Try to extract JSON from the response
-            if '{' in content and '}' in content:
-                json_start = content.index('{')
-                json_end = content.rindex('}') + 1
-                json_str = content[json_start:json_end]
-                parsed = json.loads(json_str)
-                refined_prompt = parsed.get('refined_prompt', content)
-                negative_prompt = parsed.get('negative_prompt', 'blur, low quality, watermark, text, logo')
-            else:
-                refined_prompt = content.strip()
-                negative_prompt = 'blur, low quality, watermark, text, logo, distorted, ugly'
-
-        except (KeyError, IndexError, json.JSONDecodeError) as e:
-            logger.error(f"Failed to parse DeepSeek response: {e}")
-            return Response(
-                {"detail": "Failed to process response from assistant."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+            for event, data in events:
+                yield sse_event(event, {"text": data} if event == "delta" else data)
+        except LLMError as e:
+            yield sse_event("error", {"detail": _llm_error(e)[0]})
 
-        response_data = {
-            'refined_prompt': refined_prompt,
-            'negative_prompt': negative_prompt,
-        }
 
-        return Response(response_data, status=status.HTTP_200_OK)
+class MetricsView(APIView):
+    """Metricas operacionais no formato texto do Prometheus (somente staff)."""
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(exclude=True)
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # =============================================================================
@@ -1056,7 +1272,10 @@ class CharacterReferenceUploadView(APIView):
     @extend_schema(
         tags=['Characters'],
         summary='Upload referência',
-        description='Adiciona uma imagem de referência ao personagem (multipart).',
+        description=(
+            'Adiciona uma imagem de referência ao personagem (multipart). JPEG, PNG, WebP ou GIF; '
+            'gravada como WebP com no máximo 1024px no maior lado (o original é descartado).'
+        ),
         request={'multipart/form-data': {'type': 'object', 'properties': {
             'file': {'type': 'string', 'format': 'binary'},
         }, 'required': ['file']}},
@@ -1064,7 +1283,7 @@ class CharacterReferenceUploadView(APIView):
             'id': drf_serializers.IntegerField(),
             'image_url': drf_serializers.URLField(),
             'order': drf_serializers.IntegerField(),
-        })},
+        }), 400: None, 413: None},
     )
     def post(self, request, pk):
         character = get_object_or_404(Character, pk=pk, user=request.user)
@@ -1072,8 +1291,13 @@ class CharacterReferenceUploadView(APIView):
         if not file:
             return Response({"detail": "Nenhum arquivo enviado."}, status=status.HTTP_400_BAD_REQUEST)
 
-        order = character.references.count()
-        ref = CharacterReference.objects.create(character=character, image=file, order=order)
+        try:
+            rendition = process_upload(file, CHARACTER_REFERENCE)
+        except UploadRejected as exc:
+            return Response({"detail": str(exc)}, status=exc.status_code)
+
+        ref = CharacterReference(character=character, order=character.references.count())
+        store_file(ref.image, rendition)
         url = request.build_absolute_uri(ref.image.url) if ref.image else None
         return Response({'id': ref.id, 'image_url': url, 'order': ref.order}, status=status.HTTP_201_CREATED)
 
@@ -1121,10 +1345,7 @@ class CharacterGenerateView(APIView):
         char_desc = character.description or character.name
         prompt = f"{char_desc}, {scene}, {style_mods}".strip(', ')
 
-        # Check quota
-        quotas = getattr(settings, 'PLAN_QUOTAS', {})
-        quota = quotas.get(getattr(request.user, 'plan', 'free'))
-        if quota is not None and request.user.image_generation_count >= quota:
+        if not reserve_generations(request.user):
             return Response(
                 {"detail": "Cota mensal atingida."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -1136,8 +1357,6 @@ class CharacterGenerateView(APIView):
             aspect_ratio=Image.AspectRatio.SQUARE,
             generation_type=Image.GenerationType.TXT2IMG,
         )
-        request.user.image_generation_count += 1
-        request.user.save(update_fields=['image_generation_count'])
 
         CharacterGeneration.objects.create(
             character=character, image=image, scene_description=scene,
@@ -1190,10 +1409,7 @@ class ImageVariationsView(APIView):
         count = serializer.validated_data['count']
         strength = serializer.validated_data['strength']
 
-        # Check quota
-        quotas = getattr(settings, 'PLAN_QUOTAS', {})
-        quota = quotas.get(getattr(request.user, 'plan', 'free'))
-        if quota is not None and request.user.image_generation_count + count > quota:
+        if not reserve_generations(request.user, count):
             return Response(
                 {"detail": "Cota mensal insuficiente para gerar essas variações."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -1210,12 +1426,9 @@ class ImageVariationsView(APIView):
                 generation_type=Image.GenerationType.VARIATION,
                 strength=strength,
             )
-            request.user.image_generation_count += 1
             generate_image_task.delay(img.id)
             created_images.append(img)
 
-        request.user.save(update_fields=['image_generation_count'])
-
         return Response(
             ImageSerializer(created_images, many=True, context={'request': request}).data,
             status=status.HTTP_202_ACCEPTED,
@@ -1249,10 +1462,7 @@ class ImageRestyleView(APIView):
         original_prompt = source.prompt or ''
         restyled_prompt = f"{original_prompt}, {style_modifiers}" if original_prompt else style_modifiers
 
-        # Check quota
-        quotas = getattr(settings, 'PLAN_QUOTAS', {})
-        quota = quotas.get(getattr(request.user, 'plan', 'free'))
-        if quota is not None and request.user.image_generation_count >= quota:
+        if not reserve_generations(request.user):
             return Response(
                 {"detail": "Cota mensal atingida."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -1267,8 +1477,6 @@ class ImageRestyleView(APIView):
             generation_type=Image.GenerationType.RESTYLE,
             strength=strength,
         )
-        request.user.image_generation_count += 1
-        request.user.save(update_fields=['image_generation_count'])
         generate_image_task.delay(img.id)
 
         return Response(
@@ -1348,6 +1556,17 @@ class SessionDetailView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+def _enqueue_agent_turn(agent_msg):
+    """Enfileira o turno do agente; se o broker recusar, a resposta ja sai FAILED."""
+    try:
+        agent_turn_task.delay(agent_msg.id)
+    except Exception:
+        logger.exception(f"[AGENT] Falha ao enfileirar a mensagem {agent_msg.id}.")
+        fail_pending_reply(agent_msg.id)
+        agent_msg.status = SessionMessage.Status.FAILED
+        agent_msg.text = SessionMessage.ERROR_TEXT
+
+
 class SessionMessageView(APIView):
     """Send a message to the creative agent."""
     permission_classes = [IsAuthenticated]
@@ -1358,144 +1577,68 @@ class SessionMessageView(APIView):
         tags=['Creative Agent'],
         summary='Enviar mensagem',
         description=(
-            'Envia uma mensagem ao agente criativo. O agente responde com texto e, '
-            'opcionalmente, gera uma imagem se tiver informação suficiente. '
-            'Usa o DeepSeek LLM para a conversa e FLUX.1-dev para geração.'
+            'Envia uma mensagem ao agente criativo. A resposta do agente é criada com status '
+            'PENDING e processada em background (DeepSeek LLM para a conversa e FLUX.1-dev '
+            'para geração); acompanhe por `GET /api/sessions/{id}/messages/{message_id}/` '
+            'até READY ou FAILED.'
         ),
         request=SessionMessageCreateSerializer,
-        responses={200: inline_serializer('AgentResponse', fields={
+        responses={202: inline_serializer('AgentResponse', fields={
             'message': SessionMessageSerializer(),
             'agent_response': SessionMessageSerializer(),
         })},
     )
     def post(self, request, pk):
-        import requests as http_requests
-        import json
-        import logging
-
-        logger = logging.getLogger(__name__)
-
         session = get_object_or_404(CreativeSession, pk=pk, user=request.user)
         serializer = SessionMessageCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        user_text = serializer.validated_data['text']
-
-        # Save user message
-        user_msg = SessionMessage.objects.create(
-            session=session, role=SessionMessage.Role.USER, text=user_text,
-        )
-
-        # Build conversation history for LLM
-        from .agent_prompt import CREATIVE_AGENT_SYSTEM_PROMPT
-        history = list(
-            SessionMessage.objects.filter(session=session)
-            .order_by('created_at')
-            .values_list('role', 'text')[:20]  # Last 20 messages for context
-        )
-
-        llm_messages = [{"role": "system", "content": CREATIVE_AGENT_SYSTEM_PROMPT}]
-        for role, text in history:
-            llm_messages.append({"role": role, "content": text})
-
-        # Call DeepSeek LLM
-        api_key = getattr(settings, 'DEEPSEEK_API_KEY', '')
-        base_url = getattr(settings, 'DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
-        model = getattr(settings, 'DEEPSEEK_MODEL', 'deepseek-chat')
-
-        if not api_key:
-            agent_msg = SessionMessage.objects.create(
+        with transaction.atomic():
+            user_msg = SessionMessage.objects.create(
                 session=session,
-                role=SessionMessage.Role.ASSISTANT,
-                text='Desculpe, o assistente criativo não está configurado no momento.',
+                role=SessionMessage.Role.USER,
+                text=serializer.validated_data['text'],
             )
-            return self._response(request, user_msg, agent_msg)
-
-        try:
-            llm_response = http_requests.post(
-                f"{base_url}/v1/chat/completions",
-                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                json={"model": model, "messages": llm_messages, "temperature": 0.7, "max_tokens": 800},
-                timeout=30,
-            )
-            llm_response.raise_for_status()
-            content = llm_response.json()['choices'][0]['message']['content']
-        except Exception as e:
-            logger.error(f"DeepSeek error in agent: {e}")
             agent_msg = SessionMessage.objects.create(
                 session=session,
                 role=SessionMessage.Role.ASSISTANT,
-                text='Desculpe, tive um problema ao processar sua mensagem. Tente novamente.',
+                text='',
+                status=SessionMessage.Status.PENDING,
             )
-            return self._response(request, user_msg, agent_msg)
-
-        # Parse agent response
-        agent_text = content
-        should_generate = False
-        prompt_for_generation = ''
-        negative_prompt = ''
+            # So depois do commit: o worker precisa enxergar a mensagem PENDING.
+            transaction.on_commit(lambda: _enqueue_agent_turn(agent_msg))
 
-        try:
-            if '{' in content and '}' in content:
-                json_start = content.index('{')
-                json_end = content.rindex('}') + 1
-                parsed = json.loads(content[json_start:json_end])
-                agent_text = parsed.get('message', content)
-                if parsed.get('action') == 'generate':
-                    should_generate = True
-                    prompt_for_generation = parsed.get('prompt', '')
-                    negative_prompt = parsed.get('negative_prompt', '')
-        except (json.JSONDecodeError, KeyError):
-            pass
-
-        # Generate image if agent decided to
-        generated_image = None
-        if should_generate and prompt_for_generation:
-            # Check quota
-            quotas = getattr(settings, 'PLAN_QUOTAS', {})
-            quota = quotas.get(getattr(request.user, 'plan', 'free'))
-            can_generate = quota is None or request.user.image_generation_count < quota
-
-            if can_generate:
-                image = Image.objects.create(
-                    user=request.user,
-                    prompt=prompt_for_generation,
-                    negative_prompt=negative_prompt,
-                    aspect_ratio=Image.AspectRatio.SQUARE,
-                )
-                # Increment quota
-                request.user.image_generation_count += 1
-                request.user.save(update_fields=['image_generation_count'])
-
-                generate_image_task.delay(image.id)
-                generated_image = image
-
-                # Auto-title session from first generation
-                if session.title == 'Nova sessão':
-                    session.title = user_text[:80]
-                    session.save(update_fields=['title'])
-            else:
-                agent_text += '\n\n⚠️ Sua cota mensal de geração foi atingida.'
-
-        # Save agent message
-        agent_msg = SessionMessage.objects.create(
-            session=session,
-            role=SessionMessage.Role.ASSISTANT,
-            text=agent_text,
-            image=generated_image,
-            prompt_used=prompt_for_generation,
-        )
-
-        session.save(update_fields=['updated_at'])
-
-        return self._response(request, user_msg, agent_msg)
-
-    def _response(self, request, user_msg, agent_msg):
         ctx = {'request': request}
         return Response({
             'message': SessionMessageSerializer(user_msg, context=ctx).data,
             'agent_response': SessionMessageSerializer(agent_msg, context=ctx).data,
-        })
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class SessionMessageDetailView(APIView):
+    """Poll a single session message (agent reply status and generated image)."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Creative Agent'],
+        summary='Detalhe da mensagem',
+        description=(
+            'Retorna uma mensagem da sessão. Usado para acompanhar a resposta do agente '
+            '(`status`) e a imagem gerada por ela (`image_status`). Enquanto a resposta está '
+            '`PENDING`, `text` traz o trecho já escrito pelo LLM; passado `AGENT_TURN_TIMEOUT` '
+            'sem resposta do worker, ela aparece como `FAILED`.'
+        ),
+        responses={200: SessionMessageSerializer},
+    )
+    def get(self, request, pk, message_id):
+        message = get_object_or_404(
+            SessionMessage.objects.select_related('image'),
+            pk=message_id, session_id=pk, session__user=request.user,
+        )
+        if message.status == SessionMessage.Status.PENDING:
+            # Texto parcial publicado pelo worker (agent_turn_task) enquanto o LLM escreve.
+            message.text = (read_agent_stream(message.id) or {}).get('text', message.text)
+        return Response(SessionMessageSerializer(message, context={'request': request}).data)
 
 
 # =============================================================================
@@ -1510,15 +1653,11 @@ class ProjectListCreateView(APIView):
         tags=['Projects'],
         summary='Listar projetos',
         description='Lista projetos do usuário autenticado.',
-        responses={200: ProjectSerializer(many=True)},
+        responses={200: ProjectListSerializer(many=True)},
     )
     def get(self, request):
-        projects = (
-            Project.objects.filter(user=request.user)
-            .select_related('user', 'cover_image')
-            .prefetch_related('images__image', 'tags')
-        )
-        serializer = ProjectSerializer(projects, many=True, context={'request': request})
+        projects = attach_project_previews(project_list_queryset(Project.objects.filter(user=request.user)), request)
+        serializer = ProjectListSerializer(projects, many=True, context={'request': request})
         return Response(serializer.data)
 
     @extend_schema(
@@ -1549,7 +1688,7 @@ class ProjectDetailView(APIView):
     def _get_project(self, pk, user):
         project = get_object_or_404(
             Project.objects.select_related('user', 'cover_image')
-            .prefetch_related('images__image__user', 'tags'),
+            .prefetch_related(_project_images_prefetch(user), 'tags'),
             pk=pk,
         )
         if project.user != user:
@@ -1658,38 +1797,132 @@ class ProjectReorderView(APIView):
         summary='Reordenar imagens',
         description='Reordena as imagens do projeto com base na lista de IDs fornecida.',
         request=ProjectReorderSerializer,
-        responses={200: inline_serializer('ReorderResponse', fields={'detail': drf_serializers.CharField()})},
+        responses={200: inline_serializer('ReorderResponse', fields={
+            'detail': drf_serializers.CharField(),
+            'updated': drf_serializers.IntegerField(),
+        })},
     )
     def patch(self, request, pk):
         project = get_object_or_404(Project, pk=pk, user=request.user)
         serializer = ProjectReorderSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
+        # Primeira ocorrencia de cada id define a posicao; ids fora do
+        # projeto sao ignorados.
+        positions = {}
+        for img_id in serializer.validated_data['image_ids']:
+            positions.setdefault(img_id, len(positions))
+
+        with transaction.atomic():
+            entries = list(
+                ProjectImage.objects.select_for_update()
+                .filter(project=project, image_id__in=positions)
+                .order_by()
+                .only('id', 'image_id', 'order')
+            )
+            changed = []
+            for entry in entries:
+                if entry.order != positions[entry.image_id]:
+                    entry.order = positions[entry.image_id]
+                    changed.append(entry)
+            # Um unico UPDATE ... CASE por lote em vez de um por imagem.
+            ProjectImage.objects.bulk_update(changed, ['order'], batch_size=PROJECT_BULK_MAX_IMAGES)
+
+        return Response({'detail': 'Ordem atualizada.', 'updated': len(changed)})
+
+
+class ProjectImageBulkAddView(APIView):
+    """Add many images to a project in one request."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Projects'],
+        summary='Adicionar imagens ao projeto (lote)',
+        description=(
+            'Adiciona várias imagens do usuário ao final do projeto, na ordem enviada. '
+            'Imagens que já estão no projeto são ignoradas; se algum ID não for do usuário, nada é adicionado.'
+        ),
+        request=ProjectImageBulkSerializer,
+        responses={201: inline_serializer('ProjectImagesBulkAdded', fields={
+            'added': drf_serializers.ListField(child=drf_serializers.IntegerField()),
+            'skipped': drf_serializers.ListField(child=drf_serializers.IntegerField()),
+        })},
+    )
+    def post(self, request, pk):
+        serializer = ProjectImageBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         image_ids = serializer.validated_data['image_ids']
-        for order, img_id in enumerate(image_ids):
-            ProjectImage.objects.filter(project=project, image_id=img_id).update(order=order)
 
-        return Response({'detail': 'Ordem atualizada.'})
+        with transaction.atomic():
+            # Trava o projeto para adicoes simultaneas nao repetirem posicoes.
+            project = get_object_or_404(Project.objects.select_for_update(), pk=pk, user=request.user)
+            _owned_images(request.user, image_ids)
+
+            stats = ProjectImage.objects.filter(project=project).aggregate(last=Max('order'))
+            present = set(
+                ProjectImage.objects.filter(project=project, image_id__in=image_ids)
+                .order_by()
+                .values_list('image_id', flat=True)
+            )
+            added = [img_id for img_id in image_ids if img_id not in present]
+            start = 0 if stats['last'] is None else stats['last'] + 1
+            ProjectImage.objects.bulk_create(
+                [
+                    ProjectImage(
+                        project=project,
+                        image_id=img_id,
+                        order=start + offset,
+                        caption=serializer.validated_data['caption'],
+                    )
+                    for offset, img_id in enumerate(added)
+                ],
+                batch_size=PROJECT_BULK_MAX_IMAGES,
+            )
+
+        return Response(
+            {'added': added, 'skipped': [img_id for img_id in image_ids if img_id in present]},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class ProjectImageBulkRemoveView(APIView):
+    """Remove many images from a project in one request."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=['Projects'],
+        summary='Remover imagens do projeto (lote)',
+        description='Desassocia várias imagens do projeto com um único DELETE (as imagens não são apagadas).',
+        request=ProjectImageBulkSerializer,
+        responses={200: inline_serializer('ProjectImagesBulkRemoved', fields={
+            'removed': drf_serializers.IntegerField(),
+        })},
+    )
+    def post(self, request, pk):
+        project = get_object_or_404(Project, pk=pk, user=request.user)
+        serializer = ProjectImageBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        removed, _ = ProjectImage.objects.filter(
+            project=project, image_id__in=serializer.validated_data['image_ids']
+        ).delete()
+        return Response({'removed': removed})
 
 
 class PublicProjectListView(generics.ListAPIView):
     """List public projects."""
-    serializer_class = ProjectSerializer
+    serializer_class = ProjectListSerializer
     permission_classes = [AllowAny]
 
     @extend_schema(
         tags=['Projects'],
         summary='Projetos públicos',
-        description='Lista paginada de projetos públicos.',
+        description='Lista paginada de projetos públicos, com contagem e miniaturas das primeiras imagens.',
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        attach_project_previews(page, request)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
 
     def get_queryset(self):
-        return (
-            Project.objects.filter(is_public=True)
-            .select_related('user', 'cover_image')
-            .prefetch_related('images__image', 'tags')
-            .annotate(image_count=Count('images'))
-            .order_by('-updated_at')
-        )
+        return project_list_queryset(Project.objects.filter(is_public=True)).order_by('-updated_at')
@@ -26,6 +26,8 @@ class User(AbstractUser):
     preferences = models.JSONField(default=dict, blank=True)
     social_media_links = models.JSONField(default=dict, blank=True)
     bio = models.TextField(blank=True, default="")
+    # Conta excluida pelo usuario: desativada na hora, apagada por purge_user_task.
+    deleted_at = models.DateTimeField(blank=True, null=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
@@ -5,6 +5,8 @@ from django.contrib.auth import authenticate
 from django.utils.translation import gettext_lazy as _
 from drf_spectacular.utils import extend_schema_field
 
+from api.media import media_url
+
 from .models import User, PasswordResetToken
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -145,18 +147,8 @@ class UserSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.URLField(allow_null=True))
     def get_avatar_url(self, obj) -> Optional[str]:
-        if not obj.profile_picture:
-            return None
-        request = self.context.get('request')
-        if request and not str(obj.profile_picture).startswith('http'):
-            return request.build_absolute_uri(obj.profile_picture)
-        return obj.profile_picture
+        return media_url(obj.profile_picture, self.context.get('request'))
 
     @extend_schema_field(serializers.URLField(allow_null=True))
     def get_cover_url(self, obj) -> Optional[str]:
-        if not obj.cover_picture:
-            return None
-        request = self.context.get('request')
-        if request and not str(obj.cover_picture).startswith('http'):
-            return request.build_absolute_uri(obj.cover_picture)
-        return obj.cover_picture
+        return media_url(obj.cover_picture, self.context.get('request'))
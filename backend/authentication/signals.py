@@ -0,0 +1,11 @@
+"""Sinais da conta para os outros apps.
+
+A exclusao de dados e arquivos do usuario fica no app ``api``
+(``api.signals``); a autenticacao so avisa, sem importar o ``api``.
+"""
+from django.dispatch import Signal
+
+# Conta excluida pelo proprio usuario (``user``): desativar e apagar os dados.
+account_deleted = Signal()
+# Arquivos de perfil (``names``) substituidos por um upload novo.
+profile_media_replaced = Signal()
@@ -10,13 +10,15 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework.throttling import ScopedRateThrottle
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 
 from drf_spectacular.utils import extend_schema, extend_schema_view, inline_serializer
 from rest_framework import serializers as drf_serializers
 
+from api.media import media_name, media_path
+from api.media_layout import store_content
+from api.throttles import ScopedRateThrottle
+from api.uploads import AVATAR, COVER, UploadRejected, process_upload
+
 from .models import PasswordResetToken, User
 from .serializers import (
     ChangePasswordSerializer,
@@ -27,6 +29,7 @@ from .serializers import (
     UserRegistrationSerializer,
     UserSerializer,
 )
+from .signals import account_deleted, profile_media_replaced
 from .tasks import send_verification_email_task, send_welcome_email_task
 
 # Inline serializers reutilizáveis para responses
@@ -289,21 +292,30 @@ class AvatarUploadView(APIView):
     @extend_schema(
         tags=['Profile'],
         summary='Upload de avatar',
-        description='Envia ou substitui a foto de perfil do usuário.',
+        description=(
+            'Envia ou substitui a foto de perfil do usuário. JPEG, PNG, WebP ou GIF; '
+            'gravada como WebP 256x256 (o original é descartado).'
+        ),
         request={'multipart/form-data': {'type': 'object', 'properties': {
             'file': {'type': 'string', 'format': 'binary'},
         }, 'required': ['file']}},
-        responses={200: UserSerializer, 400: _detail_response},
+        responses={200: UserSerializer, 400: _detail_response, 413: _detail_response},
     )
     def post(self, request):
         file = request.FILES.get('file')
         if not file:
             return Response({"detail": "Nenhum arquivo enviado."}, status=status.HTTP_400_BAD_REQUEST)
 
-        filename = f"avatars/{request.user.id}-{file.name}"
-        saved_path = default_storage.save(filename, ContentFile(file.read()))
-        request.user.profile_picture = default_storage.url(saved_path)
+        try:
+            rendition = process_upload(file, AVATAR)
+        except UploadRejected as exc:
+            return Response({"detail": str(exc)}, status=exc.status_code)
+
+        previous = media_name(request.user.profile_picture)
+        saved_path = store_content("avatars", rendition)
+        request.user.profile_picture = media_path(saved_path)
         request.user.save(update_fields=["profile_picture"])
+        profile_media_replaced.send(sender=User, user=request.user, names=[previous])
         serializer = UserSerializer(request.user, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -315,21 +327,30 @@ class CoverUploadView(APIView):
     @extend_schema(
         tags=['Profile'],
         summary='Upload de capa',
-        description='Envia ou substitui a imagem de capa do usuário.',
+        description=(
+            'Envia ou substitui a imagem de capa do usuário. JPEG, PNG, WebP ou GIF; '
+            'gravada como WebP 1500x500 (o original é descartado).'
+        ),
         request={'multipart/form-data': {'type': 'object', 'properties': {
             'file': {'type': 'string', 'format': 'binary'},
         }, 'required': ['file']}},
-        responses={200: UserSerializer, 400: _detail_response},
+        responses={200: UserSerializer, 400: _detail_response, 413: _detail_response},
     )
     def post(self, request):
         file = request.FILES.get('file')
         if not file:
             return Response({"detail": "Nenhum arquivo enviado."}, status=status.HTTP_400_BAD_REQUEST)
 
-        filename = f"covers/{request.user.id}-{file.name}"
-        saved_path = default_storage.save(filename, ContentFile(file.read()))
-        request.user.cover_picture = default_storage.url(saved_path)
+        try:
+            rendition = process_upload(file, COVER)
+        except UploadRejected as exc:
+            return Response({"detail": str(exc)}, status=exc.status_code)
+
+        previous = media_name(request.user.cover_picture)
+        saved_path = store_content("covers", rendition)
+        request.user.cover_picture = media_path(saved_path)
         request.user.save(update_fields=["cover_picture"])
+        profile_media_replaced.send(sender=User, user=request.user, names=[previous])
         serializer = UserSerializer(request.user, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -400,7 +421,8 @@ class DeleteAccountView(APIView):
         summary='Deletar conta',
         description=(
             'Deleta permanentemente a conta do usuário e todas as suas imagens. '
-            'Requer confirmação com a senha atual. Ação irreversível.'
+            'Requer confirmação com a senha atual. Ação irreversível: a conta é desativada e '
+            'some das listagens na hora; dados e arquivos são apagados em segundo plano.'
         ),
         request=DeleteAccountSerializer,
         responses={
@@ -418,7 +440,7 @@ class DeleteAccountView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        request.user.delete()
+        account_deleted.send(sender=User, user=request.user)
 
         return Response(
             {"detail": "Conta deletada com sucesso."},
@@ -91,6 +91,36 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Storage de midia: 'local' (MEDIA_ROOT; web e worker precisam do mesmo volume)
+# ou 's3' (bucket S3/MinIO via django-storages; o worker grava direto no bucket
+# e as URLs saem pre-assinadas por MEDIA_URL_EXPIRE segundos, ou pelo CDN em
+# MEDIA_CDN_DOMAIN). MEDIA_URL_EXPIRE deve passar de PUBLIC_RESPONSE_CACHE_TTL.
+MEDIA_STORAGE = config('MEDIA_STORAGE', default='local')
+MEDIA_URL_EXPIRE = config('MEDIA_URL_EXPIRE', default=60 * 60, cast=int)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+if MEDIA_STORAGE == 's3':
+    STORAGES['default'] = {
+        'BACKEND': 'storages.backends.s3.S3Storage',
+        'OPTIONS': {
+            'bucket_name': config('MEDIA_BUCKET'),
+            'endpoint_url': config('MEDIA_ENDPOINT_URL', default='') or None,
+            'access_key': config('MEDIA_ACCESS_KEY', default='') or None,
+            'secret_key': config('MEDIA_SECRET_KEY', default='') or None,
+            'region_name': config('MEDIA_REGION', default='') or None,
+            'custom_domain': config('MEDIA_CDN_DOMAIN', default='') or None,
+            # MinIO exige enderecamento por caminho (http://minio:9000/<bucket>/...).
+            'addressing_style': config('MEDIA_ADDRESSING_STYLE', default='') or None,
+            'signature_version': 's3v4',
+            'querystring_auth': True,
+            'querystring_expire': MEDIA_URL_EXPIRE,
+            'file_overwrite': False,
+            'default_acl': None,
+        },
+    }
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Custom user model
@@ -144,9 +174,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_THROTTLE_CLASSES': (
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.ScopedRateThrottle',
+        'api.throttles.UserRateThrottle',
+        'api.throttles.AnonRateThrottle',
+        'api.throttles.ScopedRateThrottle',
     ),
     'DEFAULT_THROTTLE_RATES': {
         'anon': '200/day',
@@ -161,6 +191,60 @@ REST_FRAMEWORK = {
     },
 }
 
+# Cache (throttles, respostas publicas). Redis compartilhado entre web e
+# workers; nos testes, locmem por processo.
+REDIS_URL = config('REDIS_URL', default='redis://redis:6379/1')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+}
+
+# Cache de respostas anonimas (galeria publica, imagens relacionadas), em
+# segundos. TTL 0 desliga; nos testes fica desligado para nao vazar estado
+# entre casos (api/tests/test_http_cache.py liga explicitamente).
+PUBLIC_RESPONSE_CACHE_TTL = config('PUBLIC_RESPONSE_CACHE_TTL', default=30, cast=int)
+PUBLIC_RESPONSE_CACHE_STALE = config('PUBLIC_RESPONSE_CACHE_STALE', default=120, cast=int)
+
+if 'test' in sys.argv:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    PUBLIC_RESPONSE_CACHE_TTL = 0
+
+# Contador de downloads (api/downloads.py): shards do buffer no Redis e
+# intervalo, em segundos, do flush periodico para o banco (Celery Beat).
+DOWNLOAD_COUNTER_SHARDS = config('DOWNLOAD_COUNTER_SHARDS', default=16, cast=int)
+DOWNLOAD_FLUSH_INTERVAL = config('DOWNLOAD_FLUSH_INTERVAL', default=30, cast=int)
+# Exclusao de contas e coleta de midia (api/purge.py): linhas por lote do
+# purge, purges parados ha N segundos sao reenfileirados pela varredura, que
+# roda a cada MEDIA_SWEEP_INTERVAL segundos e so remove arquivos orfaos mais
+# velhos que MEDIA_SWEEP_GRACE (geracoes/uploads em andamento).
+ACCOUNT_PURGE_CHUNK_SIZE = config('ACCOUNT_PURGE_CHUNK_SIZE', default=500, cast=int)
+ACCOUNT_PURGE_STALLED_AFTER = config('ACCOUNT_PURGE_STALLED_AFTER', default=60 * 60, cast=int)
+MEDIA_SWEEP_INTERVAL = config('MEDIA_SWEEP_INTERVAL', default=60 * 60 * 24, cast=int)
+MEDIA_SWEEP_GRACE = config('MEDIA_SWEEP_GRACE', default=60 * 60, cast=int)
+MEDIA_SWEEP_BATCH = config('MEDIA_SWEEP_BATCH', default=500, cast=int)
+# delete_unreferenced deixa para a varredura arquivos tocados ha menos de
+# MEDIA_REUSE_GRACE segundos: um upload com o mesmo hash pode estar
+# reaproveitando o arquivo antes de gravar a linha. Desligado nos testes.
+MEDIA_REUSE_GRACE = config('MEDIA_REUSE_GRACE', default=10 * 60, cast=int)
+if 'test' in sys.argv:
+    MEDIA_REUSE_GRACE = 0
+# Uploads de avatar/capa/referencia (api/uploads.py): bytes aceitos por
+# arquivo e pixels declarados no cabecalho antes de decodificar.
+UPLOAD_MAX_BYTES = config('UPLOAD_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+UPLOAD_MAX_PIXELS = config('UPLOAD_MAX_PIXELS', default=40_000_000, cast=int)
+CELERY_BEAT_SCHEDULE = {
+    'flush-download-counters': {
+        'task': 'api.tasks.flush_download_counters',
+        'schedule': DOWNLOAD_FLUSH_INTERVAL,
+    },
+    'sweep-orphan-media': {
+        'task': 'api.tasks.sweep_orphan_media',
+        'schedule': MEDIA_SWEEP_INTERVAL,
+    },
+}
+
 # Plan quotas (images per month); use None for unlimited plans
 PLAN_QUOTAS = {
     'free': 20,
@@ -184,6 +268,37 @@ DEEPSEEK_API_KEY = config('DEEPSEEK_API_KEY', default='')
 DEEPSEEK_BASE_URL = config('DEEPSEEK_BASE_URL', default='https://api.deepseek.com')
 DEEPSEEK_MODEL = config('DEEPSEEK_MODEL', default='deepseek-chat')
 
+# Cache de refinamentos do assistente de prompt (api/llm.py): TTL em segundos
+# no cache compartilhado (0 desliga cache e coalescencia) e tamanho da LRU
+# local de cada processo.
+LLM_REFINE_CACHE_TTL = config('LLM_REFINE_CACHE_TTL', default=60 * 60 * 24, cast=int)
+LLM_REFINE_CACHE_MAX_ENTRIES = config('LLM_REFINE_CACHE_MAX_ENTRIES', default=512, cast=int)
+# Cliente HTTP do LLM (api/outbound.py): pool por processo, retries com
+# backoff+jitter (segundos) e circuit breaker (THRESHOLD 0 desliga).
+LLM_HTTP_POOL_MAXSIZE = config('LLM_HTTP_POOL_MAXSIZE', default=10, cast=int)
+LLM_HTTP_RETRIES = config('LLM_HTTP_RETRIES', default=2, cast=int)
+LLM_HTTP_BACKOFF = config('LLM_HTTP_BACKOFF', default=0.25, cast=float)
+LLM_HTTP_BACKOFF_MAX = config('LLM_HTTP_BACKOFF_MAX', default=4.0, cast=float)
+LLM_CIRCUIT_FAILURE_THRESHOLD = config('LLM_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+LLM_CIRCUIT_WINDOW = config('LLM_CIRCUIT_WINDOW', default=30, cast=int)
+LLM_CIRCUIT_COOLDOWN = config('LLM_CIRCUIT_COOLDOWN', default=30, cast=int)
+# Contexto do agente criativo (api/agent_context.py), em tokens estimados:
+# orcamento do historico por turno (resumo + mensagens recentes), teto por
+# mensagem, no maximo N mensagens na janela; o resumo e atualizado a cada
+# AGENT_SUMMARY_BATCH mensagens fora da janela.
+AGENT_CONTEXT_MAX_TOKENS = config('AGENT_CONTEXT_MAX_TOKENS', default=2000, cast=int)
+AGENT_CONTEXT_MESSAGE_MAX_TOKENS = config('AGENT_CONTEXT_MESSAGE_MAX_TOKENS', default=600, cast=int)
+AGENT_CONTEXT_MAX_MESSAGES = config('AGENT_CONTEXT_MAX_MESSAGES', default=20, cast=int)
+AGENT_SUMMARY_BATCH = config('AGENT_SUMMARY_BATCH', default=6, cast=int)
+AGENT_SUMMARY_MAX_TOKENS = config('AGENT_SUMMARY_MAX_TOKENS', default=300, cast=int)
+# Resposta do agente PENDING ha mais de AGENT_TURN_TIMEOUT segundos e tratada
+# como FAILED (worker perdido ou fila parada) e o worker a descarta.
+AGENT_TURN_TIMEOUT = config('AGENT_TURN_TIMEOUT', default=5 * 60, cast=int)
+if 'test' in sys.argv:
+    LLM_REFINE_CACHE_TTL = 0
+    LLM_HTTP_RETRIES = 0
+    LLM_CIRCUIT_FAILURE_THRESHOLD = 0
+
 # =============================================================================
 # Spec-Driven Development - drf-spectacular (OpenAPI 3.0)
 # =============================================================================
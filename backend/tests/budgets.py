@@ -0,0 +1,297 @@
+"""Infra da suite de orcamentos (queries + tempo) por endpoint.
+
+- ``seed_dataset`` popula um volume realista (galeria, curtidas, comentarios,
+  projetos, personagens, sessoes) via ``bulk_create``. ``QUERY_BUDGET_SCALE``
+  multiplica os volumes, util para confirmar que o numero de queries nao cresce
+  com os dados.
+- ``external_services_patched`` desliga Celery, e-mail e o LLM.
+- ``BudgetReport`` grava o resultado em JSON (``QUERY_BUDGET_REPORT``) para
+  comparar entre commits.
+"""
+import json
+import os
+import platform
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Callable, Optional
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from api.models import (
+    Character,
+    CharacterGeneration,
+    CharacterReference,
+    CommentLike,
+    CreativeSession,
+    Image,
+    ImageComment,
+    ImageEmbedding,
+    ImageLike,
+    ImageTag,
+    Project,
+    ProjectImage,
+    ProjectTag,
+    SessionMessage,
+)
+from api.style_clusters import cluster_user_styles
+from api.style_profile import rebuild_style_profile
+from authentication.models import PasswordResetToken
+from tests.utils import create_user
+
+PASSWORD = "Str0ngPass!"
+
+SCALE = max(int(os.environ.get("QUERY_BUDGET_SCALE", "1")), 1)
+TIME_FACTOR = float(os.environ.get("QUERY_BUDGET_TIME_FACTOR", "1"))
+REPORT_PATH = os.environ.get("QUERY_BUDGET_REPORT", "")
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Teto de queries e de tempo (ms, antes de ``QUERY_BUDGET_TIME_FACTOR``)."""
+
+    queries: int
+    ms: float = 250.0
+
+
+@dataclass
+class Case:
+    """Uma requisicao medida: rota + metodo + orcamento."""
+
+    url_name: str
+    method: str
+    budget: Budget
+    expected_status: int = 200
+    user: Optional[str] = None  # atributo do dataset ("owner", "viewer") ou None
+    kwargs: Callable = field(default=lambda ds: {})
+    data: Callable = field(default=lambda ds: None)
+    query: str = ""
+    format: str = "json"
+    label: str = ""
+
+    @property
+    def key(self):
+        suffix = f" [{self.label}]" if self.label else ""
+        return f"{self.method.upper()} {self.url_name}{suffix}"
+
+
+def seed_dataset(scale=SCALE):
+    """Cria o volume de dados medido pela suite; retorna os objetos de referencia."""
+    User = get_user_model()
+    ds = SimpleNamespace()
+    now = timezone.now()
+
+    ds.owner = create_user(email="owner@budget.test", username="owner", password=PASSWORD)
+    ds.viewer = create_user(email="viewer@budget.test", username="viewer", password=PASSWORD)
+    ds.staff = create_user(email="staff@budget.test", username="staff", password=PASSWORD, is_staff=True)
+    hashed = make_password(PASSWORD)
+    crowd = User.objects.bulk_create(
+        User(
+            email=f"crowd{i}@budget.test",
+            username=f"crowd{i}",
+            password=hashed,
+            is_verified=True,
+        )
+        for i in range(30 * scale)
+    )
+    ds.pending = User.objects.create(
+        email="pending@budget.test",
+        username="pending",
+        password=hashed,
+        verification_token="budget-verify-token",
+        verification_token_expires_at=now + timedelta(hours=1),
+    )
+    ds.reset_token = PasswordResetToken.objects.create(
+        user=ds.owner, expires_at=now + timedelta(hours=1)
+    )
+
+    tags = ImageTag.objects.bulk_create(ImageTag(name=f"tag{i}") for i in range(20))
+    authors = [ds.owner, ds.viewer, *crowd]
+    images = Image.objects.bulk_create(
+        Image(
+            user=ds.owner if i % 4 == 0 else authors[i % len(authors)],
+            prompt=f"cinematic portrait of a lighthouse at dusk, variation {i}",
+            image=f"generated/budget/{i}.png",
+            status=Image.Status.READY,
+            is_public=i % 5 != 0,
+            relevance_score=float(i % 17),
+            featured=i % 50 == 0,
+        )
+        for i in range(300 * scale)
+    )
+    Image.tags.through.objects.bulk_create(
+        Image.tags.through(image_id=image.id, imagetag_id=tags[(image.id + k) % len(tags)].id)
+        for image in images
+        for k in range(3)
+    )
+    ImageEmbedding.objects.bulk_create(
+        ImageEmbedding(
+            image=image,
+            prompt_text=image.prompt,
+            image_embedding_json=[((image.id * 7 + d) % 13) / 13 for d in range(16)],
+        )
+        for image in images[:100]
+    )
+
+    # Perfis e grupos de estilo ja existem em producao (mantidos a cada imagem/embedding).
+    rebuild_style_profile(ds.owner.id)
+    cluster_user_styles(ds.owner.id)
+
+    owner_images = [image for image in images if image.user_id == ds.owner.id]
+    ds.public_image = next(image for image in owner_images if image.is_public)
+    ds.private_image = next(image for image in owner_images if not image.is_public)
+    ds.spare_image = owner_images[-1]
+
+    ImageLike.objects.bulk_create(
+        ImageLike(image=image, user=user)
+        for image in images[: 100 * scale]
+        for user in authors[:: 3]
+    )
+    ImageLike.objects.get_or_create(image=ds.public_image, user=ds.viewer)
+
+    commenters = authors[:10]
+    comments = ImageComment.objects.bulk_create(
+        ImageComment(image=ds.public_image, user=commenters[i % len(commenters)], text=f"comentario {i}")
+        for i in range(20 * scale)
+    )
+    replies = ImageComment.objects.bulk_create(
+        ImageComment(
+            image=ds.public_image,
+            user=commenters[(i + 1) % len(commenters)],
+            parent=comments[i % len(comments)],
+            text=f"resposta {i}",
+        )
+        for i in range(40 * scale)
+    )
+    CommentLike.objects.bulk_create(
+        CommentLike(comment=comment, user=user)
+        for comment in [*comments, *replies]
+        for user in commenters[:4]
+    )
+    ds.comment = ImageComment.objects.create(image=ds.public_image, user=ds.viewer, text="meu comentario")
+    ds.thread = comments[0]
+
+    project_tags = ProjectTag.objects.bulk_create(ProjectTag(name=f"ptag{i}") for i in range(5))
+    projects = Project.objects.bulk_create(
+        Project(user=ds.owner, title=f"Projeto {i}", is_public=True, cover_image=owner_images[i])
+        for i in range(6)
+    )
+    for project in projects:
+        project.tags.set(project_tags[:2])
+    ProjectImage.objects.bulk_create(
+        ProjectImage(project=project, image=image, order=order)
+        for project in projects
+        for order, image in enumerate(owner_images[:12])
+    )
+    ds.project = projects[0]
+    ds.project_image_ids = [image.id for image in owner_images[:12]]
+    ds.loose_image_ids = [image.id for image in owner_images[12:32]]
+
+    characters = Character.objects.bulk_create(
+        Character(user=ds.owner, name=f"Personagem {i}", description="ruiva, sardas")
+        for i in range(6)
+    )
+    CharacterReference.objects.bulk_create(
+        CharacterReference(character=character, image=f"characters/budget/{order}.png", order=order)
+        for character in characters
+        for order in range(3)
+    )
+    CharacterGeneration.objects.bulk_create(
+        CharacterGeneration(character=character, image=image, scene_description="na praia")
+        for character in characters
+        for image in owner_images[:4]
+    )
+    ds.character = characters[0]
+    ds.reference = ds.character.references.first()
+
+    sessions = CreativeSession.objects.bulk_create(
+        CreativeSession(user=ds.owner, title=f"Sessao {i}") for i in range(5)
+    )
+    SessionMessage.objects.bulk_create(
+        SessionMessage(
+            session=session,
+            role=SessionMessage.Role.USER if i % 2 == 0 else SessionMessage.Role.ASSISTANT,
+            text=f"mensagem {i}",
+            image=owner_images[i % len(owner_images)] if i % 2 else None,
+        )
+        for session in sessions
+        for i in range(30)
+    )
+    ds.session = sessions[0]
+    ds.session_message = ds.session.messages.filter(role=SessionMessage.Role.ASSISTANT).first()
+    return ds
+
+
+def _llm_response():
+    response = MagicMock()
+    response.raise_for_status.return_value = None
+    response.json.return_value = {
+        "choices": [{
+            "message": {
+                "content": json.dumps({
+                    "message": "Gerando sua imagem.",
+                    "action": "generate",
+                    "prompt": "a lighthouse at dusk, cinematic",
+                    "negative_prompt": "blur",
+                    "refined_prompt": "a lighthouse at dusk, cinematic",
+                })
+            }
+        }]
+    }
+    return response
+
+
+@contextmanager
+def external_services_patched():
+    """Celery, e-mail e DeepSeek fora do caminho medido."""
+    with ExitStack() as stack:
+        stack.enter_context(patch("api.views.generate_image_task.delay"))
+        stack.enter_context(patch("api.views.agent_turn_task.delay"))
+        stack.enter_context(patch("api.views.refresh_relevance_task.delay"))
+        stack.enter_context(patch("api.views.delete_media_files_task.delay"))
+        stack.enter_context(patch("api.signals.purge_user_task.delay"))
+        stack.enter_context(patch("authentication.views.send_verification_email_task.delay"))
+        stack.enter_context(patch("authentication.views.send_welcome_email_task.delay"))
+        stack.enter_context(patch("requests.Session.post", return_value=_llm_response()))
+        stack.enter_context(override_settings(DEEPSEEK_API_KEY="budget-key"))
+        yield
+
+
+class BudgetReport:
+    """Acumula medicoes e grava um JSON estavel (ordenado) para diff entre commits."""
+
+    def __init__(self, path=REPORT_PATH):
+        self.path = path
+        self.results = {}
+
+    def record(self, case, *, status, queries, ms):
+        self.results[case.key] = {
+            "status": status,
+            "queries": queries,
+            "query_budget": case.budget.queries,
+            "ms": round(ms, 1),
+            "ms_budget": round(case.budget.ms * TIME_FACTOR, 1),
+        }
+
+    def write(self):
+        if not self.path or not self.results:
+            return
+        payload = {
+            "meta": {
+                "scale": SCALE,
+                "time_factor": TIME_FACTOR,
+                "database": connection.vendor,
+                "python": platform.python_version(),
+            },
+            "endpoints": dict(sorted(self.results.items())),
+        }
+        with open(self.path, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+
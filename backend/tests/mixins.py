@@ -1,7 +1,10 @@
 import shutil
 import tempfile
 
+from django.conf import settings
+from django.core.files.storage import InMemoryStorage
 from django.test import override_settings
+from django.utils.encoding import filepath_to_uri
 
 
 class TemporaryMediaMixin:
@@ -17,3 +20,26 @@ class TemporaryMediaMixin:
         self._override_media.disable()
         shutil.rmtree(self._temp_media, ignore_errors=True)
         super().tearDown()
+
+
+class SignedInMemoryStorage(InMemoryStorage):
+    """Stand-in for an S3/MinIO bucket: no ``path()`` and absolute signed URLs."""
+
+    def url(self, name):
+        return f"https://bucket.test/media/{filepath_to_uri(name)}?X-Amz-Signature=test"
+
+
+class ObjectStorageMixin:
+    """Swap the default storage for an in-memory bucket during the test."""
+
+    def setUp(self):
+        super().setUp()
+        self._override_storage = override_settings(STORAGES={
+            **settings.STORAGES,
+            "default": {"BACKEND": "tests.mixins.SignedInMemoryStorage"},
+        })
+        self._override_storage.enable()
+
+    def tearDown(self):
+        self._override_storage.disable()
+        super().tearDown()
@@ -0,0 +1,285 @@
+"""Orcamento de queries e de tempo por endpoint.
+
+Cada rota de ``api/urls.py`` e ``authentication/urls.py`` tem ao menos um caso
+com teto de queries; um serializer que volta a cair no fallback
+(``obj.likes.count()``, ``references.first()``...) estoura o teto porque o
+volume semeado e bem maior que o orcamento. Os tetos de tempo sao folgados e
+escalam com ``QUERY_BUDGET_TIME_FACTOR`` (CI lento).
+
+Relatorio JSON: ``QUERY_BUDGET_REPORT=budgets.json python manage.py test tests.test_query_budgets``.
+"""
+import re
+from importlib import import_module
+from time import perf_counter
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from tests.budgets import (
+    PASSWORD,
+    TIME_FACTOR,
+    Budget,
+    BudgetReport,
+    Case,
+    external_services_patched,
+    seed_dataset,
+)
+from tests.mixins import TemporaryMediaMixin
+
+# Hash de senha (PBKDF2) domina o tempo destes endpoints.
+HASHING_MS = 2500.0
+
+PNG_BYTES = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89"
+    b"\x00\x00\x00\rIDATx\x9cc````\x00\x00\x00\x05\x00\x01\xa5\xf6E@\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+
+
+def _upload(name="ref.png"):
+    return {"file": SimpleUploadedFile(name, PNG_BYTES, content_type="image/png")}
+
+
+def _image(ds):
+    return {"pk": ds.public_image.id}
+
+
+def _comment(ds):
+    return {"pk": ds.public_image.id, "comment_id": ds.comment.id}
+
+
+CASES = [
+    # Auth (api/urls.py)
+    Case("token_obtain_pair", "post", Budget(2, HASHING_MS),
+         data=lambda ds: {"email": ds.owner.email, "password": PASSWORD}),
+    Case("token_refresh", "post", Budget(1),
+         data=lambda ds: {"refresh": str(RefreshToken.for_user(ds.owner))}),
+    # Geracao
+    Case("generate-image", "post", Budget(6), status.HTTP_202_ACCEPTED, user="owner",
+         data=lambda ds: {"prompt": "a lighthouse at dusk"}),
+    Case("user-quota", "get", Budget(0), user="owner"),
+    # Galeria. Autenticado: +1 query para carregar o conjunto de curtidas
+    # (like_cache), que aqui sempre parte do cache vazio.
+    Case("public-images", "get", Budget(3), label="anon"),
+    Case("public-images", "get", Budget(4), user="viewer", label="auth"),
+    Case("public-images", "get", Budget(4, 500.0), user="viewer", query="search=lighthouse&tag=tag3",
+         label="search"),
+    Case("user-images", "get", Budget(4), user="owner"),
+    Case("user-liked-images", "get", Budget(4), user="viewer"),
+    Case("share-image", "post", Budget(13), user="owner", kwargs=lambda ds: {"pk": ds.private_image.id}),
+    Case("share-image", "patch", Budget(13), user="owner", kwargs=_image,
+         data=lambda ds: {"is_public": False}),
+    # Social
+    Case("image-like", "post", Budget(13), status.HTTP_201_CREATED, user="owner",
+         kwargs=lambda ds: {"pk": ds.spare_image.id}),
+    Case("image-bulk-visibility", "post", Budget(4), user="owner",
+         data=lambda ds: {"image_ids": ds.loose_image_ids, "is_public": True}),
+    Case("image-bulk-tags", "post", Budget(8), user="owner",
+         data=lambda ds: {"image_ids": ds.loose_image_ids, "add": ["farol", "noite"], "remove": ["dia"]}),
+    Case("image-bulk-delete", "post", Budget(21), user="owner", data=lambda ds: {"image_ids": ds.loose_image_ids}),
+    Case("image-like", "delete", Budget(8), status.HTTP_204_NO_CONTENT, user="viewer", kwargs=_image),
+    Case("image-comments", "get", Budget(4), kwargs=_image, label="anon"),
+    Case("image-comments", "get", Budget(4), user="viewer", kwargs=_image, label="auth"),
+    Case("image-comments", "post", Budget(12), status.HTTP_201_CREATED, user="viewer", kwargs=_image,
+         data=lambda ds: {"text": "belo farol"}),
+    Case("image-comment-detail", "delete", Budget(10), status.HTTP_204_NO_CONTENT, user="viewer",
+         kwargs=_comment),
+    Case("comment-replies", "get", Budget(2), user="viewer",
+         kwargs=lambda ds: {"pk": ds.public_image.id, "comment_id": ds.thread.id}),
+    Case("comment-like", "post", Budget(6), status.HTTP_201_CREATED, user="owner", kwargs=_comment),
+    Case("comment-like", "delete", Budget(2), status.HTTP_404_NOT_FOUND, user="owner", kwargs=_comment,
+         label="not-liked"),
+    Case("image-download", "post", Budget(8), kwargs=_image),
+    Case("image-download-stats", "get", Budget(2), user="owner", kwargs=_image),
+    # Personagens
+    Case("character-list-create", "get", Budget(2), user="owner"),
+    Case("character-list-create", "post", Budget(3), status.HTTP_201_CREATED, user="owner",
+         data=lambda ds: {"name": "Nova", "description": "olhos verdes"}),
+    Case("character-detail", "get", Budget(5), user="owner", kwargs=lambda ds: {"pk": ds.character.id}),
+    Case("character-detail", "put", Budget(6), user="owner", kwargs=lambda ds: {"pk": ds.character.id},
+         data=lambda ds: {"name": "Renomeada"}),
+    Case("character-detail", "delete", Budget(7), status.HTTP_204_NO_CONTENT, user="owner",
+         kwargs=lambda ds: {"pk": ds.character.id}),
+    Case("character-ref-upload", "post", Budget(3), status.HTTP_201_CREATED, user="owner",
+         kwargs=lambda ds: {"pk": ds.character.id}, data=lambda ds: _upload(), format="multipart"),
+    Case("character-ref-remove", "delete", Budget(2), status.HTTP_204_NO_CONTENT, user="owner",
+         kwargs=lambda ds: {"pk": ds.character.id, "ref_id": ds.reference.id}),
+    Case("character-generate", "post", Budget(9), status.HTTP_202_ACCEPTED, user="owner",
+         kwargs=lambda ds: {"pk": ds.character.id}, data=lambda ds: {"scene": "num farol"}),
+    # Image-to-image
+    Case("image-variations", "post", Budget(15), status.HTTP_202_ACCEPTED, user="owner", kwargs=_image,
+         data=lambda ds: {"count": 3}),
+    Case("image-restyle", "post", Budget(7), status.HTTP_202_ACCEPTED, user="owner", kwargs=_image,
+         data=lambda ds: {"style": "anime"}),
+    # Creative Memory
+    Case("image-related", "get", Budget(5, 500.0), kwargs=_image),
+    Case("style-suggestions", "get", Budget(1), user="owner"),
+    # LLM
+    Case("refine-prompt", "post", Budget(0), user="owner",
+         data=lambda ds: {"description": "um farol ao entardecer", "style": "anime"}),
+    Case("metrics", "get", Budget(0), user="staff"),
+    Case("session-list-create", "get", Budget(1), user="owner"),
+    Case("session-list-create", "post", Budget(3), status.HTTP_201_CREATED, user="owner",
+         data=lambda ds: {"title": "Farois"}),
+    Case("session-detail", "get", Budget(4), user="owner", kwargs=lambda ds: {"pk": ds.session.id}),
+    Case("session-detail", "delete", Budget(2), status.HTTP_204_NO_CONTENT, user="owner",
+         kwargs=lambda ds: {"pk": ds.session.id}),
+    Case("session-messages", "post", Budget(5), status.HTTP_202_ACCEPTED, user="owner",
+         kwargs=lambda ds: {"pk": ds.session.id}, data=lambda ds: {"text": "quero um farol ao entardecer"}),
+    Case("session-message-detail", "get", Budget(1), user="owner",
+         kwargs=lambda ds: {"pk": ds.session.id, "message_id": ds.session_message.id}),
+    # Projetos
+    Case("project-list-create", "get", Budget(3), user="owner"),
+    Case("project-list-create", "post", Budget(4), status.HTTP_201_CREATED, user="owner",
+         data=lambda ds: {"title": "Farois", "description": "serie"}),
+    Case("public-projects", "get", Budget(4)),
+    Case("project-detail", "get", Budget(6), user="owner", kwargs=lambda ds: {"pk": ds.project.id}),
+    Case("project-detail", "put", Budget(7), user="owner", kwargs=lambda ds: {"pk": ds.project.id},
+         data=lambda ds: {"title": "Renomeado"}),
+    Case("project-detail", "delete", Budget(8), status.HTTP_204_NO_CONTENT, user="owner",
+         kwargs=lambda ds: {"pk": ds.project.id}),
+    Case("project-image-add", "post", Budget(6), status.HTTP_201_CREATED, user="owner",
+         kwargs=lambda ds: {"pk": ds.project.id}, data=lambda ds: {"image_id": ds.spare_image.id}),
+    Case("project-image-remove", "delete", Budget(2), status.HTTP_204_NO_CONTENT, user="owner",
+         kwargs=lambda ds: {"pk": ds.project.id, "image_id": ds.project_image_ids[0]}),
+    Case("project-reorder", "patch", Budget(5), user="owner", kwargs=lambda ds: {"pk": ds.project.id},
+         data=lambda ds: {"image_ids": list(reversed(ds.project_image_ids))}),
+    Case("project-images-bulk-add", "post", Budget(7), status.HTTP_201_CREATED, user="owner",
+         kwargs=lambda ds: {"pk": ds.project.id}, data=lambda ds: {"image_ids": ds.loose_image_ids}),
+    Case("project-images-bulk-remove", "post", Budget(2), user="owner", kwargs=lambda ds: {"pk": ds.project.id},
+         data=lambda ds: {"image_ids": ds.project_image_ids}),
+    # authentication/urls.py
+    Case("authentication:register", "post", Budget(4, HASHING_MS), status.HTTP_201_CREATED,
+         data=lambda ds: {
+             "email": "new@budget.test", "username": "newcomer",
+             "first_name": "New", "last_name": "Comer",
+             "password": PASSWORD, "password2": PASSWORD,
+         }),
+    Case("authentication:login", "post", Budget(1, HASHING_MS),
+         data=lambda ds: {"email": ds.owner.email, "password": PASSWORD}),
+    Case("authentication:token_refresh", "post", Budget(1),
+         data=lambda ds: {"refresh": str(RefreshToken.for_user(ds.owner))}),
+    Case("authentication:verify_email", "get", Budget(2),
+         kwargs=lambda ds: {"token": ds.pending.verification_token}),
+    Case("authentication:password_reset_request", "post", Budget(3),
+         data=lambda ds: {"email": ds.owner.email}),
+    Case("authentication:password_reset_confirm", "post", Budget(4, HASHING_MS),
+         data=lambda ds: {
+             "token": str(ds.reset_token.token),
+             "new_password": "An0therPass!", "new_password_confirm": "An0therPass!",
+         }),
+    Case("authentication:user_profile", "get", Budget(0), user="owner"),
+    Case("authentication:user_profile", "put", Budget(2), user="owner",
+         data=lambda ds: {"username": "owner", "bio": "farois"}),
+    Case("authentication:user_profile", "patch", Budget(1), user="owner",
+         data=lambda ds: {"bio": "farois"}),
+    Case("authentication:user_avatar", "post", Budget(1), user="owner",
+         data=lambda ds: _upload("avatar.png"), format="multipart"),
+    Case("authentication:user_cover", "post", Budget(1), user="owner",
+         data=lambda ds: _upload("cover.png"), format="multipart"),
+    Case("authentication:user_preferences", "get", Budget(0), user="owner"),
+    Case("authentication:user_preferences", "put", Budget(1), user="owner",
+         data=lambda ds: {"default_ratio": "16:9"}),
+    Case("authentication:change_password", "post", Budget(1, HASHING_MS), user="owner",
+         data=lambda ds: {
+             "current_password": PASSWORD,
+             "new_password": "An0therPass!", "new_password_confirm": "An0therPass!",
+         }),
+    # So desativa a conta; o purge em lotes roda no worker (api/purge.py).
+    Case("authentication:delete_account", "delete", Budget(5, HASHING_MS), user="owner",
+         data=lambda ds: {"password": PASSWORD}),
+]
+
+# Rotas que compartilham a view com outra URL; o metodo so faz sentido na outra.
+UNROUTED = {
+    ("character-ref-upload", "delete"),
+    ("character-ref-remove", "post"),
+    ("project-image-add", "delete"),
+    ("project-image-remove", "post"),
+}
+
+
+class QueryBudgetTests(TemporaryMediaMixin, APITestCase):
+    """Cada endpoint dentro do teto de queries e de tempo com dados realistas."""
+
+    report = BudgetReport()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ds = seed_dataset()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.report.write()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        # Throttles guardam contadores no cache; cada caso parte do zero.
+        cache.clear()
+
+    def _run_case(self, case):
+        ds = self.ds
+        if case.user:
+            self.client.force_authenticate(user=getattr(ds, case.user))
+        url = reverse(case.url_name, kwargs=case.kwargs(ds))
+        if case.query:
+            url = f"{url}?{case.query}"
+        request = getattr(self.client, case.method)
+        extra = {} if case.method == "get" else {"format": case.format}
+        data = case.data(ds)
+
+        with external_services_patched(), CaptureQueriesContext(connection) as queries:
+            started = perf_counter()
+            response = request(url, data, **extra)
+            # Respostas em streaming (SSE) so rodam ao serem consumidas.
+            body = b"".join(response.streaming_content) if response.streaming else response.content
+            elapsed_ms = (perf_counter() - started) * 1000
+
+        self.report.record(case, status=response.status_code, queries=len(queries), ms=elapsed_ms)
+        self.assertEqual(response.status_code, case.expected_status, body[:500])
+        self.assertLessEqual(
+            len(queries),
+            case.budget.queries,
+            f"{case.key}: {len(queries)} queries (teto {case.budget.queries})\n"
+            + "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+        self.assertLessEqual(
+            elapsed_ms,
+            case.budget.ms * TIME_FACTOR,
+            f"{case.key}: {elapsed_ms:.1f}ms (teto {case.budget.ms * TIME_FACTOR:.0f}ms)",
+        )
+
+    def test_every_route_has_a_budget(self):
+        """Toda rota/metodo de api e authentication tem um caso de orcamento."""
+        covered = {(case.url_name, case.method) for case in CASES}
+        missing = []
+        for prefix, module in (("", "api.urls"), ("authentication:", "authentication.urls")):
+            for pattern in import_module(module).urlpatterns:
+                view_class = pattern.callback.view_class
+                for method in view_class.http_method_names:
+                    if method in ("head", "options") or not hasattr(view_class, method):
+                        continue
+                    key = (f"{prefix}{pattern.name}", method)
+                    if key not in covered and key not in UNROUTED:
+                        missing.append(key)
+        self.assertEqual(missing, [], "Rotas sem orcamento em tests/test_query_budgets.py")
+
+
+def _make_test(case):
+    def test(self):
+        self._run_case(case)
+
+    test.__doc__ = f"{case.key}: ate {case.budget.queries} queries."
+    return test
+
+
+for _case in CASES:
+    _name = "test_" + re.sub(r"\W+", "_", _case.key.lower()).strip("_")
+    assert not hasattr(QueryBudgetTests, _name), _name
+    setattr(QueryBudgetTests, _name, _make_test(_case))
@@ -16,7 +16,7 @@ export interface paths {
         post?: never;
         /**
          * Deletar conta
-         * @description Deleta permanentemente a conta do usuário e todas as suas imagens. Requer confirmação com a senha atual. Ação irreversível.
+         * @description Deleta permanentemente a conta do usuário e todas as suas imagens. Requer confirmação com a senha atual. Ação irreversível: a conta é desativada e some das listagens na hora; dados e arquivos são apagados em segundo plano.
          */
         delete: operations["auth_account_destroy"];
         options?: never;
@@ -158,7 +158,7 @@ export interface paths {
         put?: never;
         /**
          * Upload de avatar
-         * @description Envia ou substitui a foto de perfil do usuário.
+         * @description Envia ou substitui a foto de perfil do usuário. JPEG, PNG, WebP ou GIF; gravada como WebP 256x256 (o original é descartado).
          */
         post: operations["auth_profile_avatar_create"];
         delete?: never;
@@ -178,7 +178,7 @@ export interface paths {
         put?: never;
         /**
          * Upload de capa
-         * @description Envia ou substitui a imagem de capa do usuário.
+         * @description Envia ou substitui a imagem de capa do usuário. JPEG, PNG, WebP ou GIF; gravada como WebP 1500x500 (o original é descartado).
          */
         post: operations["auth_profile_cover_create"];
         delete?: never;
@@ -327,7 +327,7 @@ export interface paths {
         put?: never;
         /**
          * Upload referência
-         * @description Adiciona uma imagem de referência ao personagem (multipart).
+         * @description Adiciona uma imagem de referência ao personagem (multipart). JPEG, PNG, WebP ou GIF; gravada como WebP com no máximo 1024px no maior lado (o original é descartado).
          */
         post: operations["characters_references_create"];
         /**
@@ -351,7 +351,7 @@ export interface paths {
         put?: never;
         /**
          * Upload referência
-         * @description Adiciona uma imagem de referência ao personagem (multipart).
+         * @description Adiciona uma imagem de referência ao personagem (multipart). JPEG, PNG, WebP ou GIF; gravada como WebP com no máximo 1024px no maior lado (o original é descartado).
          */
         post: operations["characters_references_remove_create"];
         /**
@@ -440,6 +440,26 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/images/{id}/comments/{comment_id}/replies/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /**
+         * Mais respostas
+         * @description Respostas de um comentário em ordem de criação, depois do id `after` (use `replies_cursor` da listagem de comentários e depois `next_cursor`).
+         */
+        get: operations["images_comments_replies_retrieve"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/images/{id}/download/": {
         parameters: {
             query?: never;
@@ -451,7 +471,7 @@ export interface paths {
         put?: never;
         /**
          * Download de imagem
-         * @description Incrementa o contador de downloads e retorna a URL para download.
+         * @description Conta o download e retorna a URL para download. O contador é acumulado no Redis e gravado no banco em lote; `download_count` já inclui os downloads pendentes.
          */
         post: operations["images_download_create"];
         delete?: never;
@@ -460,6 +480,26 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/images/{id}/downloads/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /**
+         * Downloads por dia
+         * @description Downloads diários de uma imagem do usuário nos últimos `days` dias (padrão 30, máximo 90). Dias sem download não aparecem; os contadores são gravados em lote, com atraso de até um intervalo de flush.
+         */
+        get: operations["images_downloads_retrieve"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/images/{id}/like/": {
         parameters: {
             query?: never;
@@ -568,6 +608,66 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/images/bulk/delete/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        /**
+         * Apagar imagens (lote)
+         * @description Apaga várias imagens do usuário (e curtidas, comentários e entradas de projetos delas). Os arquivos são removidos do storage em segundo plano. Se algum ID não for do usuário, nada é apagado.
+         */
+        post: operations["images_bulk_delete_create"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/api/images/bulk/tags/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        /**
+         * Editar tags (lote)
+         * @description Adiciona as tags de `add` (criadas se não existirem) e remove as de `remove` em todas as imagens informadas, com inserções em lote na tabela de associação. Se algum ID não for do usuário, nada é alterado.
+         */
+        post: operations["images_bulk_tags_create"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/api/images/bulk/visibility/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        /**
+         * Alterar visibilidade (lote)
+         * @description Publica ou despublica várias imagens do usuário com um único UPDATE. Se algum ID não for do usuário, nada é alterado. A relevância é recalculada em segundo plano.
+         */
+        post: operations["images_bulk_visibility_create"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/images/liked/": {
         parameters: {
             query?: never;
@@ -716,6 +816,46 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/projects/{id}/images/bulk/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        /**
+         * Adicionar imagens ao projeto (lote)
+         * @description Adiciona várias imagens do usuário ao final do projeto, na ordem enviada. Imagens que já estão no projeto são ignoradas; se algum ID não for do usuário, nada é adicionado.
+         */
+        post: operations["projects_images_bulk_create"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
+    "/api/projects/{id}/images/bulk-remove/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        get?: never;
+        put?: never;
+        /**
+         * Remover imagens do projeto (lote)
+         * @description Desassocia várias imagens do projeto com um único DELETE (as imagens não são apagadas).
+         */
+        post: operations["projects_images_bulk_remove_create"];
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/projects/{id}/images/reorder/": {
         parameters: {
             query?: never;
@@ -764,7 +904,7 @@ export interface paths {
         put?: never;
         /**
          * Refinar prompt
-         * @description Transforma uma descrição casual em um prompt otimizado para geração de imagem. Usa o DeepSeek LLM para gerar prompt em inglês com modificadores técnicos.
+         * @description Transforma uma descrição casual em um prompt otimizado para geração de imagem. Usa o DeepSeek LLM para gerar prompt em inglês com modificadores técnicos. Com `?stream=true` (ou `Accept: text/event-stream`) responde em SSE: eventos `delta` com trechos de `refined_prompt` e um `done` final com o resultado completo (ou `error` com `detail`).
          */
         post: operations["refine_prompt_create"];
         delete?: never;
@@ -832,7 +972,7 @@ export interface paths {
         put?: never;
         /**
          * Enviar mensagem
-         * @description Envia uma mensagem ao agente criativo. O agente responde com texto e, opcionalmente, gera uma imagem se tiver informação suficiente. Usa o DeepSeek LLM para a conversa e FLUX.1-dev para geração.
+         * @description Envia uma mensagem ao agente criativo. A resposta do agente é criada com status PENDING e processada em background (DeepSeek LLM para a conversa e FLUX.1-dev para geração); acompanhe por `GET /api/sessions/{id}/messages/{message_id}/` até READY ou FAILED.
          */
         post: operations["sessions_messages_create"];
         delete?: never;
@@ -841,6 +981,26 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/sessions/{id}/messages/{message_id}/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /**
+         * Detalhe da mensagem
+         * @description Retorna uma mensagem da sessão. Usado para acompanhar a resposta do agente (`status`) e a imagem gerada por ela (`image_status`). Enquanto a resposta está `PENDING`, `text` traz o trecho já escrito pelo LLM; passado `AGENT_TURN_TIMEOUT` sem resposta do worker, ela aparece como `FAILED`.
+         */
+        get: operations["sessions_messages_retrieve"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/token/": {
         parameters: {
             query?: never;
@@ -901,6 +1061,26 @@ export interface paths {
         patch?: never;
         trace?: never;
     };
+    "/api/users/me/quota/": {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        /**
+         * Minha cota
+         * @description Plano, gerações usadas e restantes no período atual e a data de renovação. Lido do cache de cota; `quota` e `remaining` são nulos em planos ilimitados.
+         */
+        get: operations["users_me_quota_retrieve"];
+        put?: never;
+        post?: never;
+        delete?: never;
+        options?: never;
+        head?: never;
+        patch?: never;
+        trace?: never;
+    };
     "/api/users/me/style-suggestions/": {
         parameters: {
             query?: never;
@@ -910,7 +1090,7 @@ export interface paths {
         };
         /**
          * Sugestões de estilo
-         * @description Analisa o histórico de prompts do usuário para identificar padrões recorrentes de estilo, modificadores e temas. Retorna até 5 sugestões.
+         * @description Retorna os estilos visuais recorrentes do usuário (grupos de embeddings de imagem, com a imagem mais representativa de cada um como exemplo). Sem grupos ainda, usa os padrões recorrentes dos prompts. Retorna até 5 sugestões.
          */
         get: operations["users_me_style_suggestions_retrieve"];
         put?: never;
@@ -1001,6 +1181,10 @@ export interface components {
             is_liked: boolean;
             like_count: number;
         };
+        CommentRepliesPage: {
+            results: components["schemas"]["ImageCommentReply"][];
+            next_cursor: number | null;
+        };
         CommentUnlikeResponse: {
             comment_id: number;
             is_liked: boolean;
@@ -1088,6 +1272,33 @@ export interface components {
             /** Format: date-time */
             readonly created_at: string;
         };
+        ImageBulkDeleteResult: {
+            deleted: number;
+        };
+        ImageBulkRequest: {
+            /** @description IDs de imagens do usuário */
+            image_ids: number[];
+        };
+        ImageBulkTagsRequest: {
+            /** @description IDs de imagens do usuário */
+            image_ids: number[];
+            /** @description Tags a adicionar (criadas se não existirem) */
+            add?: string[];
+            /** @description Tags a remover */
+            remove?: string[];
+        };
+        ImageBulkTagsResult: {
+            added: number;
+            removed: number;
+        };
+        ImageBulkVisibilityRequest: {
+            /** @description IDs de imagens do usuário */
+            image_ids: number[];
+            is_public: boolean;
+        };
+        ImageBulkVisibilityResult: {
+            updated: number;
+        };
         ImageComment: {
             readonly id: number;
             readonly user: components["schemas"]["ImageUser"];
@@ -1101,6 +1312,7 @@ export interface components {
             readonly parent_id: number | null;
             readonly reply_count: number;
             readonly replies: components["schemas"]["ImageCommentReply"][];
+            readonly replies_cursor: number | null;
         };
         ImageCommentCreate: {
             text: string;
@@ -1122,6 +1334,15 @@ export interface components {
             readonly like_count: number;
             readonly is_liked: boolean;
         };
+        ImageDownloadDay: {
+            /** Format: date */
+            day: string;
+            count: number;
+        };
+        ImageDownloadStats: {
+            download_count: number;
+            daily: components["schemas"]["ImageDownloadDay"][];
+        };
         /**
          * @description * `GENERATING` - Generating
          *     * `READY` - Ready
@@ -1147,6 +1368,8 @@ export interface components {
         NotFound: {
             error: string;
         };
+        /** @enum {string} */
+        NullEnum: null;
         PaginatedImageCommentList: {
             /** @example 123 */
             count: number;
@@ -1177,7 +1400,7 @@ export interface components {
             previous?: string | null;
             results: components["schemas"]["Image"][];
         };
-        PaginatedProjectList: {
+        PaginatedProjectListList: {
             /** @example 123 */
             count: number;
             /**
@@ -1190,7 +1413,7 @@ export interface components {
              * @example http://api.example.org/accounts/?page=2
              */
             previous?: string | null;
-            results: components["schemas"]["Project"][];
+            results: components["schemas"]["ProjectList"][];
         };
         /** @description Serializer for password reset confirmation. */
         PasswordResetConfirmRequest: {
@@ -1266,9 +1489,61 @@ export interface components {
             order: number;
             caption: string;
         };
+        ProjectImageBulkRequest: {
+            /** @description IDs das imagens (na ordem em que devem ser adicionadas) */
+            image_ids: number[];
+            /** @default  */
+            caption: string;
+        };
+        ProjectImagesBulkAdded: {
+            added: number[];
+            skipped: number[];
+        };
+        ProjectImagesBulkRemoved: {
+            removed: number;
+        };
+        /**
+         * @description Lighter serializer for project lists: counts and previews, no entries.
+         *
+         *     Expects ``project_list_queryset`` annotations and ``previews`` filled by
+         *     ``attach_project_previews``.
+         */
+        ProjectList: {
+            /** Format: uuid */
+            readonly id: string;
+            readonly user: components["schemas"]["ImageUser"];
+            readonly title: string;
+            readonly description: string;
+            readonly cover_image: number | null;
+            /** Format: uri */
+            readonly cover_image_url: string | null;
+            readonly is_public: boolean;
+            readonly tags: string[];
+            readonly previews: components["schemas"]["ProjectPreview"][];
+            readonly image_count: number;
+            /** Format: date-time */
+            readonly created_at: string;
+            /** Format: date-time */
+            readonly updated_at: string;
+        };
+        ProjectPreview: {
+            id: number;
+            /** Format: uri */
+            image_url: string | null;
+        };
         QuotaExceeded: {
             detail: string;
         };
+        QuotaState: {
+            plan: string;
+            quota: number | null;
+            used: number;
+            remaining: number | null;
+            /** Format: date */
+            period_start: string;
+            /** Format: date */
+            resets_on: string;
+        };
         RefUploaded: {
             id: number;
             /** Format: uri */
@@ -1299,6 +1574,7 @@ export interface components {
         };
         ReorderResponse: {
             detail: string;
+            updated: number;
         };
         /** @description Request to apply a different style to an existing image. */
         RestyleRequestRequest: {
@@ -1326,9 +1602,11 @@ export interface components {
             readonly id: number;
             readonly role: components["schemas"]["RoleEnum"];
             text: string;
+            readonly status: components["schemas"]["SessionMessageStatusEnum"];
             readonly image: number | null;
             /** Format: uri */
             readonly image_url: string | null;
+            readonly image_status: (components["schemas"]["ImageStatusEnum"] | components["schemas"]["NullEnum"]) | null;
             readonly prompt_used: string;
             /** Format: date-time */
             readonly created_at: string;
@@ -1336,6 +1614,13 @@ export interface components {
         SessionMessageCreateRequest: {
             text: string;
         };
+        /**
+         * @description * `PENDING` - Pending
+         *     * `READY` - Ready
+         *     * `FAILED` - Failed
+         * @enum {string}
+         */
+        SessionMessageStatusEnum: "PENDING" | "READY" | "FAILED";
         /**
          * @description * `active` - Active
          *     * `archived` - Archived
@@ -1747,6 +2032,14 @@ export interface operations {
                     "application/json": components["schemas"]["DetailResponse"];
                 };
             };
+            413: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["DetailResponse"];
+                };
+            };
         };
     };
     auth_profile_cover_create: {
@@ -1781,6 +2074,14 @@ export interface operations {
                     "application/json": components["schemas"]["DetailResponse"];
                 };
             };
+            413: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["DetailResponse"];
+                };
+            };
         };
     };
     auth_register_create: {
@@ -2027,6 +2328,20 @@ export interface operations {
                     "application/json": components["schemas"]["RefUploaded"];
                 };
             };
+            /** @description No response body */
+            400: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content?: never;
+            };
+            /** @description No response body */
+            413: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content?: never;
+            };
         };
     };
     characters_references_destroy: {
@@ -2076,6 +2391,20 @@ export interface operations {
                     "application/json": components["schemas"]["RefUploaded"];
                 };
             };
+            /** @description No response body */
+            400: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content?: never;
+            };
+            /** @description No response body */
+            413: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content?: never;
+            };
         };
     };
     characters_references_remove_destroy: {
@@ -2263,6 +2592,32 @@ export interface operations {
             };
         };
     };
+    images_comments_replies_retrieve: {
+        parameters: {
+            query?: {
+                after?: number;
+                /** @description Padrão 20, máximo 100. */
+                limit?: number;
+            };
+            header?: never;
+            path: {
+                comment_id: number;
+                id: number;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["CommentRepliesPage"];
+                };
+            };
+        };
+    };
     images_download_create: {
         parameters: {
             query?: never;
@@ -2291,6 +2646,29 @@ export interface operations {
             };
         };
     };
+    images_downloads_retrieve: {
+        parameters: {
+            query?: {
+                days?: number;
+            };
+            header?: never;
+            path: {
+                id: number;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ImageDownloadStats"];
+                };
+            };
+        };
+    };
     images_like_create: {
         parameters: {
             query?: never;
@@ -2496,6 +2874,81 @@ export interface operations {
             };
         };
     };
+    images_bulk_delete_create: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody: {
+            content: {
+                "application/json": components["schemas"]["ImageBulkRequest"];
+                "application/x-www-form-urlencoded": components["schemas"]["ImageBulkRequest"];
+                "multipart/form-data": components["schemas"]["ImageBulkRequest"];
+            };
+        };
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ImageBulkDeleteResult"];
+                };
+            };
+        };
+    };
+    images_bulk_tags_create: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody: {
+            content: {
+                "application/json": components["schemas"]["ImageBulkTagsRequest"];
+                "application/x-www-form-urlencoded": components["schemas"]["ImageBulkTagsRequest"];
+                "multipart/form-data": components["schemas"]["ImageBulkTagsRequest"];
+            };
+        };
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ImageBulkTagsResult"];
+                };
+            };
+        };
+    };
+    images_bulk_visibility_create: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody: {
+            content: {
+                "application/json": components["schemas"]["ImageBulkVisibilityRequest"];
+                "application/x-www-form-urlencoded": components["schemas"]["ImageBulkVisibilityRequest"];
+                "multipart/form-data": components["schemas"]["ImageBulkVisibilityRequest"];
+            };
+        };
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ImageBulkVisibilityResult"];
+                };
+            };
+        };
+    };
     images_liked_list: {
         parameters: {
             query?: {
@@ -2578,7 +3031,7 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["Project"][];
+                    "application/json": components["schemas"]["ProjectList"][];
                 };
             };
         };
@@ -2772,6 +3225,60 @@ export interface operations {
             };
         };
     };
+    projects_images_bulk_create: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                id: string;
+            };
+            cookie?: never;
+        };
+        requestBody: {
+            content: {
+                "application/json": components["schemas"]["ProjectImageBulkRequest"];
+                "application/x-www-form-urlencoded": components["schemas"]["ProjectImageBulkRequest"];
+                "multipart/form-data": components["schemas"]["ProjectImageBulkRequest"];
+            };
+        };
+        responses: {
+            201: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ProjectImagesBulkAdded"];
+                };
+            };
+        };
+    };
+    projects_images_bulk_remove_create: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                id: string;
+            };
+            cookie?: never;
+        };
+        requestBody: {
+            content: {
+                "application/json": components["schemas"]["ProjectImageBulkRequest"];
+                "application/x-www-form-urlencoded": components["schemas"]["ProjectImageBulkRequest"];
+                "multipart/form-data": components["schemas"]["ProjectImageBulkRequest"];
+            };
+        };
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["ProjectImagesBulkRemoved"];
+                };
+            };
+        };
+    };
     projects_images_reorder_partial_update: {
         parameters: {
             query?: never;
@@ -2816,14 +3323,18 @@ export interface operations {
                     [name: string]: unknown;
                 };
                 content: {
-                    "application/json": components["schemas"]["PaginatedProjectList"];
+                    "application/json": components["schemas"]["PaginatedProjectListList"];
                 };
             };
         };
     };
     refine_prompt_create: {
         parameters: {
-            query?: never;
+            query?: {
+                format?: "json" | "sse";
+                /** @description Responde em Server-Sent Events. */
+                stream?: boolean;
+            };
             header?: never;
             path?: never;
             cookie?: never;
@@ -2842,6 +3353,7 @@ export interface operations {
                 };
                 content: {
                     "application/json": components["schemas"]["RefinePromptResponse"];
+                    "text/event-stream": components["schemas"]["RefinePromptResponse"];
                 };
             };
             /** @description No response body */
@@ -2857,6 +3369,7 @@ export interface operations {
                 };
                 content: {
                     "application/json": components["schemas"]["ServiceUnavailable"];
+                    "text/event-stream": components["schemas"]["ServiceUnavailable"];
                 };
             };
         };
@@ -2963,7 +3476,7 @@ export interface operations {
             };
         };
         responses: {
-            200: {
+            202: {
                 headers: {
                     [name: string]: unknown;
                 };
@@ -2973,6 +3486,28 @@ export interface operations {
             };
         };
     };
+    sessions_messages_retrieve: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path: {
+                id: string;
+                message_id: number;
+            };
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["SessionMessage"];
+                };
+            };
+        };
+    };
     token_create: {
         parameters: {
             query?: never;
@@ -3047,6 +3582,25 @@ export interface operations {
             };
         };
     };
+    users_me_quota_retrieve: {
+        parameters: {
+            query?: never;
+            header?: never;
+            path?: never;
+            cookie?: never;
+        };
+        requestBody?: never;
+        responses: {
+            200: {
+                headers: {
+                    [name: string]: unknown;
+                };
+                content: {
+                    "application/json": components["schemas"]["QuotaState"];
+                };
+            };
+        };
+    };
     users_me_style_suggestions_retrieve: {
         parameters: {
             query?: {
@@ -3,9 +3,11 @@ import type {
   GenerateImagePayload,
   ImageRecord,
   PaginatedResponse,
+  ProjectListItem,
   ProjectRecord,
+  SessionMessageRecord,
 } from '@/features/images/types';
-import type { ImageComment } from '@/features/images/components/ImageDetailsDialog';
+import type { CommentRepliesPage, ImageComment } from '@/features/images/components/ImageDetailsDialog';
 
 export const imagesApi = {
   async fetchMyImages(page = 1) {
@@ -64,6 +66,26 @@ export const imagesApi = {
     });
     return data;
   },
+  async updateShareBulk(imageIds: number[], isPublic: boolean) {
+    const { data } = await apiClient.post<{ updated: number }>('/images/bulk/visibility/', {
+      image_ids: imageIds,
+      is_public: isPublic,
+    });
+    return data;
+  },
+  async updateTagsBulk(imageIds: number[], changes: { add?: string[]; remove?: string[] }) {
+    const { data } = await apiClient.post<{ added: number; removed: number }>('/images/bulk/tags/', {
+      image_ids: imageIds,
+      ...changes,
+    });
+    return data;
+  },
+  async deleteImagesBulk(imageIds: number[]) {
+    const { data } = await apiClient.post<{ deleted: number }>('/images/bulk/delete/', {
+      image_ids: imageIds,
+    });
+    return data;
+  },
   async like(imageId: number) {
     const { data } = await apiClient.post<ImageRecord>(`/images/${imageId}/like/`);
     return data;
@@ -106,6 +128,12 @@ export const imagesApi = {
     }>(`/images/${imageId}/comments/${commentId}/like/`);
     return data;
   },
+  async fetchCommentReplies(imageId: number, commentId: number, after: number) {
+    const { data } = await apiClient.get<CommentRepliesPage>(`/images/${imageId}/comments/${commentId}/replies/`, {
+      params: { after },
+    });
+    return data;
+  },
   async addReply(imageId: number, parentId: number, text: string) {
     const { data } = await apiClient.post<ImageComment>(
       `/images/${imageId}/comments/`,
@@ -173,16 +201,22 @@ export const imagesApi = {
   async archiveSession(sessionId: string) {
     await apiClient.delete(`/sessions/${sessionId}/`);
   },
+  // Responde 202: agent_response volta PENDING e e preenchida em background.
   async sendMessage(sessionId: string, text: string) {
     const { data } = await apiClient.post<{
-      message: { id: number; role: string; text: string; image: number | null; image_url: string | null; prompt_used: string; created_at: string };
-      agent_response: { id: number; role: string; text: string; image: number | null; image_url: string | null; prompt_used: string; created_at: string };
+      message: SessionMessageRecord;
+      agent_response: SessionMessageRecord;
     }>(`/sessions/${sessionId}/messages/`, { text });
     return data;
   },
+  // Enquanto a resposta esta PENDING, text traz o trecho ja escrito pelo agente.
+  async fetchSessionMessage(sessionId: string, messageId: number) {
+    const { data } = await apiClient.get<SessionMessageRecord>(`/sessions/${sessionId}/messages/${messageId}/`);
+    return data;
+  },
   // Projects
   async fetchProjects() {
-    const { data } = await apiClient.get<ProjectRecord[]>('/projects/');
+    const { data } = await apiClient.get<ProjectListItem[]>('/projects/');
     return data;
   },
   async fetchProject(projectId: string) {
@@ -207,12 +241,25 @@ export const imagesApi = {
   async removeImageFromProject(projectId: string, imageId: number) {
     await apiClient.delete(`/projects/${projectId}/images/${imageId}/remove/`);
   },
+  async addImagesToProject(projectId: string, imageIds: number[], caption = '') {
+    const { data } = await apiClient.post<{ added: number[]; skipped: number[] }>(
+      `/projects/${projectId}/images/bulk/`,
+      { image_ids: imageIds, caption },
+    );
+    return data;
+  },
+  async removeImagesFromProject(projectId: string, imageIds: number[]) {
+    const { data } = await apiClient.post<{ removed: number }>(`/projects/${projectId}/images/bulk-remove/`, {
+      image_ids: imageIds,
+    });
+    return data;
+  },
   async reorderProjectImages(projectId: string, imageIds: number[]) {
     const { data } = await apiClient.patch(`/projects/${projectId}/images/reorder/`, { image_ids: imageIds });
     return data;
   },
   async fetchPublicProjects(page = 1) {
-    const { data } = await apiClient.get<PaginatedResponse<ProjectRecord>>('/projects/public/', { params: { page } });
+    const { data } = await apiClient.get<PaginatedResponse<ProjectListItem>>('/projects/public/', { params: { page } });
     return data;
   },
   // Related & Suggestions
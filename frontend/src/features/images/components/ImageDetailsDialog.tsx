@@ -24,8 +24,27 @@ export type ImageComment = {
   parent_id: number | null;
   reply_count: number;
   replies: ImageCommentReply[];
+  // `after` para buscar mais replies; nulo quando `replies` ja tem todas.
+  replies_cursor: number | null;
 };
 
+export type CommentRepliesPage = {
+  results: ImageCommentReply[];
+  next_cursor: number | null;
+};
+
+// Junta uma pagina de replies ao comentario, sem duplicar as que ja foram
+// adicionadas localmente, em ordem de criacao.
+export const appendReplyPage = (comments: ImageComment[], commentId: number, page: CommentRepliesPage) =>
+  comments.map((comment) => {
+    if (comment.id !== commentId) return comment;
+    const known = new Set(comment.replies.map((reply) => reply.id));
+    const replies = [...comment.replies, ...page.results.filter((reply) => !known.has(reply.id))].sort(
+      (a, b) => a.id - b.id,
+    );
+    return { ...comment, replies, replies_cursor: page.next_cursor };
+  });
+
 type ImageDetailsDialogProps = {
   image: ImageRecord | null;
   onClose: () => void;
@@ -38,6 +57,7 @@ type ImageDetailsDialogProps = {
   onAddComment?: (image: ImageRecord, text: string) => void;
   onLikeComment?: (commentId: number) => void;
   onAddReply?: (parentId: number, text: string) => void;
+  onLoadMoreReplies?: (commentId: number) => void;
   isLoadingComments?: boolean;
 };
 
@@ -51,6 +71,7 @@ export const ImageDetailsDialog = ({
   onAddComment,
   onLikeComment,
   onAddReply,
+  onLoadMoreReplies,
   isLoadingComments = false,
 }: ImageDetailsDialogProps) => {
   const [showComments, setShowComments] = useState(false);
@@ -279,6 +300,16 @@ export const ImageDetailsDialog = ({
                               </div>
                             </div>
                           ))}
+                          {comment.replies_cursor && onLoadMoreReplies && (
+                            <button
+                              type="button"
+                              className="img-dialog__comment-btn"
+                              onClick={() => onLoadMoreReplies(comment.id)}
+                            >
+                              <ChevronDown size={13} />
+                              <span>Ver mais respostas ({comment.reply_count - comment.replies.length})</span>
+                            </button>
+                          )}
                         </div>
                       )}
 
@@ -63,3 +63,20 @@ export type ProjectRecord = {
   created_at: string;
   updated_at: string;
 };
+
+// Item das listagens: sem as entradas, com contagem e as primeiras miniaturas.
+export type ProjectListItem = Omit<ProjectRecord, 'images'> & {
+  previews: { id: number; image_url: string | null }[];
+};
+
+export type SessionMessageRecord = {
+  id: number;
+  role: 'user' | 'assistant';
+  text: string;
+  status: 'PENDING' | 'READY' | 'FAILED';
+  image: number | null;
+  image_url: string | null;
+  image_status: ImageRecord['status'] | null;
+  prompt_used: string;
+  created_at: string;
+};
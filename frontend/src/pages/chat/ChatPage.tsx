@@ -3,16 +3,11 @@ import { useParams, useNavigate, Link } from 'react-router-dom';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { Send, Plus, Sparkles, Loader2, Wand2, Image, Palette, Zap } from 'lucide-react';
 import { imagesApi } from '@/features/images/api';
+import type { SessionMessageRecord } from '@/features/images/types';
+
+const POLL_INTERVAL_MS = 1500;
+const REPLY_POLL_INTERVAL_MS = 500;
 
-type ChatMessage = {
-  id: number;
-  role: 'user' | 'assistant';
-  text: string;
-  image: number | null;
-  image_url: string | null;
-  prompt_used: string;
-  created_at: string;
-};
 
 const QUICK_PROMPTS = [
   { icon: Wand2, label: 'Retrato artístico', prompt: 'Crie um retrato artístico com iluminação dramática' },
@@ -38,9 +33,18 @@ export const ChatPage = () => {
     queryKey: ['session', sessionId],
     queryFn: () => imagesApi.fetchSession(sessionId!),
     enabled: !!sessionId,
+    // Resposta do agente e imagem sao processadas em background: refaz a
+    // consulta enquanto houver algo pendente.
+    refetchInterval: (query) => {
+      const pending = (query.state.data?.messages ?? []).some(
+        (msg: SessionMessageRecord) => msg.status === 'PENDING' || msg.image_status === 'GENERATING',
+      );
+      return pending ? POLL_INTERVAL_MS : false;
+    },
   });
 
-  const messages: ChatMessage[] = currentSession?.messages ?? [];
+  const allMessages: SessionMessageRecord[] = currentSession?.messages ?? [];
+  const messages = allMessages.filter((msg) => msg.status !== 'PENDING');
 
   const createMutation = useMutation({
     mutationFn: () => imagesApi.createSession(),
@@ -50,25 +54,51 @@ export const ChatPage = () => {
     },
   });
 
+  // Texto parcial do agente: o detalhe da resposta e consultado em intervalo
+  // curto ate ela sair de PENDING; o polling da sessao cobre o resto.
+  const [pendingReplyId, setPendingReplyId] = useState<number | null>(null);
+
+  useEffect(() => setPendingReplyId(null), [sessionId]);
+
+  const { data: pendingReply } = useQuery({
+    queryKey: ['session-message', sessionId, pendingReplyId],
+    queryFn: () => imagesApi.fetchSessionMessage(sessionId!, pendingReplyId!),
+    enabled: !!sessionId && pendingReplyId !== null,
+    refetchInterval: (query) =>
+      query.state.data && query.state.data.status !== 'PENDING' ? false : REPLY_POLL_INTERVAL_MS,
+  });
+
+  useEffect(() => {
+    if (pendingReply && pendingReply.status !== 'PENDING') {
+      setPendingReplyId(null);
+      queryClient.invalidateQueries({ queryKey: ['session', sessionId] });
+    }
+  }, [pendingReply, queryClient, sessionId]);
+
+  const streamingText = pendingReplyId !== null && pendingReply?.status === 'PENDING' ? pendingReply.text : '';
+
   const sendMutation = useMutation({
     mutationFn: (text: string) => imagesApi.sendMessage(sessionId!, text),
-    onSuccess: () => {
+    onSuccess: (data) => {
       queryClient.invalidateQueries({ queryKey: ['session', sessionId] });
       queryClient.invalidateQueries({ queryKey: ['sessions'] });
       setInput('');
+      setPendingReplyId(data.agent_response.id);
     },
   });
 
+  const agentThinking = sendMutation.isPending || allMessages.some((msg) => msg.status === 'PENDING');
+
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
-  }, [messages.length, sendMutation.isPending]);
+  }, [messages.length, agentThinking, streamingText]);
 
   useEffect(() => {
     inputRef.current?.focus();
   }, [sessionId]);
 
   const handleSend = () => {
-    if (!input.trim() || sendMutation.isPending) return;
+    if (!input.trim() || agentThinking) return;
     if (!sessionId) {
       createMutation.mutate();
       return;
@@ -208,7 +238,7 @@ export const ChatPage = () => {
                           {msg.prompt_used.slice(0, 120)}{msg.prompt_used.length > 120 ? '...' : ''}
                         </p>
                       )}
-                      {msg.image && !msg.image_url && (
+                      {msg.image && !msg.image_url && msg.image_status !== 'FAILED' && (
                         <div className="mt-3 flex items-center gap-2 rounded-xl bg-flow-50 dark:bg-flow-900/20 px-4 py-3">
                           <div className="relative">
                             <div className="absolute inset-0 animate-ping rounded-full bg-accent/30" />
@@ -222,20 +252,24 @@ export const ChatPage = () => {
                 </div>
               ))}
 
-              {sendMutation.isPending && (
+              {agentThinking && (
                 <div className="flex justify-start">
                   <div className="flex gap-3">
                     <div className="flex size-8 shrink-0 items-center justify-center rounded-xl bg-gradient-to-br from-flow-500 to-flow-700 shadow-sm">
                       <Sparkles className="h-4 w-4 text-white" />
                     </div>
                     <div className="rounded-2xl rounded-bl-md bg-white dark:bg-white/[0.06] shadow-sm px-4 py-3">
-                      <div className="flex items-center gap-2">
-                        <div className="flex gap-1">
-                          <span className="size-2 rounded-full bg-fg-muted/40 animate-bounce" style={{ animationDelay: '0ms' }} />
-                          <span className="size-2 rounded-full bg-fg-muted/40 animate-bounce" style={{ animationDelay: '150ms' }} />
-                          <span className="size-2 rounded-full bg-fg-muted/40 animate-bounce" style={{ animationDelay: '300ms' }} />
+                      {streamingText ? (
+                        <p className="whitespace-pre-wrap text-sm leading-relaxed text-fg">{streamingText}</p>
+                      ) : (
+                        <div className="flex items-center gap-2">
+                          <div className="flex gap-1">
+                            <span className="size-2 rounded-full bg-fg-muted/40 animate-bounce" style={{ animationDelay: '0ms' }} />
+                            <span className="size-2 rounded-full bg-fg-muted/40 animate-bounce" style={{ animationDelay: '150ms' }} />
+                            <span className="size-2 rounded-full bg-fg-muted/40 animate-bounce" style={{ animationDelay: '300ms' }} />
+                          </div>
                         </div>
-                      </div>
+                      )}
                     </div>
                   </div>
                 </div>
@@ -267,7 +301,7 @@ export const ChatPage = () => {
               />
               <button
                 onClick={handleSend}
-                disabled={!input.trim() || sendMutation.isPending}
+                disabled={!input.trim() || agentThinking}
                 className="flex size-10 shrink-0 items-center justify-center rounded-xl bg-gradient-to-b from-accent to-flow-700 text-white shadow-sm shadow-accent/25 transition-all duration-200 hover:shadow-md hover:scale-105 active:scale-95 disabled:opacity-30 disabled:hover:scale-100"
               >
                 {sendMutation.isPending ? (
@@ -4,7 +4,7 @@ import { useMutation, useQueryClient } from '@tanstack/react-query';
 import { useNavigate } from 'react-router-dom';
 import { toast } from 'sonner';
 import { imagesApi } from '@/features/images/api';
-import { ImageDetailsDialog, type ImageComment } from '@/features/images/components/ImageDetailsDialog';
+import { appendReplyPage, ImageDetailsDialog, type ImageComment } from '@/features/images/components/ImageDetailsDialog';
 import { GalleryCard } from '@/features/images/components/GalleryCard';
 import type { ImageRecord } from '@/features/images/types';
 import { QUERY_KEYS } from '@/lib/constants';
@@ -212,6 +212,14 @@ export const ExplorePage = () => {
     addReplyMutation.mutate({ imageId: selectedImage.id, parentId, text });
   };
 
+  const handleLoadMoreReplies = async (commentId: number) => {
+    if (!selectedImage) return;
+    const cursor = comments.find((c) => c.id === commentId)?.replies_cursor;
+    if (!cursor) return;
+    const page = await imagesApi.fetchCommentReplies(selectedImage.id, commentId, cursor);
+    setComments((prev) => appendReplyPage(prev, commentId, page));
+  };
+
   const likeMutation = useMutation({
     mutationFn: async (image: ImageRecord) => {
       if (image.is_liked) {
@@ -533,6 +541,7 @@ export const ExplorePage = () => {
         onAddComment={handleAddComment}
         onLikeComment={handleLikeComment}
         onAddReply={handleAddReply}
+        onLoadMoreReplies={handleLoadMoreReplies}
         isLoadingComments={isLoadingComments}
       />
     </div>
@@ -4,7 +4,7 @@ import { useNavigate } from 'react-router-dom';
 import { toast } from 'sonner';
 import clsx from 'clsx';
 import { GalleryCard } from '@/features/images/components/GalleryCard';
-import { ImageDetailsDialog, type ImageComment } from '@/features/images/components/ImageDetailsDialog';
+import { appendReplyPage, ImageDetailsDialog, type ImageComment } from '@/features/images/components/ImageDetailsDialog';
 import type { ImageRecord } from '@/features/images/types';
 import { imagesApi } from '@/features/images/api';
 import { authApi } from '@/features/auth/api';
@@ -264,6 +264,14 @@ export const ProfilePage = () => {
     addReplyMutation.mutate({ imageId: selectedImage.id, parentId, text });
   };
 
+  const handleLoadMoreReplies = async (commentId: number) => {
+    if (!selectedImage) return;
+    const cursor = comments.find((c) => c.id === commentId)?.replies_cursor;
+    if (!cursor) return;
+    const page = await imagesApi.fetchCommentReplies(selectedImage.id, commentId, cursor);
+    setComments((prev) => appendReplyPage(prev, commentId, page));
+  };
+
   const handleDownload = async (image: ImageRecord) => {
     const data = await imagesApi.registerDownload(image.id);
     if (data.download_url) {
@@ -632,6 +640,7 @@ export const ProfilePage = () => {
         onAddComment={handleAddComment}
         onLikeComment={handleLikeComment}
         onAddReply={handleAddReply}
+        onLoadMoreReplies={handleLoadMoreReplies}
         isLoadingComments={isLoadingComments}
       />
     </div>
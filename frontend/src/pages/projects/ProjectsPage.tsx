@@ -3,7 +3,7 @@ import { Link, useNavigate } from 'react-router-dom';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { Plus, FolderOpen, Globe, Lock, Image as ImageIcon } from 'lucide-react';
 import { imagesApi } from '@/features/images/api';
-import type { ProjectRecord } from '@/features/images/types';
+import type { ProjectListItem } from '@/features/images/types';
 
 export const ProjectsPage = () => {
   const navigate = useNavigate();
@@ -115,7 +115,8 @@ export const ProjectsPage = () => {
   );
 };
 
-function ProjectCard({ project }: { project: ProjectRecord }) {
+function ProjectCard({ project }: { project: ProjectListItem }) {
+  const coverUrl = project.cover_image_url ?? project.previews[0]?.image_url ?? null;
   return (
     <Link
       to={`/projects/${project.id}`}
@@ -123,9 +124,9 @@ function ProjectCard({ project }: { project: ProjectRecord }) {
     >
       {/* Folder animation — images peek on hover */}
       <div className="relative h-40 bg-gradient-to-br from-flow-50 to-flow-100 dark:from-flow-950 dark:to-flow-900/50 overflow-hidden">
-        {project.cover_image_url ? (
+        {coverUrl ? (
           <img
-            src={project.cover_image_url}
+            src={coverUrl}
             alt={project.title}
             className="h-full w-full object-cover transition-all duration-500 group-hover:scale-110 group-hover:brightness-110"
           />